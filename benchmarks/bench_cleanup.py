@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+"""
+Benchmark the cleanup of expired uploads and tasks.
+
+Creates N expired uploads, each with a completed task and an output file,
+then removes them with the legacy per-row loop (UploadedFile.delete() per
+row, cascading the task, django_cleanup unlinking outputs) or with
+converter.cleanup.purge_expired:
+    python benchmarks/bench_cleanup.py --rows 5000
+    python benchmarks/bench_cleanup.py --rows 20000 --modes batch --workers 1 4
+
+Runs against a throwaway SQLite file and media directory, never
+db.sqlite3 or media/.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+
+def setup_django():
+    import django
+    from django.conf import settings
+
+    temp_dir = tempfile.mkdtemp(prefix='bench_cleanup_')
+    settings.DATABASES['default']['NAME'] = os.path.join(temp_dir, 'bench.sqlite3')
+    settings.MEDIA_ROOT = os.path.join(temp_dir, 'media')
+    django.setup()
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+
+
+def populate(rows):
+    """Create rows expired uploads, each with a completed task; both have a file."""
+    from datetime import timedelta
+    from django.conf import settings
+    from django.db import transaction
+    from django.utils import timezone
+    from converter.models import UploadedFile, ConversionTask
+
+    expired = timezone.now() - timedelta(minutes=1)
+    for directory in ('uploads', 'converted'):
+        os.makedirs(os.path.join(settings.MEDIA_ROOT, directory), exist_ok=True)
+    uploads, tasks = [], []
+    for i in range(rows):
+        upload_name, output_name = f'uploads/in_{i}.pdf', f'converted/out_{i}.pdf'
+        for name in (upload_name, output_name):
+            with open(os.path.join(settings.MEDIA_ROOT, name), 'wb') as f:
+                f.write(b'%PDF-1.4 ' + b'x' * 4096)
+        upload = UploadedFile(original_filename=f'in_{i}.pdf', file_type='.pdf', file=upload_name,
+                              expires_at=expired)
+        uploads.append(upload)
+        tasks.append(ConversionTask(input_file=upload, conversion_type='compress_pdf', status='completed',
+                                    output_file=output_name, expires_at=expired))
+    with transaction.atomic():
+        UploadedFile.objects.bulk_create(uploads, batch_size=1000)
+        ConversionTask.objects.bulk_create(tasks, batch_size=1000)
+    # auto_now_add ignores the values given: age the rows so the legacy one-hour filter matches too
+    two_hours_ago = timezone.now() - timedelta(hours=2)
+    UploadedFile.objects.update(uploaded_at=two_hours_ago)
+    ConversionTask.objects.update(created_at=two_hours_ago)
+
+
+def legacy_cleanup():
+    """The pre-batch scripts/cleanup.py body (per-row delete, then bulk task delete)."""
+    from datetime import timedelta
+    from django.utils import timezone
+    from converter.models import UploadedFile, ConversionTask
+
+    one_hour_ago = timezone.now() - timedelta(hours=1)
+    for file in UploadedFile.objects.filter(uploaded_at__lt=one_hour_ago):
+        file.delete()
+    ConversionTask.objects.filter(created_at__lt=one_hour_ago).delete()
+
+
+def batch_cleanup(workers):
+    from converter.cleanup import purge_expired
+    return purge_expired(workers=workers)
+
+
+def remaining_files():
+    from django.conf import settings
+    return sum(len(files) for _, _, files in os.walk(settings.MEDIA_ROOT))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--modes', nargs='+', choices=['legacy', 'batch'], default=['legacy', 'batch'])
+    parser.add_argument('--workers', type=int, nargs='+', default=[4], help='unlink threads for batch mode')
+    args = parser.parse_args()
+
+    setup_django()
+    runs = []
+    if 'legacy' in args.modes:
+        runs.append(('legacy', None))
+    if 'batch' in args.modes:
+        runs.extend(('batch', workers) for workers in args.workers)
+
+    print(f"{args.rows} expired uploads + {args.rows} tasks, {2 * args.rows} files")
+    print(f"{'mode':>10} {'seconds':>9} {'rows/s':>9} {'files left':>11}")
+    for mode, workers in runs:
+        populate(args.rows)
+        start = time.perf_counter()
+        if mode == 'legacy':
+            legacy_cleanup()
+        else:
+            batch_cleanup(workers)
+        elapsed = time.perf_counter() - start
+        label = mode if workers is None else f"{mode}x{workers}"
+        print(f"{label:>10} {elapsed:>9.2f} {2 * args.rows / elapsed:>9.0f} {remaining_files():>11}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""
+Benchmark image-downsampling PDF compression.
+
+Compares a plain pikepdf re-save (the old behaviour) with each compression
+level, then the effect of image encoding threads:
+    python benchmarks/bench_compression.py --pages 40 --max-workers 4
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixtures import make_image_pdf
+from converter.compression import compress_pdf_file
+
+
+def _size(stream):
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.close()
+    return size
+
+
+def resave(pdf_path):
+    import pikepdf
+
+    output = tempfile.TemporaryFile()
+    with pikepdf.open(pdf_path) as pdf:
+        pdf.save(output, compress_streams=True)
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=40)
+    parser.add_argument('--image-px', type=int, default=2400)
+    parser.add_argument('--distinct', type=int, default=8, help='distinct images cycled across pages')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    pdf_path = make_image_pdf(args.pages, args.image_px, args.distinct)
+    original = os.path.getsize(pdf_path)
+    print(f"Fixture: {pdf_path} ({args.pages} pages, {original / 1e6:.1f} MB)")
+
+    print(f"{'mode':>10} {'seconds':>10} {'MB':>8} {'ratio':>8}")
+    start = time.perf_counter()
+    size = _size(resave(pdf_path))
+    print(f"{'resave':>10} {time.perf_counter() - start:>10.2f} {size / 1e6:>8.2f} {original / size:>7.1f}x")
+    for level in ('low', 'medium', 'high'):
+        start = time.perf_counter()
+        size = _size(compress_pdf_file(pdf_path, level, workers=1))
+        print(f"{level:>10} {time.perf_counter() - start:>10.2f} {size / 1e6:>8.2f} {original / size:>7.1f}x")
+
+    print(f"\n{'workers':>8} {'seconds':>10} {'speedup':>8}  (medium)")
+    baseline = None
+    workers = 1
+    while workers <= args.max_workers:
+        start = time.perf_counter()
+        _size(compress_pdf_file(pdf_path, 'medium', workers=workers))
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{workers:>8} {elapsed:>10.2f} {baseline / elapsed:>7.2f}x")
+        workers *= 2
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+"""
+Benchmark Excel to PDF rendering on workbooks of increasing size.
+
+Compares the legacy implementation (pandas.read_excel of the first sheet
+into one reportlab Table) with the streaming renderer. Each run happens in
+a fresh subprocess so peak RSS is measured independently:
+    python benchmarks/bench_excel.py
+    python benchmarks/bench_excel.py --cells 10000 100000 1000000 --columns 10
+    python benchmarks/bench_excel.py --modes streaming --cells 1000000
+
+Workbooks have one sheet of mixed text, integer, float and date columns.
+"""
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import subprocess
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixtures import make_workbook
+
+
+def legacy_render(excel_path):
+    """The pre-streaming implementation (fit_to_page, gridlines and headers on)."""
+    import io
+    import pandas as pd
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+
+    try:
+        df = pd.read_excel(excel_path)
+    except ImportError:
+        # pandas refuses the installed openpyxl: load the sheet the way its openpyxl engine does
+        from openpyxl import load_workbook
+        workbook = load_workbook(excel_path, read_only=True, data_only=True)
+        rows = list(workbook.worksheets[0].values)
+        workbook.close()
+        df = pd.DataFrame(rows[1:], columns=rows[0])
+    pdf_buffer = io.BytesIO()
+    required_width = len(df.columns) * 1.5 * inch
+    required_height = (len(df) + 1) * 0.4 * inch
+    if required_width > 10 * inch or required_height > 10 * inch:
+        pagesize = (required_width + 2 * inch, required_height + 2 * inch)
+    else:
+        pagesize = letter
+    doc = SimpleDocTemplate(pdf_buffer, pagesize=pagesize)
+    data = [df.columns.tolist()] + df.values.tolist()
+    table = Table(data, colWidths=[doc.width / len(df.columns)] * len(df.columns))
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4CAF50')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#F9F9F9')),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ]))
+    styles = getSampleStyleSheet()
+    doc.build([Paragraph("Excel to PDF Conversion", styles['Title']), Spacer(1, 20), table])
+    pdf_buffer.seek(0)
+    return pdf_buffer
+
+
+def streaming_render(excel_path):
+    from converter.excel_render import render_workbook
+    return render_workbook(excel_path)
+
+
+MODES = {
+    'legacy': legacy_render,
+    'streaming': streaming_render,
+}
+
+
+def run_mode(mode, excel_path):
+    """Run one mode in this process and print a JSON result line."""
+    start = time.perf_counter()
+    output = MODES[mode](excel_path)
+    elapsed = time.perf_counter() - start
+    output.seek(0, os.SEEK_END)
+    print(json.dumps({
+        'seconds': elapsed,
+        'output_bytes': output.tell(),
+        # ru_maxrss is reported in KiB on Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def measure(mode, excel_path, timeout):
+    completed = subprocess.run(
+        [sys.executable, __file__, '--mode', mode, '--xlsx', excel_path],
+        check=True, capture_output=True, text=True, timeout=timeout
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--cells', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--columns', type=int, default=10)
+    parser.add_argument('--modes', nargs='+', choices=sorted(MODES), default=['legacy', 'streaming'])
+    parser.add_argument('--timeout', type=int, default=600, help='seconds before a run is abandoned')
+    parser.add_argument('--mode', choices=sorted(MODES), help=argparse.SUPPRESS)
+    parser.add_argument('--xlsx', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.xlsx)
+        return
+
+    print(f"{'cells':>9} {'rows':>7} {'mode':>10} {'seconds':>9} {'rows/s':>9} {'peak RSS MB':>12} {'output MB':>10}")
+    for cells in args.cells:
+        rows = max(1, cells // args.columns)
+        excel_path = make_workbook(rows, args.columns)
+        for mode in args.modes:
+            try:
+                result = measure(mode, excel_path, args.timeout)
+            except subprocess.TimeoutExpired:
+                print(f"{cells:>9} {rows:>7} {mode:>10} timed out after {args.timeout} s")
+                continue
+            except subprocess.CalledProcessError as e:
+                print(f"{cells:>9} {rows:>7} {mode:>10} failed (exit status {e.returncode})")
+                continue
+            print(f"{cells:>9} {rows:>7} {mode:>10} {result['seconds']:>9.2f} {rows / result['seconds']:>9.0f} "
+                  f"{result['peak_rss_mb']:>12.1f} {result['output_bytes'] / 1024 / 1024:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+"""
+Benchmark Image to PDF on a corpus of phone-sized photos.
+
+Compares the legacy implementation (each file's path handed to
+reportlab's drawImage, so it is embedded at full resolution) with
+convert_images_to_pdf and its ingest pipeline. Each mode runs in a fresh
+subprocess:
+    python benchmarks/bench_images.py
+    python benchmarks/bench_images.py --photos 20 --workers 1 4
+
+The corpus holds 12 MP JPEGs (a quarter of them stored sideways with an
+EXIF rotation, as phones do), one small JPEG that can pass through
+unchanged and one PNG screenshot.
+"""
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import subprocess
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixtures import fixture_path, make_photo
+
+
+def make_corpus(photos, width=4032, height=3024):
+    """Create (or reuse) the photo corpus; returns the image paths."""
+    from PIL import Image, ImageDraw
+
+    directory = fixture_path(f'photos_{photos}_{width}x{height}')
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(photos):
+        path = os.path.join(directory, f'IMG_{i:04d}.jpg')
+        if not os.path.exists(path):
+            photo = make_photo(width, height, seed=i)
+            exif = Image.Exif()
+            if i % 4 == 3:
+                # Sensor landscape, shown portrait: EXIF orientation 6 (rotate 90 CW)
+                exif[0x0112] = 6
+            photo.save(path, quality=92, exif=exif.tobytes())
+        paths.append(path)
+
+    small = os.path.join(directory, 'small.jpg')
+    if not os.path.exists(small):
+        make_photo(800, 600, seed=999).save(small, quality=85)
+    paths.append(small)
+
+    screenshot = os.path.join(directory, 'screenshot.png')
+    if not os.path.exists(screenshot):
+        image = Image.new('RGB', (2560, 1600), 'white')
+        draw = ImageDraw.Draw(image)
+        for row in range(40):
+            draw.rectangle((40, 40 + row * 38, 2520, 66 + row * 38), fill=(230, 236, 245) if row % 2 else 'white')
+            draw.text((60, 46 + row * 38), f"Row {row}: settings value {row * 7}", fill='black')
+        image.save(screenshot)
+    paths.append(screenshot)
+    return paths
+
+
+def legacy_convert(image_paths):
+    """The pre-ingest implementation for A4 portrait, 'fit' placement."""
+    import io
+    from PIL import Image
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    pdf_buffer = io.BytesIO()
+    c = canvas.Canvas(pdf_buffer, pagesize=A4)
+    page_width, page_height = A4
+    for img_path in image_paths:
+        img_width, img_height = Image.open(img_path).size
+        scale = min(page_width * 0.9 / img_width, page_height * 0.9 / img_height)
+        width, height = img_width * scale, img_height * scale
+        c.drawImage(img_path, (page_width - width) / 2, (page_height - height) / 2, width=width, height=height)
+        c.showPage()
+    c.save()
+    return pdf_buffer
+
+
+def pipeline_convert(image_paths, workers):
+    from django.conf import settings
+    settings.configure(IMAGE_TO_PDF_WORKERS=workers)
+    from converter.utils import convert_images_to_pdf
+    return convert_images_to_pdf(image_paths, 'A4', 'portrait', 'fit')
+
+
+def run_mode(mode, workers, image_paths):
+    """Run one mode in this process and print a JSON result line."""
+    start = time.perf_counter()
+    if mode == 'legacy':
+        output = legacy_convert(image_paths)
+    else:
+        output = pipeline_convert(image_paths, workers)
+    elapsed = time.perf_counter() - start
+    output.seek(0, os.SEEK_END)
+    print(json.dumps({
+        'seconds': elapsed,
+        'output_bytes': output.tell(),
+        # ru_maxrss is reported in KiB on Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def measure(mode, workers, image_paths):
+    completed = subprocess.run(
+        [sys.executable, __file__, '--mode', mode, '--run-workers', str(workers), '--images', *image_paths],
+        check=True, capture_output=True, text=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--photos', type=int, default=20)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4], help='pipeline thread counts')
+    parser.add_argument('--mode', choices=['legacy', 'pipeline'], help=argparse.SUPPRESS)
+    parser.add_argument('--run-workers', type=int, default=1, help=argparse.SUPPRESS)
+    parser.add_argument('--images', nargs='+', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.run_workers, args.images)
+        return
+
+    image_paths = make_corpus(args.photos)
+    input_mb = sum(os.path.getsize(p) for p in image_paths) / 1024 / 1024
+    print(f"{len(image_paths)} images, {input_mb:.1f} MB, A4 fit")
+    print(f"{'mode':>12} {'seconds':>9} {'peak RSS MB':>12} {'output MB':>10}")
+    runs = [('legacy', 1)] + [('pipeline', workers) for workers in args.workers]
+    for mode, workers in runs:
+        result = measure(mode, workers, image_paths)
+        label = mode if mode == 'legacy' else f"{mode}x{workers}"
+        print(f"{label:>12} {result['seconds']:>9.2f} {result['peak_rss_mb']:>12.1f} "
+              f"{result['output_bytes'] / 1024 / 1024:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
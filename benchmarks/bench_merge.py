@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""
+Benchmark merging several PDFs into one.
+
+Compares the legacy implementation (every input read into a BytesIO for
+PyPDF2.PdfMerger, output in a BytesIO copied into ContentFile) with the
+PyMuPDF merge engine. Each mode runs in a fresh subprocess so peak RSS
+is measured independently:
+    python benchmarks/bench_merge.py --inputs 10 --pages 8
+    python benchmarks/bench_merge.py --fixture text --pages 200
+
+Inputs are copies of one fixture, like a batch produced by the same tool,
+so they share fonts and images.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import resource
+import argparse
+import tempfile
+import subprocess
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixtures import make_text_pdf, make_image_pdf
+
+
+def legacy_merge(pdf_paths):
+    """The pre-streaming implementation, including the view's ContentFile copy."""
+    import io
+    import PyPDF2
+
+    merger = PyPDF2.PdfMerger()
+    for pdf_path in pdf_paths:
+        with open(pdf_path, 'rb') as file:
+            pdf_data = io.BytesIO(file.read())
+            pdf_data.seek(0)
+            merger.append(pdf_data)
+    output_stream = io.BytesIO()
+    merger.write(output_stream)
+    merger.close()
+    output_stream.seek(0)
+    return io.BytesIO(output_stream.read())
+
+
+def streaming_merge(pdf_paths):
+    from converter.merge import merge_pdf_files
+    return merge_pdf_files(pdf_paths)
+
+
+def streaming_merge_no_dedupe(pdf_paths):
+    from converter.merge import merge_pdf_files
+    return merge_pdf_files(pdf_paths, dedupe=False)
+
+
+MODES = {
+    'legacy': legacy_merge,
+    'streaming': streaming_merge,
+    'no-dedupe': streaming_merge_no_dedupe,
+}
+
+
+def run_mode(mode, pdf_paths):
+    """Run one mode in this process and print a JSON result line."""
+    start = time.perf_counter()
+    output = MODES[mode](pdf_paths)
+    elapsed = time.perf_counter() - start
+    output.seek(0, os.SEEK_END)
+    print(json.dumps({
+        'seconds': elapsed,
+        'output_bytes': output.tell(),
+        # ru_maxrss is reported in KiB on Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def measure(mode, pdf_paths):
+    completed = subprocess.run(
+        [sys.executable, __file__, '--mode', mode, '--pdf', *pdf_paths],
+        check=True, capture_output=True, text=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--inputs', type=int, default=10)
+    parser.add_argument('--pages', type=int, default=8, help='pages per input (images: ~8 MB each)')
+    parser.add_argument('--fixture', choices=['text', 'images'], default='images')
+    parser.add_argument('--modes', nargs='+', choices=sorted(MODES), default=['legacy', 'no-dedupe', 'streaming'])
+    parser.add_argument('--mode', choices=sorted(MODES), help=argparse.SUPPRESS)
+    parser.add_argument('--pdf', nargs='+', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.pdf)
+        return
+
+    if args.fixture == 'images':
+        fixture = make_image_pdf(args.pages, image_px=2400, distinct=4)
+    else:
+        fixture = make_text_pdf(args.pages)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_paths = []
+        for i in range(args.inputs):
+            path = os.path.join(temp_dir, f'input_{i}.pdf')
+            shutil.copyfile(fixture, path)
+            pdf_paths.append(path)
+        input_mb = sum(os.path.getsize(p) for p in pdf_paths) / 1024 / 1024
+
+        print(f"{args.inputs} inputs x {args.pages} pages ({args.fixture}), {input_mb:.1f} MB in total")
+        print(f"{'mode':>10} {'seconds':>9} {'MB/s':>8} {'peak RSS MB':>12} {'output MB':>10}")
+        for mode in args.modes:
+            try:
+                result = measure(mode, pdf_paths)
+            except subprocess.CalledProcessError as e:
+                print(f"{mode:>10} failed (exit status {e.returncode}, likely out of memory)")
+                continue
+            print(f"{mode:>10} {result['seconds']:>9.2f} {input_mb / result['seconds']:>8.1f} "
+                  f"{result['peak_rss_mb']:>12.1f} {result['output_bytes'] / 1024 / 1024:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+"""
+Benchmark Word and Excel to PDF throughput with LibreOffice.
+
+Converts the same documents with:
+    spawn      soffice --convert-to pdf per document, each with a fresh profile
+               (what a per-request LibreOffice backend does)
+    pooled     converter.office_pool with long-lived instances (started before timing)
+    reportlab  the built-in renderers, for reference
+Jobs run on --concurrency processes:
+    python benchmarks/bench_office.py
+    python benchmarks/bench_office.py --jobs 40 --concurrency 2 --pool-size 2
+    python benchmarks/bench_office.py --kinds docx --modes pooled spawn
+
+Needs soffice and the uno module (python3-uno); without them only the
+reportlab mode runs. Pool lock files and profiles go to a temp directory.
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+from benchmarks import fixtures
+
+CONVERSION_TYPES = {'docx': 'word_to_pdf', 'xlsx': 'excel_to_pdf'}
+
+
+def make_input(kind):
+    if kind == 'docx':
+        return fixtures.make_docx(20)
+    return fixtures.make_workbook(2000, 10)
+
+
+def setup_django(pool_dir, pool_size):
+    import django
+    from django.conf import settings
+
+    settings.OFFICE_POOL_DIR = pool_dir
+    settings.OFFICE_POOL_SIZE = pool_size
+    django.setup()
+
+
+def spawn_convert(kind, path):
+    from django.conf import settings
+
+    with tempfile.TemporaryDirectory(prefix='office_spawn_') as temp_dir:
+        subprocess.run(
+            [settings.OFFICE_BINARY, '--headless', '--nologo', '--norestore',
+             f'-env:UserInstallation={Path(temp_dir, "profile").as_uri()}',
+             '--convert-to', 'pdf', '--outdir', temp_dir, path],
+            check=True, capture_output=True, timeout=settings.OFFICE_TIMEOUT,
+        )
+        return os.path.getsize(os.path.join(temp_dir, f'{Path(path).stem}.pdf'))
+
+
+def pooled_convert(kind, path):
+    from converter.office_pool import convert_to_pdf
+
+    with convert_to_pdf(CONVERSION_TYPES[kind], path) as output:
+        output.seek(0, os.SEEK_END)
+        return output.tell()
+
+
+def reportlab_convert(kind, path):
+    from converter.word_render import render_document
+    from converter.excel_render import render_workbook
+
+    render = render_document if kind == 'docx' else render_workbook
+    with render(path) as output:
+        output.seek(0, os.SEEK_END)
+        return output.tell()
+
+
+MODES = {
+    'spawn': spawn_convert,
+    'pooled': pooled_convert,
+    'reportlab': reportlab_convert,
+}
+
+
+def _ready(_):
+    time.sleep(0.2)
+
+
+def _job(args):
+    mode, kind, path, pool_dir, pool_size = args
+    from django.apps import apps
+
+    if not apps.ready:
+        setup_django(pool_dir, pool_size)
+    return MODES[mode](kind, path)
+
+
+def run(mode, kind, path, jobs, concurrency, pool_dir, pool_size):
+    """Seconds to convert path jobs times on concurrency processes."""
+    with ProcessPoolExecutor(concurrency) as executor:
+        # Start every worker process outside the timed part
+        list(executor.map(_ready, range(concurrency)))
+        args = [(mode, kind, path, pool_dir, pool_size)] * jobs
+        start = time.perf_counter()
+        sizes = list(executor.map(_job, args))
+        return time.perf_counter() - start, sizes[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--kinds', nargs='+', choices=sorted(CONVERSION_TYPES), default=['docx', 'xlsx'])
+    parser.add_argument('--modes', nargs='+', choices=sorted(MODES), default=['spawn', 'pooled', 'reportlab'])
+    parser.add_argument('--jobs', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=2, help='converting processes')
+    parser.add_argument('--pool-size', type=int, default=2, help='LibreOffice instances for pooled mode')
+    args = parser.parse_args()
+
+    pool_dir = tempfile.mkdtemp(prefix='office_pool_')
+    setup_django(pool_dir, args.pool_size)
+    from converter import office_pool
+
+    modes = args.modes
+    if not office_pool.is_available():
+        print("soffice or the uno module is not installed: only the reportlab mode runs")
+        modes = [mode for mode in modes if mode == 'reportlab']
+
+    if 'pooled' in modes:
+        start = time.perf_counter()
+        # Not in this process: the converting processes are forked from it
+        office_pool.warm_in_subprocess()
+        print(f"Started {args.pool_size} LibreOffice instance(s) in {time.perf_counter() - start:.1f}s")
+
+    print(f"{args.jobs} jobs per run on {args.concurrency} process(es)")
+    print(f"{'kind':>5} {'mode':>10} {'seconds':>9} {'docs/s':>8} {'s/doc':>8} {'output KB':>10}")
+    try:
+        for kind in args.kinds:
+            path = make_input(kind)
+            for mode in modes:
+                try:
+                    elapsed, size = run(mode, kind, path, args.jobs, args.concurrency, pool_dir, args.pool_size)
+                except Exception as e:
+                    print(f"{kind:>5} {mode:>10} failed: {str(e)}")
+                    continue
+                print(f"{kind:>5} {mode:>10} {elapsed:>9.2f} {args.jobs / elapsed:>8.2f} "
+                      f"{elapsed * args.concurrency / args.jobs:>8.2f} {size / 1024:>10.0f}")
+    finally:
+        if 'pooled' in modes:
+            office_pool.shutdown()
+        shutil.rmtree(pool_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
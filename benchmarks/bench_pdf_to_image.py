@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+"""
+Benchmark PDF to image export against page count, DPI and worker count.
+
+Modes:
+    in_memory  every page rendered and encoded into a list, then zipped into
+               BytesIO (what a straightforward implementation does)
+    streaming  converter.rasterize.write_images_zip with --workers processes
+Each run happens in a fresh subprocess; peak RSS is the largest of the
+parent and its rendering processes:
+    python benchmarks/bench_pdf_to_image.py
+    python benchmarks/bench_pdf_to_image.py --pages 10 100 1000 --dpi 72 150 300
+    python benchmarks/bench_pdf_to_image.py --workers 1 2 4 --formats png
+
+Documents come from benchmarks.fixtures.make_mixed_pdf (text, a table and
+a photo per page).
+"""
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import subprocess
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixtures import make_mixed_pdf
+
+
+def in_memory_render(pdf_path, image_format, dpi, quality, workers):
+    import io
+    import zipfile
+    import fitz
+
+    images = []
+    with fitz.open(pdf_path) as doc:
+        for page in doc:
+            pixmap = page.get_pixmap(dpi=dpi)
+            images.append(pixmap.tobytes('png') if image_format == 'png'
+                          else pixmap.tobytes('jpeg', jpg_quality=quality))
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, 'w') as archive:
+        for number, data in enumerate(images, 1):
+            archive.writestr(f'page_{number}.{image_format}', data)
+    output.seek(0)
+    return output
+
+
+def streaming_render(pdf_path, image_format, dpi, quality, workers):
+    from converter.rasterize import write_images_zip
+    return write_images_zip(pdf_path, image_format, dpi, quality, workers=workers)
+
+
+MODES = {
+    'in_memory': in_memory_render,
+    'streaming': streaming_render,
+}
+
+
+def run_mode(mode, pdf_path, image_format, dpi, workers):
+    """Run one export in this process and print a JSON result line."""
+    start = time.perf_counter()
+    output = MODES[mode](pdf_path, image_format, dpi, 85, workers)
+    elapsed = time.perf_counter() - start
+    output.seek(0, os.SEEK_END)
+    # ru_maxrss is reported in KiB on Linux; RUSAGE_CHILDREN is the largest child
+    peak_rss_mb = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                      resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) / 1024
+    print(json.dumps({'seconds': elapsed, 'output_bytes': output.tell(), 'peak_rss_mb': peak_rss_mb}))
+
+
+def measure(mode, pdf_path, image_format, dpi, workers, timeout):
+    completed = subprocess.run(
+        [sys.executable, __file__, '--mode', mode, '--pdf', pdf_path, '--formats', image_format,
+         '--dpi', str(dpi), '--workers', str(workers)],
+        check=True, capture_output=True, text=True, timeout=timeout
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[10, 100, 500])
+    parser.add_argument('--dpi', type=int, nargs='+', default=[72, 150, 300])
+    parser.add_argument('--formats', nargs='+', choices=['jpeg', 'png'], default=['jpeg'])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, min(4, os.cpu_count() or 1)])
+    parser.add_argument('--modes', nargs='+', choices=sorted(MODES), default=['in_memory', 'streaming'])
+    parser.add_argument('--timeout', type=int, default=1800, help='seconds before a run is abandoned')
+    parser.add_argument('--mode', choices=sorted(MODES), help=argparse.SUPPRESS)
+    parser.add_argument('--pdf', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.pdf, args.formats[0], args.dpi[0], args.workers[0])
+        return
+
+    print(f"{os.cpu_count()} CPU(s)")
+    print(f"{'pages':>6} {'dpi':>4} {'format':>6} {'mode':>10} {'workers':>7} {'seconds':>9} {'pages/s':>8} "
+          f"{'peak RSS MB':>12} {'output MB':>10}")
+    for pages in args.pages:
+        pdf_path = make_mixed_pdf(pages)
+        for dpi in args.dpi:
+            for image_format in args.formats:
+                runs = [(mode, workers) for mode in args.modes
+                        for workers in (sorted(set(args.workers)) if mode == 'streaming' else [1])]
+                for mode, workers in runs:
+                    label = f"{pages:>6} {dpi:>4} {image_format:>6} {mode:>10} {workers:>7}"
+                    try:
+                        result = measure(mode, pdf_path, image_format, dpi, workers, args.timeout)
+                    except subprocess.TimeoutExpired:
+                        print(f"{label} timed out after {args.timeout} s")
+                        continue
+                    except subprocess.CalledProcessError as e:
+                        print(f"{label} failed (exit status {e.returncode})")
+                        continue
+                    print(f"{label} {result['seconds']:>9.2f} {pages / result['seconds']:>8.1f} "
+                          f"{result['peak_rss_mb']:>12.1f} {result['output_bytes'] / 1024 / 1024:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+"""
+Benchmark page-parallel PDF to DOCX conversion.
+
+Measures wall-clock time for 1..N workers on a generated fixture:
+    python benchmarks/bench_pdf_to_word.py --pages 300 --max-workers 8
+"""
+import os
+import io
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixtures import make_text_pdf
+from converter.docx_parallel import convert_pdf_to_docx_parallel
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=300)
+    parser.add_argument('--chunk-size', type=int, default=25)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    pdf_path = make_text_pdf(args.pages)
+    print(f"Fixture: {pdf_path} ({args.pages} pages), chunk size {args.chunk_size}")
+    print(f"{'workers':>8} {'seconds':>10} {'pages/s':>10} {'speedup':>8}")
+
+    baseline = None
+    workers = 1
+    while workers <= args.max_workers:
+        start = time.perf_counter()
+        convert_pdf_to_docx_parallel(pdf_path, io.BytesIO(), workers=workers, chunk_size=args.chunk_size)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{workers:>8} {elapsed:>10.2f} {args.pages / elapsed:>10.1f} {baseline / elapsed:>7.2f}x")
+        workers *= 2
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+"""
+Benchmark ConversionTask lookups before and after the task indexes.
+
+Seeds N tasks (and their uploads) into a throwaway SQLite database at the
+0006 schema, times the hot queries, migrates to the latest schema (moving
+client_ip and output_hash out of extra_data) and times them again:
+    python benchmarks/bench_queries.py --rows 1000000
+    python benchmarks/bench_queries.py --rows 100000 --repeat 50
+
+"Before" queries select every column the 0006 model had, as the old
+views did; "after" queries are the ones the views, admin, queue and
+cleanup now run. Never touches db.sqlite3.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+import tempfile
+import statistics
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+BEFORE_MIGRATION = '0006_expires_at'
+# ConversionTask columns at BEFORE_MIGRATION
+BEFORE_FIELDS = ('id', 'input_file', 'output_file', 'conversion_type', 'status', 'created_at',
+                 'completed_at', 'expires_at', 'extra_data', 'progress_done', 'progress_total',
+                 'progress_stage')
+CONVERSION_TYPES = ('pdf_to_word', 'word_to_pdf', 'merge_pdf', 'split_pdf', 'compress_pdf',
+                    'excel_to_pdf', 'image_to_pdf')
+# Share of rows per status; most tasks finished long ago
+STATUSES = (('completed', 0.95), ('failed', 0.04), ('processing', 0.005), ('pending', 0.005))
+CHUNK = 10000
+
+
+def setup_django():
+    import django
+    from django.conf import settings
+
+    temp_dir = tempfile.mkdtemp(prefix='bench_queries_')
+    settings.DATABASES['default']['NAME'] = os.path.join(temp_dir, 'bench.sqlite3')
+    django.setup()
+
+
+def migrate(target=None):
+    from django.core.management import call_command
+    args = ['converter', target] if target else []
+    start = time.perf_counter()
+    call_command('migrate', *args, verbosity=0)
+    return time.perf_counter() - start
+
+
+def _timestamp(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S.%f')
+
+
+def seed(rows, ips):
+    """Insert rows uploads and rows tasks spread over the last day; returns sample ids."""
+    from django.db import connection, transaction
+
+    rng = random.Random(1)
+    now = datetime.now(dt_timezone.utc)
+    statuses, weights = zip(*STATUSES)
+    sample = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for start in range(0, rows, CHUNK):
+            uploads, tasks = [], []
+            for i in range(start, min(rows, start + CHUNK)):
+                created = now - timedelta(seconds=rng.uniform(0, 86400))
+                upload_id, task_id = uuid.uuid4().hex, uuid.uuid4().hex
+                status = rng.choices(statuses, weights)[0]
+                extra_data = {
+                    'output_filename': f'document_{i}.pdf',
+                    'client_ip': rng.choice(ips),
+                    'user_agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36',
+                    'output_hash': uuid.uuid4().hex * 2,
+                    'optimize_size': True,
+                    'page_size': 'a4',
+                }
+                uploads.append((upload_id, f'uploads/{upload_id[:10]}.pdf', f'document_{i}.pdf', '.pdf',
+                                _timestamp(created), '', '', _timestamp(created + timedelta(hours=1))))
+                tasks.append((task_id, upload_id, f'converted/document_{i}.pdf', rng.choice(CONVERSION_TYPES),
+                               status, _timestamp(created),
+                               _timestamp(created + timedelta(seconds=5)) if status in ('completed', 'failed') else None,
+                               _timestamp(created + timedelta(hours=1)), json.dumps(extra_data), 0, 0, ''))
+                if rng.random() < 0.001:
+                    sample.append(task_id)
+            cursor.executemany(
+                'INSERT INTO converter_uploadedfile (id, file, original_filename, file_type, uploaded_at, '
+                'session_key, file_hash, expires_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)', uploads)
+            cursor.executemany(
+                'INSERT INTO converter_conversiontask (id, input_file_id, output_file, conversion_type, status, '
+                'created_at, completed_at, expires_at, extra_data, progress_done, progress_total, progress_stage) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', tasks)
+    return [uuid.UUID(task_id) for task_id in sample]
+
+
+def queries(phase, sample_ids, ips):
+    """(name, callable) pairs for the given phase ('before' or 'after')."""
+    from django.utils import timezone
+    from converter.models import ConversionTask, UploadedFile
+    from converter.cleanup import IN_FLIGHT_STATUSES
+    from converter.views import DOWNLOAD_FIELDS, RESULT_FIELDS
+
+    rng = random.Random(2)
+    now = timezone.now()
+    before = phase == 'before'
+    download_fields = BEFORE_FIELDS if before else DOWNLOAD_FIELDS
+    result_fields = BEFORE_FIELDS if before else RESULT_FIELDS
+    # The admin change list now defers extra_data
+    list_fields = BEFORE_FIELDS if before else [f for f in BEFORE_FIELDS if f != 'extra_data'] + ['client_ip']
+
+    def by_ip():
+        ip = rng.choice(ips)
+        if before:
+            return list(ConversionTask.objects.only(*BEFORE_FIELDS).filter(extra_data__client_ip=ip)[:100])
+        return list(ConversionTask.objects.only(*list_fields).filter(client_ip=ip)[:100])
+
+    return [
+        ('download lookup', lambda: ConversionTask.objects.only(*download_fields).get(id=rng.choice(sample_ids))),
+        ('result page lookup', lambda: ConversionTask.objects.only(*result_fields).get(id=rng.choice(sample_ids))),
+        ('admin list (newest 100)', lambda: list(ConversionTask.objects.only(*list_fields)[:100])),
+        ('admin filter status=failed', lambda: list(
+            ConversionTask.objects.only(*list_fields).filter(status='failed')[:100])),
+        ('admin filter type', lambda: list(
+            ConversionTask.objects.only(*list_fields).filter(conversion_type='excel_to_pdf')[:100])),
+        ('admin tasks by client IP', by_ip),
+        ('queue dequeue candidates', lambda: list(
+            ConversionTask.objects.filter(status='pending').order_by('created_at').values_list('id', flat=True)[:10])),
+        ('queue depth', lambda: ConversionTask.objects.filter(status='pending').count()),
+        ('cleanup expired tasks batch', lambda: list(
+            ConversionTask.objects.filter(expires_at__lt=now).exclude(status__in=IN_FLIGHT_STATUSES)
+            .values_list('pk', 'output_file')[:500])),
+        ('cleanup in-flight tasks', lambda: list(
+            ConversionTask.objects.filter(status__in=IN_FLIGHT_STATUSES).values_list('conversion_type', 'extra_data'))),
+        ('cleanup orphan uploads (none)', lambda: list(
+            UploadedFile.objects.filter(expires_at__lt=now, conversiontask__isnull=True)
+            .values_list('pk', 'file')[:500])),
+    ]
+
+
+def measure(phase, sample_ids, ips, repeat):
+    results = {}
+    for name, query in queries(phase, sample_ids, ips):
+        query()  # warm the page cache
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            query()
+            timings.append(time.perf_counter() - start)
+        results[name] = statistics.median(timings) * 1000
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=20, help='timed runs per query (median reported)')
+    args = parser.parse_args()
+
+    setup_django()
+    migrate(BEFORE_MIGRATION)
+    ips = [f'10.{i // 256 % 256}.{i % 256}.{i % 200 + 1}' for i in range(5000)]
+
+    start = time.perf_counter()
+    sample_ids = seed(args.rows, ips)
+    print(f"Seeded {args.rows} tasks + {args.rows} uploads in {time.perf_counter() - start:.1f}s")
+
+    before = measure('before', sample_ids, ips, args.repeat)
+    print(f"Migrated to latest in {migrate():.1f}s (index builds + extra_data backfill)")
+    after = measure('after', sample_ids, ips, args.repeat)
+
+    print(f"{'query':<30} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+    for name, before_ms in before.items():
+        after_ms = after[name]
+        print(f"{name:<30} {before_ms:>10.2f} {after_ms:>10.2f} {before_ms / max(after_ms, 1e-6):>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""
+Micro-benchmark for the shared token-bucket rate limiter.
+
+Threads hammer one bucket and a spread of per-client buckets, reporting
+per-check latency and checking that no more tokens are granted than the
+bucket holds (atomicity):
+    python benchmarks/bench_ratelimit.py --threads 16 --checks 500
+    python benchmarks/bench_ratelimit.py --backend redis --redis-url redis://localhost:6379/0
+
+The database backend runs against a throwaway SQLite file, never db.sqlite3.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+import statistics
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+
+def setup_django(args):
+    import django
+    from django.conf import settings
+
+    if args.backend == 'database':
+        settings.DATABASES['default']['NAME'] = os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+    django.setup()
+    if args.backend == 'database':
+        from django.core.management import call_command
+        call_command('migrate', 'converter', verbosity=0)
+
+
+def make_backend(args):
+    from converter.ratelimit import DatabaseTokenBucket, RedisTokenBucket
+
+    if args.backend == 'redis':
+        return RedisTokenBucket(args.redis_url)
+    return DatabaseTokenBucket()
+
+
+def run(backend, threads, checks, key_for, capacity, rate):
+    from django.db import connection
+
+    latencies = []
+    granted = []
+    lock = threading.Lock()
+
+    def worker(n):
+        local_latencies = []
+        local_granted = 0
+        for i in range(checks):
+            start = time.perf_counter()
+            allowed, _ = backend.consume(key_for(n, i), capacity, rate)
+            local_latencies.append(time.perf_counter() - start)
+            local_granted += allowed
+        connection.close()
+        with lock:
+            latencies.extend(local_latencies)
+            granted.append(local_granted)
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return time.perf_counter() - start, latencies, sum(granted)
+
+
+def report(label, elapsed, latencies, granted, expected=None):
+    latencies.sort()
+    p = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1e6
+    line = (f"{label:<14} {len(latencies) / elapsed:>10.0f} {statistics.median(latencies) * 1e6:>9.0f} "
+            f"{p(0.95):>9.0f} {p(0.99):>9.0f} {granted:>8}")
+    if expected is not None:
+        line += f"  (expected {expected}: {'OK' if granted == expected else 'OVER-GRANTED'})"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--backend', choices=['database', 'redis'], default='database')
+    parser.add_argument('--redis-url', default='redis://localhost:6379/0')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--checks', type=int, default=250, help='checks per thread')
+    args = parser.parse_args()
+
+    setup_django(args)
+    backend = make_backend(args)
+    run_id = int(time.time() * 1000)
+    capacity = 50
+
+    print(f"Backend: {args.backend}, {args.threads} threads x {args.checks} checks")
+    print(f"{'scenario':<14} {'checks/s':>10} {'p50 us':>9} {'p95 us':>9} {'p99 us':>9} {'granted':>8}")
+
+    # Everyone contends for one bucket that (practically) never refills
+    elapsed, latencies, granted = run(backend, args.threads, args.checks,
+                                      lambda n, i: f"bench:{run_id}:shared", capacity, 1e-9)
+    report('shared bucket', elapsed, latencies, granted, expected=capacity)
+
+    # One bucket per simulated client IP
+    elapsed, latencies, granted = run(backend, args.threads, args.checks,
+                                      lambda n, i: f"bench:{run_id}:client{n}:{i % 20}", capacity, 1.0)
+    report('per-client', elapsed, latencies, granted)
+
+
+if __name__ == '__main__':
+    main()
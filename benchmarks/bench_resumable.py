@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""
+Benchmark resumable uploads: the cost of a chunk against how much came before.
+
+Sends a --size MB PDF in --chunk KB chunks through converter.resumable and
+reports the time of the first, middle and last chunks and the whole upload.
+The "spread" columns repeat the upload with the hash state lost after the
+first chunk, as when chunks land on different gunicorn workers: middle
+chunks must stay as cheap as before, and the last one pays for hashing the
+file once:
+    python benchmarks/bench_resumable.py
+    python benchmarks/bench_resumable.py --size 50 --chunk 512 2048 8192
+
+Runs against a throwaway SQLite file and media directory, never
+db.sqlite3 or media/.
+"""
+import io
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+
+def setup_django():
+    import django
+    from django.conf import settings
+
+    temp_dir = tempfile.mkdtemp(prefix='bench_resumable_')
+    settings.DATABASES['default']['NAME'] = os.path.join(temp_dir, 'bench.sqlite3')
+    settings.MEDIA_ROOT = os.path.join(temp_dir, 'media')
+    settings.UPLOAD_CHUNK_MAX_BYTES = 64 * 1024 * 1024
+    django.setup()
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+
+
+def make_content(size):
+    """A PDF header followed by incompressible filler, size bytes in all."""
+    head = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+    return head + os.urandom(size - len(head))
+
+
+def upload(content, chunk_size, spread_at=None):
+    """Send content chunk by chunk; returns the seconds taken by each chunk."""
+    from converter import resumable
+
+    session = resumable.create('bench.pdf', len(content))
+    timings = []
+    for offset in range(0, len(content), chunk_size):
+        data = content[offset:offset + chunk_size]
+        if offset == spread_at:
+            resumable._digests.clear()
+        start = time.perf_counter()
+        session = resumable.append(session, offset, io.BytesIO(data), len(data))
+        timings.append(time.perf_counter() - start)
+    assert session.complete
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=48, help='file size in MB (the PDF limit is 50)')
+    parser.add_argument('--chunk', type=int, nargs='+', default=[512, 2048, 8192], help='chunk sizes in KB')
+    args = parser.parse_args()
+
+    setup_django()
+    content = make_content(args.size * 1024 * 1024)
+    print(f"{args.size} MB file")
+    print(f"{'chunk KB':>9} {'chunks':>7} {'first ms':>9} {'middle ms':>10} {'last ms':>8} "
+          f"{'total s':>8} {'MB/s':>7} {'spread middle ms':>17} {'spread last ms':>15}")
+    for chunk_kb in args.chunk:
+        chunk_size = chunk_kb * 1024
+        timings = upload(content, chunk_size)
+        # Again, with every chunk after the first on a "process" without the hash state
+        spread = upload(content, chunk_size, spread_at=chunk_size)
+        total = sum(timings)
+        print(f"{chunk_kb:>9} {len(timings):>7} {timings[0] * 1000:>9.1f} "
+              f"{timings[len(timings) // 2] * 1000:>10.1f} {timings[-1] * 1000:>8.1f} {total:>8.2f} "
+              f"{len(content) / 1024 / 1024 / total:>7.0f} {spread[len(spread) // 2] * 1000:>17.1f} "
+              f"{spread[-1] * 1000:>15.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+"""
+Benchmark "split every N pages" to a ZIP.
+
+Compares the legacy in-memory implementation (BytesIO per part inside a
+BytesIO archive, then read() into ContentFile) with the streaming writer,
+serial and across worker processes. Each mode runs in a fresh subprocess so
+peak RSS is measured independently (children included for 'parallel'):
+    python benchmarks/bench_split.py --pages 500
+    python benchmarks/bench_split.py --pages 100 1000 5000 --workers 4
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import resource
+import argparse
+import subprocess
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixtures import make_text_pdf, make_image_pdf
+
+
+def legacy_split(pdf_path, split_every):
+    """The pre-streaming implementation, including the view's ContentFile copy."""
+    import io
+    import zipfile
+    import PyPDF2
+
+    pdf_reader = PyPDF2.PdfReader(pdf_path)
+    total_pages = len(pdf_reader.pages)
+    zip_buffer = io.BytesIO()
+    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        for part_num, start in enumerate(range(0, total_pages, split_every), 1):
+            pdf_writer = PyPDF2.PdfWriter()
+            end = min(start + split_every, total_pages)
+            for page_num in range(start, end):
+                pdf_writer.add_page(pdf_reader.pages[page_num])
+            pdf_buffer = io.BytesIO()
+            pdf_writer.write(pdf_buffer)
+            pdf_buffer.seek(0)
+            zip_file.writestr(f"part_{part_num}_pages_{start + 1}-{end}.pdf", pdf_buffer.read())
+    zip_buffer.seek(0)
+    return io.BytesIO(zip_buffer.read())
+
+
+def streaming_split(pdf_path, split_every, workers):
+    from converter.split import write_split_zip, every_parts
+    return write_split_zip(pdf_path, lambda total: every_parts(total, split_every))
+
+
+def parallel_split(pdf_path, split_every, workers):
+    from converter.split import write_split_zip, every_parts
+    return write_split_zip(pdf_path, lambda total: every_parts(total, split_every), workers=workers)
+
+
+MODES = {
+    'legacy': lambda pdf_path, split_every, workers: legacy_split(pdf_path, split_every),
+    'streaming': streaming_split,
+    'parallel': parallel_split,
+}
+
+
+def run_mode(mode, pdf_path, split_every, workers):
+    """Run one mode in this process and print a JSON result line."""
+    start = time.perf_counter()
+    output = MODES[mode](pdf_path, split_every, workers)
+    elapsed = time.perf_counter() - start
+    output.seek(0)
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: output.read(1024 * 1024), b''):
+        digest.update(chunk)
+    # ru_maxrss is reported in KiB on Linux; worker processes count separately
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    print(json.dumps({
+        'seconds': elapsed,
+        'output_bytes': output.tell(),
+        'sha256': digest.hexdigest(),
+        'peak_rss_mb': own,
+        'worker_peak_rss_mb': children,
+    }))
+
+
+def measure(mode, pdf_path, split_every, workers=1, extra_args=()):
+    completed = subprocess.run(
+        [sys.executable, __file__, '--mode', mode, '--pdf', pdf_path,
+         '--split-every', str(split_every), '--workers', str(workers), *extra_args],
+        check=True, capture_output=True, text=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[500])
+    parser.add_argument('--split-every', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument('--modes', nargs='+', choices=sorted(MODES), default=['legacy', 'streaming', 'parallel'])
+    parser.add_argument('--fixture', choices=['text', 'images'], default='text',
+                        help='images: one distinct high-resolution photo per page (large parts)')
+    parser.add_argument('--mode', choices=sorted(MODES), help=argparse.SUPPRESS)
+    parser.add_argument('--pdf', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.pdf, args.split_every, args.workers)
+        return
+
+    print(f"Split every {args.split_every}, {args.workers} workers for 'parallel' ({os.cpu_count()} CPUs)")
+    print(f"{'pages':>6} {'mode':>10} {'seconds':>9} {'pages/s':>9} {'peak RSS MB':>12} "
+          f"{'worker MB':>10} {'output MB':>10}")
+    for pages in args.pages:
+        if args.fixture == 'images':
+            pdf_path = make_image_pdf(pages, image_px=1200, distinct=pages)
+        else:
+            pdf_path = make_text_pdf(pages)
+        digests = set()
+        for mode in args.modes:
+            result = measure(mode, pdf_path, args.split_every, args.workers)
+            if mode != 'legacy':
+                digests.add(result['sha256'])
+            print(f"{pages:>6} {mode:>10} {result['seconds']:>9.2f} {pages / result['seconds']:>9.1f} "
+                  f"{result['peak_rss_mb']:>12.1f} {result['worker_peak_rss_mb']:>10.1f} "
+                  f"{result['output_bytes'] / 1024 / 1024:>10.2f}")
+        if len(digests) > 1:
+            print(f"{pages:>6} WARNING: streaming and parallel archives differ")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""
+Benchmark web worker startup: import time, boot time and baseline RSS.
+
+Each run boots the app in a fresh interpreter the way a gunicorn worker
+does (WSGI application, URLconf with every view, template context
+processors) under `python -X importtime`, then reports the boot time, the
+resident memory after boot and the slowest package imports:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 5 --top 15
+    python benchmarks/bench_startup.py --check   # exit 1 if a heavy library loads at boot
+
+Heavy libraries (pandas, pdf2docx, OpenCV, ...) belong to individual
+converters and must only be imported when a conversion runs.
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Top-level modules that must not be imported while a web worker boots
+HEAVY_MODULES = (
+    'pandas', 'numpy', 'pdf2docx', 'cv2', 'fitz', 'pymupdf', 'pikepdf', 'PyPDF2',
+    'reportlab', 'docx', 'docx2txt', 'openpyxl', 'PIL',
+)
+
+BOOT_SCRIPT = r"""
+import os, sys, json, time, resource
+start = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+from django.urls import get_resolver
+get_resolver().url_patterns
+from django.template import engines
+from django.test import RequestFactory
+template = engines['django'].engine
+request = RequestFactory().get('/')
+for processor in template.template_context_processors:
+    processor(request)
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    'seconds': elapsed,
+    # ru_maxrss is reported in KiB on Linux
+    'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'modules': sorted({name.split('.')[0] for name in sys.modules}),
+}))
+"""
+
+
+def parse_importtime(stderr):
+    """Return [(cumulative_us, package)] for every top-level package imported."""
+    imports = []
+    for line in stderr.splitlines():
+        # "import time:   self_us |  cumulative_us | <indent>package"
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        # Packages only, wherever they were first imported from
+        if '.' not in name:
+            imports.append((int(cumulative_us), name))
+    return imports
+
+
+def boot_once():
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', BOOT_SCRIPT],
+        cwd=ROOT, check=True, capture_output=True, text=True,
+    )
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result['imports'] = parse_importtime(completed.stderr)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--top', type=int, default=10, help='slowest package imports to list')
+    parser.add_argument('--check', action='store_true', help='fail if a heavy library is imported at boot')
+    args = parser.parse_args()
+
+    results = [boot_once() for _ in range(args.runs)]
+    seconds = [r['seconds'] for r in results]
+    rss = [r['rss_mb'] for r in results]
+    heavy = sorted(set(HEAVY_MODULES) & set(results[-1]['modules']))
+
+    print(f"worker boot over {args.runs} runs")
+    print(f"  boot seconds  median {statistics.median(seconds):.3f}  min {min(seconds):.3f}")
+    print(f"  baseline RSS  median {statistics.median(rss):.1f} MB")
+    print(f"  heavy libraries loaded at boot: {', '.join(heavy) or 'none'}")
+    print("\nslowest package imports (last run, cumulative):")
+    for cumulative_us, name in sorted(results[-1]['imports'], reverse=True)[:args.top]:
+        print(f"  {cumulative_us / 1000:>9.1f} ms  {name}")
+
+    if args.check and heavy:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
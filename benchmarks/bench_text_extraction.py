@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+"""
+Benchmark PDF text extraction: legacy PyPDF2 concatenation vs. PyMuPDF streaming.
+
+Each mode runs in a fresh subprocess so peak RSS is measured independently:
+    python benchmarks/bench_text_extraction.py --pages 1000
+"""
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import subprocess
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixtures import make_text_pdf
+
+
+def legacy_extract(pdf_path):
+    """The pre-streaming implementation: PyPDF2 + repeated string concatenation."""
+    import io
+    import PyPDF2
+
+    text = ""
+    with open(pdf_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        for page_num in range(len(pdf_reader.pages)):
+            page = pdf_reader.pages[page_num]
+            text += page.extract_text() + "\n\n"
+    return io.BytesIO(text.encode('utf-8'))
+
+
+def streaming_extract(pdf_path):
+    from converter.text_extract import extract_to_tempfile
+    return extract_to_tempfile(pdf_path, 'txt')
+
+
+def run_mode(mode, pdf_path):
+    """Run one mode in this process and print a JSON result line."""
+    extract = legacy_extract if mode == 'legacy' else streaming_extract
+    start = time.perf_counter()
+    output = extract(pdf_path)
+    elapsed = time.perf_counter() - start
+    output.seek(0, os.SEEK_END)
+    print(json.dumps({
+        'seconds': elapsed,
+        'output_bytes': output.tell(),
+        # ru_maxrss is reported in KiB on Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=1000)
+    parser.add_argument('--mode', choices=['legacy', 'streaming'], help=argparse.SUPPRESS)
+    parser.add_argument('--pdf', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.pdf)
+        return
+
+    pdf_path = make_text_pdf(args.pages, with_tables=False)
+    print(f"Fixture: {pdf_path} ({args.pages} pages)")
+    print(f"{'mode':>10} {'seconds':>9} {'pages/s':>9} {'peak RSS MB':>12} {'output MB':>10}")
+
+    for mode in ('legacy', 'streaming'):
+        completed = subprocess.run(
+            [sys.executable, __file__, '--mode', mode, '--pdf', pdf_path],
+            check=True, capture_output=True, text=True
+        )
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        print(f"{mode:>10} {result['seconds']:>9.2f} {args.pages / result['seconds']:>9.1f} "
+              f"{result['peak_rss_mb']:>12.1f} {result['output_bytes'] / 1024 / 1024:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+"""
+Benchmark page thumbnails (converter.thumbnails) on PDFs of increasing size.
+
+For each document and format, times one batch of --batch pages:
+    cold       nothing cached: open the document, rasterize and encode the pages
+    cached     the same batch again, served from the on-disk cache
+    all pages  every page rasterized up front, what an eager preview would cost
+and reports the bytes of one batch as it is sent (base64 data URIs):
+    python benchmarks/bench_thumbnails.py
+    python benchmarks/bench_thumbnails.py --pages 10 100 1000 --dpi 72 --formats webp
+
+Documents come from benchmarks.fixtures.make_mixed_pdf (text, a table and
+a photo per page). The cache goes to a temp directory.
+"""
+import os
+import sys
+import time
+import shutil
+import base64
+import argparse
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+from benchmarks.fixtures import make_mixed_pdf
+
+
+def batch(thumbnails, path, content_hash, spec, dpi, fmt):
+    start = time.perf_counter()
+    _, pages = thumbnails.get_thumbnails(path, content_hash, spec, dpi, fmt)
+    elapsed = time.perf_counter() - start
+    size = 0
+    for thumbnail in pages:
+        with open(thumbnail.path, 'rb') as f:
+            size += len(base64.b64encode(f.read()))
+    return elapsed, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[10, 100, 500])
+    parser.add_argument('--formats', nargs='+', choices=['webp', 'png'], default=['webp', 'png'])
+    parser.add_argument('--dpi', type=int, default=48)
+    parser.add_argument('--batch', type=int, default=12, help='pages per batch request')
+    parser.add_argument('--no-all-pages', action='store_true', help='skip rendering every page')
+    args = parser.parse_args()
+
+    import django
+    from django.conf import settings
+
+    cache_dir = tempfile.mkdtemp(prefix='thumbnail_bench_')
+    settings.THUMBNAIL_CACHE_DIR = cache_dir
+    settings.THUMBNAIL_BATCH_LIMIT = max(settings.THUMBNAIL_BATCH_LIMIT, max(args.pages))
+    django.setup()
+    from converter import thumbnails
+
+    print(f"{args.batch} pages per batch at {args.dpi} dpi")
+    print(f"{'pages':>6} {'format':>6} {'cold s':>8} {'cached s':>9} {'batch KB':>9} {'all pages s':>12}")
+    try:
+        for pages in args.pages:
+            path = make_mixed_pdf(pages)
+            content_hash = thumbnails.file_hash(path)
+            for fmt in args.formats:
+                shutil.rmtree(cache_dir, ignore_errors=True)
+                spec = f'1-{args.batch}'
+                cold, size = batch(thumbnails, path, content_hash, spec, args.dpi, fmt)
+                cached, _ = batch(thumbnails, path, content_hash, spec, args.dpi, fmt)
+                every = ''
+                if not args.no_all_pages:
+                    shutil.rmtree(cache_dir, ignore_errors=True)
+                    every, _ = batch(thumbnails, path, content_hash, f'1-{pages}', args.dpi, fmt)
+                    every = f'{every:.2f}'
+                print(f"{pages:>6} {fmt:>6} {cold:>8.3f} {cached:>9.4f} {size / 1024:>9.0f} {every:>12}")
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+"""
+Benchmark Word to PDF rendering on documents of increasing size.
+
+Compares the legacy implementation (python-docx, every paragraph and then
+every table collected into one story before SimpleDocTemplate.build) with
+the streaming renderer in converter.word_render. Each run happens in a
+fresh subprocess so peak RSS is measured independently:
+    python benchmarks/bench_word.py
+    python benchmarks/bench_word.py --sections 100 1000 4000
+    python benchmarks/bench_word.py --modes streaming --sections 4000
+
+Documents come from benchmarks.fixtures.make_docx: a heading, three
+paragraphs and an 8-row table per section (about two sections a page).
+"""
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import subprocess
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixtures import make_docx
+
+
+def legacy_render(word_path):
+    """The pre-streaming implementation, without its canvas fallback for empty documents."""
+    import io
+    from docx import Document
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    doc = Document(word_path)
+    pdf_buffer = io.BytesIO()
+    pdf_doc = SimpleDocTemplate(pdf_buffer, pagesize=letter, rightMargin=72, leftMargin=72,
+                                topMargin=72, bottomMargin=72)
+    story = []
+    styles = getSampleStyleSheet()
+    for paragraph in doc.paragraphs:
+        if paragraph.text.strip():
+            if paragraph.style.name.startswith('Heading'):
+                style = styles['Heading1'] if 'Heading1' in paragraph.style.name else styles['Heading2']
+            else:
+                style = styles['Normal']
+            story.append(Paragraph(paragraph.text, style))
+            story.append(Spacer(1, 12))
+    for table in doc.tables:
+        table_data = [[cell.text for cell in row.cells] for row in table.rows]
+        if table_data:
+            pdf_table = Table(table_data)
+            pdf_table.setStyle(TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, 0), 14),
+                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+                ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ]))
+            story.append(pdf_table)
+            story.append(Spacer(1, 20))
+    pdf_doc.build(story)
+    pdf_buffer.seek(0)
+    return pdf_buffer
+
+
+def streaming_render(word_path):
+    from converter.word_render import render_document
+    return render_document(word_path)
+
+
+MODES = {
+    'legacy': legacy_render,
+    'streaming': streaming_render,
+}
+
+
+def run_mode(mode, word_path):
+    """Run one mode in this process and print a JSON result line."""
+    import fitz
+
+    start = time.perf_counter()
+    output = MODES[mode](word_path)
+    elapsed = time.perf_counter() - start
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    data = output.read()
+    with fitz.open(stream=data, filetype='pdf') as pdf:
+        pages = pdf.page_count
+    print(json.dumps({
+        'seconds': elapsed,
+        'pages': pages,
+        'output_bytes': len(data),
+        # ru_maxrss is reported in KiB on Linux
+        'peak_rss_mb': peak_rss_mb,
+    }))
+
+
+def measure(mode, word_path, timeout):
+    completed = subprocess.run(
+        [sys.executable, __file__, '--mode', mode, '--docx', word_path],
+        check=True, capture_output=True, text=True, timeout=timeout
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sections', type=int, nargs='+', default=[100, 1000, 4000])
+    parser.add_argument('--modes', nargs='+', choices=sorted(MODES), default=['legacy', 'streaming'])
+    parser.add_argument('--timeout', type=int, default=900, help='seconds before a run is abandoned')
+    parser.add_argument('--mode', choices=sorted(MODES), help=argparse.SUPPRESS)
+    parser.add_argument('--docx', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.docx)
+        return
+
+    print(f"{'sections':>8} {'DOCX MB':>8} {'mode':>10} {'pages':>6} {'seconds':>9} {'pages/s':>8} "
+          f"{'peak RSS MB':>12} {'output MB':>10}")
+    for sections in args.sections:
+        word_path = make_docx(sections)
+        size = os.path.getsize(word_path) / 1024 / 1024
+        for mode in args.modes:
+            try:
+                result = measure(mode, word_path, args.timeout)
+            except subprocess.TimeoutExpired:
+                print(f"{sections:>8} {size:>8.2f} {mode:>10} timed out after {args.timeout} s")
+                continue
+            except subprocess.CalledProcessError as e:
+                print(f"{sections:>8} {size:>8.2f} {mode:>10} failed (exit status {e.returncode})")
+                continue
+            print(f"{sections:>8} {size:>8.2f} {mode:>10} {result['pages']:>6} {result['seconds']:>9.2f} "
+                  f"{result['pages'] / result['seconds']:>8.1f} {result['peak_rss_mb']:>12.1f} "
+                  f"{result['output_bytes'] / 1024 / 1024:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
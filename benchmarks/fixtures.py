@@ -0,0 +1,180 @@
+"""
+Deterministic fixture documents for benchmarks.
+
+Files are generated on demand into a cache directory and reused between runs.
+"""
+import os
+import tempfile
+
+FIXTURE_DIR = os.getenv('BENCH_FIXTURE_DIR', os.path.join(tempfile.gettempdir(), 'pdfconverter_bench'))
+
+
+def fixture_path(name):
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    return os.path.join(FIXTURE_DIR, name)
+
+
+def make_text_pdf(pages, with_tables=True):
+    """Create (or reuse) a PDF with paragraphs and a small table on every page."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    path = fixture_path(f'text_{pages}p{"_tables" if with_tables else ""}.pdf')
+    if os.path.exists(path):
+        return path
+
+    width, height = A4
+    c = canvas.Canvas(path, pagesize=A4)
+    for page in range(pages):
+        c.setFont('Helvetica-Bold', 16)
+        c.drawString(72, height - 72, f"Section {page + 1}")
+        c.setFont('Helvetica', 10)
+        y = height - 100
+        for line in range(30):
+            c.drawString(72, y, f"Page {page + 1}, line {line + 1}: the quick brown fox jumps over the lazy dog.")
+            y -= 14
+        if with_tables:
+            top = y - 10
+            for row in range(6):
+                for col in range(4):
+                    x = 72 + col * 110
+                    c.rect(x, top - row * 18, 110, 18)
+                    c.drawString(x + 4, top - row * 18 + 5, f"R{row + 1}C{col + 1}")
+        c.showPage()
+    c.save()
+    return path
+
+
+def make_photo(width, height, seed=0):
+    """Deterministic photo-like RGB image (smooth gradients plus noise)."""
+    import random
+    from PIL import Image, ImageFilter
+
+    rng = random.Random(seed)
+    noise = Image.frombytes('RGB', (width // 8, height // 8), rng.randbytes((width // 8) * (height // 8) * 3))
+    return noise.resize((width, height), Image.BICUBIC).filter(ImageFilter.GaussianBlur(2))
+
+
+def make_image_pdf(pages, image_px=2400, distinct=4):
+    """Create (or reuse) a PDF with one high-resolution photo per page, cycling `distinct` images."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfgen import canvas
+
+    path = fixture_path(f'images_{pages}p_{image_px}px_{distinct}.pdf')
+    if os.path.exists(path):
+        return path
+
+    photos = [ImageReader(make_photo(image_px, image_px * 3 // 4, seed)) for seed in range(distinct)]
+    width, height = A4
+    c = canvas.Canvas(path, pagesize=A4)
+    for page in range(pages):
+        c.setFont('Helvetica', 12)
+        c.drawString(72, height - 72, f"Photo page {page + 1}")
+        # 6 x 4.5 inches: a 2400px image is ~400 DPI here
+        c.drawImage(photos[page % distinct], 72, height - 72 - 340, width=432, height=324)
+        c.showPage()
+    c.save()
+    return path
+
+
+def make_workbook(rows, columns):
+    """Create (or reuse) an .xlsx with a header row and rows x columns cells."""
+    from datetime import date, timedelta
+    from openpyxl import Workbook
+
+    path = fixture_path(f'sheet_{rows}x{columns}.xlsx')
+    if os.path.exists(path):
+        return path
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Data')
+    sheet.append([f'Column {c + 1}' for c in range(columns)])
+    start = date(2024, 1, 1)
+    for r in range(rows):
+        row = []
+        for c in range(columns):
+            kind = c % 4
+            if kind == 0:
+                row.append(r)
+            elif kind == 1:
+                row.append(f'Item {r}-{c}')
+            elif kind == 2:
+                row.append(r * 1.25 + c)
+            else:
+                row.append(start + timedelta(days=r % 365))
+        sheet.append(row)
+    workbook.save(path)
+    return path
+
+
+def make_mixed_pdf(pages):
+    """Create (or reuse) a PDF with text, a table and a photo on every page."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfgen import canvas
+
+    path = fixture_path(f'mixed_{pages}p.pdf')
+    if os.path.exists(path):
+        return path
+
+    photos = [ImageReader(make_photo(640, 480, seed)) for seed in range(4)]
+    width, height = A4
+    c = canvas.Canvas(path, pagesize=A4)
+    for page in range(pages):
+        c.setFont('Helvetica-Bold', 16)
+        c.drawString(72, height - 72, f"Report section {page + 1}")
+        c.setFont('Helvetica', 10)
+        y = height - 100
+        for line in range(12):
+            c.drawString(72, y, f"Page {page + 1}, line {line + 1}: quarterly figures and notes for the region.")
+            y -= 14
+        c.drawImage(photos[page % len(photos)], 72, y - 250, width=320, height=240)
+        top = y - 290
+        for row in range(8):
+            for col in range(4):
+                x = 72 + col * 110
+                c.rect(x, top - row * 18, 110, 18)
+                c.drawString(x + 4, top - row * 18 + 5, f"{page + 1}.{row + 1}.{col + 1}")
+        c.showPage()
+    c.save()
+    return path
+
+
+def make_docx(sections, table_rows=8):
+    """Create (or reuse) a .docx with a heading, paragraphs and a table per section."""
+    from docx import Document
+
+    path = fixture_path(f'document_{sections}s_{table_rows}r.docx')
+    if os.path.exists(path):
+        return path
+
+    document = Document()
+    for section in range(sections):
+        document.add_heading(f"Section {section + 1}", level=1)
+        for paragraph in range(3):
+            document.add_paragraph(f"Section {section + 1}, paragraph {paragraph + 1}: " + "lorem ipsum " * 20)
+        table = document.add_table(rows=table_rows, cols=4)
+        for r, row in enumerate(table.rows):
+            for col, cell in enumerate(row.cells):
+                cell.text = f"Item {r}" if col == 0 else f"{(section + 1) * (r + 1) * (col + 1)}"
+    document.save(path)
+    return path
+
+
+def make_photos(count, width=3000, height=2000, image_format='JPEG'):
+    """Create (or reuse) count photos as JPEG or PNG; returns their paths."""
+    extension = 'jpg' if image_format == 'JPEG' else 'png'
+    directory = fixture_path(f'photos_{count}_{width}x{height}_{extension}')
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f'photo_{i:04d}.{extension}')
+        if not os.path.exists(path):
+            photo = make_photo(width, height, seed=i)
+            if image_format == 'JPEG':
+                photo.save(path, quality=90)
+            else:
+                photo.save(path)
+        paths.append(path)
+    return paths
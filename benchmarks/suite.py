@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+"""
+Benchmark every converter in converter/utils.py against a synthetic corpus.
+
+The corpus is generated deterministically by benchmarks/fixtures.py: PDFs
+with text, tables and photos, DOCX files with tables, XLSX workbooks and
+JPEG/PNG photos. Each case runs in a fresh subprocess so that its peak RSS
+is its own. The report gives p50/p95 latency, throughput and peak RSS, and
+is written as JSON:
+    python benchmarks/suite.py                           # quick profile: 1 and 100 pages
+    python benchmarks/suite.py --profile full            # adds 1000-page PDFs, bigger files
+    python benchmarks/suite.py --cases merge split       # cases whose name contains a word
+    python benchmarks/suite.py --update-baseline         # store the results as the baseline
+
+When a baseline exists for the profile (benchmarks/baseline.json by default),
+the run fails if any case is slower or bigger than the baseline beyond
+--tolerance and the absolute noise floors.
+"""
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import platform
+import resource
+import subprocess
+from datetime import datetime, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+from benchmarks import fixtures
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+# Regressions smaller than these are noise, whatever the ratio
+MIN_SECONDS_DELTA = 0.05
+MIN_RSS_DELTA_MB = 20
+
+PROFILES = {
+    'quick': {'pages': (1, 100), 'docx_sections': (10, 200), 'sheets': ((1000, 10), (20000, 10)),
+              'photos': 8, 'repeat': 5},
+    'full': {'pages': (1, 100, 1000), 'docx_sections': (10, 200, 2000),
+             'sheets': ((1000, 10), (20000, 10), (100000, 10)), 'photos': 40, 'repeat': 5},
+}
+# Cases slower than this per run are repeated fewer times
+SLOW_CASE_PAGES = 100
+
+# Not benchmarked: handle_file_upload needs a request and the database,
+# split_pdf is an alias of split_pdf_by_range, parse_page_ranges only parses text.
+
+
+def build_cases(profile):
+    """
+    Return {name: case}; a case names the utils function, how to build its
+    arguments from the corpus, the pages it handles and its repeat count
+    """
+    settings = PROFILES[profile]
+    repeat = settings['repeat']
+    cases = {}
+
+    def add(name, function, args, kwargs=None, pages=None, repeat=repeat):
+        cases[name] = {'function': function, 'args': args, 'kwargs': kwargs or {}, 'pages': pages,
+                       'repeat': repeat}
+
+    for pages in settings['pages']:
+        pdf = lambda pages=pages: fixtures.make_mixed_pdf(pages)
+        slow = 1 if pages >= SLOW_CASE_PAGES else repeat
+        add(f'pdf_to_word_docx_{pages}p', 'convert_pdf_to_word', lambda pdf=pdf: [pdf(), 'docx'],
+            pages=pages, repeat=slow)
+        add(f'pdf_to_word_txt_{pages}p', 'convert_pdf_to_word', lambda pdf=pdf: [pdf(), 'txt'], pages=pages)
+        add(f'pdf_to_word_rtf_{pages}p', 'convert_pdf_to_word', lambda pdf=pdf: [pdf(), 'rtf'], pages=pages)
+        add(f'merge_pdfs_5x{pages}p', 'merge_pdfs', lambda pdf=pdf: [[pdf()] * 5], pages=pages * 5)
+        add(f'split_pdf_by_range_{pages}p', 'split_pdf_by_range',
+            lambda pdf=pdf, pages=pages: [pdf(), f'1-{max(1, pages // 2)}'], pages=pages)
+        add(f'split_pdf_every_page_{pages}p', 'split_pdf_every_page', lambda pdf=pdf: [pdf(), 1], pages=pages)
+        add(f'split_pdf_by_count_{pages}p', 'split_pdf_by_count', lambda pdf=pdf: [pdf(), 10], pages=pages)
+        add(f'split_pdf_custom_{pages}p', 'split_pdf_custom',
+            lambda pdf=pdf, pages=pages: [pdf(), ','.join(str(p) for p in range(1, pages, 7)) or '1'],
+            pages=pages)
+        add(f'convert_pdf_to_images_jpeg_{pages}p', 'convert_pdf_to_images', lambda pdf=pdf: [pdf(), 'jpeg', 150],
+            pages=pages, repeat=slow)
+        add(f'compress_pdf_{pages}p', 'compress_pdf', lambda pdf=pdf: [pdf()], pages=pages)
+        add(f'compress_pdf_with_pypdf2_{pages}p', 'compress_pdf_with_pypdf2', lambda pdf=pdf: [pdf()],
+            pages=pages)
+        add(f'compress_pdf_with_pikepdf_{pages}p', 'compress_pdf_with_pikepdf', lambda pdf=pdf: [pdf()],
+            pages=pages)
+        add(f'compress_pdf_advanced_{pages}p', 'compress_pdf_advanced', lambda pdf=pdf: [pdf(), 'high'],
+            pages=pages)
+
+    for sections in settings['docx_sections']:
+        add(f'convert_word_to_pdf_{sections}s', 'convert_word_to_pdf',
+            lambda sections=sections: [fixtures.make_docx(sections)])
+
+    for rows, columns in settings['sheets']:
+        add(f'convert_excel_to_pdf_{rows}x{columns}', 'convert_excel_to_pdf',
+            lambda rows=rows, columns=columns: [fixtures.make_workbook(rows, columns)])
+
+    photos = settings['photos']
+    images = lambda: fixtures.make_photos(photos) + fixtures.make_photos(2, 1600, 1000, 'PNG')
+    add(f'convert_images_to_pdf_fit_{photos + 2}img', 'convert_images_to_pdf', lambda: [images()],
+        pages=photos + 2)
+    add(f'convert_images_to_pdf_multiple_{photos + 2}img', 'convert_images_to_pdf',
+        lambda: [images()], {'placement': 'multiple'})
+    return cases
+
+
+def _input_bytes(args):
+    total = 0
+    for arg in args:
+        for value in (arg if isinstance(arg, list) else [arg]):
+            if isinstance(value, str) and os.path.isfile(value):
+                total += os.path.getsize(value)
+    return total
+
+
+def _output_bytes(result):
+    if hasattr(result, 'size') and isinstance(result.size, int):
+        return result.size
+    result.seek(0, os.SEEK_END)
+    return result.tell()
+
+
+def run_case(profile, name):
+    """Run one case in this process and print a JSON result line."""
+    import django
+    django.setup()
+    from converter import utils
+
+    case = build_cases(profile)[name]
+    function = getattr(utils, case['function'])
+    args = case['args']()
+    if case['repeat'] > 1:
+        # Import the libraries and warm the page cache outside the timed runs
+        function(*args, **case['kwargs']).close()
+
+    latencies = []
+    for _ in range(case['repeat']):
+        start = time.perf_counter()
+        result = function(*args, **case['kwargs'])
+        latencies.append(time.perf_counter() - start)
+        output_bytes = _output_bytes(result)
+        result.close()
+    print(json.dumps({
+        'latencies': latencies,
+        'input_bytes': _input_bytes(args),
+        'output_bytes': output_bytes,
+        # ru_maxrss is reported in KiB on Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def measure(profile, name, case):
+    completed = subprocess.run(
+        [sys.executable, __file__, '--profile', profile, '--case', name],
+        check=True, capture_output=True, text=True
+    )
+    raw = json.loads(completed.stdout.strip().splitlines()[-1])
+    p50 = percentile(raw['latencies'], 0.50)
+    result = {
+        'function': case['function'],
+        'runs': len(raw['latencies']),
+        'p50_seconds': p50,
+        'p95_seconds': percentile(raw['latencies'], 0.95),
+        'input_mb_per_second': raw['input_bytes'] / 1024 / 1024 / p50,
+        'peak_rss_mb': raw['peak_rss_mb'],
+        'input_bytes': raw['input_bytes'],
+        'output_bytes': raw['output_bytes'],
+    }
+    if case['pages']:
+        result['pages_per_second'] = case['pages'] / p50
+    return result
+
+
+def compare(results, baseline, tolerance, rss_tolerance):
+    """Return a list of regression messages against the baseline results."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        slower = result['p50_seconds'] - base['p50_seconds']
+        if result['p50_seconds'] > base['p50_seconds'] * (1 + tolerance) and slower > MIN_SECONDS_DELTA:
+            regressions.append(f"{name}: p50 {result['p50_seconds']:.3f}s vs baseline {base['p50_seconds']:.3f}s")
+        bigger = result['peak_rss_mb'] - base['peak_rss_mb']
+        if result['peak_rss_mb'] > base['peak_rss_mb'] * (1 + rss_tolerance) and bigger > MIN_RSS_DELTA_MB:
+            regressions.append(f"{name}: peak RSS {result['peak_rss_mb']:.0f} MB "
+                               f"vs baseline {base['peak_rss_mb']:.0f} MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='quick')
+    parser.add_argument('--cases', nargs='+', help='only run cases whose name contains one of these')
+    parser.add_argument('--output', default='bench_results.json', help='where to write the JSON report')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed p50 slowdown (0.5 = 50%%)')
+    parser.add_argument('--rss-tolerance', type=float, default=0.25, help='allowed peak RSS growth')
+    parser.add_argument('--update-baseline', action='store_true', help='store these results as the baseline')
+    parser.add_argument('--case', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        run_case(args.profile, args.case)
+        return
+
+    cases = build_cases(args.profile)
+    if args.cases:
+        cases = {name: case for name, case in cases.items() if any(word in name for word in args.cases)}
+
+    print(f"{'case':<40} {'runs':>4} {'p50 s':>8} {'p95 s':>8} {'MB/s':>8} {'pages/s':>8} {'RSS MB':>7}")
+    results, failed = {}, []
+    for name, case in cases.items():
+        try:
+            result = measure(args.profile, name, case)
+        except subprocess.CalledProcessError as e:
+            print(f"{name:<40} failed (exit status {e.returncode})")
+            failed.append(name)
+            continue
+        results[name] = result
+        pages_per_second = f"{result['pages_per_second']:>8.1f}" if 'pages_per_second' in result else f"{'':>8}"
+        print(f"{name:<40} {result['runs']:>4} {result['p50_seconds']:>8.3f} {result['p95_seconds']:>8.3f} "
+              f"{result['input_mb_per_second']:>8.1f} {pages_per_second} {result['peak_rss_mb']:>7.0f}")
+
+    report = {
+        'profile': args.profile,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': f"{platform.system()} {platform.machine()}, {os.cpu_count()} CPU",
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"Wrote {args.output}")
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+    if args.update_baseline:
+        stored = baselines.get(args.profile, {'results': {}})
+        stored['results'].update(results)
+        stored.update({key: report[key] for key in ('created', 'python', 'machine')})
+        baselines[args.profile] = stored
+        with open(args.baseline, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"Updated baseline '{args.profile}' in {args.baseline}")
+    elif args.profile in baselines:
+        if baselines[args.profile].get('machine') != report['machine']:
+            print(f"Note: baseline was recorded on {baselines[args.profile].get('machine')}")
+        regressions = compare(results, baselines[args.profile]['results'], args.tolerance, args.rss_tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against baseline '{args.profile}'")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,6 @@
 """Admin configuration for converter app."""
 from django.contrib import admin
-from .models import UploadedFile, ConversionTask
+from .models import UploadedFile, ConversionTask, ConversionCacheEntry, UploadSession
 
 @admin.register(UploadedFile)
 class UploadedFileAdmin(admin.ModelAdmin):
@@ -10,6 +10,21 @@ class UploadedFileAdmin(admin.ModelAdmin):
 
 @admin.register(ConversionTask)
 class ConversionTaskAdmin(admin.ModelAdmin):
-    list_display = ('conversion_type', 'status', 'created_at', 'completed_at')
+    list_display = ('conversion_type', 'status', 'created_at', 'completed_at', 'client_ip', 'output_size')
     list_filter = ('conversion_type', 'status', 'created_at')
-    search_fields = ('conversion_type', 'status')
\ No newline at end of file
+    search_fields = ('conversion_type', 'status', '=client_ip')
+    
+    def get_queryset(self, request):
+        # The change list never shows extra_data; the change form loads it on access
+        return super().get_queryset(request).defer('extra_data')
+
+@admin.register(ConversionCacheEntry)
+class ConversionCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ('key', 'conversion_type', 'size', 'hits', 'created_at', 'last_used_at')
+    list_filter = ('conversion_type',)
+    search_fields = ('key',)
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'offset', 'size', 'mime_type', 'created_at', 'expires_at', 'file_id')
+    search_fields = ('filename', 'session_key')
@@ -0,0 +1,109 @@
+"""
+Batch removal of expired uploads and conversion tasks.
+
+Rows carry an indexed expires_at (FILE_RETENTION_SECONDS after creation).
+Each pass:
+
+1. deletes expired tasks in batches of CLEANUP_BATCH_SIZE ids, skipping
+   tasks still pending or processing until CLEANUP_IN_FLIGHT_GRACE has
+   passed too (then they are considered abandoned);
+2. deletes expired uploads that no remaining task uses, including the
+   extra inputs of merge/image tasks that are still in flight;
+3. deletes expired resumable upload sessions and their partial files;
+4. unlinks the files of every deleted row on a thread pool.
+
+Rows are removed with one DELETE per batch, without loading model
+instances or sending delete signals (django_cleanup would otherwise
+unlink files one by one in on_commit hooks). A file is only unlinked after
+its row is gone, so a failure never leaves a row pointing at a missing file.
+"""
+import os
+import time
+import logging
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from .models import UploadedFile, ConversionTask, UploadSession
+from .result_cache import INPUT_KEYS
+
+logger = logging.getLogger(__name__)
+
+IN_FLIGHT_STATUSES = ('pending', 'processing')
+
+
+def _unlink(name):
+    """Remove a stored file; returns the bytes freed."""
+    try:
+        path = default_storage.path(name)
+        size = os.path.getsize(path)
+        os.remove(path)
+        return size
+    except FileNotFoundError:
+        return 0
+    except Exception as e:
+        logger.warning(f"Could not delete {name}: {str(e)}")
+        return 0
+
+
+def _in_flight_inputs():
+    """Ids of extra input uploads referenced by tasks that are still running."""
+    ids = set()
+    in_flight = ConversionTask.objects.filter(status__in=IN_FLIGHT_STATUSES,
+                                              conversion_type__in=list(INPUT_KEYS))
+    for conversion_type, extra_data in in_flight.values_list('conversion_type', 'extra_data'):
+        ids.update(str(uid) for uid in (extra_data or {}).get(INPUT_KEYS[conversion_type], []))
+    return ids
+
+
+def _delete_batches(queryset, file_field, batch_size, pool, stats, prefix):
+    """Delete queryset rows batch by batch and queue their files for unlinking."""
+    futures = []
+    while True:
+        rows = list(queryset.values_list('pk', file_field)[:batch_size])
+        if not rows:
+            break
+        with transaction.atomic():
+            # Raw DELETE: no instances loaded, no signals, one statement per batch
+            deleted = queryset.model.objects.filter(pk__in=[pk for pk, _ in rows])._raw_delete(queryset.db)
+        stats[f'{prefix}_rows'] += deleted
+        futures.extend(pool.submit(_unlink, name) for _, name in rows if name)
+        if len(rows) < batch_size:
+            break
+    return futures
+
+
+def purge_expired(now=None, batch_size=None, workers=None):
+    """
+    Delete expired tasks and uploads with their files; returns a stats dict
+    """
+    now = now or timezone.now()
+    batch_size = batch_size or settings.CLEANUP_BATCH_SIZE
+    workers = max(1, workers or settings.CLEANUP_WORKERS)
+    abandoned = now - timedelta(seconds=settings.CLEANUP_IN_FLIGHT_GRACE)
+    stats = {'task_rows': 0, 'upload_rows': 0, 'session_rows': 0, 'files': 0, 'bytes': 0}
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        tasks = (ConversionTask.objects.filter(expires_at__lt=now)
+                 .exclude(status__in=IN_FLIGHT_STATUSES, expires_at__gte=abandoned))
+        futures = _delete_batches(tasks, 'output_file', batch_size, pool, stats, 'task')
+
+        uploads = (UploadedFile.objects.filter(expires_at__lt=now, conversiontask__isnull=True)
+                   .exclude(pk__in=_in_flight_inputs()))
+        futures += _delete_batches(uploads, 'file', batch_size, pool, stats, 'upload')
+
+        # Chunks stop extending expires_at once the client gives up
+        sessions = UploadSession.objects.filter(expires_at__lt=now)
+        futures += _delete_batches(sessions, 'staging_name', batch_size, pool, stats, 'session')
+
+        for future in futures:
+            freed = future.result()
+            stats['files'] += 1
+            stats['bytes'] += freed
+
+    stats['seconds'] = time.perf_counter() - start
+    return stats
@@ -0,0 +1,353 @@
+"""
+Image-aware PDF compression.
+
+Images usually account for most of a PDF's size, so re-saving with
+compressed streams alone barely moves it. This engine:
+
+1. walks every page's content stream once, recording each image XObject and
+   the largest size (in points) it is drawn at;
+2. collapses byte-identical images to a single object by content hash;
+3. decodes the remaining images with Pillow, downsamples them to the target
+   DPI for the compression level and re-encodes them as JPEG (photographic
+   content) or Flate (few colours, e.g. line art), on a thread pool;
+4. saves with object streams so the dictionaries compress too.
+
+A re-encoded image is only kept if it is smaller than the original.
+"""
+import io
+import math
+import zlib
+import hashlib
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+COMPRESSION_PROFILES = {
+    'low': {'dpi': 300, 'jpeg_quality': 90},
+    'medium': {'dpi': 150, 'jpeg_quality': 75},
+    'high': {'dpi': 96, 'jpeg_quality': 55},
+}
+
+IDENTITY = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+MAX_FORM_DEPTH = 8
+# Images whose stream is smaller than this are not worth decoding
+MIN_IMAGE_BYTES = 4096
+# Skip the resample when it would shrink the image by less than this
+MIN_SCALE_STEP = 0.9
+COLOR_SPACES = {'/DeviceRGB': 'RGB', '/DeviceGray': 'L'}
+ICC_MODES = {1: 'L', 3: 'RGB'}
+LOSSLESS_FILTERS = {'/FlateDecode', '/LZWDecode', '/RunLengthDecode', '/ASCII85Decode', '/ASCIIHexDecode'}
+
+
+def _multiply(m, n):
+    """Return the affine product m x n (PDF row-vector convention)."""
+    a, b, c, d, e, f = m
+    na, nb, nc, nd, ne, nf = n
+    return (
+        a * na + b * nc, a * nb + b * nd,
+        c * na + d * nc, c * nb + d * nd,
+        e * na + f * nc + ne, e * nb + f * nd + nf,
+    )
+
+
+class ImageRecord:
+    """An image XObject, where it is referenced and how large it is drawn."""
+
+    def __init__(self, obj):
+        self.obj = obj
+        self.width_pt = 0.0
+        self.height_pt = 0.0
+        self.sites = []
+
+    def drawn(self, ctm):
+        a, b, c, d = ctm[:4]
+        self.width_pt = max(self.width_pt, math.hypot(a, b))
+        self.height_pt = max(self.height_pt, math.hypot(c, d))
+
+
+def _scan(pdf_obj, resources, ctm, images, depth=0):
+    """Record image placements in a page or Form XObject content stream."""
+    import pikepdf
+
+    xobjects = resources.get('/XObject') if resources is not None else None
+    if xobjects is None or depth > MAX_FORM_DEPTH:
+        return
+
+    stack = []
+    for operands, operator in pikepdf.parse_content_stream(pdf_obj, 'q Q cm Do'):
+        op = str(operator)
+        if op == 'q':
+            stack.append(ctm)
+        elif op == 'Q':
+            ctm = stack.pop() if stack else ctm
+        elif op == 'cm' and len(operands) == 6:
+            ctm = _multiply(tuple(float(v) for v in operands), ctm)
+        elif op == 'Do' and operands:
+            name = operands[0]
+            xobj = xobjects.get(name)
+            if xobj is None or not isinstance(xobj, pikepdf.Stream):
+                continue
+            subtype = xobj.get('/Subtype')
+            if subtype == '/Image':
+                key = xobj.objgen
+                record = images.get(key)
+                if record is None:
+                    record = images[key] = ImageRecord(xobj)
+                record.drawn(ctm)
+                record.sites.append((xobjects, name))
+            elif subtype == '/Form':
+                matrix = xobj.get('/Matrix')
+                form_ctm = _multiply(tuple(float(v) for v in matrix), ctm) if matrix is not None else ctm
+                _scan(xobj, xobj.get('/Resources', resources), form_ctm, images, depth + 1)
+
+
+def collect_images(pdf):
+    """
+    Walk all pages once and return {objgen: ImageRecord} for drawn images
+    """
+    images = {}
+    for page in pdf.pages:
+        try:
+            _scan(page.obj, page.obj.get('/Resources'), IDENTITY, images)
+        except Exception as e:
+            logger.warning(f"Skipping images on unreadable page content: {str(e)}")
+    return images
+
+
+def _content_hash(obj):
+    """Hash an image stream together with its dictionary (minus /Length)."""
+    import pikepdf
+
+    digest = hashlib.sha256(obj.read_raw_bytes())
+    for key in sorted(k for k in obj.keys() if k != '/Length'):
+        # Wrapping in an Array unparses scalars too, and indirect values as "N G R"
+        digest.update(pikepdf.Array([pikepdf.Name(key), obj[key]]).unparse())
+    return digest.hexdigest()
+
+
+def _image_mode(obj):
+    """Return the Pillow mode for an image we can safely re-encode, else None."""
+    import pikepdf
+
+    if obj.get('/ImageMask', False) or '/Decode' in obj:
+        return None
+    # Colour-key masking matches exact pixel values, which lossy JPEG would shift
+    if isinstance(obj.get('/Mask'), pikepdf.Array):
+        return None
+    if int(obj.get('/BitsPerComponent', 0)) != 8:
+        return None
+
+    color_space = obj.get('/ColorSpace')
+    if color_space is None:
+        return None
+    if str(color_space) in COLOR_SPACES:
+        return COLOR_SPACES[str(color_space)]
+    # [/ICCBased stream]: keep the profile, pixels are plain Gray/RGB
+    if isinstance(color_space, pikepdf.Array) and len(color_space) == 2 and color_space[0] == '/ICCBased':
+        return ICC_MODES.get(int(color_space[1].get('/N', 0)))
+    return None
+
+
+def _image_filters(obj):
+    import pikepdf
+
+    filters = obj.get('/Filter')
+    if filters is None:
+        return []
+    if isinstance(filters, pikepdf.Array):
+        return [str(f) for f in filters]
+    return [str(filters)]
+
+
+def _target_size(record, dpi):
+    """Pixel size needed to show the image at `dpi`, or None to keep it."""
+    width, height = int(record.obj.Width), int(record.obj.Height)
+    if not record.width_pt or not record.height_pt:
+        return None
+    need_w = record.width_pt / 72.0 * dpi
+    need_h = record.height_pt / 72.0 * dpi
+    scale = max(need_w / width, need_h / height)
+    if scale >= MIN_SCALE_STEP:
+        return None
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def _prepare(record, dpi, downsample):
+    """Extract what a worker thread needs; pikepdf objects stay on this thread."""
+    obj = record.obj
+    mode = _image_mode(obj)
+    filters = _image_filters(obj)
+    source_jpeg = filters == ['/DCTDecode']
+    if mode is None or not (source_jpeg or set(filters) <= LOSSLESS_FILTERS):
+        return None
+
+    raw = obj.read_raw_bytes()
+    if len(raw) < MIN_IMAGE_BYTES:
+        return None
+
+    size = (int(obj.Width), int(obj.Height))
+    if source_jpeg:
+        data = raw
+    else:
+        data = obj.read_bytes()
+        if len(data) != size[0] * size[1] * len(mode):
+            return None
+
+    return {
+        'data': data,
+        'source_jpeg': source_jpeg,
+        'mode': mode,
+        'size': size,
+        'target': _target_size(record, dpi) if downsample else None,
+        'original_bytes': len(raw),
+    }
+
+
+def reencode_image(job, jpeg_quality):
+    """
+    Decode, downsample and re-encode one image (runs on a worker thread)
+
+    Returns (data, filter_name, (width, height)) or None to keep the original.
+    """
+    from PIL import Image
+
+    target = job['target']
+    if job['source_jpeg']:
+        image = Image.open(io.BytesIO(job['data']))
+        if image.mode != job['mode']:
+            return None
+        if target:
+            # Let libjpeg decode at a reduced scale first
+            image.draft(job['mode'], target)
+    else:
+        image = Image.frombytes(job['mode'], job['size'], job['data'])
+
+    if target and image.size != target:
+        image = image.resize(target, Image.LANCZOS)
+
+    if job['source_jpeg'] or image.getcolors(256) is None:
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=jpeg_quality, optimize=True)
+        data, filter_name = buffer.getvalue(), '/DCTDecode'
+    else:
+        data, filter_name = zlib.compress(image.tobytes(), 9), '/FlateDecode'
+
+    if len(data) >= job['original_bytes']:
+        return None
+    return data, filter_name, image.size
+
+
+def _apply(obj, result):
+    import pikepdf
+
+    data, filter_name, (width, height) = result
+    obj.write(data, filter=pikepdf.Name(filter_name))
+    if '/DecodeParms' in obj:
+        del obj['/DecodeParms']
+    obj.Width = width
+    obj.Height = height
+    obj.BitsPerComponent = 8
+
+
+def compress_pdf_file(input_path, compression_level='medium', optimize_images=True,
+                      downsample_images=True, remove_metadata=False, workers=None, progress=None):
+    """
+    Compress a PDF and return the result as a rewound temp file
+
+    Args:
+        input_path: Path to the input PDF file
+        compression_level: 'low', 'medium', or 'high'
+        optimize_images: Re-encode images (JPEG/Flate)
+        downsample_images: Resample images to the level's target DPI
+        remove_metadata: Remove XMP metadata and the document info dictionary
+        workers: Image encoding threads (default: settings.COMPRESSION_WORKERS)
+        progress: Optional progress(done, total, stage) callback, per image batch
+    """
+    import pikepdf
+
+    if workers is None:
+        from django.conf import settings
+        workers = getattr(settings, 'COMPRESSION_WORKERS', 1)
+    profile = COMPRESSION_PROFILES.get(compression_level, COMPRESSION_PROFILES['medium'])
+
+    stats = {'images': 0, 'duplicates': 0, 'reencoded': 0}
+    with pikepdf.open(input_path) as pdf:
+        if optimize_images or downsample_images:
+            _compress_images(pdf, profile, downsample_images, max(1, workers), stats, progress)
+
+        if remove_metadata:
+            if '/Metadata' in pdf.Root:
+                del pdf.Root.Metadata
+            if '/Info' in pdf.trailer:
+                del pdf.trailer.Info
+
+        if progress:
+            progress(0, 0, 'writing')
+        output = tempfile.TemporaryFile()
+        try:
+            pdf.save(
+                output,
+                compress_streams=True,
+                object_stream_mode=pikepdf.ObjectStreamMode.generate,
+            )
+        except Exception:
+            output.close()
+            raise
+
+    logger.info(f"Compressed PDF ({compression_level}): {stats['images']} images, "
+                f"{stats['duplicates']} duplicates merged, {stats['reencoded']} re-encoded")
+    output.seek(0)
+    return output
+
+
+def _compress_images(pdf, profile, downsample, workers, stats, progress=None):
+    images = collect_images(pdf)
+    stats['images'] = len(images)
+
+    # Point every duplicate at one canonical object so it is written (and encoded) once
+    canonical = {}
+    unique = []
+    for record in images.values():
+        try:
+            digest = _content_hash(record.obj)
+        except Exception:
+            unique.append(record)
+            continue
+        first = canonical.get(digest)
+        if first is None:
+            canonical[digest] = record
+            unique.append(record)
+            continue
+        for xobjects, name in record.sites:
+            xobjects[name] = first.obj
+        first.width_pt = max(first.width_pt, record.width_pt)
+        first.height_pt = max(first.height_pt, record.height_pt)
+        stats['duplicates'] += 1
+
+    # Bounded batches keep only a few decoded images in memory at once
+    batch_size = workers * 2
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for start in range(0, len(unique), batch_size):
+            batch = []
+            for record in unique[start:start + batch_size]:
+                try:
+                    job = _prepare(record, profile['dpi'], downsample)
+                except Exception as e:
+                    logger.warning(f"Skipping unreadable image {record.obj.objgen}: {str(e)}")
+                    continue
+                if job is not None:
+                    batch.append((record, pool.submit(reencode_image, job, profile['jpeg_quality'])))
+
+            for record, future in batch:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.warning(f"Image re-encode failed for {record.obj.objgen}: {str(e)}")
+                    continue
+                if result is not None:
+                    _apply(record.obj, result)
+                    stats['reencoded'] += 1
+            if progress:
+                progress(min(start + batch_size, len(unique)), len(unique), 'compressing images')
@@ -0,0 +1,86 @@
+"""
+Page-parallel PDF to DOCX conversion.
+
+pdf2docx's own multi_processing mode writes fixed 'pages-N.json' files into
+the current directory, so two conversions running at once would overwrite
+each other. Instead each worker process parses one chunk of pages and
+serializes it into a private temp directory; the parent restores every chunk
+into a single Converter and builds the DOCX once.
+"""
+import os
+import tempfile
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+def page_chunks(total_pages, chunk_size):
+    """Split [0, total_pages) into consecutive page-index lists."""
+    chunk_size = max(1, chunk_size)
+    return [
+        list(range(start, min(start + chunk_size, total_pages)))
+        for start in range(0, total_pages, chunk_size)
+    ]
+
+
+def _parse_chunk(args):
+    """Worker: parse one chunk of pages and serialize the layout to JSON."""
+    from pdf2docx import Converter
+
+    pdf_path, pages, json_path = args
+    cv = Converter(pdf_path)
+    try:
+        cv.parse(pages=pages, **cv.default_settings)
+        cv.serialize(json_path)
+    finally:
+        cv.close()
+    return json_path
+
+
+def convert_pdf_to_docx_parallel(pdf_path, docx_stream, workers=4, chunk_size=25, progress=None):
+    """
+    Convert a PDF to DOCX, parsing page chunks across a process pool
+
+    Falls back to a single in-process conversion when the document fits in
+    one chunk or only one worker is configured. progress(done, total, stage)
+    is called as chunks finish.
+    """
+    from pdf2docx import Converter
+
+    cv = Converter(pdf_path)
+    try:
+        total_pages = len(cv.fitz_doc)
+        chunks = page_chunks(total_pages, chunk_size)
+        workers = min(max(1, workers), len(chunks))
+
+        if workers <= 1:
+            if progress:
+                progress(0, total_pages, 'converting')
+            cv.convert(docx_stream)
+            return docx_stream
+
+        logger.info(f"Parallel PDF to Word: {total_pages} pages in {len(chunks)} chunks, {workers} workers")
+
+        with tempfile.TemporaryDirectory(prefix='pdf2docx_') as temp_dir:
+            jobs = [
+                (pdf_path, pages, os.path.join(temp_dir, f'chunk_{i:05d}.json'))
+                for i, pages in enumerate(chunks)
+            ]
+            json_paths = []
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for pages, json_path in zip(chunks, pool.map(_parse_chunk, jobs)):
+                    json_paths.append(json_path)
+                    if progress:
+                        progress(pages[-1] + 1, total_pages, 'parsing')
+
+            # Restore in page order, then stitch into one document
+            for json_path in json_paths:
+                cv.deserialize(json_path)
+
+        if progress:
+            progress(total_pages, total_pages, 'building document')
+        cv.make_docx(docx_stream, **cv.default_settings)
+        return docx_stream
+    finally:
+        cv.close()
@@ -0,0 +1,125 @@
+"""
+File download responses.
+
+With DOWNLOAD_OFFLOAD set, views only authorize the request and hand the
+transfer to the front proxy:
+- 'nginx': X-Accel-Redirect to an internal location (see nginx.conf)
+- 'sendfile': X-Sendfile with the absolute path (Apache mod_xsendfile, lighttpd)
+
+Otherwise the file is served from Python with support for single-range
+requests (resumable downloads) and conditional requests on an ETag derived
+from the file's SHA-256.
+"""
+import os
+import re
+import mimetypes
+from urllib.parse import quote
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, quote_etag, parse_etags
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def file_etag(path, file_hash=''):
+    """Strong ETag from the content hash, else a weak one from mtime and size."""
+    if file_hash:
+        return quote_etag(file_hash)
+    stat = os.stat(path)
+    return f'W/"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+
+
+def parse_range(header, size):
+    """
+    Parse a single-range Range header into (start, end) inclusive
+
+    Returns None when the header should be ignored (absent, malformed or
+    multi-range: the whole file is sent) and False when it is unsatisfiable.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _offload_response(path):
+    response = HttpResponse()
+    if settings.DOWNLOAD_OFFLOAD == 'nginx':
+        relative = os.path.relpath(path, settings.MEDIA_ROOT)
+        response['X-Accel-Redirect'] = settings.DOWNLOAD_OFFLOAD_PREFIX + quote(relative.replace(os.sep, '/'))
+    else:
+        response['X-Sendfile'] = path
+    # Let the proxy fill in Content-Type from the file
+    del response['Content-Type']
+    return response
+
+
+def file_download_response(request, path, filename, file_hash=''):
+    """
+    Return a response that sends path as an attachment named filename
+    """
+    if settings.DOWNLOAD_OFFLOAD in ('nginx', 'sendfile'):
+        response = _offload_response(path)
+        response['Content-Disposition'] = content_disposition_header(True, filename)
+        return response
+
+    size = os.path.getsize(path)
+    etag = file_etag(path, file_hash)
+    last_modified = os.path.getmtime(path)
+
+    # 304 for a matching If-None-Match, 412 for a failed If-Match
+    response = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+    if response is not None:
+        response['ETag'] = etag
+        return response
+
+    byte_range = parse_range(request.headers.get('Range'), size)
+    if_range = request.headers.get('If-Range')
+    if byte_range and if_range and etag not in parse_etags(if_range) and if_range != http_date(last_modified):
+        # The client's partial copy is stale: send everything
+        byte_range = None
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+    elif byte_range:
+        start, end = byte_range
+        response = StreamingHttpResponse(_read_range(path, start, end - start + 1), status=206)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Type'] = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response['Content-Disposition'] = content_disposition_header(True, filename)
+    else:
+        # FileResponse uses wsgi.file_wrapper (sendfile) where the server offers it
+        response = FileResponse(open(path, 'rb'), as_attachment=True, filename=filename)
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
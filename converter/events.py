@@ -0,0 +1,190 @@
+"""
+Server-sent events for conversion progress (ASGI side).
+
+core/asgi.py routes /tools/tasks/<uuid>/events here, bypassing the Django
+request cycle. Each process keeps one ProgressHub that feeds every open
+stream from a single source:
+- 'redis': one pattern subscription to all task channels
+- 'database': one query per PROGRESS_POLL_INTERVAL for all watched tasks
+
+so the cost per watcher is one queue and one database read on connect,
+however many browsers are watching.
+"""
+import re
+import json
+import asyncio
+import logging
+from collections import defaultdict
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from .models import ConversionTask
+from .progress import CHANNEL_PREFIX, TERMINAL_STATUSES, snapshot
+
+logger = logging.getLogger(__name__)
+
+EVENTS_PATH = re.compile(r'^/tools/tasks/(?P<task_id>[0-9a-fA-F-]{36})/events/?$')
+QUEUE_SIZE = 16
+RECONNECT_DELAY = 2.0
+
+
+def format_event(event, name='progress'):
+    return f"event: {name}\ndata: {json.dumps(event)}\n\n".encode('utf-8')
+
+
+def _load_snapshots(task_ids):
+    close_old_connections()
+    fields = ('id', 'status', 'progress_done', 'progress_total', 'progress_stage')
+    return {
+        str(task.id): snapshot(task)
+        for task in ConversionTask.objects.filter(id__in=list(task_ids)).only(*fields)
+    }
+
+
+class ProgressHub:
+    """
+    Fan progress events out to per-connection queues
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or settings.PROGRESS_BACKEND
+        self.watchers = defaultdict(set)
+        self.listener = None
+
+    def subscribe(self, task_id):
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.watchers[task_id].add(queue)
+        if self.listener is None or self.listener.done():
+            listen = self._listen_redis if self.backend == 'redis' else self._poll_database
+            self.listener = asyncio.get_running_loop().create_task(listen())
+        return queue
+
+    def unsubscribe(self, task_id, queue):
+        queues = self.watchers.get(task_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.watchers[task_id]
+
+    def dispatch(self, task_id, event):
+        for queue in list(self.watchers.get(task_id, ())):
+            if queue.full():
+                # Progress is a state, not a log: the newest event wins
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    async def _listen_redis(self):
+        import redis.asyncio as redis
+
+        while True:
+            client = redis.Redis.from_url(settings.PROGRESS_REDIS_URL)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                async for message in pubsub.listen():
+                    if message['type'] != 'pmessage':
+                        continue
+                    task_id = message['channel'].decode()[len(CHANNEL_PREFIX):]
+                    if task_id in self.watchers:
+                        self.dispatch(task_id, json.loads(message['data']))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Progress subscription lost, reconnecting: {str(e)}")
+                await asyncio.sleep(RECONNECT_DELAY)
+            finally:
+                await pubsub.aclose()
+                await client.aclose()
+
+    async def _poll_database(self):
+        last = {}
+        while self.watchers:
+            try:
+                current = await sync_to_async(_load_snapshots)(self.watchers.keys())
+            except Exception as e:
+                logger.error(f"Progress poll failed: {str(e)}")
+                current = {}
+            for task_id, event in current.items():
+                if last.get(task_id) != event:
+                    last[task_id] = event
+                    self.dispatch(task_id, event)
+            last = {task_id: event for task_id, event in last.items() if task_id in self.watchers}
+            await asyncio.sleep(settings.PROGRESS_POLL_INTERVAL)
+
+
+_hub = None
+
+
+def get_hub():
+    global _hub
+    if _hub is None:
+        _hub = ProgressHub()
+    return _hub
+
+
+async def _send_text(send, status, body):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'text/plain; charset=utf-8')]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def sse_application(scope, receive, send):
+    """
+    ASGI app streaming progress events for one task until it finishes
+    """
+    match = EVENTS_PATH.match(scope['path'])
+    if scope['method'] != 'GET':
+        await _send_text(send, 405, b'Method not allowed')
+        return
+    task_id = match.group('task_id').lower()
+
+    hub = get_hub()
+    # Subscribe before reading the current state so no update falls in between
+    queue = hub.subscribe(task_id)
+    try:
+        try:
+            current = (await sync_to_async(_load_snapshots)([task_id])).get(task_id)
+        except Exception:
+            # Not a valid UUID
+            current = None
+        if current is None:
+            await _send_text(send, 404, b'Task not found')
+            return
+
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ]})
+        await send({'type': 'http.response.body', 'body': b'retry: 3000\n\n' + format_event(current),
+                    'more_body': True})
+
+        event = current
+        disconnect = asyncio.ensure_future(receive())
+        try:
+            while event['status'] not in TERMINAL_STATUSES:
+                get_event = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait({get_event, disconnect}, timeout=settings.PROGRESS_HEARTBEAT,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if disconnect in done:
+                    if disconnect.result()['type'] == 'http.disconnect':
+                        get_event.cancel()
+                        return
+                    # The (empty) request body of the GET: keep listening for the disconnect
+                    disconnect = asyncio.ensure_future(receive())
+                    if get_event not in done:
+                        get_event.cancel()
+                        continue
+                if get_event in done:
+                    event = get_event.result()
+                    body = format_event(event)
+                else:
+                    get_event.cancel()
+                    body = b': keep-alive\n\n'
+                await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+        finally:
+            disconnect.cancel()
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        hub.unsubscribe(task_id, queue)
@@ -0,0 +1,372 @@
+"""
+Streaming Excel to PDF rendering.
+
+Rows are read one at a time with openpyxl in read_only mode and laid out a
+page at a time: each page is a reportlab Table of fixed-height rows with
+the sheet's first row repeated as its header. Text longer than its column
+is shortened with an ellipsis rather than wrapped, so every page holds the
+same number of rows and Table never has to measure or split a large
+flowable. Numbers and dates are never shortened: one that does not fit is
+drawn in a smaller font.
+
+Columns are at least MIN_COLUMN_WIDTH wide. A sheet with more columns than
+fit across the page is split into column groups, printed on successive
+pages for the same rows, each with its part of the header.
+
+The column count comes from the first row, which openpyxl pads to the
+sheet's declared <dimension>. Files without one (or with a wrong one) can
+have longer rows further down: the page in progress is finished and the
+layout widens from the next page, with the header padded, so no cell is
+left out.
+
+Pages are drawn in segments of SEGMENT_PAGES on separate canvases (a
+canvas keeps its pages in memory until saved) and the segments are joined
+by converter.merge, so memory stays bounded by one page of rows plus one
+segment of output, whatever the workbook size.
+
+Legacy .xls files, which openpyxl cannot read, go through pandas (xlrd).
+"""
+import os
+import shutil
+import logging
+import tempfile
+from datetime import date, datetime, time
+
+logger = logging.getLogger(__name__)
+
+SHEET_OPTIONS = ('first', 'active', 'all', 'selection')
+SEGMENT_PAGES = 200
+MARGIN = 36
+TITLE_HEIGHT = 28
+FOOTER_HEIGHT = 20
+MAX_FONT_SIZE = 9
+MIN_FONT_SIZE = 5
+# Average Helvetica glyph width as a fraction of the font size
+CHAR_WIDTH = 0.5
+CELL_PADDING = 6
+# With fit_to_page, turn the page sideways when columns would be narrower than this
+MIN_PORTRAIT_COLUMN = 60
+# Narrower columns would cut most values: wider sheets are split into column groups
+MIN_COLUMN_WIDTH = 60
+
+
+def select_sheets(sheet_names, active_name, option='first', selected=None):
+    """
+    Return the names of the sheets to render, in workbook order
+
+    option is one of SHEET_OPTIONS; 'selection' uses the names in selected
+    and falls back to the first sheet when none of them exist.
+    """
+    if not sheet_names:
+        return []
+    if option == 'all':
+        return list(sheet_names)
+    if option == 'active' and active_name in sheet_names:
+        return [active_name]
+    if option == 'selection' and selected:
+        wanted = {name.strip().lower() for name in selected}
+        chosen = [name for name in sheet_names if name.lower() in wanted]
+        if chosen:
+            return chosen
+    return [sheet_names[0]]
+
+
+def cell_text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        return f"{value:.10g}"
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ', timespec='seconds').removesuffix(' 00:00:00')
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    return str(value)
+
+
+def _open_workbook(excel_path):
+    """
+    Return (sheet_names, active_name, iter_rows, row_count, close)
+
+    iter_rows(name) yields tuples of cell values; row_count(name) is the
+    sheet's declared row count, or 0 when the file does not record it.
+    """
+    if excel_path.lower().endswith('.xls'):
+        import pandas as pd
+
+        book = pd.ExcelFile(excel_path)
+
+        def iter_xls_rows(name):
+            frame = book.parse(name, header=None)
+            for row in frame.itertuples(index=False, name=None):
+                yield tuple(None if pd.isna(value) else value for value in row)
+
+        return book.sheet_names, book.sheet_names[0], iter_xls_rows, lambda name: 0, book.close
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(excel_path, read_only=True, data_only=True)
+
+    def iter_rows(name):
+        return workbook[name].iter_rows(values_only=True)
+
+    def row_count(name):
+        return workbook[name].max_row or 0
+
+    return workbook.sheetnames, workbook.active.title, iter_rows, row_count, workbook.close
+
+
+class _PageLayout:
+    """Page size, column groups, column width and rows per page for one sheet."""
+
+    def __init__(self, columns, fit_to_page, include_headers):
+        from reportlab.lib.pagesizes import letter, landscape
+
+        pagesize = letter
+        if fit_to_page and (letter[0] - 2 * MARGIN) / columns < MIN_PORTRAIT_COLUMN:
+            pagesize = landscape(letter)
+        self.pagesize = pagesize
+        width, height = pagesize
+        # Balanced groups: 20 columns at 12 per page print as 10 + 10
+        per_page = max(1, int((width - 2 * MARGIN) / MIN_COLUMN_WIDTH))
+        group_count = -(-columns // per_page)
+        group_size = -(-columns // group_count)
+        self.groups = [(start, min(start + group_size, columns)) for start in range(0, columns, group_size)]
+        self.column_width = (width - 2 * MARGIN) / group_size
+        self.font_size = max(MIN_FONT_SIZE, min(MAX_FONT_SIZE, self.column_width / 8 / CHAR_WIDTH))
+        self.row_height = self.font_size + 5
+        self.max_chars = max(1, int((self.column_width - CELL_PADDING) / (self.font_size * CHAR_WIDTH)))
+        self.top = height - MARGIN - (TITLE_HEIGHT if include_headers else 0)
+        bottom = MARGIN + (FOOTER_HEIGHT if include_headers else 0)
+        # One row is the repeated header
+        self.rows_per_page = max(1, int((self.top - bottom) / self.row_height) - 1)
+
+
+class _SegmentedCanvas:
+    """Draw pages onto canvases of SEGMENT_PAGES pages, saved to temp_dir."""
+
+    def __init__(self, temp_dir, segment_pages=SEGMENT_PAGES):
+        self.temp_dir = temp_dir
+        self.segment_pages = segment_pages
+        self.paths = []
+        self.canvas = None
+        self.pages = 0
+
+    def page(self, pagesize):
+        from reportlab.pdfgen import canvas
+
+        if self.canvas is None:
+            path = os.path.join(self.temp_dir, f'segment_{len(self.paths):05d}.pdf')
+            self.paths.append(path)
+            self.canvas = canvas.Canvas(path, pagesize=pagesize, pageCompression=1)
+        self.canvas.setPageSize(pagesize)
+        return self.canvas
+
+    def end_page(self):
+        self.canvas.showPage()
+        self.pages += 1
+        if self.pages % self.segment_pages == 0:
+            self.flush()
+
+    def flush(self):
+        if self.canvas is not None:
+            self.canvas.save()
+            self.canvas = None
+
+
+def _table_style(include_gridlines, font_size):
+    from reportlab.lib import colors
+    from reportlab.platypus import TableStyle
+
+    commands = [
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4CAF50')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), font_size),
+        ('LEADING', (0, 0), (-1, -1), font_size + 1),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('TOPPADDING', (0, 0), (-1, -1), 1),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 1),
+        ('LEFTPADDING', (0, 0), (-1, -1), CELL_PADDING / 2),
+        ('RIGHTPADDING', (0, 0), (-1, -1), CELL_PADDING / 2),
+    ]
+    if include_gridlines:
+        commands.append(('GRID', (0, 0), (-1, -1), 0.5, colors.grey))
+    else:
+        commands.append(('BOX', (0, 0), (-1, -1), 1, colors.black))
+    return TableStyle(commands)
+
+
+def _overflow_fonts(data, layout):
+    """FONTSIZE commands shrinking the cells (numbers, dates) wider than their column."""
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+
+    room = layout.column_width - CELL_PADDING
+    commands = []
+    for r, row in enumerate(data):
+        font = 'Helvetica-Bold' if r == 0 else 'Helvetica'
+        for col, text in enumerate(row):
+            if len(text) * layout.font_size * CHAR_WIDTH < room * 0.8:
+                continue
+            text_width = stringWidth(text, font, layout.font_size)
+            if text_width > room:
+                commands.append(('FONTSIZE', (col, r), (col, r), layout.font_size * room / text_width))
+    return commands
+
+
+def _draw_page(segments, layout, style, header, rows, title, page_number, include_headers):
+    from reportlab.platypus import Table
+
+    c = segments.page(layout.pagesize)
+    width, height = layout.pagesize
+    data = [header] + rows
+    table = Table(data, colWidths=[layout.column_width] * len(header),
+                  rowHeights=[layout.row_height] * len(data), style=style)
+    overflow = _overflow_fonts(data, layout)
+    if overflow:
+        table.setStyle(overflow)
+    table.wrapOn(c, width, height)
+    table.drawOn(c, MARGIN, layout.top - layout.row_height * len(data))
+    if include_headers:
+        c.setFont('Helvetica-Bold', 12)
+        c.drawString(MARGIN, height - MARGIN - 14, title)
+        c.setFont('Helvetica', 8)
+        c.setFillColorRGB(0.4, 0.4, 0.4)
+        c.drawRightString(width - MARGIN, MARGIN, f"Page {page_number}")
+        c.setFillColorRGB(0, 0, 0)
+    segments.end_page()
+
+
+def fit_text(text, max_chars):
+    """text, shortened with an ellipsis when longer than max_chars."""
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars - 1] + '\u2026'
+
+
+def column_letter(number):
+    """Spreadsheet column name: 1 -> A, 27 -> AA."""
+    name = ''
+    while number:
+        number, remainder = divmod(number - 1, 26)
+        name = chr(ord('A') + remainder) + name
+    return name
+
+
+def used_width(row):
+    """Cells up to and including the last non-empty one."""
+    for index in range(len(row) - 1, -1, -1):
+        if row[index] is not None and row[index] != '':
+            return index + 1
+    return 0
+
+
+def _render_sheet(segments, rows, title, include_gridlines, fit_to_page, include_headers, on_rows):
+    """Lay out one sheet's rows; returns the number of data rows drawn."""
+    header_row = header = None
+    layout = style = None
+    columns = 0
+    page_rows = []
+    drawn = 0
+    page_number = 0
+
+    def cells(row):
+        # Only text is shortened; numbers and dates are shrunk to fit by _draw_page
+        values = [fit_text(value, layout.max_chars) if isinstance(value, str) else cell_text(value)
+                  for value in row[:columns]]
+        values.extend([''] * (columns - len(values)))
+        return values
+
+    def draw():
+        nonlocal page_rows, page_number, drawn
+        for start, end in layout.groups:
+            page_number += 1
+            label = title
+            if len(layout.groups) > 1:
+                label = f"{title} ({column_letter(start + 1)}\u2013{column_letter(end)})"
+            _draw_page(segments, layout, style, header[start:end], [row[start:end] for row in page_rows],
+                       label, page_number, include_headers)
+        drawn += len(page_rows)
+        on_rows(len(page_rows))
+        page_rows = []
+
+    for row in rows:
+        width = used_width(row)
+        if not width:
+            continue
+        if width > columns:
+            # First row, or a row wider than any before it: finish the page at
+            # the old width, then lay out the next ones (and the header) wider
+            if page_rows:
+                draw()
+            columns = max(width, len(row) if header_row is None else 0)
+            layout = _PageLayout(columns, fit_to_page, include_headers)
+            style = _table_style(include_gridlines, layout.font_size)
+            if header_row is None:
+                header_row = row
+                header = cells(row)
+                continue
+            header = cells(header_row)
+        page_rows.append(cells(row))
+        if len(page_rows) == layout.rows_per_page:
+            draw()
+
+    if header is not None and (page_rows or page_number == 0):
+        draw()
+    return drawn
+
+
+def render_workbook(excel_path, output=None, sheets='first', sheet_names=None, include_gridlines=True,
+                    fit_to_page=True, include_headers=True, progress=None, segment_pages=SEGMENT_PAGES):
+    """
+    Render the selected sheets of a workbook into a PDF in output
+
+    sheets is one of SHEET_OPTIONS (sheet_names lists the names for
+    'selection'). Each sheet starts on a new page; its first non-empty row
+    is the header repeated on every page. progress(done, total, stage)
+    counts rows. Returns output (default: a new temp file) rewound.
+    """
+    if output is None:
+        output = tempfile.TemporaryFile()
+
+    names, active, iter_rows, row_count, close = _open_workbook(excel_path)
+    try:
+        chosen = select_sheets(names, active, sheets, sheet_names)
+        total = sum(row_count(name) for name in chosen)
+        done = 0
+
+        def on_rows(count):
+            nonlocal done
+            done += count
+            if progress:
+                progress(min(done, total) if total else done, total, 'rendering')
+
+        with tempfile.TemporaryDirectory(prefix='excel_') as temp_dir:
+            segments = _SegmentedCanvas(temp_dir, segment_pages)
+            for name in chosen:
+                drawn = _render_sheet(segments, iter_rows(name), name, include_gridlines,
+                                      fit_to_page, include_headers, on_rows)
+                logger.debug(f"Rendered sheet {name!r}: {drawn} rows")
+            if segments.pages == 0:
+                # Nothing but empty sheets: still produce a valid one-page PDF
+                pagesize = _PageLayout(1, False, False).pagesize
+                c = segments.page(pagesize)
+                c.setFont('Helvetica', 10)
+                c.drawString(MARGIN, pagesize[1] - MARGIN - 10, 'This workbook has no data.')
+                segments.end_page()
+            segments.flush()
+
+            if len(segments.paths) == 1:
+                with open(segments.paths[0], 'rb') as rendered:
+                    shutil.copyfileobj(rendered, output, 1024 * 1024)
+            else:
+                from .merge import merge_pdf_files
+                merge_pdf_files(segments.paths, output, dedupe=False)
+    except Exception:
+        output.close()
+        raise
+    finally:
+        close()
+
+    output.seek(0)
+    return output
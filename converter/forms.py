@@ -162,6 +162,13 @@ class SplitPDFForm(BaseFileUploadForm):
         self.fields['file'].validators = [
             FileExtensionValidator(allowed_extensions=['pdf'])
         ]
+        # Not needed when the file was already uploaded for the page previews
+        self.fields['file'].required = False
+    
+    upload_id = forms.UUIDField(
+        required=False,
+        widget=forms.HiddenInput(attrs={'id': 'uploadId'})
+    )
     
     SPLIT_CHOICES = [
         ('range', 'Split by Page Range'),
@@ -231,6 +238,9 @@ class SplitPDFForm(BaseFileUploadForm):
         cleaned_data = super().clean()
         split_type = cleaned_data.get('split_type')
         
+        if not cleaned_data.get('file') and not cleaned_data.get('upload_id') and 'file' not in self.errors:
+            raise forms.ValidationError({'file': 'Please select a PDF file to split.'})
+        
         if split_type == 'range':
             if not cleaned_data.get('pages'):
                 raise forms.ValidationError({'pages': 'Please enter page ranges for splitting.'})
@@ -246,6 +256,62 @@ class SplitPDFForm(BaseFileUploadForm):
         
         return cleaned_data
 
+class PDFToImageForm(BaseFileUploadForm):
+    """Form for exporting PDF pages as images."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['file'].widget.attrs['accept'] = '.pdf'
+        self.fields['file'].validators = [
+            FileExtensionValidator(allowed_extensions=['pdf'])
+        ]
+    
+    image_format = forms.ChoiceField(
+        label='Image format',
+        choices=[
+            ('jpeg', 'JPG - smaller files, best for photos'),
+            ('png', 'PNG - lossless, best for text and drawings'),
+        ],
+        initial='jpeg',
+        widget=forms.RadioSelect(attrs={
+            'class': 'image-format-radio'
+        })
+    )
+    
+    dpi = forms.TypedChoiceField(
+        label='Resolution',
+        choices=[
+            (72, '72 DPI - screen'),
+            (150, '150 DPI - recommended'),
+            (300, '300 DPI - print'),
+        ],
+        coerce=int,
+        initial=150,
+        widget=forms.Select(attrs={
+            'class': 'w-full px-3 py-2 border rounded-lg'
+        })
+    )
+    
+    quality = forms.IntegerField(
+        label='JPG quality',
+        required=False,
+        min_value=10,
+        max_value=100,
+        initial=85,
+        widget=forms.NumberInput(attrs={
+            'class': 'w-full',
+            'type': 'range',
+            'step': 5,
+            'id': 'qualityInput'
+        }),
+        help_text='Higher is sharper but larger'
+    )
+    
+    def clean_quality(self):
+        # Only meaningful for JPG; a fixed value keeps PNG results cacheable
+        if self.cleaned_data.get('image_format') != 'jpeg':
+            return 0
+        return self.cleaned_data.get('quality') or 85
+
 # In converter/forms.py, update the CompressPDFForm class:
 # In converter/forms.py - Update the CompressPDFForm class:
 
@@ -0,0 +1,147 @@
+"""
+Image ingest for Image to PDF.
+
+Handing reportlab the original files embeds every photo at full
+resolution (a 12 MP phone photo stays 12 MP on an A4 page) after reportlab
+has decoded it once more. Instead each image is prepared on a thread pool:
+
+1. the header is read to get the size and EXIF orientation, and the box the
+   image occupies on the page is worked out for the placement option;
+2. a JPEG that is upright, RGB or greyscale and no larger than that box
+   needs at the target DPI is passed through untouched (reportlab embeds
+   JPEG data as-is);
+3. anything else is decoded (JPEGs in draft mode, so libjpeg scales by
+   1/2, 1/4 or 1/8 while decoding), rotated upright, downscaled to the
+   target DPI and re-encoded as JPEG, or as PNG when it has few colours or
+   transparency.
+
+Only a few decoded images are in memory at a time; the encoded results are
+embedded in page order.
+"""
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DPI = 150
+DEFAULT_JPEG_QUALITY = 85
+# Skip the resample when it would shrink the image by less than this
+MIN_SCALE_STEP = 0.9
+# EXIF orientation tag; 1 means upright
+ORIENTATION_TAG = 0x0112
+# Orientations that swap width and height
+TRANSPOSED = (5, 6, 7, 8)
+PASSTHROUGH_MODES = ('RGB', 'L')
+
+
+def place(image_size, page_size, placement='fit'):
+    """Return (x, y, width, height) in points for an image of image_size pixels."""
+    img_width, img_height = image_size
+    page_width, page_height = page_size
+    if placement == 'fit':
+        # Fit to page with margins
+        scale = min(page_width * 0.9 / img_width, page_height * 0.9 / img_height)
+    elif placement == 'full':
+        # Full page (stretch to fill)
+        return 0, 0, page_width, page_height
+    elif placement == 'center':
+        # Center original size
+        scale = 1
+    else:
+        # Unknown placement ('multiple' is laid out by converter.layout): 80% of the page
+        scale = min(page_width / img_width, page_height / img_height) * 0.8
+    width, height = img_width * scale, img_height * scale
+    return (page_width - width) / 2, (page_height - height) / 2, width, height
+
+
+def _target_size(size, box, dpi):
+    """Pixel size needed to show an image of size in box at dpi, or None to keep it."""
+    width, height = size
+    scale = max(box[0] / 72.0 * dpi / width, box[1] / 72.0 * dpi / height)
+    if scale >= MIN_SCALE_STEP:
+        return None
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def oriented_size(path):
+    """(width, height) of an image as displayed, i.e. after EXIF rotation."""
+    from PIL import Image
+
+    with Image.open(path) as image:
+        if image.getexif().get(ORIENTATION_TAG, 1) in TRANSPOSED:
+            return image.size[1], image.size[0]
+        return image.size
+
+
+def ingest_image(path, page_size, placement='fit', dpi=DEFAULT_DPI, jpeg_quality=DEFAULT_JPEG_QUALITY,
+                 box=None):
+    """
+    Prepare one image for drawing (runs on a worker thread)
+
+    The image goes in box (x, y, width, height) when given, else where the
+    placement option puts it. Returns a dict with 'image' (the path itself
+    or an ImageReader over the re-encoded bytes), the 'box' and 'reencoded'.
+    """
+    from PIL import Image, ImageOps
+    from reportlab.lib.utils import ImageReader
+
+    with Image.open(path) as image:
+        orientation = image.getexif().get(ORIENTATION_TAG, 1)
+        size = image.size
+        if orientation in TRANSPOSED:
+            size = size[1], size[0]
+        x, y, width, height = box or place(size, page_size, placement)
+        target = _target_size(size, (width, height), dpi)
+
+        if image.format == 'JPEG' and orientation == 1 and image.mode in PASSTHROUGH_MODES and target is None:
+            return {'image': path, 'box': (x, y, width, height), 'reencoded': False}
+
+        if image.format == 'JPEG' and target:
+            # Decode straight to roughly the target size; draft takes the pre-rotation size
+            draft_size = (target[1], target[0]) if orientation in TRANSPOSED else target
+            image.draft(image.mode, draft_size)
+        converted = ImageOps.exif_transpose(image)
+
+    if target and converted.size != target:
+        converted = converted.resize(target, Image.LANCZOS, reducing_gap=3.0)
+
+    buffer = io.BytesIO()
+    if converted.mode in ('1', 'P', 'LA', 'RGBA', 'PA') or (
+            converted.mode not in ('CMYK', 'I', 'F') and converted.getcolors(256) is not None):
+        # Line art, palettes and transparency: lossless
+        if converted.mode not in ('1', 'L', 'P', 'LA', 'RGB', 'RGBA'):
+            converted = converted.convert('RGBA')
+        converted.save(buffer, format='PNG', optimize=False)
+    else:
+        if converted.mode not in PASSTHROUGH_MODES:
+            converted = converted.convert('RGB')
+        converted.save(buffer, format='JPEG', quality=jpeg_quality, optimize=True)
+    buffer.seek(0)
+    return {'image': ImageReader(buffer), 'box': (x, y, width, height), 'reencoded': True}
+
+
+def _ingest_or_error(args):
+    try:
+        return ingest_image(*args)
+    except Exception as e:
+        return e
+
+
+def ingest_images(image_paths, page_size, placement='fit', dpi=DEFAULT_DPI,
+                  jpeg_quality=DEFAULT_JPEG_QUALITY, workers=1, boxes=None):
+    """
+    Yield (path, result) in order, where result is ingest_image's dict or
+    the exception raised for that image
+
+    boxes optionally gives each image's (x, y, width, height).
+    """
+    workers = max(1, workers)
+    # Bounded batches keep only a few decoded images in memory at once
+    batch_size = workers * 2
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for start in range(0, len(image_paths), batch_size):
+            batch = image_paths[start:start + batch_size]
+            jobs = [(path, page_size, placement, dpi, jpeg_quality, boxes[start + offset] if boxes else None)
+                    for offset, path in enumerate(batch)]
+            yield from zip(batch, pool.map(_ingest_or_error, jobs))
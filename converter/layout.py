@@ -0,0 +1,85 @@
+"""
+Multi-up page layout for Image to PDF ('multiple' placement).
+
+Images keep their order and aspect ratio and are packed into justified
+rows (shelf packing): images are added to a row while the row, at the
+target height, still fits the page width; the row is then scaled so it
+spans the full width exactly. Rows are stacked down the page, and a row
+that does not fit the remaining height starts a new page.
+
+The target row height comes from rows_per_page, so a page of small scans
+or receipts carries several rows of several images each, while a very wide
+image simply gets a row to itself.
+"""
+
+DEFAULT_MARGIN = 36
+DEFAULT_GAP = 12
+DEFAULT_ROWS_PER_PAGE = 3
+# A justified row may grow to this multiple of the target height (a row
+# holding a single tall image would otherwise fill the page)
+MAX_ROW_GROWTH = 1.5
+
+
+def _close_row(row, aspects, usable_width, target_height, gap):
+    """Return (height, [(index, width)]) for a row scaled to the page width."""
+    total_aspect = sum(aspects[index] for index in row)
+    height = (usable_width - gap * (len(row) - 1)) / total_aspect
+    height = min(height, target_height * MAX_ROW_GROWTH)
+    return height, [(index, aspects[index] * height) for index in row]
+
+
+def _rows(aspects, usable_width, usable_height, target_height, gap):
+    row = []
+    row_width = 0.0
+    for index, aspect in enumerate(aspects):
+        width = aspect * target_height
+        if row and row_width + gap + width > usable_width:
+            yield _close_row(row, aspects, usable_width, target_height, gap)
+            row, row_width = [], 0.0
+        row.append(index)
+        row_width += (gap if len(row) > 1 else 0) + width
+    if row:
+        height, cells = _close_row(row, aspects, usable_width, target_height, gap)
+        # The last row is not stretched past the target height
+        yield min(height, target_height), [(index, aspects[index] * min(height, target_height))
+                                           for index, _ in cells]
+
+
+def pack_pages(sizes, page_size, margin=DEFAULT_MARGIN, gap=DEFAULT_GAP, rows_per_page=DEFAULT_ROWS_PER_PAGE):
+    """
+    Lay out images of the given (width, height) sizes on pages
+
+    Returns a list of pages, each a list of (index, (x, y, width, height))
+    in points with the origin at the bottom left, in input order.
+    """
+    page_width, page_height = page_size
+    usable_width = page_width - 2 * margin
+    usable_height = page_height - 2 * margin
+    target_height = (usable_height - gap * (rows_per_page - 1)) / rows_per_page
+    aspects = [max(width, 1) / max(height, 1) for width, height in sizes]
+
+    pages = []
+    page = None
+    top = 0.0
+    for height, cells in _rows(aspects, usable_width, usable_height, target_height, gap):
+        if height > usable_height:
+            # A single very tall image: fit it to the page
+            scale = usable_height / height
+            height, cells = usable_height, [(index, width * scale) for index, width in cells]
+        if page is None or top - height < margin:
+            page = []
+            pages.append(page)
+            top = page_height - margin
+        row_width = sum(width for _, width in cells) + gap * (len(cells) - 1)
+        x = margin + (usable_width - row_width) / 2
+        for index, width in cells:
+            page.append((index, (x, top - height, width, height)))
+            x += width + gap
+        top -= height + gap
+    return pages
+
+
+def page_fill(page, page_size, margin=DEFAULT_MARGIN):
+    """Fraction of the usable page area covered by a packed page's images."""
+    usable = (page_size[0] - 2 * margin) * (page_size[1] - 2 * margin)
+    return sum(width * height for _, (_, _, width, height) in page) / usable
@@ -0,0 +1,92 @@
+"""
+Delete expired uploads, chunked upload sessions, conversion tasks, cached results, page thumbnails and rate limit buckets.
+
+Usage:
+    python manage.py cleanup_expired                 # one pass (cron)
+    python manage.py cleanup_expired --loop          # every CLEANUP_INTERVAL seconds, at low priority
+"""
+import os
+import time
+import signal
+import logging
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from converter import result_cache, thumbnails
+from converter.cleanup import purge_expired
+from converter.ratelimit import purge_stale_buckets
+
+logger = logging.getLogger('converter')
+
+
+class Command(BaseCommand):
+    help = 'Delete expired uploads and conversion tasks (with their files) in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep running, one pass every --interval seconds, until SIGTERM/SIGINT'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=getattr(settings, 'CLEANUP_INTERVAL', 300),
+            help='Seconds between passes with --loop (default: CLEANUP_INTERVAL)'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=getattr(settings, 'CLEANUP_BATCH_SIZE', 500),
+            help='Rows deleted per statement (default: CLEANUP_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=getattr(settings, 'CLEANUP_WORKERS', 4),
+            help='Threads unlinking files (default: CLEANUP_WORKERS)'
+        )
+        parser.add_argument(
+            '--nice', type=int, default=10,
+            help='Niceness increment applied with --loop so conversions keep the CPU'
+        )
+
+    def run_pass(self, options):
+        stats = purge_expired(batch_size=options['batch_size'], workers=options['workers'])
+        # Cached outputs are user data too; they expire with their own TTL
+        cache_count = result_cache.purge_expired()
+        # So are page thumbnails; this also trims the cache to THUMBNAIL_CACHE_MAX_BYTES
+        thumbnail_count = thumbnails.sweep()
+        # Idle rate limit buckets have refilled; dropping them changes nothing
+        bucket_count = purge_stale_buckets()
+
+        rows = stats['task_rows'] + stats['upload_rows']
+        seconds = max(stats['seconds'], 1e-6)
+        self.stdout.write(
+            f"Cleanup: {stats['task_rows']} tasks, {stats['upload_rows']} uploads, "
+            f"{stats['session_rows']} chunked upload sessions, "
+            f"{stats['files']} files ({stats['bytes'] / 1024 / 1024:.1f} MB), "
+            f"{cache_count} cached results, {thumbnail_count} thumbnails, {bucket_count} rate limit buckets "
+            f"in {stats['seconds']:.2f}s ({rows / seconds:.0f} rows/s, {stats['files'] / seconds:.0f} files/s)"
+        )
+        return stats
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            self.run_pass(options)
+            return
+
+        stopping = []
+        signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+        signal.signal(signal.SIGINT, lambda signum, frame: stopping.append(signum))
+        if options['nice'] and hasattr(os, 'nice'):
+            os.nice(options['nice'])
+
+        self.stdout.write(self.style.SUCCESS(f"Cleanup running every {options['interval']:.0f}s"))
+        while not stopping:
+            try:
+                self.run_pass(options)
+            except Exception as e:
+                logger.error(f"Cleanup pass failed: {str(e)}", exc_info=True)
+            finally:
+                # Long-lived processes must not keep stale connections around
+                connections.close_all()
+            deadline = time.monotonic() + options['interval']
+            while not stopping and time.monotonic() < deadline:
+                time.sleep(min(1.0, options['interval']))
+
+        self.stdout.write('Cleanup stopped')
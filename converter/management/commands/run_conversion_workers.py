@@ -0,0 +1,169 @@
+"""
+Run a pool of conversion worker processes.
+
+Usage: python manage.py run_conversion_workers --concurrency 4
+
+With PROMETHEUS_MULTIPROC_DIR set, the workers' conversion metrics are
+summed and served on --metrics-port (default METRICS_WORKER_PORT).
+
+Every CONVERSION_HEARTBEAT_INTERVAL seconds the supervisor requeues tasks
+whose worker stopped heartbeating (see converter.queues.recover_stalled_tasks).
+
+When OFFICE_CONVERSION_TYPES is set, the LibreOffice pool is started before
+the workers, from a child process, and stopped after them.
+"""
+import os
+import time
+import signal
+import logging
+import multiprocessing
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+logger = logging.getLogger('converter')
+
+
+def worker_loop(worker_number, stop_event, dequeue_timeout, office=False):
+    """
+    Claim and execute tasks until the supervisor asks us to stop
+    """
+    from converter.queues import get_queue, heartbeat
+    from converter.tasks import execute_task
+
+    # Signal handlers only flip a flag: touching the shared Event from a
+    # handler can deadlock on its internal lock.
+    terminating = []
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: terminating.append(signum))
+
+    queue = get_queue()
+    logger.info(f"Conversion worker {worker_number} started (pid {os.getpid()})")
+
+    while not terminating and not stop_event.is_set():
+        try:
+            task_id = queue.dequeue(timeout=dequeue_timeout)
+            if task_id is not None:
+                try:
+                    with heartbeat(task_id):
+                        execute_task(task_id)
+                finally:
+                    queue.ack(task_id)
+        except Exception as e:
+            logger.error(f"Conversion worker {worker_number} error: {str(e)}", exc_info=True)
+            time.sleep(dequeue_timeout)
+        finally:
+            # Long-lived processes must not keep stale connections around
+            connections.close_all()
+            if office:
+                from converter import office_pool
+                office_pool.reap()
+
+    logger.info(f"Conversion worker {worker_number} stopped")
+
+
+class Command(BaseCommand):
+    help = 'Run conversion worker processes that execute queued ConversionTasks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int,
+            default=getattr(settings, 'CONVERSION_WORKER_CONCURRENCY', 2),
+            help='Number of worker processes (default: CONVERSION_WORKER_CONCURRENCY)'
+        )
+        parser.add_argument(
+            '--timeout', type=float, default=5.0,
+            help='Seconds a worker blocks waiting for a task before re-checking for shutdown'
+        )
+        parser.add_argument(
+            '--metrics-port', type=int, default=getattr(settings, 'METRICS_WORKER_PORT', 0),
+            help='Serve Prometheus metrics on this port, 0 to disable (default: METRICS_WORKER_PORT)'
+        )
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        dequeue_timeout = options['timeout']
+
+        stop_event = multiprocessing.Event()
+        stopping = []
+        signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+        signal.signal(signal.SIGINT, lambda signum, frame: stopping.append(signum))
+
+        # Children must open their own database connections
+        connections.close_all()
+
+        if settings.METRICS_ENABLED:
+            from converter import metrics
+            # Values left by a previous run would be added to this one's
+            metrics.reset_multiprocess_dir()
+            if options['metrics_port']:
+                metrics.serve(options['metrics_port'])
+
+        office = bool(settings.OFFICE_CONVERSION_TYPES)
+        if office:
+            from converter import office_pool
+            if office_pool.is_available():
+                office_pool.warm_in_subprocess()
+            else:
+                logger.warning(f"OFFICE_CONVERSION_TYPES is set but {settings.OFFICE_BINARY} or the uno "
+                               f"module is missing; using reportlab")
+                office = False
+
+        workers = {}
+
+        def start_worker(number):
+            process = multiprocessing.Process(
+                target=worker_loop,
+                args=(number, stop_event, dequeue_timeout, office),
+                name=f'conversion-worker-{number}',
+                # Not daemonic: converters may start their own process pools
+                daemon=False,
+            )
+            process.start()
+            workers[number] = process
+
+        for number in range(1, concurrency + 1):
+            start_worker(number)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Started {concurrency} conversion worker(s) using the "
+            f"'{settings.CONVERSION_QUEUE_BACKEND}' queue backend"
+        ))
+
+        # Supervise: restart workers that die (e.g. OOM-killed by a huge PDF)
+        # and put back the tasks they were running
+        next_recovery = 0.0
+        while not stopping:
+            if time.monotonic() >= next_recovery:
+                next_recovery = time.monotonic() + settings.CONVERSION_HEARTBEAT_INTERVAL
+                self.recover_tasks()
+            for number, process in list(workers.items()):
+                if not process.is_alive() and not stopping:
+                    logger.warning(f"Conversion worker {number} exited with code {process.exitcode}, restarting")
+                    if settings.METRICS_ENABLED:
+                        from converter import metrics
+                        metrics.mark_process_dead(process.pid)
+                    start_worker(number)
+            time.sleep(1.0)
+
+        # Let workers finish the task they are running, then exit
+        stop_event.set()
+        for process in workers.values():
+            process.join(timeout=dequeue_timeout + 30)
+            if process.is_alive():
+                process.terminate()
+        if office:
+            office_pool.shutdown()
+
+        self.stdout.write('Conversion workers stopped')
+
+    def recover_tasks(self):
+        from converter.queues import recover_stalled_tasks
+
+        try:
+            recover_stalled_tasks()
+        except Exception as e:
+            logger.error(f"Recovering stalled conversion tasks failed: {str(e)}", exc_info=True)
+        finally:
+            # Workers restarted later must not inherit the supervisor's connection
+            connections.close_all()
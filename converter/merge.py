@@ -0,0 +1,99 @@
+"""
+Bounded-memory PDF merge.
+
+Both PyMuPDF and pikepdf copy the stream data of every page taken from
+another document into memory, so building the merged document in one go
+costs as much RAM as all inputs together. Instead the result is built on
+disk one input at a time:
+
+1. the first input is copied into a work file;
+2. each further input is opened, its pages are appended to the work file
+   and only the new objects are written, as an incremental update;
+3. a final full save rewrites the work file to the output, merging
+   identical objects and streams (garbage=4), so fonts and images shared
+   by several inputs are stored once and the incremental sections vanish.
+
+Peak memory is therefore about the size of the largest single input, and
+the bookmarks of every input are carried over with their pages.
+"""
+import os
+import shutil
+import logging
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+# garbage=4: drop unused objects, compact the xref, merge duplicate objects and streams
+FINAL_GARBAGE_LEVEL = 4
+
+
+def _open_source(fitz, path):
+    source = fitz.open(path)
+    if source.needs_pass:
+        source.close()
+        raise Exception(f"{os.path.basename(path)} is password protected")
+    return source
+
+
+def merge_pdf_files(pdf_paths, output=None, dedupe=True, progress=None):
+    """
+    Merge PDFs in order into output (default: a new temp file)
+
+    With dedupe=False the final rewrite only drops unused objects.
+    progress(done, total, stage) is called after each input.
+    Returns output rewound.
+    """
+    import fitz
+
+    if output is None:
+        output = tempfile.TemporaryFile()
+
+    try:
+        with tempfile.TemporaryDirectory(prefix='merge_') as temp_dir:
+            work_path = os.path.join(temp_dir, 'work.pdf')
+            toc = []
+            page_count = 0
+
+            for index, path in enumerate(pdf_paths):
+                source = _open_source(fitz, path)
+                try:
+                    toc.extend([level, title, page + page_count] for level, title, page in source.get_toc())
+                    if index == 0:
+                        if source.can_save_incrementally():
+                            shutil.copyfile(path, work_path)
+                        else:
+                            # Repaired or otherwise unsuitable for appending: normalise once
+                            source.save(work_path)
+                    else:
+                        work = fitz.open(work_path)
+                        try:
+                            work.insert_pdf(source)
+                            work.saveIncr()
+                        finally:
+                            work.close()
+                    page_count += source.page_count
+                finally:
+                    source.close()
+                if progress:
+                    progress(index + 1, len(pdf_paths), 'merging')
+
+            # PyMuPDF takes a TemporaryFile's integer .name for a path, so save to disk and copy
+            final_path = os.path.join(temp_dir, 'merged.pdf')
+            if progress:
+                progress(len(pdf_paths), len(pdf_paths), 'writing')
+            work = fitz.open(work_path)
+            try:
+                if toc:
+                    work.set_toc(toc)
+                work.save(final_path, garbage=FINAL_GARBAGE_LEVEL if dedupe else 1)
+            finally:
+                work.close()
+            with open(final_path, 'rb') as merged:
+                shutil.copyfileobj(merged, output, 1024 * 1024)
+    except Exception:
+        output.close()
+        raise
+
+    logger.debug(f"Merged {len(pdf_paths)} PDFs, {page_count} pages")
+    output.seek(0)
+    return output
@@ -0,0 +1,217 @@
+"""
+Prometheus metrics for conversions and requests.
+
+- Conversions are recorded once per task by execute_task (every converter
+  in utils runs inside a task handler): duration by outcome, input and
+  output bytes, PDF pages, and failures by exception type.
+- Requests are timed by MetricsMiddleware, labelled with the URL name of
+  the view that answered.
+- Queue depth and in-flight tasks are read from the database when
+  /metrics is scraped, so they are right however many processes run.
+
+Counters and histograms live in the process that records them. Gunicorn
+and run_conversion_workers run several processes: point
+PROMETHEUS_MULTIPROC_DIR at an empty directory (one per host or container)
+before they start and every process writes its values there; a scrape then
+sums them. gunicorn.conf.py and run_conversion_workers clear the directory
+on start. Conversion workers expose their own endpoint on
+METRICS_WORKER_PORT.
+"""
+import os
+import time
+import logging
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.storage import default_storage
+from django.db.models import Count
+from prometheus_client import (
+    REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess, start_http_server,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = tuple(2 ** power for power in range(14, 30, 2))  # 16 KB .. 256 MB
+PAGE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+# Anything else is labelled 'other' to keep the label set bounded
+METHODS = ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS')
+
+CONVERSION_SECONDS = Histogram(
+    'conversion_duration_seconds', 'Time to run a conversion task',
+    ['conversion_type', 'outcome'], buckets=DURATION_BUCKETS,
+)
+CONVERSION_INPUT_BYTES = Histogram(
+    'conversion_input_bytes', 'Total size of the files a conversion read',
+    ['conversion_type'], buckets=SIZE_BUCKETS,
+)
+CONVERSION_OUTPUT_BYTES = Histogram(
+    'conversion_output_bytes', 'Size of the file a conversion produced',
+    ['conversion_type'], buckets=SIZE_BUCKETS,
+)
+CONVERSION_PAGES = Histogram(
+    'conversion_pages', 'Pages of the PDF a conversion produced or read',
+    ['conversion_type'], buckets=PAGE_BUCKETS,
+)
+CONVERSION_FAILURES = Counter(
+    'conversion_failures', 'Failed conversion tasks', ['conversion_type', 'error'],
+)
+REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', 'Time to answer a request',
+    ['view', 'method', 'status'], buckets=REQUEST_BUCKETS,
+)
+
+
+def is_enabled():
+    return getattr(settings, 'METRICS_ENABLED', False)
+
+
+def is_multiprocess():
+    return bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR'))
+
+
+def _file_size(name):
+    try:
+        return os.path.getsize(default_storage.path(name))
+    except OSError:
+        return 0
+
+
+def _input_bytes(task):
+    """Size of the task's primary input plus any extra inputs (merge, images)."""
+    from .models import UploadedFile
+    from .result_cache import INPUT_KEYS
+
+    names = [task.input_file.file.name]
+    extra_ids = task.extra_data.get(INPUT_KEYS.get(task.conversion_type), [])
+    if extra_ids:
+        names += UploadedFile.objects.filter(id__in=extra_ids).values_list('file', flat=True)
+    return sum(_file_size(name) for name in names if name)
+
+
+def _pdf_pages(task):
+    """Pages of the output PDF, or of the input PDF for Word/ZIP outputs; None otherwise."""
+    for name in (task.output_file.name, task.input_file.file.name):
+        if name and name.lower().endswith('.pdf'):
+            import fitz
+
+            with fitz.open(default_storage.path(name)) as doc:
+                return doc.page_count
+    return None
+
+
+def observe_conversion(task, seconds, outcome, error=None):
+    """
+    Record a finished task; outcome is 'converted', 'cached' or 'failed'
+    """
+    if not is_enabled():
+        return
+    conversion_type = task.conversion_type
+    try:
+        CONVERSION_SECONDS.labels(conversion_type, outcome).observe(seconds)
+        if outcome == 'failed':
+            CONVERSION_FAILURES.labels(conversion_type, type(error).__name__).inc()
+            return
+        CONVERSION_INPUT_BYTES.labels(conversion_type).observe(_input_bytes(task))
+        if task.output_size is not None:
+            CONVERSION_OUTPUT_BYTES.labels(conversion_type).observe(task.output_size)
+        pages = _pdf_pages(task)
+        if pages is not None:
+            CONVERSION_PAGES.labels(conversion_type).observe(pages)
+    except Exception as e:
+        # Metrics must never fail a conversion
+        logger.warning(f"Could not record metrics for task {task.id}: {str(e)}")
+
+
+class TaskStateCollector:
+    """
+    Queue depth and in-flight tasks, read from the database at scrape time
+    """
+
+    def collect(self):
+        from .models import ConversionTask
+        from .queues import get_queue
+
+        depth = GaugeMetricFamily('conversion_queue_depth', 'Tasks waiting for a worker')
+        in_flight = GaugeMetricFamily('conversion_tasks_in_flight', 'Tasks being converted',
+                                      labels=['conversion_type'])
+        try:
+            depth.add_metric([], get_queue().depth())
+            counts = (ConversionTask.objects.filter(status='processing').order_by()
+                      .values_list('conversion_type').annotate(count=Count('id')))
+            for conversion_type, count in counts:
+                in_flight.add_metric([conversion_type], count)
+        except Exception as e:
+            logger.warning(f"Could not read task state for metrics: {str(e)}")
+            return
+        yield depth
+        yield in_flight
+
+
+TASK_STATE = CollectorRegistry()
+TASK_STATE.register(TaskStateCollector())
+
+
+def _process_registry():
+    """Registry holding this process's metrics, or every process's in multiprocess mode."""
+    if not is_multiprocess():
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render():
+    """Text exposition for /metrics."""
+    return generate_latest(_process_registry()) + generate_latest(TASK_STATE)
+
+
+def serve(port):
+    """
+    Expose the metrics of this process tree on port (conversion workers)
+    """
+    if not is_multiprocess():
+        logger.warning("Worker metrics need PROMETHEUS_MULTIPROC_DIR; not serving them")
+        return False
+    start_http_server(port, registry=_process_registry())
+    logger.info(f"Serving worker metrics on port {port}")
+    return True
+
+
+def reset_multiprocess_dir():
+    """Empty PROMETHEUS_MULTIPROC_DIR before any process records values."""
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if not path:
+        return
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        if name.endswith('.db'):
+            os.remove(os.path.join(path, name))
+
+
+def mark_process_dead(pid):
+    if is_multiprocess():
+        multiprocess.mark_process_dead(pid)
+
+
+class MetricsMiddleware:
+    """
+    Time every request, labelled with the URL name of the view
+    """
+
+    def __init__(self, get_response):
+        if not is_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        response = self.get_response(request)
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name if match else '') or 'unmatched'
+        method = request.method if request.method in METHODS else 'other'
+        REQUEST_SECONDS.labels(view, method, str(response.status_code)).observe(
+            time.perf_counter() - start
+        )
+        return response
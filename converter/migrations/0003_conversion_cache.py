@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('converter', '0002_alter_conversiontask_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConversionCacheEntry',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('conversion_type', models.CharField(max_length=50)),
+                ('output_file', models.FileField(upload_to='cache/')),
+                ('result_data', models.JSONField(blank=True, default=dict)),
+                ('size', models.BigIntegerField(default=0)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('last_used_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='uploadedfile',
+            name='file_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('converter', '0004_rate_limit_bucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversiontask',
+            name='progress_done',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='conversiontask',
+            name='progress_stage',
+            field=models.CharField(blank=True, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='conversiontask',
+            name='progress_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
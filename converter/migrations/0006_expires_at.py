@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:45
+
+import converter.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('converter', '0005_task_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversiontask',
+            name='expires_at',
+            field=models.DateTimeField(db_index=True, default=converter.models.default_expiry),
+        ),
+        migrations.AddField(
+            model_name='uploadedfile',
+            name='expires_at',
+            field=models.DateTimeField(db_index=True, default=converter.models.default_expiry),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:48
+
+from django.db import migrations, models
+from django.db.models import Value
+from django.db.models.fields.json import KT
+from django.db.models.functions import Cast, Coalesce
+
+
+def copy_to_columns(apps, schema_editor):
+    """Fill the new columns from extra_data in one UPDATE.
+
+    The keys are left in extra_data, so rolling back needs no data step;
+    the rows expire within FILE_RETENTION_SECONDS anyway.
+    """
+    ConversionTask = apps.get_model('converter', 'ConversionTask')
+    ConversionTask.objects.filter(extra_data__has_key='client_ip').update(
+        client_ip=Cast(KT('extra_data__client_ip'), models.GenericIPAddressField())
+    )
+    ConversionTask.objects.filter(extra_data__has_key='output_hash').update(
+        output_hash=Coalesce(KT('extra_data__output_hash'), Value(''))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('converter', '0006_expires_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversiontask',
+            name='client_ip',
+            field=models.GenericIPAddressField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='conversiontask',
+            name='output_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='conversiontask',
+            name='output_size',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(copy_to_columns, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='uploadedfile',
+            name='uploaded_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name='conversiontask',
+            index=models.Index(fields=['-created_at'], name='task_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversiontask',
+            index=models.Index(fields=['status', 'created_at'], name='task_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversiontask',
+            index=models.Index(fields=['conversion_type', 'created_at'], name='task_type_created_idx'),
+        ),
+    ]
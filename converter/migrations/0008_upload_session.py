@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:01
+
+import converter.models
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('converter', '0007_task_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255)),
+                ('size', models.BigIntegerField()),
+                ('offset', models.BigIntegerField(default=0)),
+                ('staging_name', models.CharField(blank=True, max_length=255)),
+                ('expected_hash', models.CharField(blank=True, max_length=64)),
+                ('mime_type', models.CharField(blank=True, max_length=100)),
+                ('category', models.CharField(blank=True, max_length=20)),
+                ('session_key', models.CharField(blank=True, max_length=40)),
+                ('file_id', models.UUIDField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(db_index=True, default=converter.models.default_expiry)),
+            ],
+        ),
+    ]
@@ -3,7 +3,10 @@
 import os
 import uuid
 import json
+from datetime import timedelta
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 def upload_to(instance, filename):
     """Generate upload path for files."""
@@ -11,14 +14,21 @@ def upload_to(instance, filename):
     filename = f"{uuid.uuid4().hex[:10]}{ext}"
     return os.path.join('uploads/', filename)
 
+def default_expiry():
+    """Uploads and tasks are removed by cleanup_expired after FILE_RETENTION_SECONDS."""
+    return timezone.now() + timedelta(seconds=settings.FILE_RETENTION_SECONDS)
+
 class UploadedFile(models.Model):
     """Store uploaded files."""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     file = models.FileField(upload_to=upload_to)
     original_filename = models.CharField(max_length=255)
     file_type = models.CharField(max_length=20)
-    uploaded_at = models.DateTimeField(auto_now_add=True)
+    uploaded_at = models.DateTimeField(auto_now_add=True, db_index=True)
     session_key = models.CharField(max_length=40, blank=True)
+    # SHA-256 computed during upload validation; used as the result cache key
+    file_hash = models.CharField(max_length=64, blank=True)
+    expires_at = models.DateTimeField(default=default_expiry, db_index=True)
     
     def __str__(self):
         return self.original_filename
@@ -46,12 +56,38 @@ class ConversionTask(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(default=default_expiry, db_index=True)
+
+    # Worker lease (see converter.queues): a processing task whose heartbeat
+    # stops is requeued by the supervisor, and failed after too many attempts
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    
+    # Read on every download and result view, so kept out of extra_data
+    client_ip = models.GenericIPAddressField(null=True, blank=True, db_index=True)
+    # SHA-256 and size of output_file (download ETag, admin)
+    output_hash = models.CharField(max_length=64, blank=True)
+    output_size = models.BigIntegerField(null=True, blank=True)
     
     # Add this field for storing conversion options
     extra_data = models.JSONField(default=dict, blank=True)
+
+    # Progress of a running conversion (see converter.progress)
+    progress_done = models.PositiveIntegerField(default=0)
+    progress_total = models.PositiveIntegerField(default=0)
+    progress_stage = models.CharField(max_length=32, blank=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Default ordering: admin change list and date filters
+            models.Index(fields=['-created_at'], name='task_created_idx'),
+            # Database queue (oldest pending first), queue depth, admin status filter
+            models.Index(fields=['status', 'created_at'], name='task_status_created_idx'),
+            # Admin conversion type filter
+            models.Index(fields=['conversion_type', 'created_at'], name='task_type_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.conversion_type} - {self.status}"
@@ -62,4 +98,66 @@ class ConversionTask(models.Model):
     
     def set_extra_data(self, data):
         """Set extra data."""
-        self.extra_data = data
\ No newline at end of file
+        self.extra_data = data
+
+
+class ConversionCacheEntry(models.Model):
+    """Stored output of a conversion, keyed on input hashes + options."""
+    key = models.CharField(max_length=64, primary_key=True)
+    conversion_type = models.CharField(max_length=50)
+    output_file = models.FileField(upload_to='cache/')
+    # extra_data keys the handler added (e.g. compression stats), replayed on a hit
+    result_data = models.JSONField(default=dict, blank=True)
+    size = models.BigIntegerField(default=0)
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    last_used_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    def __str__(self):
+        return f"{self.conversion_type} - {self.key[:12]}"
+
+
+class ConversionCacheCounter(models.Model):
+    """Result cache hit/miss totals, shared by every web and worker process."""
+    name = models.CharField(max_length=32, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
+class RateLimitBucket(models.Model):
+    """Token bucket state for the database rate limiter."""
+    key = models.CharField(max_length=200, primary_key=True)
+    tokens = models.FloatField()
+    updated_at = models.FloatField(db_index=True)  # Unix time of the last refill
+    
+    def __str__(self):
+        return f"{self.key}: {self.tokens:.2f}"
+
+
+class UploadSession(models.Model):
+    """A resumable upload in progress, sent in chunks (see converter.resumable)."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    # Bytes received and stored so far; the next chunk must start here
+    offset = models.BigIntegerField(default=0)
+    # Partial file under MEDIA_ROOT, cleared once it has become an UploadedFile
+    staging_name = models.CharField(max_length=255, blank=True)
+    # SHA-256 the client expects, checked when the last chunk arrives
+    expected_hash = models.CharField(max_length=64, blank=True)
+    mime_type = models.CharField(max_length=100, blank=True)
+    category = models.CharField(max_length=20, blank=True)
+    session_key = models.CharField(max_length=40, blank=True)
+    # The UploadedFile created on completion (an id, so uploads expire independently)
+    file_id = models.UUIDField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(default=default_expiry, db_index=True)
+    
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+    
+    @property
+    def complete(self):
+        return self.file_id is not None
@@ -0,0 +1,443 @@
+"""
+Optional LibreOffice backend for Word and Excel to PDF.
+
+OFFICE_CONVERSION_TYPES lists the conversion types rendered by headless
+LibreOffice over UNO instead of reportlab. The reportlab renderers stay the
+fallback: when soffice or the uno module is missing, no instance is free in
+time, or LibreOffice fails on a document, convert_with_office returns None
+and the caller renders as before.
+
+Starting soffice takes seconds, so instances are long-lived and shared by
+every worker process on the host. Each of the OFFICE_POOL_SIZE instances
+listens on its own UNO pipe and has its own profile and lock file under
+OFFICE_POOL_DIR. A job is dispatched to an idle instance by taking its
+lock (flock); the instance is started if it is not running and must answer
+a UNO call before it is used. It is recycled (stopped, then started again
+by its next job) after OFFICE_MAX_JOBS jobs, when its processes use more
+than OFFICE_MAX_RSS_MB, or after a job that failed or ran past
+OFFICE_TIMEOUT.
+
+run_conversion_workers warms the pool from a short-lived child process, so
+the supervisor never loads pyuno or holds UNO bridges when it forks
+workers. Instances it started outlive that child and are reaped by init.
+An instance started by a worker and stopped by another one is reaped by the
+worker that started it (reap()).
+
+Documents are loaded hidden with macros disabled and links not updated.
+"""
+import os
+import json
+import time
+import fcntl
+import shutil
+import signal
+import hashlib
+import logging
+import tempfile
+import threading
+import subprocess
+import importlib.util
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+PDF_FILTERS = {
+    'word_to_pdf': 'writer_pdf_Export',
+    'excel_to_pdf': 'calc_pdf_Export',
+}
+ACQUIRE_POLL = 0.1
+CONNECT_POLL = 0.25
+STOP_WAIT = 5
+# com.sun.star.document.MacroExecMode.NEVER_EXECUTE, UpdateDocMode.NO_UPDATE
+NEVER_EXECUTE = 0
+NO_UPDATE = 0
+
+# pid -> (owner pid, Popen) of instances started here; workers forked later inherit
+# the dict but cannot wait on the supervisor's children
+_children = {}
+# (process pid, index, instance pid) -> Desktop; UNO connections do not survive fork
+_desktops = {}
+
+
+class OfficeError(Exception):
+    """LibreOffice could not convert a document."""
+
+
+@lru_cache(maxsize=None)
+def is_available():
+    """True when the soffice binary and the uno module are installed."""
+    return bool(shutil.which(settings.OFFICE_BINARY)) and importlib.util.find_spec('uno') is not None
+
+
+def enabled_for(conversion_type):
+    return conversion_type in settings.OFFICE_CONVERSION_TYPES and is_available()
+
+
+def _properties(**values):
+    """A tuple of UNO PropertyValues."""
+    import uno  # noqa: F401 - installs the com.sun.star import hook
+    from com.sun.star.beans import PropertyValue
+
+    properties = []
+    for name, value in values.items():
+        prop = PropertyValue()
+        prop.Name = name
+        prop.Value = value
+        properties.append(prop)
+    return tuple(properties)
+
+
+def _group_rss_mb(pgid):
+    """Resident memory of every process in a process group (Linux /proc)."""
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    total = 0
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # pid (comm) state ppid pgrp ...; comm may contain spaces
+                fields = f.read().rsplit(')', 1)[1].split()
+            if int(fields[2]) != pgid:
+                continue
+            with open(f'/proc/{entry}/statm') as f:
+                total += int(f.read().split()[1]) * page_size
+        except (OSError, ValueError, IndexError):
+            continue
+    return total / 1024 / 1024
+
+
+def _pool_dir():
+    path = settings.OFFICE_POOL_DIR or os.path.join(tempfile.gettempdir(), 'office_pool')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class _Instance:
+    """One soffice process, used by whoever holds its lock file."""
+
+    def __init__(self, index):
+        self.index = index
+        directory = _pool_dir()
+        self.state_path = os.path.join(directory, f'instance_{index}.json')
+        self.profile = os.path.join(directory, f'profile_{index}')
+        # Pipes are host-wide: tell pools in different directories apart
+        self.pipe = f'office_{hashlib.md5(directory.encode()).hexdigest()[:8]}_{index}'
+        self.state = self._load_state()
+
+    def _load_state(self):
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self):
+        with open(self.state_path, 'w') as f:
+            json.dump(self.state, f)
+
+    @property
+    def pid(self):
+        return self.state.get('pid')
+
+    @property
+    def _key(self):
+        return (os.getpid(), self.index, self.pid)
+
+    def _child(self):
+        owner, process = _children.get(self.pid, (None, None))
+        return process if owner == os.getpid() else None
+
+    def _running(self):
+        if not self.pid:
+            return False
+        child = self._child()
+        if child is not None:
+            return child.poll() is None
+        try:
+            # The pid may have been reused since the state file was written
+            with open(f'/proc/{self.pid}/cmdline', 'rb') as f:
+                return self.pipe.encode() in f.read()
+        except OSError:
+            return False
+
+    def _connect(self):
+        import uno
+
+        key = self._key
+        if key not in _desktops:
+            local = uno.getComponentContext()
+            resolver = local.ServiceManager.createInstanceWithContext('com.sun.star.bridge.UnoUrlResolver', local)
+            context = resolver.resolve(f'uno:pipe,name={self.pipe};urp;StarOffice.ComponentContext')
+            _desktops[key] = context.ServiceManager.createInstanceWithContext('com.sun.star.frame.Desktop', context)
+        return _desktops[key]
+
+    def healthy(self):
+        """Running and answering UNO calls."""
+        if not self._running():
+            return False
+        try:
+            self._connect().getFrames().getCount()
+            return True
+        except Exception as e:
+            _desktops.pop(self._key, None)
+            logger.warning(f"LibreOffice instance {self.index} (pid {self.pid}) is not answering: {str(e)}")
+            return False
+
+    def start(self):
+        os.makedirs(self.profile, exist_ok=True)
+        process = subprocess.Popen(
+            [settings.OFFICE_BINARY, '--headless', '--invisible', '--nologo', '--nodefault', '--norestore',
+             '--nolockcheck', f'-env:UserInstallation={Path(self.profile).as_uri()}',
+             f'--accept=pipe,name={self.pipe};urp;StarOffice.ComponentContext'],
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            # Own process group: soffice forks soffice.bin, stop() signals both
+            start_new_session=True,
+        )
+        _children[process.pid] = (os.getpid(), process)
+        self.state = {'pid': process.pid, 'jobs': 0, 'started': time.time()}
+        self._save_state()
+
+        deadline = time.monotonic() + settings.OFFICE_START_TIMEOUT
+        while True:
+            try:
+                self._connect()
+                break
+            except Exception:
+                if process.poll() is not None:
+                    self.stop()
+                    raise OfficeError(f"LibreOffice exited with code {process.returncode} on start")
+                if time.monotonic() > deadline:
+                    self.stop()
+                    raise OfficeError(f"LibreOffice did not start within {settings.OFFICE_START_TIMEOUT}s")
+                time.sleep(CONNECT_POLL)
+        logger.info(f"Started LibreOffice instance {self.index} (pid {process.pid}) in "
+                    f"{time.time() - self.state['started']:.1f}s")
+
+    def kill(self, sig=signal.SIGKILL):
+        # The group outlives a leader that exited; a pid not started here must still be ours
+        if not self.pid or (self._child() is None and not self._running()):
+            return
+        try:
+            os.killpg(self.pid, sig)
+        except OSError:
+            pass
+
+    def stop(self):
+        """Terminate the instance's processes; the next job starts a new one."""
+        if not self.pid:
+            return
+        desktop = _desktops.pop(self._key, None)
+        try:
+            if desktop is not None:
+                desktop.terminate()
+        except Exception:
+            pass
+        self.kill(signal.SIGTERM)
+        deadline = time.monotonic() + STOP_WAIT
+        while self._running() and time.monotonic() < deadline:
+            time.sleep(0.1)
+        self.kill()
+        child = self._child()
+        if child is not None:
+            child.wait()
+            del _children[self.pid]
+        logger.info(f"Stopped LibreOffice instance {self.index} (pid {self.pid}, {self.state.get('jobs', 0)} jobs)")
+        self.state = {}
+        self._save_state()
+
+    def ensure_running(self):
+        if not self.healthy():
+            self.stop()
+            self.start()
+
+    def run(self, job):
+        """
+        Call job(desktop); stop the instance when the job fails, times out
+        or the instance is due for recycling
+        """
+        timer = threading.Timer(settings.OFFICE_TIMEOUT, self.kill)
+        timer.start()
+        try:
+            return job(self._connect())
+        except Exception as e:
+            self.stop()
+            if not timer.is_alive():
+                raise OfficeError(f"LibreOffice took longer than {settings.OFFICE_TIMEOUT}s")
+            raise OfficeError(f"LibreOffice failed: {str(e)}")
+        finally:
+            timer.cancel()
+            if self.state:
+                self.state['jobs'] = self.state.get('jobs', 0) + 1
+                self._save_state()
+                self._recycle_if_due()
+
+    def _recycle_if_due(self):
+        jobs = self.state['jobs']
+        if jobs >= settings.OFFICE_MAX_JOBS:
+            logger.info(f"Recycling LibreOffice instance {self.index} after {jobs} jobs")
+            self.stop()
+            return
+        rss = _group_rss_mb(self.pid)
+        if rss > settings.OFFICE_MAX_RSS_MB:
+            logger.info(f"Recycling LibreOffice instance {self.index} using {rss:.0f} MB")
+            self.stop()
+
+
+@contextmanager
+def _locked(index, blocking=False):
+    """Hold instance index's lock; yields the instance, or None when it is busy."""
+    with open(os.path.join(_pool_dir(), f'instance_{index}.lock'), 'a') as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield None
+            return
+        try:
+            yield _Instance(index)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+@contextmanager
+def idle_instance():
+    """
+    A running instance for the caller's exclusive use; raises OfficeError
+    if none is free within OFFICE_ACQUIRE_TIMEOUT
+    """
+    size = max(1, settings.OFFICE_POOL_SIZE)
+    # Start at a different instance in each process to spread the load
+    first = os.getpid() % size
+    deadline = time.monotonic() + settings.OFFICE_ACQUIRE_TIMEOUT
+    reap()
+    while True:
+        for offset in range(size):
+            with _locked((first + offset) % size) as instance:
+                if instance is None:
+                    continue
+                instance.ensure_running()
+                yield instance
+                return
+        if time.monotonic() > deadline:
+            raise OfficeError(f"No LibreOffice instance was free within {settings.OFFICE_ACQUIRE_TIMEOUT}s")
+        time.sleep(ACQUIRE_POLL)
+
+
+def warm():
+    """Start every instance that is not running."""
+    for index in range(max(1, settings.OFFICE_POOL_SIZE)):
+        with _locked(index, blocking=True) as instance:
+            try:
+                instance.ensure_running()
+            except OfficeError as e:
+                logger.warning(f"LibreOffice instance {index} did not start: {str(e)}")
+
+
+def warm_in_subprocess():
+    """
+    warm() in a child process, for callers that fork workers afterwards
+
+    The caller never imports pyuno or opens a UNO bridge. The instances
+    outlive the child.
+    """
+    import multiprocessing
+
+    process = multiprocessing.get_context('fork').Process(target=warm, name='office-warm')
+    process.start()
+    process.join()
+
+
+def reap():
+    """Wait for instances started by this process that another process stopped."""
+    for pid, (owner, process) in list(_children.items()):
+        if owner == os.getpid() and process.poll() is not None:
+            del _children[pid]
+
+
+def shutdown():
+    """Stop every instance of the pool."""
+    for index in range(max(1, settings.OFFICE_POOL_SIZE)):
+        with _locked(index, blocking=True) as instance:
+            instance.stop()
+
+
+def _prepare_workbook(document, sheets='first', sheet_names=None, include_gridlines=True, fit_to_page=True,
+                      include_headers=True):
+    """Apply the Excel to PDF options to a loaded Calc document."""
+    from .excel_render import select_sheets
+
+    names = list(document.Sheets.ElementNames)
+    controller = document.getCurrentController()
+    active = controller.getActiveSheet().Name if controller is not None else names[0]
+    chosen = select_sheets(names, active, sheets, sheet_names)
+    for name in names:
+        if name not in chosen:
+            document.Sheets.removeByName(name)
+    page_styles = document.StyleFamilies.getByName('PageStyles')
+    for name in chosen:
+        style = page_styles.getByName(document.Sheets.getByName(name).PageStyle)
+        style.PrintGrid = include_gridlines
+        # LibreOffice's default header and footer are the sheet name and page number
+        style.HeaderIsOn = include_headers
+        style.FooterIsOn = include_headers
+        if fit_to_page:
+            style.ScaleToPagesX = 1
+            style.ScaleToPagesY = 0
+
+
+def _export(desktop, input_path, output_path, conversion_type, options):
+    import uno
+
+    document = desktop.loadComponentFromURL(
+        uno.systemPathToFileUrl(os.path.abspath(input_path)), '_blank', 0,
+        _properties(Hidden=True, MacroExecutionMode=NEVER_EXECUTE, UpdateDocMode=NO_UPDATE),
+    )
+    if document is None:
+        raise OfficeError(f"LibreOffice could not open {os.path.basename(input_path)}")
+    try:
+        if conversion_type == 'excel_to_pdf':
+            _prepare_workbook(document, **options)
+        document.storeToURL(uno.systemPathToFileUrl(output_path),
+                            _properties(FilterName=PDF_FILTERS[conversion_type], Overwrite=True))
+    finally:
+        document.close(True)
+
+
+def convert_to_pdf(conversion_type, input_path, output=None, **options):
+    """
+    Convert with the pool into output (default: a new temp file), rewound;
+    raises OfficeError
+    """
+    if output is None:
+        output = tempfile.TemporaryFile()
+    try:
+        with tempfile.TemporaryDirectory(prefix='office_') as temp_dir:
+            output_path = os.path.join(temp_dir, 'output.pdf')
+            with idle_instance() as instance:
+                instance.run(lambda desktop: _export(desktop, input_path, output_path, conversion_type, options))
+            if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+                raise OfficeError("LibreOffice produced no PDF")
+            with open(output_path, 'rb') as rendered:
+                shutil.copyfileobj(rendered, output, 1024 * 1024)
+    except Exception:
+        output.close()
+        raise
+    output.seek(0)
+    return output
+
+
+def convert_with_office(conversion_type, input_path, **options):
+    """
+    The PDF from LibreOffice when it is enabled for conversion_type and
+    succeeds, otherwise None so the caller uses its reportlab renderer
+    """
+    if not enabled_for(conversion_type):
+        return None
+    try:
+        return convert_to_pdf(conversion_type, input_path, **options)
+    except OfficeError as e:
+        logger.warning(f"{conversion_type} of {os.path.basename(input_path)} falls back to reportlab: {str(e)}")
+        return None
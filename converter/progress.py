@@ -0,0 +1,119 @@
+"""
+Conversion progress reporting (worker side).
+
+Conversion functions accept an optional progress(done, total, stage)
+callback. During a task it is a ProgressReporter, which keeps the counters
+on the ConversionTask row (progress_done / progress_total / progress_stage,
+written at most every PROGRESS_SAVE_INTERVAL seconds) and, with the 'redis'
+backend, publishes every change on a per-task channel. converter.events
+fans those changes out to the browsers watching the task.
+
+Reporting never fails a conversion: publish errors are logged and dropped.
+"""
+import json
+import time
+import logging
+from django.conf import settings
+
+from .models import ConversionTask
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = 'task-progress:'
+# Upper bound on pub/sub messages per task
+PUBLISH_INTERVAL = 0.25
+TERMINAL_STATUSES = ('completed', 'failed')
+
+
+def channel_name(task_id):
+    return f"{CHANNEL_PREFIX}{task_id}"
+
+
+def snapshot(task):
+    """The event payload describing a task's state."""
+    return {
+        'status': task.status,
+        'done': task.progress_done,
+        'total': task.progress_total,
+        'stage': task.progress_stage,
+    }
+
+
+class RedisPublisher:
+    """Publish progress events on Redis pub/sub."""
+
+    def __init__(self, url=None):
+        import redis
+
+        self.client = redis.Redis.from_url(url or settings.PROGRESS_REDIS_URL)
+
+    def publish(self, task_id, event):
+        self.client.publish(channel_name(task_id), json.dumps(event))
+
+
+class DatabasePublisher:
+    """No messages: converter.events polls the task rows of watched tasks."""
+
+    def publish(self, task_id, event):
+        pass
+
+
+PROGRESS_BACKENDS = {
+    'redis': RedisPublisher,
+    'database': DatabasePublisher,
+}
+
+_publishers = {}
+
+
+def get_publisher():
+    """Return the configured publisher (one instance per process)."""
+    name = settings.PROGRESS_BACKEND
+    if name not in _publishers:
+        _publishers[name] = PROGRESS_BACKENDS[name]()
+    return _publishers[name]
+
+
+def publish(task):
+    """Publish a task's current state, e.g. after a status change."""
+    try:
+        get_publisher().publish(task.id, snapshot(task))
+    except Exception as e:
+        logger.warning(f"Could not publish progress for {task.id}: {str(e)}")
+
+
+class ProgressReporter:
+    """
+    progress(done, total, stage) callback bound to one task
+    """
+
+    def __init__(self, task):
+        self.task = task
+        self.last_saved = 0.0
+        self.last_published = 0.0
+
+    def __call__(self, done, total, stage=''):
+        task = self.task
+        stage = stage or task.progress_stage
+        changed_stage = stage != task.progress_stage
+        finished = bool(total) and done >= total
+        task.progress_done = min(done, total) if total else done
+        task.progress_total = total
+        task.progress_stage = stage[:32]
+
+        now = time.monotonic()
+        urgent = changed_stage or finished
+        if urgent or now - self.last_saved >= settings.PROGRESS_SAVE_INTERVAL:
+            self.last_saved = now
+            try:
+                # A worker whose claim was taken back must not overwrite the new run's progress
+                ConversionTask.objects.filter(id=task.id, status='processing', attempts=task.attempts).update(
+                    progress_done=task.progress_done,
+                    progress_total=task.progress_total,
+                    progress_stage=task.progress_stage,
+                )
+            except Exception as e:
+                logger.warning(f"Could not save progress for {task.id}: {str(e)}")
+        if urgent or now - self.last_published >= PUBLISH_INTERVAL:
+            self.last_published = now
+            publish(task)
@@ -0,0 +1,280 @@
+"""
+Pluggable job queues for conversion tasks.
+
+The ConversionTask status field is the source of truth for every backend:
+a task is 'pending' until a worker claims it, and claiming is a conditional
+UPDATE so two workers can never pick up the same task.
+
+A claim is a lease: the worker refreshes heartbeat_at while it runs the
+task, and run_conversion_workers calls recover_stalled_tasks to put back
+tasks whose worker stopped (OOM kill, host restart) without finishing.
+"""
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+def claim_task(task_id) -> bool:
+    """
+    Atomically move a task from 'pending' to 'processing'
+    """
+    from .models import ConversionTask
+
+    now = timezone.now()
+    claimed = ConversionTask.objects.filter(
+        id=task_id, status='pending'
+    ).update(status='processing', started_at=now, heartbeat_at=now, attempts=F('attempts') + 1)
+    return claimed == 1
+
+
+@contextmanager
+def heartbeat(task_id, interval: float = None):
+    """
+    Refresh a claimed task's heartbeat_at from a thread while the block runs
+    """
+    from django.db import connection
+    from .models import ConversionTask
+
+    interval = interval or settings.CONVERSION_HEARTBEAT_INTERVAL
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(interval):
+            try:
+                ConversionTask.objects.filter(
+                    id=task_id, status='processing'
+                ).update(heartbeat_at=timezone.now())
+            except Exception as e:
+                logger.warning(f"Heartbeat for task {task_id} failed: {str(e)}")
+        # The thread's own connection
+        connection.close()
+
+    thread = threading.Thread(target=beat, name=f'heartbeat-{task_id}', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def recover_stalled_tasks(queue=None):
+    """
+    Put back processing tasks whose lease expired; returns (requeued, failed)
+
+    A task with no heartbeat for CONVERSION_TASK_LEASE seconds goes back to
+    'pending', unless it was already started CONVERSION_TASK_MAX_ATTEMPTS
+    times (it probably kills its worker) - then it is failed.
+    """
+    from .models import ConversionTask
+    from .progress import publish
+
+    queue = queue or get_queue()
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=settings.CONVERSION_TASK_LEASE)
+    stalled = ConversionTask.objects.filter(status='processing').filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True)
+    )
+
+    requeued = failed = 0
+    for task in stalled:
+        # Conditional on the heartbeat we read: a worker that just beat keeps its task
+        current = ConversionTask.objects.filter(pk=task.pk, status='processing',
+                                                heartbeat_at=task.heartbeat_at)
+        if task.attempts < settings.CONVERSION_TASK_MAX_ATTEMPTS:
+            if current.update(status='pending', progress_done=0, progress_stage=''):
+                queue.requeue(task.id)
+                requeued += 1
+                logger.warning(f"Conversion task {task.id} lost its worker (attempt {task.attempts}), requeued")
+        else:
+            task.extra_data['error'] = f"The conversion stopped its worker {task.attempts} times"
+            if current.update(status='failed', completed_at=now, progress_stage='failed',
+                              extra_data=task.extra_data):
+                task.status = task.progress_stage = 'failed'
+                task.completed_at = now
+                publish(task)
+                failed += 1
+                logger.error(f"Conversion task {task.id} failed after {task.attempts} attempts")
+
+    queue.recover()
+    return requeued, failed
+
+
+class BaseQueue:
+    """
+    Interface every queue backend implements
+    """
+
+    def enqueue(self, task_id):
+        raise NotImplementedError
+
+    def dequeue(self, timeout: float = 5.0):
+        """
+        Block up to `timeout` seconds and return a claimed task id, or None
+        """
+        raise NotImplementedError
+
+    def depth(self) -> int:
+        raise NotImplementedError
+
+    def ack(self, task_id):
+        """
+        Called by the worker once a dequeued task has been executed
+        """
+
+    def requeue(self, task_id):
+        """
+        Queue again a task moved back to 'pending' by recover_stalled_tasks
+        """
+        self.enqueue(task_id)
+
+    def recover(self):
+        """
+        Repair entries lost by workers that died (run by the supervisor)
+        """
+
+
+class DatabaseQueue(BaseQueue):
+    """
+    Queue that uses pending ConversionTask rows directly (SQLite/Postgres)
+    """
+
+    def __init__(self, poll_interval: float = None):
+        self.poll_interval = poll_interval or getattr(settings, 'CONVERSION_QUEUE_POLL_INTERVAL', 1.0)
+
+    def enqueue(self, task_id):
+        # The pending row is the queue entry - nothing else to write
+        pass
+
+    def dequeue(self, timeout: float = 5.0):
+        from .models import ConversionTask
+
+        deadline = time.monotonic() + timeout
+        while True:
+            candidates = ConversionTask.objects.filter(
+                status='pending'
+            ).order_by('created_at').values_list('id', flat=True)[:10]
+
+            for task_id in candidates:
+                if claim_task(task_id):
+                    return task_id
+
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(self.poll_interval)
+
+    def depth(self) -> int:
+        from .models import ConversionTask
+        return ConversionTask.objects.filter(status='pending').count()
+
+
+class RedisQueue(BaseQueue):
+    """
+    Queue backed by a Redis list; the database still records task state
+
+    BLMOVE hands an id to a worker by moving it to a processing list, where
+    it stays until the worker acks it. An id whose worker died between the
+    move and the claim is found there by recover() instead of being lost.
+    """
+
+    def __init__(self, url: str = None, key: str = None):
+        import redis
+
+        self.url = url or settings.CONVERSION_QUEUE_REDIS_URL
+        self.key = key or getattr(settings, 'CONVERSION_QUEUE_REDIS_KEY', 'conversion:queue')
+        self.processing_key = f'{self.key}:processing'
+        self.client = redis.Redis.from_url(self.url)
+
+    def enqueue(self, task_id):
+        self.client.lpush(self.key, str(task_id))
+
+    def dequeue(self, timeout: float = 5.0):
+        item = self.client.blmove(self.key, self.processing_key, max(1, int(timeout)), 'RIGHT', 'LEFT')
+        if not item:
+            return None
+
+        task_id = item.decode()
+        if claim_task(task_id):
+            return task_id
+
+        # Already claimed or no longer pending (e.g. deleted by cleanup)
+        logger.debug(f"Skipping unclaimable task from Redis queue: {task_id}")
+        self.ack(task_id)
+        return None
+
+    def ack(self, task_id):
+        self.client.lrem(self.processing_key, 1, str(task_id))
+
+    def requeue(self, task_id):
+        pipe = self.client.pipeline()
+        pipe.lrem(self.processing_key, 1, str(task_id))
+        pipe.lpush(self.key, str(task_id))
+        pipe.execute()
+
+    def recover(self):
+        from .models import ConversionTask
+
+        entries = {entry.decode() for entry in self.client.lrange(self.processing_key, 0, -1)}
+        if not entries:
+            return
+        statuses = {str(task_id): status for task_id, status in
+                    ConversionTask.objects.filter(id__in=entries).values_list('id', 'status')}
+        for task_id in entries:
+            status = statuses.get(task_id)
+            if status == 'processing':
+                # Still leased: recover_stalled_tasks decides when its worker is gone
+                continue
+            if status == 'pending':
+                # Moved but never claimed. If the worker is only slow to claim, the
+                # copy pushed here is skipped later since claiming is conditional.
+                logger.warning(f"Returning unclaimed task {task_id} to the Redis queue")
+                self.requeue(task_id)
+            else:
+                self.ack(task_id)
+
+    def depth(self) -> int:
+        return self.client.llen(self.key)
+
+
+class EagerQueue(BaseQueue):
+    """
+    Run tasks inside the enqueuing process (development and tests only)
+    """
+
+    def enqueue(self, task_id):
+        from .tasks import execute_task
+
+        if claim_task(task_id):
+            execute_task(task_id)
+
+    def dequeue(self, timeout: float = 5.0):
+        return None
+
+    def depth(self) -> int:
+        return 0
+
+
+QUEUE_BACKENDS = {
+    'database': DatabaseQueue,
+    'redis': RedisQueue,
+    'eager': EagerQueue,
+}
+
+
+def get_queue() -> BaseQueue:
+    """
+    Return the queue backend selected by CONVERSION_QUEUE_BACKEND
+    """
+    backend = getattr(settings, 'CONVERSION_QUEUE_BACKEND', 'database')
+    queue_class = QUEUE_BACKENDS.get(backend)
+    if queue_class is None:
+        queue_class = import_string(backend)
+    return queue_class()
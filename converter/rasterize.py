@@ -0,0 +1,170 @@
+"""
+PDF to images: every page rasterized with PyMuPDF into a ZIP archive.
+
+Pages are rendered one at a time and each encoded image goes straight into
+its ZIP member, so memory holds one page per rendering process whatever
+the page count. Images are stored uncompressed in the archive (JPEG and
+PNG data does not deflate any further) with the fixed timestamp used by
+split archives, so the same input and options give the same bytes.
+
+Documents with at least PDF_TO_IMAGE_PARALLEL_MIN_PAGES pages are spread
+across a process pool by page range. Each worker opens the document once
+per range and appends its encoded pages to a shard file; the parent copies
+each shard into the archive in page order as soon as it is complete and
+the ranges before it are stored, then deletes it.
+"""
+import os
+import time
+import logging
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from .split import zip_member
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {'jpeg': 'jpg', 'png': 'png'}
+# Ranges handed to each worker: small enough to keep every worker busy to
+# the end and the shards on disk short-lived, large enough to amortize
+# opening the document
+MIN_RANGE_PAGES = 4
+RANGES_PER_WORKER = 4
+
+
+def page_name(number, page_count, image_format):
+    """Member name that sorts in page order: page_007.jpg"""
+    return f"page_{number:0{len(str(page_count))}d}.{FORMATS[image_format]}"
+
+
+def _zoom(page, dpi, max_pixels):
+    """Scale for dpi, reduced so the page stays within max_pixels."""
+    zoom = dpi / 72
+    pixels = page.rect.width * page.rect.height * zoom * zoom
+    if max_pixels and pixels > max_pixels:
+        zoom *= (max_pixels / pixels) ** 0.5
+    return zoom
+
+
+def _render_page(fitz, page, image_format, dpi, quality, max_pixels):
+    zoom = _zoom(page, dpi, max_pixels)
+    pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False, colorspace=fitz.csRGB)
+    pixmap.set_dpi(round(zoom * 72), round(zoom * 72))
+    if image_format == 'png':
+        return pixmap.tobytes('png')
+    return pixmap.tobytes('jpeg', jpg_quality=quality)
+
+
+def _open(fitz, pdf_path):
+    doc = fitz.open(pdf_path)
+    if doc.needs_pass:
+        doc.close()
+        raise Exception(f"{os.path.basename(pdf_path)} is password protected")
+    return doc
+
+
+def _render_range(args):
+    """
+    Worker: render pages [start, end) into a shard file
+
+    Returns the encoded size of each page, in page order.
+    """
+    import fitz
+
+    pdf_path, start, end, shard_path, image_format, dpi, quality, max_pixels = args
+    sizes = []
+    with _open(fitz, pdf_path) as doc, open(shard_path, 'wb') as shard:
+        for number in range(start, end):
+            sizes.append(shard.write(_render_page(fitz, doc[number], image_format, dpi, quality, max_pixels)))
+    return sizes
+
+
+def _ranges(page_count, workers):
+    """Consecutive (start, end) page ranges, RANGES_PER_WORKER per worker."""
+    size = max(MIN_RANGE_PAGES, -(-page_count // (workers * RANGES_PER_WORKER)))
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+def _member(name):
+    info = zip_member(name)
+    info.compress_type = zipfile.ZIP_STORED
+    return info
+
+
+def write_images_parallel(pdf_path, page_count, zip_file, workers, options, progress=None):
+    """Render page ranges on a process pool and store them in page order."""
+    image_format = options[0]
+    done = 0
+    with tempfile.TemporaryDirectory(prefix='rasterize_') as temp_dir:
+        jobs = [
+            (pdf_path, start, end, os.path.join(temp_dir, f'range_{start:06d}.bin'), *options)
+            for start, end in _ranges(page_count, workers)
+        ]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # map() yields in submission order, so members are written in page order
+            for job, sizes in zip(jobs, pool.map(_render_range, jobs)):
+                start, shard_path = job[1], job[3]
+                with open(shard_path, 'rb') as shard:
+                    for number, size in enumerate(sizes, start + 1):
+                        name = page_name(number, page_count, image_format)
+                        with zip_file.open(_member(name), 'w') as member:
+                            member.write(shard.read(size))
+                os.remove(shard_path)
+                done += len(sizes)
+                if progress:
+                    progress(done, page_count, 'rendering')
+
+
+def write_images_serial(pdf_path, page_count, zip_file, options, progress=None):
+    import fitz
+
+    image_format = options[0]
+    with _open(fitz, pdf_path) as doc:
+        for number, page in enumerate(doc, 1):
+            data = _render_page(fitz, page, *options)
+            with zip_file.open(_member(page_name(number, page_count, image_format)), 'w') as member:
+                member.write(data)
+            if progress:
+                progress(number, page_count, 'rendering')
+
+
+def write_images_zip(pdf_path, image_format='jpeg', dpi=150, quality=85, max_pixels=None,
+                     output=None, workers=1, min_parallel_pages=0, progress=None):
+    """
+    Rasterize every page of a PDF into a ZIP written to output (default: a new temp file)
+
+    image_format is 'jpeg' or 'png'; quality applies to JPEG. Pages larger
+    than max_pixels at dpi are rendered at a lower resolution. With
+    workers > 1 and at least min_parallel_pages pages, ranges of pages are
+    rendered in worker processes. progress(done, total, stage) is called as
+    pages are stored. Returns output rewound.
+    """
+    import fitz
+
+    if image_format not in FORMATS:
+        raise Exception(f"Unsupported image format: {image_format}")
+    if output is None:
+        output = tempfile.TemporaryFile()
+    options = (image_format, dpi, quality, max_pixels)
+    started = time.perf_counter()
+    try:
+        with _open(fitz, pdf_path) as doc:
+            page_count = doc.page_count
+        if not page_count:
+            raise Exception("PDF has no pages")
+
+        workers = min(max(1, workers), -(-page_count // MIN_RANGE_PAGES))
+        parallel = workers > 1 and page_count >= min_parallel_pages
+        with zipfile.ZipFile(output, 'w', zipfile.ZIP_STORED, allowZip64=True) as zip_file:
+            if parallel:
+                write_images_parallel(pdf_path, page_count, zip_file, workers, options, progress)
+            else:
+                write_images_serial(pdf_path, page_count, zip_file, options, progress)
+    except Exception:
+        output.close()
+        raise
+
+    logger.debug(f"Rendered {page_count} pages of {pdf_path} at {dpi} dpi as {image_format} "
+                 f"in {time.perf_counter() - started:.2f}s ({workers if parallel else 1} workers)")
+    output.seek(0)
+    return output
@@ -0,0 +1,210 @@
+"""
+Shared token-bucket rate limiting.
+
+Every web process checks the same buckets, so limits hold across gunicorn
+workers. Each bucket holds up to `limit` tokens and refills at
+limit / window tokens per second; a request spends one token.
+
+Backends (RATE_LIMIT_BACKEND):
+- 'redis': one Lua script call per check, atomic on the Redis server
+- 'database': one conditional UPDATE per check, atomic on any database
+
+Limits are configured per operation in RATE_LIMITS as 'N/s', 'N/m' or 'N/h'.
+"""
+import math
+import time
+import logging
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Least
+from django.utils.module_loading import import_string
+from ipware import get_client_ip
+
+from .models import RateLimitBucket
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600}
+
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(retry_after)}
+"""
+
+
+def parse_rate(rate):
+    """Parse '10/m' into (10, 60)."""
+    count, _, period = rate.partition('/')
+    return int(count), PERIODS[period.strip()[:1].lower()]
+
+
+class RateLimitDecision:
+    """Outcome of a check; truthy when the request may proceed."""
+
+    def __init__(self, allowed, retry_after=0.0, operation='', limit=None):
+        self.allowed = allowed
+        self.retry_after = retry_after
+        self.operation = operation
+        self.limit = limit
+
+    def __bool__(self):
+        return self.allowed
+
+    @property
+    def retry_after_header(self):
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class RedisTokenBucket:
+    """
+    Token buckets in Redis hashes, updated by a single Lua script
+    """
+
+    def __init__(self, url=None):
+        import redis
+
+        self.client = redis.Redis.from_url(url or settings.RATE_LIMIT_REDIS_URL)
+        self.script = self.client.register_script(TOKEN_BUCKET_LUA)
+
+    def consume(self, key, capacity, rate, cost=1):
+        """Return (allowed, retry_after_seconds)."""
+        allowed, retry_after = self.script(keys=[f"ratelimit:{key}"], args=[capacity, rate, cost])
+        return bool(allowed), float(retry_after)
+
+
+class DatabaseTokenBucket:
+    """
+    Token buckets in the RateLimitBucket table
+
+    Refill and spend happen in one conditional UPDATE, so concurrent checks
+    cannot both take the last token.
+    """
+
+    def consume(self, key, capacity, rate, cost=1):
+        """Return (allowed, retry_after_seconds)."""
+        now = time.time()
+        elapsed = Value(now) - F('updated_at')
+        for _ in range(2):
+            spent = RateLimitBucket.objects.filter(
+                key=key, tokens__gte=Value(float(cost)) - elapsed * Value(rate)
+            ).update(
+                tokens=Least(Value(float(capacity)), F('tokens') + elapsed * Value(rate)) - Value(float(cost)),
+                updated_at=now,
+            )
+            if spent:
+                return True, 0.0
+
+            try:
+                with transaction.atomic():
+                    RateLimitBucket.objects.create(key=key, tokens=capacity - cost, updated_at=now)
+                return True, 0.0
+            except IntegrityError:
+                pass
+
+            bucket = RateLimitBucket.objects.filter(key=key).values_list('tokens', 'updated_at').first()
+            if bucket is not None:
+                tokens = min(capacity, bucket[0] + max(0.0, now - bucket[1]) * rate)
+                return False, (cost - tokens) / rate
+            # Deleted by cleanup between the two statements: try again
+        return True, 0.0
+
+
+RATE_LIMIT_BACKENDS = {
+    'redis': RedisTokenBucket,
+    'database': DatabaseTokenBucket,
+}
+
+_backends = {}
+
+
+def get_backend():
+    """Return the configured backend (one instance per process)."""
+    name = settings.RATE_LIMIT_BACKEND
+    if name not in _backends:
+        backend_class = RATE_LIMIT_BACKENDS.get(name) or import_string(name)
+        _backends[name] = backend_class()
+    return _backends[name]
+
+
+def check_rate_limit(identity, operation, limit=None, window=None):
+    """
+    Spend one token from identity's bucket for operation
+
+    limit/window override the RATE_LIMITS entry for the operation.
+    """
+    if limit is None or window is None:
+        rate = settings.RATE_LIMITS.get(operation, settings.RATE_LIMITS['default'])
+        limit, window = parse_rate(rate)
+
+    try:
+        allowed, retry_after = get_backend().consume(f"{operation}:{identity}", limit, limit / window)
+    except Exception as e:
+        # Never turn a limiter outage into a site outage
+        logger.error(f"Rate limiter unavailable, allowing request: {str(e)}")
+        return RateLimitDecision(True, operation=operation, limit=limit)
+
+    if not allowed:
+        logger.warning(f"Rate limit exceeded for {identity}, operation: {operation}")
+    return RateLimitDecision(allowed, retry_after, operation, limit)
+
+
+def rate_limit_check(request, operation_type: str):
+    """
+    Check rate limiting for a request's client IP
+
+    A denied decision is remembered on the request so RateLimitMiddleware
+    can answer 429 with Retry-After.
+    """
+    client_ip, _ = get_client_ip(request)
+    if not client_ip:
+        return RateLimitDecision(True, operation=operation_type)  # Can't track, but proceed
+
+    decision = check_rate_limit(client_ip, operation_type)
+    if not decision:
+        request.rate_limit = decision
+    return decision
+
+
+class RateLimitMiddleware:
+    """
+    Turn responses to rate-limited requests into 429 with Retry-After
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        decision = getattr(request, 'rate_limit', None)
+        if decision is not None:
+            # Views re-render their form with an error message on a limit hit
+            if response.status_code == 200:
+                response.status_code = 429
+            response['Retry-After'] = decision.retry_after_header
+        return response
+
+
+def purge_stale_buckets(max_age=3600):
+    """
+    Delete database buckets untouched for max_age seconds (they are full again)
+    """
+    return RateLimitBucket.objects.filter(updated_at__lt=time.time() - max_age).delete()[0]
@@ -0,0 +1,204 @@
+"""
+Content-addressed cache of conversion results.
+
+A cache key is the SHA-256 of the conversion type, the SHA-256 of every
+input file (recorded at upload time) and the task options that affect the
+output. On a hit the worker skips the conversion and gives the new task its
+own hard link to the cached blob, so deleting either the task (cleanup) or
+the cache entry (eviction) never removes the other's file.
+
+Entries expire after CONVERSION_CACHE_TTL seconds, which defaults to the
+one-hour retention promised to users, and the least recently used entries
+are evicted once the cache grows past CONVERSION_CACHE_MAX_BYTES.
+
+Hit and miss totals are ConversionCacheCounter rows, so stats() adds up
+every web and worker process whatever the Django cache backend.
+"""
+import os
+import json
+import shutil
+import hashlib
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import UploadedFile, ConversionCacheEntry, ConversionCacheCounter
+
+logger = logging.getLogger(__name__)
+
+# extra_data entries that describe the request, not the conversion
+VOLATILE_OPTIONS = {
+    'output_filename', 'client_ip', 'user_agent', 'file_names', 'file_count', 'image_count',
+    'merged_files', 'additional_files', 'cache_key', 'error',
+}
+INPUT_KEYS = {
+    'merge_pdf': 'merged_files',
+    'image_to_pdf': 'additional_files',
+}
+HITS_KEY = 'hits'
+MISSES_KEY = 'misses'
+
+
+def is_enabled():
+    return getattr(settings, 'CONVERSION_CACHE_ENABLED', True)
+
+
+def _expiry_cutoff():
+    return timezone.now() - timedelta(seconds=settings.CONVERSION_CACHE_TTL)
+
+
+def _count(counter):
+    if ConversionCacheCounter.objects.filter(name=counter).update(value=F('value') + 1):
+        return
+    try:
+        with transaction.atomic():
+            ConversionCacheCounter.objects.create(name=counter, value=1)
+    except IntegrityError:
+        # Created by another process in between
+        ConversionCacheCounter.objects.filter(name=counter).update(value=F('value') + 1)
+
+
+def _link(source_path, target_name):
+    """
+    Hard-link a stored file to a new, unused storage name and return that name
+
+    Falls back to a copy where hard links are unavailable.
+    """
+    target_name = default_storage.get_available_name(target_name)
+    target_path = default_storage.path(target_name)
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    try:
+        os.link(source_path, target_path)
+    except OSError:
+        shutil.copyfile(source_path, target_path)
+    return target_name
+
+
+def cache_key(task):
+    """
+    Return the cache key for a task, or None if an input has no recorded hash
+    """
+    hashes = [task.input_file.file_hash]
+    extra_ids = task.extra_data.get(INPUT_KEYS.get(task.conversion_type), [])
+    if extra_ids:
+        by_id = {str(uid): file_hash for uid, file_hash in
+                 UploadedFile.objects.filter(id__in=extra_ids).values_list('id', 'file_hash')}
+        hashes.extend(by_id.get(uid) for uid in extra_ids)
+    if not all(hashes):
+        return None
+
+    options = {k: v for k, v in task.extra_data.items() if k not in VOLATILE_OPTIONS}
+    payload = json.dumps({
+        'type': task.conversion_type,
+        'inputs': hashes,
+        'options': options,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def lookup(task):
+    """
+    Attach a cached output to the task if one exists
+
+    Returns True on a hit. On a miss the key is stored in extra_data so that
+    store() can file the result once the conversion finishes.
+    """
+    key = cache_key(task)
+    if key is None:
+        return False
+
+    entry = ConversionCacheEntry.objects.filter(key=key, created_at__gte=_expiry_cutoff()).first()
+    if entry is None or not entry.output_file or not os.path.exists(entry.output_file.path):
+        task.extra_data['cache_key'] = key
+        _count(MISSES_KEY)
+        return False
+
+    target = task.output_file.field.generate_filename(task, task.extra_data['output_filename'])
+    task.output_file.name = _link(entry.output_file.path, target)
+    result_data = dict(entry.result_data)
+    task.output_hash = result_data.pop('output_hash', '')
+    task.output_size = entry.size
+    task.extra_data.update(result_data)
+    ConversionCacheEntry.objects.filter(key=key).update(hits=F('hits') + 1, last_used_at=timezone.now())
+    _count(HITS_KEY)
+    logger.info(f"Conversion cache hit: {task.id} ({task.conversion_type}), key {key[:12]}")
+    return True
+
+
+def store(task, result_data):
+    """
+    File a completed task's output under the key computed by lookup()
+    """
+    key = task.extra_data.pop('cache_key', None)
+    if key is None or not task.output_file:
+        return None
+
+    entry = ConversionCacheEntry(
+        key=key,
+        conversion_type=task.conversion_type,
+        result_data=dict(result_data, output_hash=task.output_hash),
+        size=task.output_file.size,
+    )
+    entry.output_file.name = _link(
+        task.output_file.path,
+        entry.output_file.field.generate_filename(entry, os.path.basename(task.output_file.name)),
+    )
+    try:
+        # Expired entry under the same key: replace it
+        ConversionCacheEntry.objects.filter(key=key, created_at__lt=_expiry_cutoff()).delete()
+        with transaction.atomic():
+            entry.save(force_insert=True)
+    except IntegrityError:
+        # Another worker stored the same result first
+        default_storage.delete(entry.output_file.name)
+        return None
+
+    evict()
+    return entry
+
+
+def evict(max_bytes=None):
+    """
+    Delete least recently used entries until the cache fits in max_bytes
+    """
+    if max_bytes is None:
+        max_bytes = settings.CONVERSION_CACHE_MAX_BYTES
+
+    total = ConversionCacheEntry.objects.aggregate(total=Sum('size'))['total'] or 0
+    evicted = 0
+    if total > max_bytes:
+        for entry in ConversionCacheEntry.objects.order_by('last_used_at').iterator():
+            if total <= max_bytes:
+                break
+            total -= entry.size
+            entry.delete()
+            evicted += 1
+    if evicted:
+        logger.info(f"Conversion cache evicted {evicted} entries, {total} bytes remain")
+    return evicted
+
+
+def purge_expired():
+    """
+    Delete entries older than the TTL and return how many were removed
+    """
+    # QuerySet.delete() still sends post_delete, so django_cleanup removes the blobs
+    return ConversionCacheEntry.objects.filter(created_at__lt=_expiry_cutoff()).delete()[0]
+
+
+def stats():
+    """
+    Return hit/miss counters and the current size of the cache
+    """
+    totals = ConversionCacheEntry.objects.aggregate(total=Sum('size'))
+    counters = dict(ConversionCacheCounter.objects.values_list('name', 'value'))
+    return {
+        'hits': counters.get(HITS_KEY, 0),
+        'misses': counters.get(MISSES_KEY, 0),
+        'entries': ConversionCacheEntry.objects.count(),
+        'bytes': totals['total'] or 0,
+    }
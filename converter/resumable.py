@@ -0,0 +1,287 @@
+"""
+Resumable uploads: one file sent as a series of chunks, each retried alone.
+
+Protocol (PUT by offset; every answer is JSON and carries the offset in an
+Upload-Offset header):
+
+    POST   /tools/uploads/            filename, size[, sha256]  -> 201, offset 0
+    HEAD   /tools/uploads/<id>        committed offset, after a failed chunk
+    PUT    /tools/uploads/<id>        Upload-Offset: n, body = the bytes from n
+    DELETE /tools/uploads/<id>        abandon the upload
+
+A chunk must start at the committed offset, otherwise the answer is 409
+with the offset to resume from. Bytes are appended to a staging file under
+MEDIA_ROOT/partial/, so a chunk costs O(chunk) whatever was sent before. If
+a connection drops mid-chunk, the bytes that did arrive are kept.
+
+hashlib state cannot be stored in the database, so each process keeps the
+SHA-256 of the uploads it is receiving, keyed by offset, and updates it as
+bytes arrive. Chunks never re-read earlier data: once a chunk lands on a
+process that does not hold the state for its offset (another gunicorn
+worker, a restart), incremental hashing stops for that upload and the file
+is hashed in one pass when its last chunk arrives. That pass costs about
+as much as hashing an ordinary upload.
+
+The MIME type is sniffed as soon as SNIFF_BYTES have arrived and checked
+with SecureFileValidator like any upload, against the declared size. When
+the last byte arrives the staging file is moved to uploads/ and becomes an
+UploadedFile. Only SplitPDFForm accepts its id (upload_id); the other tools
+still take the file in one multipart POST.
+"""
+import os
+import fcntl
+import hashlib
+import logging
+import mimetypes
+from collections import OrderedDict
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from .models import UploadedFile, UploadSession, upload_to, default_expiry
+from .security import SecureFileValidator
+
+logger = logging.getLogger(__name__)
+
+STAGING_DIR = 'partial'
+# Digests kept per process: one per upload being received
+HASH_STATES = 128
+READ_SIZE = 64 * 1024
+
+_digests = OrderedDict()
+
+
+class UploadError(Exception):
+    """A request the upload protocol refuses; status is the HTTP answer."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def max_size(filename):
+    """Largest size accepted for a file name, from its extension."""
+    validator = SecureFileValidator
+    mime_type, _ = mimetypes.guess_type(filename.lower())
+    category, errors = validator.check_type(filename, mime_type or '')
+    if errors:
+        raise UploadError(f"Unsupported file type: {os.path.splitext(filename)[1] or filename}", 415)
+    return validator.MAX_FILE_SIZES[category]
+
+
+def create(filename, size, session_key='', expected_hash=''):
+    """Start an upload of size bytes; returns the UploadSession."""
+    filename = os.path.basename(filename or '').strip()
+    if not filename:
+        raise UploadError("A file name is required")
+    errors = SecureFileValidator.check_extension(filename)
+    if errors:
+        raise UploadError(errors[0], 415)
+    if size <= 0:
+        raise UploadError("The file is empty")
+    limit = max_size(filename)
+    if size > limit:
+        raise UploadError(f"File too large. Maximum size is {limit / 1024 / 1024}MB", 413)
+    expected_hash = (expected_hash or '').lower()
+    if expected_hash and (len(expected_hash) != 64 or set(expected_hash) - set('0123456789abcdef')):
+        raise UploadError("sha256 must be 64 hex digits")
+
+    upload = UploadSession(filename=filename, size=size, session_key=session_key,
+                           expected_hash=expected_hash)
+    upload.staging_name = f"{STAGING_DIR}/{upload.id.hex}.part"
+    path = default_storage.path(upload.staging_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'xb').close()
+    upload.save()
+    return upload
+
+
+def _digest(upload):
+    """
+    SHA-256 of the first upload.offset bytes if this process has it, else None
+
+    The state only exists when this process saw every chunk from offset 0.
+    """
+    state = _digests.pop(upload.id, None)
+    if state is not None and state[0] == upload.offset:
+        return state[1]
+    if upload.offset == 0:
+        return hashlib.sha256()
+    return None
+
+
+def _hash_file(staging):
+    """SHA-256 of the whole staging file, read once."""
+    digest = hashlib.sha256()
+    staging.seek(0)
+    for data in iter(lambda: staging.read(1024 * 1024), b''):
+        digest.update(data)
+    return digest
+
+
+def _remember(upload, digest):
+    _digests[upload.id] = (upload.offset, digest)
+    while len(_digests) > HASH_STATES:
+        _digests.popitem(last=False)
+
+
+def _sniff(upload, staging):
+    """Check the real type from the first bytes; sets mime_type and category."""
+    validator = SecureFileValidator
+    head = os.pread(staging.fileno(), validator.SNIFF_BYTES, 0)
+    mime_type = validator.detect_mime_type(head, upload.filename)
+    if not mime_type:
+        raise UploadError("Unable to determine file type", 415)
+    category, errors = validator.check_type(upload.filename, mime_type)
+    if errors:
+        raise UploadError(errors[0], 415)
+    error = validator.size_error(category, upload.size)
+    if error:
+        raise UploadError(error, 413)
+    upload.mime_type = mime_type
+    upload.category = category
+
+
+def append(upload, offset, stream, length):
+    """
+    Store length bytes read from stream at offset; returns the UploadSession
+
+    Only one chunk of an upload is written at a time (409 otherwise). When
+    the last byte arrives the upload is completed.
+    """
+    if upload.complete:
+        raise UploadError("Upload already complete", 409)
+    if length > settings.UPLOAD_CHUNK_MAX_BYTES:
+        raise UploadError(f"Chunks are limited to {settings.UPLOAD_CHUNK_MAX_BYTES} bytes", 413)
+
+    path = default_storage.path(upload.staging_name)
+    try:
+        staging = open(path, 'r+b')
+    except FileNotFoundError:
+        upload.refresh_from_db()
+        if upload.complete:
+            raise UploadError("Upload already complete", 409)
+        raise UploadError("Upload not found", 404)
+
+    with staging:
+        try:
+            fcntl.flock(staging, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadError("Another chunk of this upload is being written", 409)
+
+        upload.refresh_from_db()
+        if upload.complete:
+            raise UploadError("Upload already complete", 409)
+        stored = os.fstat(staging.fileno()).st_size
+        if stored < upload.offset:
+            # The staging file lost data (host crash before a flush): resume from what is there
+            logger.warning(f"Upload {upload.id} has {stored} of {upload.offset} committed bytes")
+            upload.offset = stored
+            UploadSession.objects.filter(pk=upload.pk).update(offset=stored)
+        if offset != upload.offset:
+            raise UploadError(f"Expected a chunk at offset {upload.offset}", 409)
+        if offset + length > upload.size:
+            raise UploadError(f"Chunk ends past the declared size of {upload.size} bytes", 413)
+
+        # Bytes past the committed offset come from a chunk that failed before its commit
+        staging.truncate(offset)
+        digest = _digest(upload)
+        staging.seek(offset)
+        received = 0
+        while received < length:
+            try:
+                data = stream.read(min(READ_SIZE, length - received))
+            except OSError as e:
+                # Client went away (UnreadablePostError): keep what arrived
+                logger.debug(f"Upload {upload.id}: reading the chunk failed: {str(e)}")
+                break
+            if not data:
+                break
+            if digest is not None:
+                digest.update(data)
+            staging.write(data)
+            received += len(data)
+        staging.flush()
+
+        upload.offset = offset + received
+        upload.expires_at = default_expiry()
+        if not upload.mime_type and (upload.offset >= SecureFileValidator.SNIFF_BYTES
+                                     or upload.offset == upload.size):
+            try:
+                _sniff(upload, staging)
+            except UploadError:
+                _discard(upload)
+                raise
+        UploadSession.objects.filter(pk=upload.pk).update(
+            offset=upload.offset, expires_at=upload.expires_at,
+            mime_type=upload.mime_type, category=upload.category,
+        )
+
+        if upload.offset == upload.size:
+            if digest is None:
+                logger.info(f"Upload {upload.id} was received by several processes; hashing it once")
+                digest = _hash_file(staging)
+            _complete(upload, digest.hexdigest())
+        elif digest is not None:
+            _remember(upload, digest)
+    if received < length:
+        logger.info(f"Upload {upload.id}: chunk at {offset} ended after {received} of {length} bytes")
+    return upload
+
+
+def _complete(upload, file_hash):
+    """Move the staging file to uploads/ and record it as an UploadedFile."""
+    if upload.expected_hash and upload.expected_hash != file_hash:
+        _discard(upload)
+        raise UploadError("The file does not match its sha256; please upload it again", 422)
+
+    storage_name = default_storage.get_available_name(upload_to(None, upload.filename))
+    path = default_storage.path(storage_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(default_storage.path(upload.staging_name), path)
+    if settings.FILE_UPLOAD_PERMISSIONS is not None:
+        os.chmod(path, settings.FILE_UPLOAD_PERMISSIONS)
+
+    uploaded = UploadedFile(
+        original_filename=upload.filename,
+        file_type=os.path.splitext(upload.filename)[1].lower(),
+        session_key=upload.session_key or 'anonymous',
+        file_hash=file_hash,
+    )
+    uploaded.file.name = storage_name
+    uploaded.save()
+
+    upload.file_id = uploaded.id
+    upload.staging_name = ''
+    UploadSession.objects.filter(pk=upload.pk).update(file_id=uploaded.id, staging_name='')
+    logger.info(f"Resumable upload complete: {upload.filename}, size: {upload.size}, "
+                f"type: {upload.mime_type}")
+    return uploaded
+
+
+def _discard(upload):
+    _digests.pop(upload.id, None)
+    if upload.staging_name:
+        try:
+            os.remove(default_storage.path(upload.staging_name))
+        except FileNotFoundError:
+            pass
+    UploadSession.objects.filter(pk=upload.pk).delete()
+
+
+def cancel(upload):
+    """Abandon an upload and delete what was received."""
+    if upload.complete:
+        raise UploadError("Upload already complete", 409)
+    _discard(upload)
+
+
+def get(upload_id, session_key):
+    """The session's unexpired upload with this id, or None."""
+    upload = UploadSession.objects.filter(id=upload_id, expires_at__gt=timezone.now()).first()
+    if upload is None:
+        return None
+    if upload.session_key and upload.session_key != session_key:
+        logger.warning(f"Resumable upload {upload_id} from another session refused")
+        return None
+    return upload
@@ -48,91 +48,126 @@ class SecureFileValidator:
         '.htm', '.jar', '.war', '.ear', '.dll', '.so', '.bin', '.app'
     ]
     
+    # Bytes needed to sniff the MIME type
+    SNIFF_BYTES = 2048
+    
     @classmethod
-    def validate_file(cls, file: UploadedFile) -> Dict:
+    def check_extension(cls, filename: str) -> List[str]:
         """
-        Validate file for security
-        
-        Returns: {
-            'is_valid': bool,
-            'mime_type': str,
-            'real_extension': str,
-            'errors': list
-        }
+        Reject dangerous extensions before reading any content
         """
-        errors = []
-        
-        # 1. Check file extension
-        original_name = file.name.lower()
-        original_ext = Path(original_name).suffix
-        
-        # Block dangerous extensions
+        original_ext = Path(filename.lower()).suffix
         if any(original_ext.endswith(ext) for ext in cls.DANGEROUS_EXTENSIONS):
-            errors.append(f"Dangerous file extension: {original_ext}")
-            return {'is_valid': False, 'errors': errors}
-        
-        # 2. Check file size based on type
-        file_size = file.size
-        
-        # Read first 2048 bytes for MIME detection
-        file_content = file.read(2048)
-        file.seek(0)  # Reset file pointer
-        
-        # 3. Detect real MIME type using magic
+            return [f"Dangerous file extension: {original_ext}"]
+        return []
+    
+    @classmethod
+    def detect_mime_type(cls, head: bytes, filename: str):
+        """
+        Detect the real MIME type from the first bytes, falling back to the name
+        """
         try:
-            mime_type = magic.from_buffer(file_content, mime=True)
+            return magic.from_buffer(head, mime=True)
         except Exception as e:
             logger.error(f"Error detecting MIME type: {e}")
             # Fallback to Python's mimetypes
-            mime_type, _ = mimetypes.guess_type(original_name)
-            if not mime_type:
-                errors.append("Unable to determine file type")
-                return {'is_valid': False, 'errors': errors}
+            mime_type, _ = mimetypes.guess_type(filename.lower())
+            return mime_type
+    
+    @classmethod
+    def check_type(cls, filename: str, mime_type: str) -> Tuple[str, List[str]]:
+        """
+        Check MIME type and extension agree; returns (category, errors)
+        """
+        original_ext = Path(filename.lower()).suffix
         
-        # 4. Check if MIME type is allowed
+        # Check if MIME type is allowed
         if mime_type not in cls.ALLOWED_MIME_TYPES:
-            errors.append(f"Unsupported file type: {mime_type}")
-            return {'is_valid': False, 'errors': errors}
+            return '', [f"Unsupported file type: {mime_type}"]
         
-        # 5. Get allowed extensions for this MIME type
+        # Check if extension matches MIME type
         allowed_extensions = cls.ALLOWED_MIME_TYPES.get(mime_type, [])
-        
-        # 6. Check if extension matches MIME type
         if original_ext not in allowed_extensions:
             # Try to get correct extension from MIME type
             correct_ext = allowed_extensions[0] if allowed_extensions else '.unknown'
-            errors.append(f"File extension {original_ext} doesn't match file type {mime_type}. Expected: {correct_ext}")
-            return {'is_valid': False, 'errors': errors}
+            return '', [f"File extension {original_ext} doesn't match file type {mime_type}. Expected: {correct_ext}"]
         
-        # 7. Check file size based on file type category
         if 'image' in mime_type:
-            max_size = cls.MAX_FILE_SIZES['image']
-            category = 'image'
+            return 'image', []
         elif 'pdf' in mime_type:
-            max_size = cls.MAX_FILE_SIZES['pdf']
-            category = 'pdf'
-        else:
-            max_size = cls.MAX_FILE_SIZES['document']
-            category = 'document'
-        
+            return 'pdf', []
+        return 'document', []
+    
+    @classmethod
+    def size_error(cls, category: str, file_size: int):
+        """
+        Return an error message if file_size exceeds the category limit
+        """
+        max_size = cls.MAX_FILE_SIZES[category]
         if file_size > max_size:
             mb_size = max_size / 1024 / 1024
-            errors.append(f"File too large for {category} type. Maximum size is {mb_size}MB")
-            return {'is_valid': False, 'errors': errors}
-        
-        # 8. Calculate file hash for tracking
-        file.seek(0)
-        file_hash = hashlib.sha256(file.read()).hexdigest()
-        file.seek(0)
-        
+            return f"File too large for {category} type. Maximum size is {mb_size}MB"
+        return None
+    
+    @classmethod
+    def valid_result(cls, filename: str, mime_type: str, category: str, file_hash: str) -> Dict:
         return {
             'is_valid': True,
             'mime_type': mime_type,
-            'real_extension': original_ext,
+            'real_extension': Path(filename.lower()).suffix,
             'category': category,
             'file_hash': file_hash,
-            'errors': errors
+            'errors': []
         }
+    
+    @classmethod
+    def validate_file(cls, file: UploadedFile) -> Dict:
+        """
+        Validate file for security
+        
+        Uploads received by SecureUploadHandler were already validated while
+        streaming; their result is returned as-is.
+        
+        Returns: {
+            'is_valid': bool,
+            'mime_type': str,
+            'real_extension': str,
+            'errors': list
+        }
+        """
+        streamed_result = getattr(file, 'validation_result', None)
+        if streamed_result is not None:
+            return streamed_result
+        
+        # 1. Block dangerous extensions
+        errors = cls.check_extension(file.name)
+        if errors:
+            return {'is_valid': False, 'errors': errors}
+        
+        # 2. Detect real MIME type from the first bytes
+        file_content = file.read(cls.SNIFF_BYTES)
+        file.seek(0)  # Reset file pointer
+        mime_type = cls.detect_mime_type(file_content, file.name)
+        if not mime_type:
+            return {'is_valid': False, 'errors': ["Unable to determine file type"]}
+        
+        # 3. Check MIME type and extension
+        category, errors = cls.check_type(file.name, mime_type)
+        if errors:
+            return {'is_valid': False, 'errors': errors}
+        
+        # 4. Check file size based on file type category
+        error = cls.size_error(category, file.size)
+        if error:
+            return {'is_valid': False, 'errors': [error]}
+        
+        # 5. Calculate file hash for tracking, chunk by chunk
+        digest = hashlib.sha256()
+        for chunk in file.chunks():
+            digest.update(chunk)
+        file.seek(0)
+        
+        return cls.valid_result(file.name, mime_type, category, digest.hexdigest())
 
 
 class FilePathSecurity:
@@ -176,24 +211,15 @@ class AntiAbuseSystem:
     
     def __init__(self, ip_address: str):
         self.ip_address = ip_address
-        self.redis_client = None  # You can connect to Redis here
     
     def check_rate_limit(self, operation: str, limit: int = 10, window: int = 60) -> bool:
         """
         Check if IP has exceeded rate limit
         """
-        # Implement with Redis or Django cache
-        from django.core.cache import cache
-        
-        cache_key = f"rate_limit:{self.ip_address}:{operation}"
-        requests = cache.get(cache_key, 0)
-        
-        if requests >= limit:
-            logger.warning(f"Rate limit exceeded for IP {self.ip_address}, operation: {operation}")
-            return False
+        # Shared token buckets (Redis or database), see converter.ratelimit
+        from .ratelimit import check_rate_limit
         
-        cache.set(cache_key, requests + 1, window)
-        return True
+        return check_rate_limit(self.ip_address, operation, limit, window).allowed
     
     def track_conversion(self, file_hash: str) -> bool:
         """
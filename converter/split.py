@@ -0,0 +1,335 @@
+"""
+Streaming PDF split into a ZIP archive.
+
+Each part is written straight into its ZIP member and the archive itself
+lives in a temp file, so peak memory is bounded by one part rather than by
+the whole archive. Parts are built with pikepdf, which copies page streams
+without decoding them; PyPDF2 is the fallback. Members get a fixed
+timestamp and parts a content-derived /ID, so the same input and options
+always produce the same archive bytes.
+
+Large "every N pages" splits can also be spread across processes: each
+worker opens the source once (memory-mapped) and deflates its own run of
+parts into a shard file, and the parent writes the pre-compressed members
+into the archive in part order. The archive bytes do not depend on the
+number of workers.
+"""
+import io
+import os
+import zlib
+import struct
+import logging
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Earliest timestamp a ZIP entry can hold; keeps archives reproducible
+ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
+# Reopen the source after copying this much, releasing qpdf's stream copies
+SOURCE_RECYCLE_BYTES = 32 * 1024 * 1024
+
+# ZIP record layouts (same fields zipfile writes for a deflated member)
+LOCAL_HEADER = struct.Struct('<4s2B4HL2L2H')
+CENTRAL_HEADER = struct.Struct('<4s4B4HL2L5H2L')
+END_RECORD = struct.Struct('<4s4H2LH')
+ZIP_VERSION = 20
+ZIP_UNIX = 3
+ZIP_UTF8_FLAG = 0x800
+ZIP_EPOCH_DOS = ((ZIP_EPOCH[0] - 1980) << 9 | ZIP_EPOCH[1] << 5 | ZIP_EPOCH[2],
+                 ZIP_EPOCH[3] << 11 | ZIP_EPOCH[4] << 5 | ZIP_EPOCH[5] // 2)
+ZIP_MAX_MEMBERS = 0xFFFF
+ZIP_MAX_OFFSET = 0xFFFFFFFF
+
+
+class _OffsetWriter:
+    """
+    Buffered write-only wrapper that tracks its offset; ZIP members cannot tell()
+
+    PyPDF2 issues many tiny writes; batching them keeps zlib calls cheap.
+    """
+
+    def __init__(self, raw, buffer_size=64 * 1024):
+        self.raw = raw
+        self.buffer = bytearray()
+        self.buffer_size = buffer_size
+        self.offset = 0
+
+    def write(self, data):
+        self.buffer += data
+        self.offset += len(data)
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+        return len(data)
+
+    def flush(self):
+        if self.buffer:
+            self.raw.write(self.buffer)
+            self.buffer.clear()
+
+    def tell(self):
+        return self.offset
+
+
+def zip_member(name):
+    """ZipInfo for a deflated member with a reproducible timestamp."""
+    info = zipfile.ZipInfo(name, date_time=ZIP_EPOCH)
+    info.compress_type = zipfile.ZIP_DEFLATED
+    info.external_attr = 0o644 << 16
+    return info
+
+
+def range_parts(ranges, total_pages):
+    """Parts for parsed ranges ([{'start': 1, 'end': 3}, ...], 1-indexed, inclusive)."""
+    return [
+        (f"part_{i + 1}_pages_{r['start']}-{r['end']}.pdf",
+         max(0, r['start'] - 1), min(total_pages, r['end']))
+        for i, r in enumerate(ranges)
+    ]
+
+
+def every_parts(total_pages, split_every):
+    """Parts of split_every pages each."""
+    return [
+        (f"part_{i + 1}_pages_{start + 1}-{min(start + split_every, total_pages)}.pdf",
+         start, min(start + split_every, total_pages))
+        for i, start in enumerate(range(0, total_pages, split_every))
+    ]
+
+
+def custom_parts(points, total_pages):
+    """Parts ending at each split point (1-indexed), plus the remainder."""
+    parts = []
+    start = 0
+    for point in sorted(set(points)):
+        if start < point <= total_pages:
+            parts.append((f"part_{len(parts) + 1}_pages_{start + 1}-{point}.pdf", start, point))
+            start = point
+    if start < total_pages:
+        parts.append((f"part_{len(parts) + 1}_pages_{start + 1}-{total_pages}.pdf", start, total_pages))
+    return parts
+
+
+def write_parts_pikepdf(pdf_path, parts, zip_file, progress=None):
+    """
+    Write parts with pikepdf, copying page streams verbatim (no re-encode)
+
+    qpdf keeps data for streams copied out of a source document alive until
+    that document is closed, so the source is reopened every
+    SOURCE_RECYCLE_BYTES of output to keep memory flat.
+    """
+    import pikepdf
+
+    source = pikepdf.open(pdf_path)
+    copied = 0
+    try:
+        for name, start, end in parts:
+            if copied >= SOURCE_RECYCLE_BYTES:
+                source.close()
+                source = pikepdf.open(pdf_path)
+                copied = 0
+            with pikepdf.new() as part:
+                for page_num in range(start, end):
+                    part.pages.append(source.pages[page_num])
+                with zip_file.open(zip_member(name), 'w') as member:
+                    part.save(member, compress_streams=False, deterministic_id=True,
+                              stream_decode_level=pikepdf.StreamDecodeLevel.none)
+            copied += zip_file.infolist()[-1].file_size
+            if progress:
+                progress(len(zip_file.infolist()), len(parts), 'splitting')
+    finally:
+        source.close()
+
+
+def write_parts_pypdf2(pdf_path, parts, zip_file, progress=None):
+    """Write parts with PyPDF2 (fallback when pikepdf is unavailable)."""
+    import PyPDF2
+
+    reader = PyPDF2.PdfReader(pdf_path)
+    for number, (name, start, end) in enumerate(parts, 1):
+        writer = PyPDF2.PdfWriter()
+        for page_num in range(start, end):
+            writer.add_page(reader.pages[page_num])
+        with zip_file.open(zip_member(name), 'w') as member:
+            stream = _OffsetWriter(member)
+            writer.write(stream)
+            stream.flush()
+        if progress:
+            progress(number, len(parts), 'splitting')
+
+
+def _write_shard(args):
+    """
+    Worker: build a run of parts and append each, deflated, to a shard file
+
+    Each part is saved to a scratch file next to the shard and deflated from
+    there in chunks, so memory stays bounded however large a part is.
+    Returns [(name, crc, compressed_size, size), ...] in part order.
+    """
+    import pikepdf
+
+    pdf_path, parts, shard_path = args
+    part_path = f"{shard_path}.part"
+    entries = []
+    source = pikepdf.open(pdf_path, access_mode=pikepdf.AccessMode.mmap)
+    copied = 0
+    try:
+        with open(shard_path, 'wb') as shard:
+            for name, start, end in parts:
+                if copied >= SOURCE_RECYCLE_BYTES:
+                    source.close()
+                    source = pikepdf.open(pdf_path, access_mode=pikepdf.AccessMode.mmap)
+                    copied = 0
+                with pikepdf.new() as part:
+                    for page_num in range(start, end):
+                        part.pages.append(source.pages[page_num])
+                    part.save(part_path, compress_streams=False, deterministic_id=True,
+                              stream_decode_level=pikepdf.StreamDecodeLevel.none)
+
+                compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+                crc = size = compressed_size = 0
+                with open(part_path, 'rb') as part_file:
+                    for chunk in iter(lambda: part_file.read(1024 * 1024), b''):
+                        crc = zlib.crc32(chunk, crc)
+                        size += len(chunk)
+                        compressed_size += shard.write(compressor.compress(chunk))
+                compressed_size += shard.write(compressor.flush())
+                entries.append((name, crc, compressed_size, size))
+                copied += size
+    finally:
+        source.close()
+        if os.path.exists(part_path):
+            os.remove(part_path)
+    return entries
+
+
+def _write_deflated_member(output, central, name, crc, compressed_size, size, data_file):
+    """Copy one pre-deflated member from data_file into the archive."""
+    offset = output.tell()
+    if offset + compressed_size > ZIP_MAX_OFFSET:
+        raise zipfile.LargeZipFile("Parallel split archive would need ZIP64")
+
+    encoded = name.encode('ascii', errors='ignore')
+    flags = 0
+    if encoded.decode('ascii') != name:
+        encoded = name.encode('utf-8')
+        flags = ZIP_UTF8_FLAG
+    dos_date, dos_time = ZIP_EPOCH_DOS
+    output.write(LOCAL_HEADER.pack(
+        b'PK\x03\x04', ZIP_VERSION, 0, flags, zipfile.ZIP_DEFLATED, dos_time, dos_date,
+        crc, compressed_size, size, len(encoded), 0,
+    ))
+    output.write(encoded)
+    remaining = compressed_size
+    while remaining:
+        chunk = data_file.read(min(remaining, 1024 * 1024))
+        if not chunk:
+            raise IOError(f"Shard truncated while copying {name}")
+        output.write(chunk)
+        remaining -= len(chunk)
+
+    central.append(CENTRAL_HEADER.pack(
+        b'PK\x01\x02', ZIP_VERSION, ZIP_UNIX, ZIP_VERSION, 0, flags, zipfile.ZIP_DEFLATED,
+        dos_time, dos_date, crc, compressed_size, size, len(encoded), 0, 0, 0, 0,
+        0o644 << 16, offset,
+    ) + encoded)
+
+
+def _batches(parts, workers):
+    """Split parts into `workers` consecutive runs of roughly equal page counts."""
+    total = sum(end - start for _, start, end in parts)
+    batches = [[] for _ in range(workers)]
+    done = 0
+    for part in parts:
+        batches[min(workers - 1, done * workers // max(1, total))].append(part)
+        done += part[2] - part[1]
+    return [batch for batch in batches if batch]
+
+
+def write_parts_parallel(pdf_path, parts, output, workers, progress=None):
+    """
+    Write parts across a process pool and assemble the ZIP in part order
+
+    Produces the same bytes as write_parts_pikepdf into a ZipFile.
+    """
+    if len(parts) > ZIP_MAX_MEMBERS:
+        raise zipfile.LargeZipFile("Parallel split archive would need ZIP64")
+
+    base = output.tell()
+    central = []
+    with tempfile.TemporaryDirectory(prefix='split_') as temp_dir:
+        jobs = [
+            (pdf_path, batch, os.path.join(temp_dir, f'shard_{i:04d}.bin'))
+            for i, batch in enumerate(_batches(parts, workers))
+        ]
+        with ProcessPoolExecutor(max_workers=len(jobs)) as pool:
+            for (_, _, shard_path), entries in zip(jobs, pool.map(_write_shard, jobs)):
+                with open(shard_path, 'rb') as shard:
+                    for entry in entries:
+                        _write_deflated_member(output, central, *entry, shard)
+                os.remove(shard_path)
+                if progress:
+                    progress(len(central), len(parts), 'splitting')
+
+    directory_offset = output.tell() - base
+    directory = b''.join(central)
+    output.write(directory)
+    output.write(END_RECORD.pack(
+        b'PK\x05\x06', 0, 0, len(central), len(central), len(directory), directory_offset, 0,
+    ))
+
+
+def count_pages(pdf_path):
+    try:
+        import pikepdf
+    except ImportError:
+        import PyPDF2
+        return len(PyPDF2.PdfReader(pdf_path).pages)
+    with pikepdf.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+
+def write_split_zip(pdf_path, plan, output=None, workers=1, min_parallel_parts=0, progress=None):
+    """
+    Split a PDF into a ZIP written to output (default: a new temp file)
+
+    plan is a callable taking the page count and returning
+    [(member_name, start, end), ...] with 0-indexed, end-exclusive pages.
+    With workers > 1 and at least min_parallel_parts parts, parts are built
+    in worker processes. progress(done, total, stage) is called as parts
+    are written. Returns output rewound.
+    """
+    if output is None:
+        output = tempfile.TemporaryFile()
+    try:
+        parts = plan(count_pages(pdf_path))
+        try:
+            import pikepdf  # noqa: F401
+            write_parts = write_parts_pikepdf
+        except ImportError:
+            write_parts = write_parts_pypdf2
+            workers = 1
+
+        workers = min(max(1, workers), len(parts))
+        parallel = workers > 1 and len(parts) >= min_parallel_parts
+        if parallel:
+            start = output.tell()
+            try:
+                write_parts_parallel(pdf_path, parts, output, workers, progress)
+            except zipfile.LargeZipFile as e:
+                logger.info(f"Falling back to a serial split: {str(e)}")
+                output.seek(start)
+                output.truncate()
+                parallel = False
+
+        if not parallel:
+            with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+                write_parts(pdf_path, parts, zip_file, progress)
+    except Exception:
+        output.close()
+        raise
+
+    logger.debug(f"Split {pdf_path} into {len(parts)} parts ({workers if parallel else 1} workers)")
+    output.seek(0)
+    return output
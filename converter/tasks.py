@@ -0,0 +1,279 @@
+"""
+Conversion task execution.
+
+Views create a ConversionTask in 'pending' and enqueue it; workers started by
+`manage.py run_conversion_workers` claim tasks and call execute_task, which
+moves them to 'completed' or 'failed'. Handlers pass task.progress (a
+ProgressReporter) to the conversion functions so watchers see page counts.
+"""
+import os
+import time
+import hashlib
+import logging
+from django.core.files.base import File
+from django.utils import timezone
+
+from .models import UploadedFile, ConversionTask
+from .queues import get_queue
+from .progress import ProgressReporter, publish
+from . import metrics, result_cache
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_task(task):
+    """
+    Hand a pending task to the configured queue backend
+    """
+    get_queue().enqueue(task.id)
+    logger.info(f"Conversion task queued: {task.id} ({task.conversion_type})")
+
+
+def _input_paths(task, extra_key):
+    """
+    Return the primary input path followed by any additional inputs
+    """
+    paths = [task.input_file.file.path]
+    extra_ids = task.extra_data.get(extra_key, [])
+    extra_files = {str(uf.id): uf for uf in UploadedFile.objects.filter(id__in=extra_ids)}
+    for file_id in extra_ids:
+        uploaded = extra_files.get(file_id)
+        if uploaded is None:
+            raise FileNotFoundError(f"Uploaded file missing: {file_id}")
+        paths.append(uploaded.file.path)
+
+    for path in paths:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Uploaded file missing: {path}")
+    return paths
+
+
+def _save_output(task, result):
+    """
+    Store a conversion result stream as the task's output file
+
+    The stream is copied to storage in chunks rather than read into memory.
+    Its SHA-256 (the download ETag) and size are recorded on the task.
+    """
+    try:
+        result.seek(0)
+        digest = hashlib.sha256()
+        size = 0
+        for chunk in iter(lambda: result.read(1024 * 1024), b''):
+            digest.update(chunk)
+            size += len(chunk)
+        task.output_hash = digest.hexdigest()
+        task.output_size = size
+        result.seek(0)
+        task.output_file.save(task.extra_data['output_filename'], File(result), save=False)
+    finally:
+        result.close()
+
+
+def run_pdf_to_word(task):
+    from .utils import convert_pdf_to_word
+
+    options = task.extra_data
+    result = convert_pdf_to_word(
+        task.input_file.file.path,
+        output_format=options['output_format'],
+        preserve_layout=options['preserve_layout'],
+        use_ocr=options['enhanced_ocr'],
+        extract_text_only=options['extract_text_only'],
+        progress=task.progress,
+    )
+    _save_output(task, result)
+
+
+def run_word_to_pdf(task):
+    from .utils import convert_word_to_pdf
+
+    result = convert_word_to_pdf(task.input_file.file.path, progress=task.progress)
+    _save_output(task, result)
+
+
+def run_merge_pdf(task):
+    from .utils import merge_pdfs
+
+    file_paths = _input_paths(task, 'merged_files')
+    logger.info(f"Merging {len(file_paths)} PDFs: {[os.path.basename(p) for p in file_paths]}")
+
+    result = merge_pdfs(file_paths, progress=task.progress)
+    _save_output(task, result)
+
+
+def run_split_pdf(task):
+    from .utils import split_pdf_by_range, split_pdf_every_page, split_pdf_by_count, split_pdf_custom
+
+    options = task.extra_data
+    pdf_path = task.input_file.file.path
+    split_type = options['split_type']
+
+    if split_type == 'every':
+        result = split_pdf_every_page(pdf_path, options['split_every'], progress=task.progress)
+    elif split_type == 'count':
+        result = split_pdf_by_count(pdf_path, options['page_count'], progress=task.progress)
+    elif split_type == 'custom':
+        result = split_pdf_custom(pdf_path, options['custom_split'], progress=task.progress)
+    else:
+        result = split_pdf_by_range(pdf_path, options.get('pages') or '1', progress=task.progress)
+
+    _save_output(task, result)
+
+
+def run_pdf_to_image(task):
+    from .utils import convert_pdf_to_images
+
+    options = task.extra_data
+    result = convert_pdf_to_images(
+        task.input_file.file.path,
+        image_format=options['image_format'],
+        dpi=options['dpi'],
+        quality=options['quality'],
+        progress=task.progress,
+    )
+    _save_output(task, result)
+
+
+def run_compress_pdf(task):
+    from .utils import compress_pdf as compress_pdf_util
+
+    options = task.extra_data
+    input_path = task.input_file.file.path
+    compress_kwargs = {
+        'compression_level': options['compression_level'],
+        'optimize_images': options['optimize_images'],
+        'optimize_fonts': options['optimize_fonts'],
+        'remove_metadata': options['remove_metadata'],
+    }
+
+    # Try different compression methods
+    try:
+        from .utils import compress_pdf_with_pikepdf, compress_pdf_with_pypdf2
+        compressed_pdf = compress_pdf_with_pikepdf(input_path, progress=task.progress, **compress_kwargs)
+    except ImportError:
+        try:
+            compressed_pdf = compress_pdf_with_pypdf2(input_path, **compress_kwargs)
+        except ImportError:
+            compressed_pdf = compress_pdf_util(input_path, **compress_kwargs)
+
+    _save_output(task, compressed_pdf)
+
+    # Calculate stats
+    original_size = task.input_file.file.size
+    compressed_size = task.output_file.size
+    reduction_percent = 0
+    if original_size > 0:
+        reduction_percent = ((original_size - compressed_size) / original_size) * 100
+
+    task.extra_data.update({
+        'reduction_percent': round(reduction_percent, 1),
+        'original_size': original_size,
+        'compressed_size': compressed_size,
+        'savings': original_size - compressed_size
+    })
+
+
+def run_excel_to_pdf(task):
+    from .utils import convert_excel_to_pdf
+
+    options = task.extra_data
+    result = convert_excel_to_pdf(
+        task.input_file.file.path,
+        include_gridlines=options['include_gridlines'],
+        fit_to_page=options['fit_to_page'],
+        include_headers=options['include_headers'],
+        worksheet_option=options.get('worksheet_option', 'first'),
+        worksheet_names=options.get('worksheet_names'),
+        progress=task.progress,
+    )
+    _save_output(task, result)
+
+
+def run_image_to_pdf(task):
+    from .utils import convert_images_to_pdf
+
+    options = task.extra_data
+    result = convert_images_to_pdf(
+        _input_paths(task, 'additional_files'),
+        options['page_size'],
+        options['orientation'],
+        options['placement'],
+        options['add_page_numbers'],
+        progress=task.progress,
+    )
+    _save_output(task, result)
+
+
+TASK_HANDLERS = {
+    'pdf_to_word': run_pdf_to_word,
+    'word_to_pdf': run_word_to_pdf,
+    'merge_pdf': run_merge_pdf,
+    'split_pdf': run_split_pdf,
+    'pdf_to_image': run_pdf_to_image,
+    'compress_pdf': run_compress_pdf,
+    'excel_to_pdf': run_excel_to_pdf,
+    'image_to_pdf': run_image_to_pdf,
+}
+
+
+def execute_task(task_id):
+    """
+    Run a claimed ('processing') task and record the outcome
+
+    Returns the task, or None when it no longer exists or the claim was lost.
+    """
+    try:
+        task = ConversionTask.objects.select_related('input_file').get(id=task_id)
+    except ConversionTask.DoesNotExist:
+        logger.warning(f"Conversion task disappeared before execution: {task_id}")
+        return None
+
+    handler = TASK_HANDLERS.get(task.conversion_type)
+    task.progress = ProgressReporter(task)
+    task.progress(0, 0, 'starting')
+    start = time.perf_counter()
+    error = None
+
+    try:
+        if handler is None:
+            raise ValueError(f"Unknown conversion type: {task.conversion_type}")
+
+        outcome = 'cached'
+        if not (result_cache.is_enabled() and result_cache.lookup(task)):
+            outcome = 'converted'
+            option_keys = set(task.extra_data)
+            handler(task)
+            if result_cache.is_enabled():
+                result_cache.store(task, {k: v for k, v in task.extra_data.items() if k not in option_keys})
+        task.status = 'completed'
+        logger.info(f"Conversion task completed: {task.id} ({task.conversion_type}), "
+                    f"input: {task.input_file.original_filename}")
+
+    except Exception as e:
+        logger.error(f"Conversion task failed: {task.id} ({task.conversion_type}): {str(e)}", exc_info=True)
+        task.status = 'failed'
+        task.extra_data['error'] = str(e)
+        outcome, error = 'failed', e
+    metrics.observe_conversion(task, time.perf_counter() - start, outcome, error)
+
+    task.completed_at = timezone.now()
+    if task.status == 'completed' and task.progress_total:
+        task.progress_done = task.progress_total
+    task.progress_stage = task.status
+    # Only while the claim is ours: after its lease expired the task may have been
+    # requeued (and claimed by another worker) or failed by recover_stalled_tasks
+    written = ConversionTask.objects.filter(
+        id=task.id, status='processing', attempts=task.attempts
+    ).update(
+        status=task.status, completed_at=task.completed_at, extra_data=task.extra_data,
+        output_file=task.output_file.name or '', output_hash=task.output_hash, output_size=task.output_size,
+        progress_done=task.progress_done, progress_total=task.progress_total, progress_stage=task.progress_stage,
+    )
+    if not written:
+        logger.warning(f"Conversion task {task.id} was taken back from this worker; discarding its result")
+        if task.output_file:
+            task.output_file.delete(save=False)
+        return None
+    publish(task)
+    return task
@@ -1,7 +1,32 @@
 """Tests for converter app."""
-from django.test import TestCase
+import io
+import os
+import signal
+import hashlib
+import tempfile
+from unittest import mock, skipUnless
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from .models import UploadedFile, ConversionTask, ConversionCacheEntry
+from .docx_parallel import page_chunks
+from .queues import DatabaseQueue, recover_stalled_tasks
+from .office_pool import is_available as office_available
+from .text_extract import extract_to_tempfile, rtf_escape
+from .compression import compress_pdf_file
+from .tasks import enqueue_task, execute_task
+from . import tasks
+from . import result_cache
+from .security import SecureFileValidator
+from .ratelimit import DatabaseTokenBucket
+from .progress import ProgressReporter
+from . import events
+
 class ConverterViewsTests(TestCase):
     def test_pdf_to_word_page(self):
         response = self.client.get(reverse('pdf_to_word'))
@@ -16,4 +41,1228 @@ class ConverterViewsTests(TestCase):
     def test_merge_pdf_page(self):
         response = self.client.get(reverse('merge_pdf'))
         self.assertEqual(response.status_code, 200)
-        self.assertTemplateUsed(response, 'converter/merge_pdf.html')
\ No newline at end of file
+        self.assertTemplateUsed(response, 'converter/merge_pdf.html')
+
+    def test_web_boot_skips_conversion_libraries(self):
+        import sys
+        import subprocess
+        from django.conf import settings
+
+        script = (
+            "import os, sys; os.environ['DJANGO_SETTINGS_MODULE'] = 'core.settings'; "
+            "import django; django.setup(); import converter.views, home.context_processors; "
+            "print('loaded:', *(m for m in ('pandas', 'PyPDF2', 'reportlab', 'PIL', 'docx') if m in sys.modules))"
+        )
+        completed = subprocess.run([sys.executable, '-c', script], cwd=settings.BASE_DIR,
+                                   capture_output=True, text=True, check=True)
+        self.assertEqual(completed.stdout.strip().splitlines()[-1], 'loaded:')
+
+def make_pdf_bytes(pages=1):
+    """Build a small multi-page PDF for conversion tests."""
+    from reportlab.pdfgen import canvas
+
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer)
+    for page in range(pages):
+        c.drawString(72, 720, f"Test page {page + 1}")
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='converter_tests_'),
+                   CONVERSION_QUEUE_BACKEND='database')
+class ConversionQueueTests(TestCase):
+    def setUp(self):
+        cache.clear()  # Rate limits are per test
+
+    def upload_merge(self):
+        files = [
+            SimpleUploadedFile(f'doc{i}.pdf', make_pdf_bytes(i + 1), content_type='application/pdf')
+            for i in range(2)
+        ]
+        return self.client.post(reverse('merge_pdf'), {'files': files})
+
+    def test_post_enqueues_pending_task(self):
+        response = self.upload_merge()
+        task = ConversionTask.objects.get()
+        self.assertEqual(task.status, 'pending')
+        self.assertRedirects(response, reverse('conversion_result', args=[task.id]))
+
+    def test_worker_claims_and_completes_task(self):
+        self.upload_merge()
+        queue = DatabaseQueue(poll_interval=0.01)
+
+        task_id = queue.dequeue(timeout=0)
+        self.assertEqual(ConversionTask.objects.get(id=task_id).status, 'processing')
+        self.assertIsNone(queue.dequeue(timeout=0))
+
+        task = execute_task(task_id)
+        self.assertEqual(task.status, 'completed')
+        self.assertTrue(task.output_file)
+
+    def test_stalled_task_is_requeued_then_failed(self):
+        from datetime import timedelta
+        from django.utils import timezone
+
+        self.upload_merge()
+        queue = DatabaseQueue(poll_interval=0.01)
+        task_id = queue.dequeue(timeout=0)
+        task = ConversionTask.objects.get(id=task_id)
+        self.assertEqual(task.attempts, 1)
+        self.assertIsNotNone(task.started_at)
+
+        # A live worker keeps its task
+        self.assertEqual(recover_stalled_tasks(queue), (0, 0))
+
+        # Its worker died: the heartbeat stops and the lease runs out
+        stale = timezone.now() - timedelta(seconds=3600)
+        ConversionTask.objects.filter(id=task_id).update(heartbeat_at=stale)
+        self.assertEqual(recover_stalled_tasks(queue), (1, 0))
+        self.assertEqual(ConversionTask.objects.get(id=task_id).status, 'pending')
+        self.assertEqual(queue.dequeue(timeout=0), task_id)
+
+        with override_settings(CONVERSION_TASK_MAX_ATTEMPTS=2):
+            ConversionTask.objects.filter(id=task_id).update(heartbeat_at=stale)
+            self.assertEqual(recover_stalled_tasks(queue), (0, 1))
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'failed')
+        self.assertIn('error', task.extra_data)
+
+    def test_worker_that_lost_its_claim_keeps_its_hands_off(self):
+        from django.conf import settings
+
+        self.upload_merge()
+        task_id = DatabaseQueue(poll_interval=0.01).dequeue(timeout=0)
+        output_dir = os.path.join(settings.MEDIA_ROOT, 'converted')
+        before = set(os.listdir(output_dir)) if os.path.isdir(output_dir) else set()
+
+        # Lease expired mid-run: requeued and claimed again by another worker
+        real_merge = tasks.TASK_HANDLERS['merge_pdf']
+
+        def merge_and_lose_claim(task):
+            real_merge(task)
+            ConversionTask.objects.filter(id=task_id).update(attempts=2)
+
+        with mock.patch.dict(tasks.TASK_HANDLERS, {'merge_pdf': merge_and_lose_claim}):
+            self.assertIsNone(execute_task(task_id))
+
+        task = ConversionTask.objects.get(id=task_id)
+        self.assertEqual(task.status, 'processing')
+        self.assertFalse(task.output_file)
+        self.assertEqual(set(os.listdir(output_dir)), before)
+
+    @override_settings(CONVERSION_QUEUE_BACKEND='eager')
+    def test_failed_conversion_marks_task_failed(self):
+        uploaded = UploadedFile.objects.create(original_filename='broken.pdf', file_type='.pdf')
+        uploaded.file.save('broken.pdf', ContentFile(b'not a pdf'))
+        task = ConversionTask.objects.create(
+            input_file=uploaded, conversion_type='merge_pdf',
+            extra_data={'output_filename': 'merged.pdf', 'merged_files': []}
+        )
+        enqueue_task(task)
+
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'failed')
+        self.assertIn('error', task.extra_data)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='converter_tests_'), CONVERSION_QUEUE_BACKEND='eager')
+class ResultCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.pdf_bytes = make_pdf_bytes(3)  # reportlab embeds a timestamp; reuse one copy
+
+    def upload_split(self, pages='1'):
+        upload = SimpleUploadedFile('brochure.pdf', self.pdf_bytes, content_type='application/pdf')
+        self.client.post(reverse('split_pdf'), {'file': upload, 'split_type': 'range', 'pages': pages})
+        return ConversionTask.objects.order_by('created_at').last()
+
+    def test_identical_upload_reuses_output(self):
+        first = self.upload_split()
+        second = self.upload_split()
+
+        self.assertEqual(second.status, 'completed')
+        # Counted in the database, not in the (per-process) Django cache
+        cache.clear()
+        self.assertEqual(result_cache.stats()['hits'], 1)
+        self.assertEqual(result_cache.stats()['misses'], 1)
+        self.assertNotEqual(first.output_file.name, second.output_file.name)
+        self.assertEqual(os.stat(first.output_file.path).st_ino, os.stat(second.output_file.path).st_ino)
+        self.assertEqual(second.output_hash, first.output_hash)
+        self.assertEqual(second.output_size, os.path.getsize(first.output_file.path))
+        self.assertEqual(second.client_ip, '127.0.0.1')
+        self.assertNotIn('client_ip', second.extra_data)
+
+        # Deleting the task (as cleanup does) leaves the cached blob
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        entry = ConversionCacheEntry.objects.get()
+        self.assertTrue(os.path.exists(entry.output_file.path))
+
+    def test_different_options_miss(self):
+        self.upload_split('1')
+        self.upload_split('1-2')
+        self.assertEqual(result_cache.stats()['hits'], 0)
+        self.assertEqual(ConversionCacheEntry.objects.count(), 2)
+
+    def test_evicts_least_recently_used(self):
+        self.upload_split('1')
+        self.upload_split('1-2')
+        oldest = ConversionCacheEntry.objects.order_by('last_used_at').first()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result_cache.evict(max_bytes=result_cache.stats()['bytes'] - 1)
+        self.assertEqual(ConversionCacheEntry.objects.count(), 1)
+        self.assertFalse(ConversionCacheEntry.objects.filter(key=oldest.key).exists())
+        self.assertFalse(os.path.exists(oldest.output_file.path))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='converter_tests_'))
+class StreamingUploadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def stored_uploads(self):
+        from django.conf import settings
+        upload_dir = os.path.join(settings.MEDIA_ROOT, 'uploads')
+        return set(os.listdir(upload_dir)) if os.path.isdir(upload_dir) else set()
+
+    def post(self, name, content):
+        upload = SimpleUploadedFile(name, content, content_type='application/pdf')
+        return self.client.post(reverse('word_to_pdf'), {'file': upload})
+
+    def test_upload_is_hashed_and_stored_in_place(self):
+        content = make_pdf_bytes(2)
+        self.client.post(reverse('split_pdf'), {'file': SimpleUploadedFile('doc.pdf', content),
+                                                'split_type': 'range', 'pages': '1'})
+        uploaded = UploadedFile.objects.get()
+        self.assertTrue(uploaded.file.name.startswith('uploads/'))
+        self.assertEqual(uploaded.file_hash, hashlib.sha256(content).hexdigest())
+        with uploaded.file.open('rb') as stored:
+            self.assertEqual(stored.read(), content)
+
+    def test_disguised_file_is_rejected_and_removed(self):
+        before = self.stored_uploads()
+        self.post('report.docx', b'#!/bin/sh\n' * 500)
+        self.assertFalse(UploadedFile.objects.exists())
+        self.assertEqual(self.stored_uploads(), before)
+
+    def test_size_limit_stops_writing_early(self):
+        before = self.stored_uploads()
+        with mock.patch.dict(SecureFileValidator.MAX_FILE_SIZES, {'pdf': 3000}):
+            self.client.post(reverse('split_pdf'), {
+                'file': SimpleUploadedFile('big.pdf', make_pdf_bytes(1) + b'%' * 10000),
+                'split_type': 'range', 'pages': '1',
+            })
+        self.assertFalse(UploadedFile.objects.exists())
+        self.assertEqual(self.stored_uploads(), before)
+
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='converter_tests_'))
+class ResumableUploadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def start(self, name, content, **extra):
+        response = self.client.post(reverse('upload_sessions'), dict(filename=name, size=len(content), **extra))
+        self.assertEqual(response.status_code, 201)
+        return response['Location']
+
+    def put(self, url, offset, data):
+        return self.client.put(url, data, content_type='application/offset+octet-stream',
+                               HTTP_UPLOAD_OFFSET=str(offset))
+
+    def test_chunks_resume_from_committed_offset(self):
+        from . import resumable
+
+        content = make_pdf_bytes(3)
+        url = self.start('doc.pdf', content, sha256=hashlib.sha256(content).hexdigest())
+        third = len(content) // 3
+
+        self.assertEqual(self.put(url, 0, content[:third]).json()['offset'], third)
+        # A retried chunk that already arrived is refused with the offset to resume from
+        response = self.put(url, 0, content[:third])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Upload-Offset'], str(third))
+        self.assertEqual(self.client.head(url)['Upload-Offset'], str(third))
+
+        # Next chunks handled by another process: nothing is re-read until the
+        # file is hashed once at completion
+        resumable._digests.clear()
+        with mock.patch.object(resumable, '_hash_file', wraps=resumable._hash_file) as hash_file:
+            self.put(url, third, content[third:2 * third])
+            hash_file.assert_not_called()
+            data = self.put(url, 2 * third, content[2 * third:]).json()
+        self.assertTrue(data['complete'])
+        hash_file.assert_called_once()
+
+        uploaded = UploadedFile.objects.get(id=data['file_id'])
+        self.assertEqual(uploaded.file_hash, hashlib.sha256(content).hexdigest())
+        self.assertTrue(uploaded.file.name.startswith('uploads/'))
+        with uploaded.file.open('rb') as stored:
+            self.assertEqual(stored.read(), content)
+        # The finished upload feeds the split form's upload_id
+        self.client.post(reverse('split_pdf'), {'upload_id': data['file_id'], 'split_type': 'every',
+                                                'split_every': 1})
+        self.assertEqual(ConversionTask.objects.get().input_file_id, uploaded.id)
+
+    def test_disguised_file_is_rejected_once_sniffed(self):
+        url = self.start('report.pdf', b'#!/bin/sh\n' * 500)
+        response = self.put(url, 0, b'#!/bin/sh\n' * 300)
+        self.assertEqual(response.status_code, 415)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertFalse(UploadedFile.objects.exists())
+
+    def test_limits_and_ownership(self):
+        response = self.client.post(reverse('upload_sessions'), {'filename': 'tool.exe', 'size': 10})
+        self.assertEqual(response.status_code, 415)
+        response = self.client.post(reverse('upload_sessions'), {'filename': 'big.pdf', 'size': 51 * 1024 * 1024})
+        self.assertEqual(response.status_code, 413)
+
+        url = self.start('doc.pdf', make_pdf_bytes(1))
+        with override_settings(UPLOAD_CHUNK_MAX_BYTES=100):
+            self.assertEqual(self.put(url, 0, b'%' * 101).status_code, 413)
+        self.client.cookies.clear()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+class RateLimitTests(TestCase):
+    @override_settings(RATE_LIMITS={'conversion': '2/m', 'default': '5/m'})
+    def test_exceeding_limit_returns_429_with_retry_after(self):
+        for _ in range(2):
+            self.assertEqual(self.client.post(reverse('word_to_pdf')).status_code, 200)
+        response = self.client.post(reverse('word_to_pdf'))
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+
+    def test_database_bucket_refills(self):
+        bucket = DatabaseTokenBucket()
+        with mock.patch('converter.ratelimit.time.time', return_value=1000.0):
+            self.assertEqual(bucket.consume('op:1.2.3.4', 2, 0.5), (True, 0.0))
+            self.assertEqual(bucket.consume('op:1.2.3.4', 2, 0.5), (True, 0.0))
+            self.assertEqual(bucket.consume('op:1.2.3.4', 2, 0.5), (False, 2.0))
+            # Buckets are per key
+            self.assertTrue(bucket.consume('op:5.6.7.8', 2, 0.5)[0])
+        with mock.patch('converter.ratelimit.time.time', return_value=1002.0):
+            self.assertTrue(bucket.consume('op:1.2.3.4', 2, 0.5)[0])
+            self.assertFalse(bucket.consume('op:1.2.3.4', 2, 0.5)[0])
+
+
+class StreamingSplitTests(TestCase):
+    def test_split_writes_reproducible_zip_to_disk(self):
+        import zipfile
+        import PyPDF2
+        from .utils import split_pdf_every_page
+
+        with tempfile.NamedTemporaryFile(suffix='.pdf') as pdf:
+            pdf.write(make_pdf_bytes(5))
+            pdf.flush()
+            first = split_pdf_every_page(pdf.name, 2)
+            second = split_pdf_every_page(pdf.name, 2)
+
+        self.assertTrue(hasattr(first, 'fileno'))  # a temp file, not BytesIO
+        self.assertEqual(first.read(), second.read())
+        with zipfile.ZipFile(first) as archive:
+            self.assertEqual(archive.namelist(), [
+                'part_1_pages_1-2.pdf', 'part_2_pages_3-4.pdf', 'part_3_pages_5-5.pdf'
+            ])
+            with archive.open('part_3_pages_5-5.pdf') as part:
+                reader = PyPDF2.PdfReader(io.BytesIO(part.read()))
+                self.assertIn('Test page 5', reader.pages[0].extract_text())
+        first.close()
+        second.close()
+
+    def test_parallel_split_matches_serial_archive(self):
+        import zipfile
+        from .split import write_split_zip, every_parts
+
+        with tempfile.NamedTemporaryFile(suffix='.pdf') as pdf:
+            pdf.write(make_pdf_bytes(7))
+            pdf.flush()
+            serial = write_split_zip(pdf.name, lambda total: every_parts(total, 1))
+            parallel = write_split_zip(pdf.name, lambda total: every_parts(total, 1), workers=3)
+
+        data = parallel.read()
+        self.assertEqual(data, serial.read())
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(len(archive.namelist()), 7)
+        serial.close()
+        parallel.close()
+
+
+class RasterizeTests(TestCase):
+    def test_parallel_render_matches_serial_archive(self):
+        import zipfile
+        from PIL import Image
+        from .rasterize import write_images_zip
+
+        with tempfile.NamedTemporaryFile(suffix='.pdf') as pdf:
+            pdf.write(make_pdf_bytes(10))
+            pdf.flush()
+            serial = write_images_zip(pdf.name, 'png', dpi=36)
+            parallel = write_images_zip(pdf.name, 'png', dpi=36, workers=2)
+
+        data = parallel.read()
+        self.assertEqual(data, serial.read())
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(archive.namelist(), [f'page_{n:02d}.png' for n in range(1, 11)])
+            with Image.open(archive.open('page_10.png')) as image:
+                self.assertEqual(image.size, (round(595.28 / 2), round(841.89 / 2)))
+        serial.close()
+        parallel.close()
+
+    @override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='converter_tests_'), CONVERSION_QUEUE_BACKEND='eager')
+    def test_view_queues_jpeg_export(self):
+        import zipfile
+
+        cache.clear()
+        response = self.client.post(reverse('pdf_to_image'), {
+            'file': SimpleUploadedFile('doc.pdf', make_pdf_bytes(2), content_type='application/pdf'),
+            'image_format': 'jpeg', 'dpi': 72, 'quality': 60,
+        })
+        task = ConversionTask.objects.get()
+        self.assertRedirects(response, reverse('conversion_result', args=[task.id]))
+        self.assertEqual(task.status, 'completed')
+        self.assertEqual(task.extra_data['quality'], 60)
+        with zipfile.ZipFile(task.output_file.path) as archive:
+            self.assertEqual(archive.namelist(), ['page_1.jpg', 'page_2.jpg'])
+
+
+class ParallelDocxTests(TestCase):
+    def test_page_chunks_cover_every_page_once(self):
+        chunks = page_chunks(53, 25)
+        self.assertEqual([len(c) for c in chunks], [25, 25, 3])
+        self.assertEqual(sum(chunks, []), list(range(53)))
+
+
+class TextExtractionTests(TestCase):
+    def test_streams_every_page_to_text(self):
+        with tempfile.NamedTemporaryFile(suffix='.pdf') as pdf:
+            pdf.write(make_pdf_bytes(3))
+            pdf.flush()
+            output = extract_to_tempfile(pdf.name, 'txt')
+
+        text = output.read().decode('utf-8')
+        output.close()
+        for page in (1, 2, 3):
+            self.assertIn(f"Test page {page}", text)
+
+    def test_rtf_escape(self):
+        self.assertEqual(rtf_escape('a{b}\\\nc é'), 'a\\{b\\}\\\\\\par c \\u233?')
+
+
+def make_duplicate_image_pdf(path, pages=2, pixels=600, **image_keys):
+    """PDF whose pages each carry their own copy of the same noisy image, drawn 1 inch wide."""
+    import zlib
+    import pikepdf
+
+    pixel_data = os.urandom(pixels * pixels * 3)
+    pdf = pikepdf.new()
+    for _ in range(pages):
+        image = pikepdf.Stream(pdf, zlib.compress(pixel_data), Type=pikepdf.Name.XObject,
+                               Subtype=pikepdf.Name.Image, Width=pixels, Height=pixels,
+                               ColorSpace=pikepdf.Name.DeviceRGB, BitsPerComponent=8,
+                               Filter=pikepdf.Name.FlateDecode, **image_keys)
+        page = pikepdf.Dictionary(Type=pikepdf.Name.Page, MediaBox=[0, 0, 612, 792],
+                                  Resources=pikepdf.Dictionary(XObject=pikepdf.Dictionary(Im0=image)),
+                                  Contents=pikepdf.Stream(pdf, b"q 72 0 0 72 100 100 cm /Im0 Do Q"))
+        pdf.pages.append(pikepdf.Page(page))
+    pdf.save(path)
+
+
+class CompressionTests(TestCase):
+    def test_downsamples_and_merges_duplicate_images(self):
+        import pikepdf
+
+        with tempfile.NamedTemporaryFile(suffix='.pdf') as pdf_file:
+            make_duplicate_image_pdf(pdf_file.name)
+            original_size = os.path.getsize(pdf_file.name)
+            output = compress_pdf_file(pdf_file.name, 'medium', workers=2)
+
+        with pikepdf.open(output) as pdf:
+            images = [page.Resources.XObject.Im0 for page in pdf.pages]
+            self.assertEqual(images[0].objgen, images[1].objgen)
+            # 600px drawn at 1 inch is 600 DPI; medium targets 150 DPI
+            self.assertEqual((int(images[0].Width), int(images[0].Height)), (150, 150))
+            self.assertEqual(images[0].Filter, pikepdf.Name.DCTDecode)
+        output.seek(0, os.SEEK_END)
+        self.assertLess(output.tell(), original_size / 10)
+        output.close()
+
+    def test_colour_key_masked_images_are_left_alone(self):
+        import pikepdf
+
+        with tempfile.NamedTemporaryFile(suffix='.pdf') as pdf_file:
+            make_duplicate_image_pdf(pdf_file.name, pages=1, Mask=pikepdf.Array([0, 10, 0, 10, 0, 10]))
+            output = compress_pdf_file(pdf_file.name, 'high', workers=1)
+
+        with pikepdf.open(output) as pdf:
+            image = pdf.pages[0].Resources.XObject.Im0
+            self.assertEqual(int(image.Width), 600)
+            self.assertEqual(image.Filter, pikepdf.Name.FlateDecode)
+        output.close()
+
+
+class MergeTests(TestCase):
+    def test_merges_in_order_and_shares_duplicate_images(self):
+        import fitz
+        from .utils import merge_pdfs
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            text_path = os.path.join(temp_dir, 'text.pdf')
+            with open(text_path, 'wb') as f:
+                f.write(make_pdf_bytes(2))
+            image_path = os.path.join(temp_dir, 'images.pdf')
+            make_duplicate_image_pdf(image_path, pages=1)
+            with fitz.open(text_path) as doc:
+                doc.set_toc([[1, 'Second page', 2]])
+                doc.saveIncr()
+
+            output = merge_pdfs([image_path, text_path, image_path])
+
+        with fitz.open(stream=output.read(), filetype='pdf') as merged:
+            self.assertEqual(merged.page_count, 4)
+            self.assertIn('Test page 1', merged[1].get_text())
+            self.assertEqual(merged.get_toc(), [[1, 'Second page', 3]])
+            images = {xref for page in merged for xref, *_ in page.get_images()}
+            self.assertEqual(len(images), 1)
+        output.close()
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='converter_tests_'), DOWNLOAD_OFFLOAD='')
+class DownloadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.content = bytes(range(256)) * 40
+        uploaded = UploadedFile.objects.create(original_filename='in.pdf', file_type='.pdf')
+        self.task = ConversionTask.objects.create(
+            input_file=uploaded, conversion_type='compress_pdf', status='completed',
+            output_hash=hashlib.sha256(self.content).hexdigest()
+        )
+        self.task.output_file.save('result.pdf', ContentFile(self.content))
+        self.url = reverse('download_file', args=[self.task.id])
+
+    def test_range_request_returns_partial_content(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.content)}')
+        self.assertEqual(b''.join(response.streaming_content), self.content[100:200])
+
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.content)}-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_matching_etag_returns_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_download_does_not_load_extra_data(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        task_queries = [q['sql'] for q in queries if 'converter_conversiontask' in q['sql']]
+        self.assertEqual(len(task_queries), 1)
+        self.assertNotIn('extra_data', task_queries[0])
+
+    @override_settings(DOWNLOAD_OFFLOAD='nginx')
+    def test_nginx_offload_sends_no_body(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.task.output_file.name}')
+        self.assertEqual(response.content, b'')
+        self.assertIn('attachment', response['Content-Disposition'])
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='converter_tests_'),
+                   THUMBNAIL_CACHE_DIR=tempfile.mkdtemp(prefix='converter_thumbnails_'))
+class ThumbnailTests(TestCase):
+    def setUp(self):
+        import shutil
+        from django.conf import settings
+
+        cache.clear()
+        shutil.rmtree(settings.THUMBNAIL_CACHE_DIR, ignore_errors=True)
+
+    def preview(self, pages=3):
+        upload = SimpleUploadedFile('doc.pdf', make_pdf_bytes(pages), content_type='application/pdf')
+        return self.client.post(reverse('pdf_preview') + '?pages=1-2', {'file': upload})
+
+    def test_preview_batch_renders_and_caches_pages(self):
+        from . import thumbnails
+
+        response = self.preview()
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['page_count'], 3)
+        self.assertEqual([page['page'] for page in data['pages']], [1, 2])
+        self.assertTrue(data['pages'][0]['src'].startswith('data:image/webp;base64,'))
+
+        url = reverse('file_thumbnails', args=[data['file_id']])
+        with mock.patch.object(thumbnails, '_render') as render:
+            data = self.client.get(url, {'pages': '2'}).json()
+        render.assert_not_called()
+        self.assertEqual([page['page'] for page in data['pages']], [2])
+
+        response = self.client.get(url, {'pages': '3-9', 'format': 'png', 'dpi': '100'})
+        page = response.json()['pages'][0]
+        self.assertEqual(page['page'], 3)
+        self.assertEqual(page['width'], round(595.28 * 100 / 72))  # A4
+        self.assertTrue(page['src'].startswith('data:image/png;base64,'))
+
+        # 150 dpi at most, and no side longer than THUMBNAIL_MAX_SIDE
+        page = self.client.get(url, {'pages': '1', 'dpi': '1000'}).json()['pages'][0]
+        self.assertEqual(page['height'], 1600)
+
+    def test_split_reuses_previewed_upload(self):
+        file_id = self.preview().json()['file_id']
+        response = self.client.post(reverse('split_pdf'), {'upload_id': file_id, 'split_type': 'every',
+                                                           'split_every': 1})
+        task = ConversionTask.objects.get()
+        self.assertRedirects(response, reverse('conversion_result', args=[task.id]),
+                             fetch_redirect_response=False)
+        self.assertEqual(str(task.input_file_id), file_id)
+        self.assertEqual(UploadedFile.objects.count(), 1)
+
+    def test_other_session_cannot_see_upload(self):
+        file_id = self.preview().json()['file_id']
+        self.client.cookies.clear()
+        response = self.client.get(reverse('file_page_thumbnail', args=[file_id, 1]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_full_queue_answers_busy(self):
+        file_id = self.preview().json()['file_id']
+        with override_settings(THUMBNAIL_QUEUE_LIMIT=-1):
+            response = self.client.get(reverse('file_thumbnails', args=[file_id]), {'pages': '3'})
+        self.assertEqual(response.status_code, 503)
+
+    def test_sweep_evicts_least_recently_used(self):
+        from . import thumbnails
+
+        file_id = self.preview().json()['file_id']
+        upload = UploadedFile.objects.get(id=file_id)
+        first = thumbnails._image_path(upload.file_hash, 1, 48, 'webp')
+        second = thumbnails._image_path(upload.file_hash, 2, 48, 'webp')
+        os.utime(first, (1, 1))
+        self.assertEqual(thumbnails.sweep(max_bytes=os.path.getsize(second) + 100), 1)
+        self.assertFalse(os.path.exists(first))
+        self.assertTrue(os.path.exists(second))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='converter_tests_'), PROGRESS_BACKEND='database',
+                   PROGRESS_POLL_INTERVAL=0.01, PROGRESS_HEARTBEAT=5)
+class ProgressEventsTests(TestCase):
+    def setUp(self):
+        events._hub = None
+        uploaded = UploadedFile.objects.create(original_filename='in.pdf', file_type='.pdf')
+        self.task = ConversionTask.objects.create(input_file=uploaded, conversion_type='split_pdf',
+                                                  status='processing')
+
+    def test_reporter_saves_progress(self):
+        progress = ProgressReporter(self.task)
+        with mock.patch('converter.progress.publish') as publish:
+            progress(3, 10, 'splitting')
+        self.task.refresh_from_db()
+        self.assertEqual((self.task.progress_done, self.task.progress_total, self.task.progress_stage),
+                         (3, 10, 'splitting'))
+        publish.assert_called_once()
+
+    def test_stream_ends_when_task_finishes(self):
+        import asyncio
+        from asgiref.sync import async_to_sync, sync_to_async
+
+        def finish():
+            ConversionTask.objects.filter(id=self.task.id).update(
+                status='completed', progress_done=4, progress_total=4)
+
+        async def run():
+            sent = []
+            disconnected = asyncio.Event()
+
+            async def receive():
+                await disconnected.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                sent.append(message)
+                if len(sent) == 2:
+                    await sync_to_async(finish)()
+
+            scope = {'type': 'http', 'method': 'GET', 'path': f'/tools/tasks/{self.task.id}/events'}
+            await asyncio.wait_for(events.sse_application(scope, receive, send), timeout=5)
+            return sent
+
+        sent = async_to_sync(run)()
+        self.assertEqual(sent[0]['status'], 200)
+        body = b''.join(message.get('body', b'') for message in sent[1:]).decode()
+        self.assertIn('"status": "processing"', body)
+        self.assertIn('"status": "completed", "done": 4, "total": 4', body)
+        self.assertFalse(sent[-1].get('more_body', False))
+
+    def test_stream_outlives_the_request_message(self):
+        import asyncio
+        from asgiref.sync import async_to_sync, sync_to_async
+
+        def advance(done, status='processing'):
+            ConversionTask.objects.filter(id=self.task.id).update(
+                status=status, progress_done=done, progress_total=4)
+
+        async def run():
+            sent = []
+            messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+            async def receive():
+                # A real server answers the first receive() of a GET with its body,
+                # then blocks until the client goes away
+                if messages:
+                    return messages.pop(0)
+                await asyncio.Event().wait()
+
+            async def send(message):
+                sent.append(message)
+                events_sent = sum(b'event: progress' in m.get('body', b'') for m in sent)
+                if message.get('more_body') and events_sent < 3:
+                    await sync_to_async(advance)(events_sent)
+                elif events_sent == 3:
+                    await sync_to_async(advance)(4, 'completed')
+
+            scope = {'type': 'http', 'method': 'GET', 'path': f'/tools/tasks/{self.task.id}/events'}
+            await asyncio.wait_for(events.sse_application(scope, receive, send), timeout=5)
+            return sent
+
+        with override_settings(PROGRESS_BACKEND='database', PROGRESS_POLL_INTERVAL=0.01):
+            sent = async_to_sync(run)()
+        body = b''.join(message.get('body', b'') for message in sent[1:]).decode()
+        self.assertGreaterEqual(body.count('event: progress'), 4)
+        self.assertIn('"status": "completed", "done": 4, "total": 4', body)
+        self.assertEqual(sent[-1], {'type': 'http.response.body', 'body': b''})
+
+    def test_fallback_view_sends_one_event(self):
+        response = self.client.get(reverse('task_events', args=[self.task.id]))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertIn(b'retry: 3000', response.content)
+        self.assertIn(b'"status": "processing"', response.content)
+
+
+class ExcelRenderTests(TestCase):
+    def make_workbook(self, sheets):
+        from openpyxl import Workbook
+
+        workbook = Workbook()
+        workbook.remove(workbook.active)
+        for name, rows in sheets.items():
+            sheet = workbook.create_sheet(name)
+            for row in rows:
+                sheet.append(row)
+        path = os.path.join(tempfile.mkdtemp(), 'book.xlsx')
+        workbook.save(path)
+        return path
+
+    def test_select_sheets(self):
+        from .excel_render import select_sheets
+
+        names = ['Summary', 'Sales', 'Costs']
+        self.assertEqual(select_sheets(names, 'Sales', 'first'), ['Summary'])
+        self.assertEqual(select_sheets(names, 'Sales', 'active'), ['Sales'])
+        self.assertEqual(select_sheets(names, 'Sales', 'all'), names)
+        self.assertEqual(select_sheets(names, 'Sales', 'selection', ['costs', 'summary']), ['Summary', 'Costs'])
+        self.assertEqual(select_sheets(names, 'Sales', 'selection', ['missing']), ['Summary'])
+
+    def test_rows_paginate_with_repeated_header(self):
+        import fitz
+        from .excel_render import render_workbook
+
+        rows = [['Name', 'Amount']] + [[f'row {i}', i * 1.5] for i in range(300)]
+        path = self.make_workbook({'Data': rows, 'Notes': [['Note'], ['hello']]})
+        calls = []
+        output = render_workbook(path, sheets='all', segment_pages=2,
+                                 progress=lambda done, total, stage: calls.append((done, total)))
+        with fitz.open(stream=output.read(), filetype='pdf') as doc:
+            pages = [page.get_text() for page in doc]
+        output.close()
+
+        self.assertGreater(len(pages), 3)
+        data_pages = [text for text in pages if 'row ' in text]
+        self.assertTrue(all('Name' in text and 'Amount' in text for text in data_pages))
+        text = ''.join(pages)
+        self.assertIn('row 0', text)
+        self.assertIn('row 299', text)
+        self.assertIn('448.5', text)
+        self.assertIn('hello', pages[-1])
+        self.assertEqual(calls[-1][0], 301)
+
+    def test_wide_sheet_keeps_numbers_and_dates_whole(self):
+        import fitz
+        from datetime import date
+        from .excel_render import render_workbook
+
+        header = [f'Column {i}' for i in range(20)]
+        rows = [header] + [[date(2024, 1, 15) if i % 2 else 12345.67 + row for i in range(20)]
+                           for row in range(5)]
+        output = render_workbook(self.make_workbook({'Wide': rows}))
+        with fitz.open(stream=output.read(), filetype='pdf') as doc:
+            pages = [page.get_text() for page in doc]
+        output.close()
+
+        # Two groups of ten columns, each page with its part of the header
+        self.assertEqual(len(pages), 2)
+        self.assertIn('Column 0', pages[0])
+        self.assertIn('Column 19', pages[1])
+        self.assertIn('Wide (K\u2013T)', pages[1])
+        text = ''.join(pages)
+        self.assertEqual(text.count('2024-01-15'), 50)
+        self.assertEqual(text.count('12349.67'), 10)
+        self.assertNotIn('\u2026', text)
+
+    def test_rows_wider_than_header_without_dimension(self):
+        import re
+        import zipfile
+        import fitz
+        from .excel_render import render_workbook
+
+        long_text = 'a very long description ' * 10
+        path = self.make_workbook({'Data': [['Header'], ['x', 'second', 'third'], ['y', long_text, 'z']]})
+        # Writers other than Excel often leave out <dimension>
+        stripped = path.replace('.xlsx', '_nodim.xlsx')
+        with zipfile.ZipFile(path) as source, zipfile.ZipFile(stripped, 'w') as target:
+            for item in source.infolist():
+                data = source.read(item.filename)
+                if item.filename.startswith('xl/worksheets/'):
+                    data = re.sub(rb'<dimension[^>]*/>', b'', data)
+                target.writestr(item, data)
+
+        output = render_workbook(stripped)
+        with fitz.open(stream=output.read(), filetype='pdf') as doc:
+            text = ''.join(page.get_text() for page in doc)
+        output.close()
+
+        for value in ('Header', 'second', 'third', 'z'):
+            self.assertIn(value, text)
+        self.assertIn('\u2026', text)
+        self.assertNotIn(long_text.strip(), text)
+
+
+class WordRenderTests(TestCase):
+    def render(self, document):
+        import fitz
+        from .word_render import render_document
+
+        path = os.path.join(tempfile.mkdtemp(), 'document.docx')
+        document.save(path)
+        output = render_document(path)
+        with fitz.open(stream=output.read(), filetype='pdf') as doc:
+            pages = [page.get_text() for page in doc]
+        output.close()
+        return pages
+
+    def test_paragraphs_and_tables_keep_document_order(self):
+        from docx import Document
+        from docx.enum.text import WD_BREAK
+
+        document = Document()
+        document.add_heading('Quarterly report', level=1)
+        document.add_paragraph('Before the table')
+        table = document.add_table(rows=2, cols=2)
+        for r, row in enumerate(table.rows):
+            for c, cell in enumerate(row.cells):
+                cell.text = f'cell {r}{c} & co'
+        paragraph = document.add_paragraph('After the table')
+        paragraph.add_run().add_break(WD_BREAK.PAGE)
+        paragraph.add_run('Next page')
+
+        pages = self.render(document)
+        self.assertEqual(len(pages), 2)
+        text = pages[0]
+        positions = [text.index(word) for word in ('Quarterly report', 'Before the table', 'cell 00 & co',
+                                                   'cell 11 & co', 'After the table')]
+        self.assertEqual(positions, sorted(positions))
+        self.assertIn('Next page', pages[1])
+
+    def test_text_boxes_are_left_out(self):
+        from docx import Document
+        from lxml import etree
+
+        document = Document()
+        document.add_paragraph('Before')
+        anchor = document.add_paragraph('Anchor para')
+        # What Word writes for a text box: a DrawingML copy and a VML fallback
+        box = '<w:txbxContent><w:p><w:r><w:t>BOXTEXT</w:t></w:r></w:p></w:txbxContent>'
+        anchor._p.append(etree.fromstring(
+            '<w:r xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+            'xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006" '
+            'xmlns:wps="http://schemas.microsoft.com/office/word/2010/wordprocessingShape" '
+            'xmlns:v="urn:schemas-microsoft-com:vml">'
+            '<mc:AlternateContent><mc:Choice Requires="wps"><w:drawing><wps:wsp><wps:txbx>'
+            f'{box}</wps:txbx></wps:wsp></w:drawing></mc:Choice>'
+            f'<mc:Fallback><w:pict><v:shape><v:textbox>{box}</v:textbox></v:shape></w:pict></mc:Fallback>'
+            '</mc:AlternateContent></w:r>'
+        ))
+        document.add_paragraph('After')
+
+        text = ''.join(self.render(document))
+        self.assertNotIn('BOXTEXT', text)
+        self.assertLess(text.index('Before'), text.index('Anchor para'))
+        self.assertLess(text.index('Anchor para'), text.index('After'))
+
+    def test_long_table_repeats_its_header_on_each_page(self):
+        from docx import Document
+        from docx.oxml import OxmlElement
+
+        document = Document()
+        table = document.add_table(rows=150, cols=2)
+        for r, row in enumerate(table.rows):
+            row.cells[0].text = 'Name' if r == 0 else f'row {r}'
+            row.cells[1].text = 'Amount' if r == 0 else str(r * 3)
+        table.rows[0]._tr.get_or_add_trPr().append(OxmlElement('w:tblHeader'))
+
+        pages = self.render(document)
+        self.assertGreater(len(pages), 2)
+        self.assertTrue(all(page.count('Name') == 1 for page in pages))
+        rows = [line for page in pages for line in page.splitlines() if line.startswith('row ')]
+        self.assertEqual(rows, [f'row {r}' for r in range(1, 150)])
+
+
+@override_settings(OFFICE_CONVERSION_TYPES=['word_to_pdf'], OFFICE_ACQUIRE_TIMEOUT=0)
+class OfficePoolTests(TestCase):
+    def setUp(self):
+        from . import office_pool
+
+        office_pool.is_available.cache_clear()
+        self.addCleanup(office_pool.is_available.cache_clear)
+
+    def make_docx(self):
+        from docx import Document
+
+        document = Document()
+        document.add_paragraph('Rendered by reportlab')
+        path = os.path.join(tempfile.mkdtemp(), 'document.docx')
+        document.save(path)
+        return path
+
+    @override_settings(OFFICE_BINARY='soffice-not-installed')
+    def test_missing_binary_uses_reportlab(self):
+        from .utils import convert_word_to_pdf
+
+        output = convert_word_to_pdf(self.make_docx())
+        self.assertEqual(output.read(5), b'%PDF-')
+        output.close()
+
+    def test_office_failure_falls_back_to_reportlab(self):
+        from . import office_pool
+        from .utils import convert_word_to_pdf
+
+        with mock.patch.object(office_pool, 'is_available', return_value=True), \
+                mock.patch.object(office_pool, 'convert_to_pdf', side_effect=office_pool.OfficeError('crashed')):
+            output = convert_word_to_pdf(self.make_docx())
+        self.assertEqual(output.read(5), b'%PDF-')
+        output.close()
+
+    def test_busy_pool_is_reported(self):
+        from . import office_pool
+
+        with override_settings(OFFICE_POOL_DIR=tempfile.mkdtemp(), OFFICE_POOL_SIZE=1):
+            with office_pool._locked(0, blocking=True):
+                with self.assertRaises(office_pool.OfficeError):
+                    with office_pool.idle_instance():
+                        pass
+
+    def test_instance_stopped_elsewhere_is_reaped(self):
+        import subprocess
+        from . import office_pool
+
+        # Stands in for an soffice started here and killed by another worker
+        process = subprocess.Popen(['sleep', '30'])
+        self.addCleanup(office_pool._children.pop, process.pid, None)
+        office_pool._children[process.pid] = (os.getpid(), process)
+        os.kill(process.pid, signal.SIGKILL)
+        os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOWAIT)
+
+        office_pool.reap()
+        self.assertNotIn(process.pid, office_pool._children)
+        self.assertFalse(os.path.exists(f'/proc/{process.pid}'))
+
+
+@skipUnless(office_available(), "needs soffice and the uno module (python3-uno)")
+class OfficeIntegrationTests(TestCase):
+    """The pool against a real LibreOffice (run by .github/workflows/office.yml)."""
+
+    def setUp(self):
+        from . import office_pool
+
+        override = override_settings(OFFICE_POOL_DIR=tempfile.mkdtemp(), OFFICE_POOL_SIZE=1)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(office_pool.shutdown)
+
+    def make_docx(self):
+        from docx import Document
+
+        document = Document()
+        document.add_paragraph('Rendered by LibreOffice')
+        path = os.path.join(tempfile.mkdtemp(), 'document.docx')
+        document.save(path)
+        return path
+
+    def convert(self):
+        from . import office_pool
+
+        output = office_pool.convert_to_pdf('word_to_pdf', self.make_docx())
+        self.assertEqual(output.read(5), b'%PDF-')
+        output.close()
+
+    def test_instances_warmed_in_a_subprocess_are_shared(self):
+        from . import office_pool
+
+        office_pool.warm_in_subprocess()
+        with office_pool._locked(0, blocking=True) as instance:
+            pid = instance.pid
+        self.assertTrue(pid)
+        self.assertNotIn(pid, office_pool._children)
+
+        self.convert()
+        with office_pool._locked(0, blocking=True) as instance:
+            self.assertEqual(instance.pid, pid)
+
+    def test_instance_killed_elsewhere_is_reaped_and_replaced(self):
+        from . import office_pool
+
+        self.convert()
+        with office_pool._locked(0, blocking=True) as instance:
+            pid = instance.pid
+            instance.kill()
+        self.assertIn(pid, office_pool._children)
+        os.waitid(os.P_PID, pid, os.WEXITED | os.WNOWAIT)
+
+        self.convert()
+        self.assertNotIn(pid, office_pool._children)
+        self.assertFalse(os.path.exists(f'/proc/{pid}'))
+
+
+class ImageIngestTests(TestCase):
+    def save_jpeg(self, size, orientation=1):
+        from PIL import Image
+
+        image = Image.new('RGB', size, (200, 120, 40))
+        exif = Image.Exif()
+        if orientation != 1:
+            exif[0x0112] = orientation
+        path = os.path.join(tempfile.mkdtemp(), 'photo.jpg')
+        image.save(path, quality=90, exif=exif.tobytes())
+        return path
+
+    def test_small_upright_jpeg_passes_through(self):
+        from .image_ingest import ingest_image
+
+        path = self.save_jpeg((400, 300))
+        result = ingest_image(path, (595, 842), 'fit', dpi=150)
+        self.assertEqual(result['image'], path)
+        self.assertFalse(result['reencoded'])
+
+    def test_large_rotated_jpeg_is_turned_and_downscaled(self):
+        from .image_ingest import ingest_image
+
+        # Stored landscape, displayed portrait
+        path = self.save_jpeg((4000, 3000), orientation=6)
+        result = ingest_image(path, (595, 842), 'fit', dpi=72)
+        x, y, width, height = result['box']
+        self.assertTrue(result['reencoded'])
+        self.assertLess(width, height)
+        pixel_width, pixel_height = result['image'].getSize()
+        self.assertLess(pixel_width, pixel_height)
+        self.assertLessEqual(pixel_height, round(height) + 1)
+
+    def test_unreadable_image_is_reported_in_order(self):
+        from .image_ingest import ingest_images
+
+        bad = os.path.join(tempfile.mkdtemp(), 'broken.jpg')
+        with open(bad, 'wb') as f:
+            f.write(b'not an image')
+        good = self.save_jpeg((200, 100))
+        results = list(ingest_images([bad, good], (595, 842), workers=2))
+        self.assertEqual([path for path, _ in results], [bad, good])
+        self.assertIsInstance(results[0][1], Exception)
+        self.assertEqual(results[1][1]['image'], good)
+
+
+class MultiUpLayoutTests(TestCase):
+    A4 = (595.28, 841.89)
+
+    def assert_within_margins(self, pages, margin=36):
+        for page in pages:
+            for _, (x, y, width, height) in page:
+                self.assertGreaterEqual(x, margin - 0.01)
+                self.assertGreaterEqual(y, margin - 0.01)
+                self.assertLessEqual(x + width, self.A4[0] - margin + 0.01)
+                self.assertLessEqual(y + height, self.A4[1] - margin + 0.01)
+
+    def test_receipts_pack_densely_in_order(self):
+        from .layout import pack_pages, page_fill
+
+        pages = pack_pages([(800, 2000)] * 12, self.A4)
+        self.assertEqual(len(pages), 2)
+        self.assertGreaterEqual(len(pages[0]), 8)
+        self.assertGreater(page_fill(pages[0], self.A4), 0.6)
+        self.assertEqual([index for page in pages for index, _ in page], list(range(12)))
+        self.assert_within_margins(pages)
+
+    def test_boxes_keep_aspect_and_do_not_overlap(self):
+        from .layout import pack_pages
+
+        sizes = [(4000, 3000), (3000, 4000), (800, 2000), (6000, 1000), (1000, 6000)] * 3
+        pages = pack_pages(sizes, self.A4)
+        self.assertLess(len(pages), len(sizes))
+        self.assert_within_margins(pages)
+        for page in pages:
+            for index, (x, y, width, height) in page:
+                self.assertAlmostEqual(width / height, sizes[index][0] / sizes[index][1], places=6)
+            for i, (_, a) in enumerate(page):
+                for _, b in page[i + 1:]:
+                    overlap_x = min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0])
+                    overlap_y = min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1])
+                    self.assertFalse(overlap_x > 0.01 and overlap_y > 0.01)
+
+    def test_multiple_placement_draws_fewer_pages(self):
+        import fitz
+        from PIL import Image
+        from .utils import convert_images_to_pdf
+
+        directory = tempfile.mkdtemp()
+        paths = []
+        for i in range(6):
+            path = os.path.join(directory, f'receipt_{i}.png')
+            Image.new('RGB', (300, 800), (255, 255 - i * 30, 255)).save(path)
+            paths.append(path)
+        output = convert_images_to_pdf(paths, placement='multiple', add_page_numbers=True)
+        with fitz.open(stream=output.read(), filetype='pdf') as doc:
+            self.assertEqual(doc.page_count, 1)
+            self.assertEqual(len(doc[0].get_images()), 6)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='converter_tests_'), CLEANUP_IN_FLIGHT_GRACE=3600)
+class CleanupTests(TestCase):
+    def upload(self, expires_at, name='in.pdf'):
+        uploaded = UploadedFile.objects.create(original_filename=name, file_type='.pdf', expires_at=expires_at)
+        uploaded.file.save(name, ContentFile(b'%PDF-1.4 test'), save=True)
+        return uploaded
+
+    def test_purge_expired_skips_in_flight_work(self):
+        from datetime import timedelta
+        from django.core.management import call_command
+        from django.utils import timezone
+        from .cleanup import purge_expired
+
+        now = timezone.now()
+        past, future = now - timedelta(minutes=5), now + timedelta(minutes=30)
+
+        done_input = self.upload(past)
+        done = ConversionTask.objects.create(input_file=done_input, conversion_type='split_pdf',
+                                             status='completed', expires_at=past)
+        done.output_file.save('out.zip', ContentFile(b'zip'), save=True)
+        running_input = self.upload(past)
+        merge_extra = self.upload(past, 'second.pdf')
+        running = ConversionTask.objects.create(input_file=running_input, conversion_type='merge_pdf',
+                                                status='processing', expires_at=past,
+                                                extra_data={'merged_files': [str(merge_extra.id)]})
+        abandoned = ConversionTask.objects.create(input_file=self.upload(past), conversion_type='split_pdf',
+                                                  status='pending', expires_at=now - timedelta(hours=2))
+        fresh = self.upload(future)
+        orphan = self.upload(past)
+        paths = [done_input.file.path, done.output_file.path, orphan.file.path]
+
+        stats = purge_expired(batch_size=1, workers=2)
+
+        self.assertEqual(stats['task_rows'], 2)
+        self.assertEqual(stats['upload_rows'], 3)
+        self.assertEqual(stats['files'], 4)
+        self.assertEqual(set(ConversionTask.objects.values_list('id', flat=True)), {running.id})
+        self.assertFalse(ConversionTask.objects.filter(id=abandoned.id).exists())
+        self.assertEqual(set(UploadedFile.objects.values_list('id', flat=True)),
+                         {running_input.id, merge_extra.id, fresh.id})
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+        self.assertTrue(os.path.exists(fresh.file.path))
+
+        out = io.StringIO()
+        call_command('cleanup_expired', stdout=out)
+        self.assertIn('0 tasks, 0 uploads', out.getvalue())
+
+    def test_purge_expired_removes_abandoned_chunked_uploads(self):
+        from datetime import timedelta
+        from django.core.files.storage import default_storage
+        from django.utils import timezone
+        from . import resumable
+        from .cleanup import purge_expired
+        from .models import UploadSession
+
+        abandoned = resumable.create('doc.pdf', 1000)
+        active = resumable.create('doc.pdf', 1000)
+        UploadSession.objects.filter(id=abandoned.id).update(expires_at=timezone.now() - timedelta(minutes=1))
+
+        stats = purge_expired()
+
+        self.assertEqual(stats['session_rows'], 1)
+        self.assertEqual(list(UploadSession.objects.values_list('id', flat=True)), [active.id])
+        self.assertFalse(os.path.exists(default_storage.path(abandoned.staging_name)))
+        self.assertTrue(os.path.exists(default_storage.path(active.staging_name)))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='converter_tests_'), CONVERSION_QUEUE_BACKEND='eager',
+                   METRICS_ENABLED=True, METRICS_TOKEN='')
+class MetricsTests(TestCase):
+    def sample(self, name, **labels):
+        from prometheus_client import REGISTRY
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_conversion_and_request_are_recorded(self):
+        labels = {'conversion_type': 'split_pdf'}
+        count = self.sample('conversion_duration_seconds_count', outcome='converted', **labels)
+        pages = self.sample('conversion_pages_sum', **labels)
+        requests = self.sample('http_request_duration_seconds_count', view='split_pdf', method='POST', status='302')
+
+        upload = SimpleUploadedFile('doc.pdf', make_pdf_bytes(3), content_type='application/pdf')
+        self.client.post(reverse('split_pdf'), {'file': upload, 'split_type': 'range', 'pages': '1-2'})
+
+        self.assertEqual(self.sample('conversion_duration_seconds_count', outcome='converted', **labels), count + 1)
+        self.assertEqual(self.sample('conversion_pages_sum', **labels), pages + 3)
+        self.assertGreater(self.sample('conversion_input_bytes_sum', **labels), 0)
+        self.assertEqual(self.sample('http_request_duration_seconds_count', view='split_pdf', method='POST',
+                                     status='302'), requests + 1)
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'conversion_queue_depth 0.0', response.content)
+        self.assertIn(b'conversion_failures_total', response.content)
+
+    def test_endpoint_is_restricted(self):
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='203.0.113.7').status_code, 403)
+        with override_settings(METRICS_TOKEN='s3cret'):
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+            response = self.client.get('/metrics', REMOTE_ADDR='203.0.113.7', HTTP_AUTHORIZATION='Bearer s3cret')
+            self.assertEqual(response.status_code, 200)
+        with override_settings(METRICS_ENABLED=False):
+            self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+    def test_multiprocess_values_are_summed(self):
+        import sys
+        import subprocess
+        from django.conf import settings
+        from prometheus_client import CollectorRegistry, multiprocess
+
+        metrics_dir = tempfile.mkdtemp(prefix='metrics_')
+        script = (
+            "import os; os.environ['DJANGO_SETTINGS_MODULE'] = 'core.settings'; "
+            "import django; django.setup(); from converter import metrics; "
+            "metrics.CONVERSION_FAILURES.labels('merge_pdf', 'ValueError').inc()"
+        )
+        env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=metrics_dir)
+        for _ in range(2):
+            subprocess.run([sys.executable, '-c', script], cwd=settings.BASE_DIR, env=env,
+                           capture_output=True, check=True)
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=metrics_dir)
+        self.assertEqual(registry.get_sample_value(
+            'conversion_failures_total', {'conversion_type': 'merge_pdf', 'error': 'ValueError'}), 2)
@@ -0,0 +1,115 @@
+"""
+Streaming text extraction for PDF to TXT/RTF conversion.
+
+Pages are extracted one at a time with PyMuPDF and written straight to the
+output file, so memory stays bounded by a single page of text. PyPDF2 is
+kept as a fallback when PyMuPDF is unavailable or cannot open the file.
+"""
+import re
+import logging
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+RTF_HEADER = r"{\rtf1\ansi\deff0 {\fonttbl {\f0 Times New Roman;}}\f0\fs24 "
+RTF_FOOTER = "}"
+RTF_ESCAPES = str.maketrans({'\\': '\\\\', '{': '\\{', '}': '\\}', '\n': '\\par '})
+NON_ASCII = re.compile(r'[^\x00-\x7f]')
+
+
+def _iter_pages_pymupdf(pdf_path, progress=None):
+    import fitz
+
+    with fitz.open(pdf_path) as doc:
+        for number, page in enumerate(doc, 1):
+            yield page.get_text()
+            if progress:
+                progress(number, doc.page_count, 'extracting')
+
+
+def _iter_pages_pypdf2(pdf_path, progress=None):
+    import PyPDF2
+
+    with open(pdf_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        total = len(pdf_reader.pages)
+        for number, page in enumerate(pdf_reader.pages, 1):
+            yield page.extract_text() or ''
+            if progress:
+                progress(number, total, 'extracting')
+
+
+def iter_page_text(pdf_path, progress=None):
+    """
+    Yield the text of each page in order
+
+    progress(done, total, stage) is called after each page.
+    """
+    try:
+        pages = _iter_pages_pymupdf(pdf_path, progress)
+        first = next(pages, None)
+    except Exception as e:
+        # ImportError or a file PyMuPDF refuses to open
+        logger.warning(f"PyMuPDF text extraction unavailable, using PyPDF2: {str(e)}")
+        yield from _iter_pages_pypdf2(pdf_path, progress)
+        return
+
+    if first is None:
+        return
+    yield first
+    yield from pages
+
+
+def _rtf_unicode(match):
+    # RTF wants signed 16-bit code units; astral characters become surrogate pairs
+    encoded = match.group().encode('utf-16-le')
+    return ''.join(
+        f"\\u{int.from_bytes(encoded[i:i + 2], 'little', signed=True)}?"
+        for i in range(0, len(encoded), 2)
+    )
+
+
+def rtf_escape(text):
+    """Escape text for an RTF body, encoding non-ASCII as \\uN? sequences."""
+    text = text.translate(RTF_ESCAPES)
+    if not text.isascii():
+        text = NON_ASCII.sub(_rtf_unicode, text)
+    return text
+
+
+def write_text(pdf_path, output, progress=None):
+    """
+    Stream page text into a binary file object as UTF-8
+    """
+    for text in iter_page_text(pdf_path, progress):
+        output.write(text.encode('utf-8'))
+        output.write(b"\n\n")
+    return output
+
+
+def write_rtf(pdf_path, output, progress=None):
+    """
+    Stream page text into a binary file object as a simple RTF document
+    """
+    output.write(RTF_HEADER.encode('ascii'))
+    for text in iter_page_text(pdf_path, progress):
+        output.write(rtf_escape(text + "\n\n").encode('ascii'))
+    output.write(RTF_FOOTER.encode('ascii'))
+    return output
+
+
+def extract_to_tempfile(pdf_path, output_format='txt', progress=None):
+    """
+    Extract text into an anonymous temp file and return it rewound
+    """
+    output = tempfile.TemporaryFile()
+    try:
+        if output_format == 'rtf':
+            write_rtf(pdf_path, output, progress)
+        else:
+            write_text(pdf_path, output, progress)
+    except Exception:
+        output.close()
+        raise
+    output.seek(0)
+    return output
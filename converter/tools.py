@@ -0,0 +1,69 @@
+"""
+Registry of the conversion tools shown in navigation and on the home page.
+
+Kept free of conversion libraries: home.context_processors calls
+get_all_tools on every page render.
+"""
+
+
+def get_all_tools():
+    """Return a list of all available conversion tools."""
+    tools = [
+        {
+            'name': 'PDF to Word',
+            'description': 'Convert PDF files to editable Word documents',
+            'url': 'pdf_to_word',  # Changed from 'pdf-to-word' to 'pdf_to_word'
+            'icon': 'fa-file-word',
+            'color': 'blue'
+        },
+        {
+            'name': 'Word to PDF',
+            'description': 'Convert Word documents to PDF format',
+            'url': 'word_to_pdf',  # Changed from 'word-to-pdf' to 'word_to_pdf'
+            'icon': 'fa-file-pdf',
+            'color': 'red'
+        },
+        {
+            'name': 'Merge PDF',
+            'description': 'Combine multiple PDF files into one',
+            'url': 'merge_pdf',  # Changed from 'merge-pdf' to 'merge_pdf'
+            'icon': 'fa-copy',
+            'color': 'purple'
+        },
+        {
+            'name': 'Split PDF',
+            'description': 'Split PDF into multiple files or extract pages',
+            'url': 'split_pdf',  # Changed from 'split-pdf' to 'split_pdf'
+            'icon': 'fa-cut',
+            'color': 'green'
+        },
+        {
+            'name': 'PDF to Image',
+            'description': 'Export every PDF page as a JPG or PNG image',
+            'url': 'pdf_to_image',
+            'icon': 'fa-file-image',
+            'color': 'orange'
+        },
+        {
+            'name': 'Compress PDF',
+            'description': 'Reduce PDF file size without losing quality',
+            'url': 'compress_pdf',  # Changed from 'compress-pdf' to 'compress_pdf'
+            'icon': 'fa-compress',
+            'color': 'yellow'
+        },
+        {
+            'name': 'Excel to PDF',
+            'description': 'Convert Excel spreadsheets to PDF',
+            'url': 'excel_to_pdf',  # Changed from 'excel-to-pdf' to 'excel_to_pdf'
+            'icon': 'fa-file-excel',
+            'color': 'green'
+        },
+        {
+            'name': 'Image to PDF',
+            'description': 'Convert images to PDF documents',
+            'url': 'image_to_pdf',  # Changed from 'image-to-pdf' to 'image_to_pdf'
+            'icon': 'fa-image',
+            'color': 'pink'
+        },
+    ]
+    return tools
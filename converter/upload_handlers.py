@@ -0,0 +1,168 @@
+"""
+Single-pass upload handling.
+
+SecureUploadHandler validates each uploaded file while Django streams it
+from the request: the MIME type is sniffed from the first bytes, the
+SHA-256 is updated chunk by chunk, the per-category size limit is enforced
+as soon as it is crossed, and the bytes are written straight to their final
+path under MEDIA_ROOT/uploads/. Memory use is bounded by the chunk size and
+handle_file_upload only has to create the database row.
+"""
+import os
+import hashlib
+import logging
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+
+from .models import upload_to
+from .security import SecureFileValidator
+
+logger = logging.getLogger(__name__)
+
+
+class StreamedUploadedFile(UploadedFile):
+    """
+    A file already stored at its final location, plus its validation result
+
+    Unless claim() is called (handle_file_upload does), the stored file is
+    removed when Django closes the request's files.
+    """
+
+    def __init__(self, storage_name, path, name, content_type, size, charset,
+                 content_type_extra, validation_result):
+        file = open(path, 'rb') if path else None
+        super().__init__(file, name, content_type, size, charset, content_type_extra)
+        self.storage_name = storage_name
+        self.path = path
+        self.validation_result = validation_result
+        self.claimed = False
+
+    def temporary_file_path(self):
+        return self.path
+
+    def claim(self):
+        """Keep the stored file after the request finishes."""
+        self.claimed = True
+
+    def open(self, mode=None):
+        if self.file is None:
+            raise ValueError("The file was rejected during upload.")
+        return super().open(mode)
+
+    def chunks(self, chunk_size=None):
+        if self.file is None:
+            return iter(())
+        return super().chunks(chunk_size)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+        if self.path and not self.claimed:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                # Moved by storage.save() or cleaned up already
+                pass
+
+
+class SecureUploadHandler(FileUploadHandler):
+    """
+    Validate, hash and store uploads in one streaming pass
+    """
+    validator = SecureFileValidator
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.head = b''
+        self.category = None
+        self.mime_type = None
+        self.errors = self.validator.check_extension(self.file_name)
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.output = None
+
+        self.storage_name = default_storage.get_available_name(upload_to(None, self.file_name))
+        self.path = default_storage.path(self.storage_name)
+        if not self.errors:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.output = open(self.path, 'xb')
+
+    def _reject(self, error):
+        self.errors.append(error)
+        logger.warning(f"Upload rejected while streaming: {self.file_name}: {error}")
+        if self.output is not None:
+            self.output.close()
+            self.output = None
+            os.remove(self.path)
+
+    def _sniff(self):
+        mime_type = self.validator.detect_mime_type(self.head, self.file_name)
+        if not mime_type:
+            self._reject("Unable to determine file type")
+            return
+        category, errors = self.validator.check_type(self.file_name, mime_type)
+        if errors:
+            self._reject(errors[0])
+            return
+        self.mime_type = mime_type
+        self.category = category
+
+    def receive_data_chunk(self, raw_data, start):
+        self.size += len(raw_data)
+        if self.errors:
+            # Keep counting so the form sees the real size, but store nothing
+            return None
+
+        if self.category is None:
+            self.head += raw_data[:self.validator.SNIFF_BYTES - len(self.head)]
+            if len(self.head) >= self.validator.SNIFF_BYTES:
+                self._sniff()
+
+        if self.category is not None:
+            error = self.validator.size_error(self.category, self.size)
+            if error:
+                self._reject(error)
+
+        if not self.errors:
+            self.digest.update(raw_data)
+            self.output.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if not self.errors and self.category is None:
+            # Shorter than the sniff window
+            self._sniff()
+
+        if self.errors:
+            validation_result = {'is_valid': False, 'errors': self.errors}
+            path = None
+        else:
+            self.output.close()
+            if settings.FILE_UPLOAD_PERMISSIONS is not None:
+                os.chmod(self.path, settings.FILE_UPLOAD_PERMISSIONS)
+            validation_result = self.validator.valid_result(
+                self.file_name, self.mime_type, self.category, self.digest.hexdigest()
+            )
+            path = self.path
+
+        return StreamedUploadedFile(
+            storage_name=self.storage_name,
+            path=path,
+            name=self.file_name,
+            content_type=self.content_type,
+            size=self.size,
+            charset=self.charset,
+            content_type_extra=self.content_type_extra,
+            validation_result=validation_result,
+        )
+
+    def upload_interrupted(self):
+        if self.output is not None:
+            self.output.close()
+            self.output = None
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
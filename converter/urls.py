@@ -8,9 +8,21 @@ urlpatterns = [
     path('word-to-pdf/', views.word_to_pdf, name='word_to_pdf'),
     path('merge-pdf/', views.merge_pdf, name='merge_pdf'),
     path('split-pdf/', views.split_pdf, name='split_pdf'),
+    path('pdf-to-image/', views.pdf_to_image, name='pdf_to_image'),
     path('compress-pdf/', views.compress_pdf_view, name='compress_pdf'),  # Keep this as compress_pdf
     path('excel-to-pdf/', views.excel_to_pdf, name='excel_to_pdf'),
     path('image-to-pdf/', views.image_to_pdf, name='image_to_pdf'),
     path('download/<uuid:task_id>/', views.download_file, name='download_file'),
+    path('result/<uuid:task_id>/', views.conversion_result, name='conversion_result'),
+    # Streamed by core/asgi.py under ASGI; the view is the WSGI fallback
+    path('tasks/<uuid:task_id>/events', views.task_events, name='task_events'),
+    # Page thumbnails (converter/thumbnails.py)
+    path('preview/', views.pdf_preview, name='pdf_preview'),
+    path('files/<uuid:file_id>/thumbnails', views.file_thumbnails, name='file_thumbnails'),
+    path('files/<uuid:file_id>/pages/<int:page>/thumbnail', views.file_page_thumbnail, name='file_page_thumbnail'),
+    path('tasks/<uuid:task_id>/thumbnails', views.task_thumbnails, name='task_thumbnails'),
+    # Resumable chunked uploads (converter/resumable.py)
+    path('uploads/', views.upload_sessions, name='upload_sessions'),
+    path('uploads/<uuid:upload_id>', views.upload_session, name='upload_session'),
     
 ]
\ No newline at end of file
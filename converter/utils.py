@@ -1,22 +1,42 @@
 # converter/utils.py
+"""
+Conversion functions run by converter.tasks.
+
+This module is imported by every web worker (views use handle_file_upload),
+so conversion libraries (pandas, PyPDF2, reportlab, PIL, python-docx, ...)
+are imported inside the functions that use them, on the first conversion.
+The tool registry lives in converter.tools.
+"""
 import os
 import io
+import logging
 import tempfile
-import zipfile  # <-- ADD THIS IMPORT
-import PyPDF2
-from pdf2docx import Converter
-from docx import Document
-from PIL import Image
-import pandas as pd
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter, A4, A5, legal
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
-from reportlab.pdfgen import canvas
+from django.conf import settings
 from django.core.files.base import ContentFile
 from django.utils import timezone
 
+from .text_extract import extract_to_tempfile
+from .split import write_split_zip, range_parts, every_parts, custom_parts
+
+logger = logging.getLogger(__name__)
+
+def _convert_pdf_to_docx_stream(pdf_path, progress=None):
+    """Convert PDF to DOCX in memory using the configured worker pool."""
+    from .docx_parallel import convert_pdf_to_docx_parallel
+
+    docx_stream = io.BytesIO()
+    convert_pdf_to_docx_parallel(
+        pdf_path,
+        docx_stream,
+        workers=getattr(settings, 'PDF_TO_WORD_WORKERS', 1),
+        chunk_size=getattr(settings, 'PDF_TO_WORD_CHUNK_SIZE', 25),
+        progress=progress,
+    )
+    docx_stream.seek(0)
+    return docx_stream
+
 def convert_pdf_to_word(pdf_path, output_format='docx', preserve_layout=True, 
-                       use_ocr=False, extract_text_only=False):
+                       use_ocr=False, extract_text_only=False, progress=None):
     """
     Convert PDF to Word with formatting options
     
@@ -26,188 +46,62 @@ def convert_pdf_to_word(pdf_path, output_format='docx', preserve_layout=True,
         preserve_layout: Keep original layout
         use_ocr: Use OCR for scanned documents
         extract_text_only: Extract only text, no images/tables
+        progress: Optional progress(done, total, stage) callback
     """
     try:
         # For DOCX format (recommended)
         if output_format == 'docx':
-            # Create a temporary file for the docx output
-            docx_stream = io.BytesIO()
-            
-            # Convert PDF to DOCX
-            cv = Converter(pdf_path)
-            
-            if preserve_layout:
-                # Try to preserve layout
-                cv.convert(docx_stream, start=0, end=None)
-            else:
-                # Simple conversion
-                cv.convert(docx_stream)
-            
-            cv.close()
-            docx_stream.seek(0)
-            return docx_stream
+            # Convert PDF to DOCX (page chunks run in parallel for large files)
+            return _convert_pdf_to_docx_stream(pdf_path, progress)
         
-        # For TXT format (text only)
+        # For TXT format (text only) - streamed page by page to a temp file
         elif output_format == 'txt':
-            text = ""
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page_num in range(len(pdf_reader.pages)):
-                    page = pdf_reader.pages[page_num]
-                    text += page.extract_text() + "\n\n"
-            
-            # Return as BytesIO
-            return io.BytesIO(text.encode('utf-8'))
+            return extract_to_tempfile(pdf_path, 'txt', progress)
         
         # For DOC format (older Word format)
         elif output_format == 'doc':
-            # Convert to DOCX first
-            docx_stream = io.BytesIO()
-            cv = Converter(pdf_path)
-            cv.convert(docx_stream)
-            cv.close()
-            docx_stream.seek(0)
-            
             # For now, return as DOCX since .doc is tricky
-            return docx_stream
+            return _convert_pdf_to_docx_stream(pdf_path, progress)
         
         # For RTF format
         elif output_format == 'rtf':
-            # Convert PDF to text first, then format as RTF
-            text = ""
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page_num in range(len(pdf_reader.pages)):
-                    page = pdf_reader.pages[page_num]
-                    text += page.extract_text() + "\n\n"
-            
-            # Create simple RTF header and content
-            rtf_content = r"{\rtf1\ansi\deff0 {\fonttbl {\f0 Times New Roman;}}\f0\fs24 "
-            rtf_content += text.replace('\n', '\\par ')
-            rtf_content += "}"
-            
-            return io.BytesIO(rtf_content.encode('utf-8'))
+            return extract_to_tempfile(pdf_path, 'rtf', progress)
         
         # Default to DOCX
         else:
-            docx_stream = io.BytesIO()
-            cv = Converter(pdf_path)
-            cv.convert(docx_stream)
-            cv.close()
-            docx_stream.seek(0)
-            return docx_stream
+            return _convert_pdf_to_docx_stream(pdf_path, progress)
             
     except Exception as e:
         # Fallback: Extract text only
         try:
-            text = ""
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page_num in range(len(pdf_reader.pages)):
-                    page = pdf_reader.pages[page_num]
-                    text += page.extract_text() + "\n\n"
-            
-            return io.BytesIO(text.encode('utf-8'))
+            return extract_to_tempfile(pdf_path, 'txt', progress)
         except:
             raise Exception(f"Conversion error: {str(e)}")
 
-def convert_word_to_pdf(word_path):
-    """Convert Word document to PDF - Linux compatible version."""
+def convert_word_to_pdf(word_path, progress=None):
+    """
+    Convert Word document to PDF - Linux compatible version.
+
+    LibreOffice renders it when enabled for word_to_pdf (converter.office_pool);
+    otherwise the body is streamed in document order by converter.word_render.
+    The result is a temp file; documents neither can read fall back to plain text.
+    """
     try:
-        # Try using python-docx and reportlab for Linux compatibility
-        from docx import Document
-        from reportlab.lib.pagesizes import letter
-        from reportlab.pdfgen import canvas
-        from reportlab.lib.styles import getSampleStyleSheet
-        from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
-        
-        # Read Word document
-        doc = Document(word_path)
-        
-        # Create PDF buffer
-        pdf_buffer = io.BytesIO()
-        
-        # Create PDF document
-        pdf_doc = SimpleDocTemplate(
-            pdf_buffer,
-            pagesize=letter,
-            rightMargin=72,
-            leftMargin=72,
-            topMargin=72,
-            bottomMargin=72
-        )
-        
-        # Extract content from Word
-        story = []
-        styles = getSampleStyleSheet()
-        
-        # Process each paragraph
-        for paragraph in doc.paragraphs:
-            if paragraph.text.strip():  # Skip empty paragraphs
-                # Preserve some formatting
-                text = paragraph.text
-                
-                # Check for heading styles
-                if paragraph.style.name.startswith('Heading'):
-                    style = styles['Heading1'] if 'Heading1' in paragraph.style.name else styles['Heading2']
-                else:
-                    style = styles['Normal']
-                
-                story.append(Paragraph(text, style))
-                story.append(Spacer(1, 12))
-        
-        # Process tables
-        for table in doc.tables:
-            table_data = []
-            for row in table.rows:
-                row_data = []
-                for cell in row.cells:
-                    row_data.append(cell.text)
-                table_data.append(row_data)
-            
-            if table_data:
-                from reportlab.platypus import Table, TableStyle
-                from reportlab.lib import colors
-                
-                pdf_table = Table(table_data)
-                pdf_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, 0), 14),
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black)
-                ]))
-                story.append(pdf_table)
-                story.append(Spacer(1, 20))
-        
-        # Build PDF
-        if story:
-            pdf_doc.build(story)
-        else:
-            # Fallback: create simple PDF with text
-            c = canvas.Canvas(pdf_buffer, pagesize=letter)
-            y = 750
-            
-            for paragraph in doc.paragraphs:
-                if paragraph.text.strip():
-                    if y < 50:
-                        c.showPage()
-                        y = 750
-                    
-                    c.drawString(50, y, paragraph.text[:100])
-                    y -= 20
-            
-            c.save()
-        
-        pdf_buffer.seek(0)
-        return pdf_buffer
-        
+        from .office_pool import convert_with_office
+        from .word_render import render_document
+
+        result = convert_with_office('word_to_pdf', word_path)
+        if result is not None:
+            return result
+
+        return render_document(word_path, progress=progress)
+
     except Exception as e:
         # Fallback: create a very basic PDF
         try:
+            from reportlab.lib.pagesizes import letter
+            from reportlab.pdfgen import canvas
+
             pdf_buffer = io.BytesIO()
             c = canvas.Canvas(pdf_buffer, pagesize=letter)
             
@@ -234,29 +128,39 @@ def convert_word_to_pdf(word_path):
         except Exception as fallback_error:
             raise Exception(f"Word to PDF conversion failed: {str(fallback_error)}")
 
-def merge_pdfs(pdf_paths):
-    """Merge multiple PDFs into one - Render compatible."""
+def merge_pdfs(pdf_paths, progress=None):
+    """
+    Merge multiple PDFs into one.
+
+    Inputs are read from disk by converter.merge and the result is a temp
+    file; PyPDF2 is only used when PyMuPDF is not installed.
+    """
     try:
-        merger = PyPDF2.PdfMerger()
-        
         for pdf_path in pdf_paths:
             # Check if file exists
             if not os.path.exists(pdf_path):
                 raise FileNotFoundError(f"PDF file not found: {pdf_path}")
-            
-            # Read file content first to avoid path issues
-            with open(pdf_path, 'rb') as file:
-                pdf_data = io.BytesIO(file.read())
-                pdf_data.seek(0)
-                merger.append(pdf_data)
-        
-        output_stream = io.BytesIO()
+
+        try:
+            import fitz  # noqa: F401
+        except ImportError:
+            fitz = None
+        if fitz is not None:
+            from .merge import merge_pdf_files
+            return merge_pdf_files(pdf_paths, progress=progress)
+
+        import PyPDF2
+        merger = PyPDF2.PdfMerger()
+        for pdf_path in pdf_paths:
+            merger.append(pdf_path)
+
+        output_stream = tempfile.TemporaryFile()
         merger.write(output_stream)
         merger.close()
-        
+
         output_stream.seek(0)
         return output_stream
-        
+
     except Exception as e:
         raise Exception(f"PDF merge failed: {str(e)}")
 
@@ -285,6 +189,7 @@ def split_pdf(pdf_path, pages):
             pages_to_extract = [int(pages) - 1]
         
         # Extract pages
+        import PyPDF2
         pdf_reader = PyPDF2.PdfReader(pdf_path)
         pdf_writer = PyPDF2.PdfWriter()
         
@@ -301,114 +206,43 @@ def split_pdf(pdf_path, pages):
     except Exception as e:
         raise Exception(f"PDF split failed: {str(e)}")
 
-def split_pdf_by_range(pdf_path, pages):
+def split_pdf_by_range(pdf_path, pages, progress=None):
     """Split PDF by specific page ranges."""
     # Parse page ranges
     pages_to_extract = parse_page_ranges(pages)
-    
-    # Read PDF
-    pdf_reader = PyPDF2.PdfReader(pdf_path)
-    total_pages = len(pdf_reader.pages)
-    
-    # Create zip file in memory
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        for i, page_range in enumerate(pages_to_extract):
-            pdf_writer = PyPDF2.PdfWriter()
-            
-            # Adjust for 0-indexed pages
-            start = max(0, page_range['start'] - 1)
-            end = min(total_pages, page_range['end'])
-            
-            for page_num in range(start, end):
-                pdf_writer.add_page(pdf_reader.pages[page_num])
-            
-            # Create PDF in memory
-            pdf_buffer = io.BytesIO()
-            pdf_writer.write(pdf_buffer)
-            pdf_buffer.seek(0)
-            
-            filename = f"part_{i+1}_pages_{page_range['start']}-{page_range['end']}.pdf"
-            zip_file.writestr(filename, pdf_buffer.read())
-    
-    zip_buffer.seek(0)
-    return zip_buffer
+    return write_split_zip(pdf_path, lambda total: range_parts(pages_to_extract, total), progress=progress)
 
-def split_pdf_every_page(pdf_path, split_every=1):
+def split_pdf_every_page(pdf_path, split_every=1, progress=None):
     """Split PDF into files with specified number of pages each."""
-    pdf_reader = PyPDF2.PdfReader(pdf_path)
-    total_pages = len(pdf_reader.pages)
-    
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        part_num = 1
-        for start in range(0, total_pages, split_every):
-            pdf_writer = PyPDF2.PdfWriter()
-            end = min(start + split_every, total_pages)
-            
-            for page_num in range(start, end):
-                pdf_writer.add_page(pdf_reader.pages[page_num])
-            
-            pdf_buffer = io.BytesIO()
-            pdf_writer.write(pdf_buffer)
-            pdf_buffer.seek(0)
-            
-            filename = f"part_{part_num}_pages_{start+1}-{end}.pdf"
-            zip_file.writestr(filename, pdf_buffer.read())
-            part_num += 1
-    
-    zip_buffer.seek(0)
-    return zip_buffer
+    return write_split_zip(
+        pdf_path, lambda total: every_parts(total, split_every),
+        workers=getattr(settings, 'SPLIT_WORKERS', 1),
+        min_parallel_parts=getattr(settings, 'SPLIT_PARALLEL_MIN_PARTS', 0),
+        progress=progress,
+    )
 
-def split_pdf_by_count(pdf_path, pages_per_file=10):
+def split_pdf_by_count(pdf_path, pages_per_file=10, progress=None):
     """Split PDF by number of pages per file."""
-    return split_pdf_every_page(pdf_path, pages_per_file)
+    return split_pdf_every_page(pdf_path, pages_per_file, progress)
 
-def split_pdf_custom(pdf_path, split_points):
+def split_pdf_custom(pdf_path, split_points, progress=None):
     """Split PDF at custom split points."""
     # Parse split points
     points = [int(p.strip()) for p in split_points.split(',') if p.strip().isdigit()]
-    points = sorted(set(points))
-    
-    pdf_reader = PyPDF2.PdfReader(pdf_path)
-    total_pages = len(pdf_reader.pages)
-    
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        start = 0
-        part_num = 1
-        
-        for split_point in points:
-            if split_point > start and split_point <= total_pages:
-                pdf_writer = PyPDF2.PdfWriter()
-                for page_num in range(start, split_point):
-                    pdf_writer.add_page(pdf_reader.pages[page_num])
-                
-                pdf_buffer = io.BytesIO()
-                pdf_writer.write(pdf_buffer)
-                pdf_buffer.seek(0)
-                
-                filename = f"part_{part_num}_pages_{start+1}-{split_point}.pdf"
-                zip_file.writestr(filename, pdf_buffer.read())
-                
-                start = split_point
-                part_num += 1
-        
-        # Add remaining pages
-        if start < total_pages:
-            pdf_writer = PyPDF2.PdfWriter()
-            for page_num in range(start, total_pages):
-                pdf_writer.add_page(pdf_reader.pages[page_num])
-            
-            pdf_buffer = io.BytesIO()
-            pdf_writer.write(pdf_buffer)
-            pdf_buffer.seek(0)
-            
-            filename = f"part_{part_num}_pages_{start+1}-{total_pages}.pdf"
-            zip_file.writestr(filename, pdf_buffer.read())
-    
-    zip_buffer.seek(0)
-    return zip_buffer
+    return write_split_zip(pdf_path, lambda total: custom_parts(points, total), progress=progress)
+
+def convert_pdf_to_images(pdf_path, image_format='jpeg', dpi=150, quality=85, progress=None):
+    """Rasterize every page of a PDF into a ZIP of JPEG or PNG images."""
+    from .rasterize import write_images_zip
+
+    dpi = max(36, min(getattr(settings, 'PDF_TO_IMAGE_MAX_DPI', 300), int(dpi)))
+    return write_images_zip(
+        pdf_path, image_format, dpi, int(quality),
+        max_pixels=getattr(settings, 'PDF_TO_IMAGE_MAX_PIXELS', None),
+        workers=getattr(settings, 'PDF_TO_IMAGE_WORKERS', 1),
+        min_parallel_pages=getattr(settings, 'PDF_TO_IMAGE_PARALLEL_MIN_PAGES', 0),
+        progress=progress,
+    )
 
 def parse_page_ranges(pages_str):
     """Parse page range string like '1-3, 5, 7-10'."""
@@ -518,43 +352,26 @@ def compress_pdf_with_pypdf2(input_path, compression_level='medium',
 
 def compress_pdf_with_pikepdf(input_path, compression_level='medium',
                             optimize_images=True, optimize_fonts=False,
-                            remove_metadata=False):
+                            remove_metadata=False, progress=None):
     """
     Better compression using pikepdf library.
+
+    Images are downsampled and re-encoded by converter.compression; the
+    result is a temp file, not an in-memory copy.
     """
     try:
-        import pikepdf
-        
-        # Open the PDF
-        pdf = pikepdf.open(input_path)
-        
-        # Apply compression based on level
-        if compression_level != 'low':
-            # Save with compression (pikepdf automatically applies some compression)
-            output = ContentFile(b'', name='compressed.pdf')
-            pdf.save(output, compress_streams=True)
-            output.seek(0)
-            
-            # Additional optimizations
-            if optimize_images:
-                # pikepdf doesn't have direct image optimization
-                # You might need additional libraries for this
-                pass
-                
-            if remove_metadata:
-                # Remove metadata
-                with pikepdf.open(output) as pdf_without_metadata:
-                    if '/Metadata' in pdf_without_metadata.Root:
-                        del pdf_without_metadata.Root.Metadata
-                    pdf_without_metadata.save(output, compress_streams=True)
-                    output.seek(0)
-                    
-            return output
-        else:
-            # For low compression, just return a copy
-            with open(input_path, 'rb') as f:
-                return ContentFile(f.read(), name='compressed.pdf')
-                
+        import pikepdf  # noqa: F401
+        from .compression import compress_pdf_file
+
+        return compress_pdf_file(
+            input_path,
+            compression_level=compression_level,
+            optimize_images=optimize_images,
+            downsample_images=optimize_images,
+            remove_metadata=remove_metadata,
+            progress=progress,
+        )
+
     except ImportError:
         # pikepdf not installed, fall back to PyPDF2
         return compress_pdf_with_pypdf2(input_path, compression_level,
@@ -576,6 +393,19 @@ def compress_pdf_advanced(pdf_path, compression_level='medium',
         remove_metadata: Remove document metadata
         downsample_images: Reduce image resolution
     """
+    try:
+        from .compression import compress_pdf_file
+        return compress_pdf_file(
+            pdf_path,
+            compression_level=compression_level,
+            optimize_images=optimize_images,
+            downsample_images=downsample_images,
+            remove_metadata=remove_metadata,
+        )
+    except ImportError:
+        # pikepdf not installed, use PyPDF2 stream compression only
+        pass
+
     try:
         import PyPDF2
         import io
@@ -615,14 +445,6 @@ def compress_pdf_advanced(pdf_path, compression_level='medium',
             if '/Metadata' in pdf_writer._root_object:
                 del pdf_writer._root_object['/Metadata']
         
-        if downsample_images:
-            # Downsample images (simplified - in production use proper image processing)
-            for page in pdf_writer.pages:
-                if hasattr(page, 'images'):
-                    for image in page.images:
-                        # This is a placeholder - actual downsampling would require PIL
-                        pass
-        
         # Write to output stream
         output_stream = io.BytesIO()
         pdf_writer.write(output_stream)
@@ -633,6 +455,9 @@ def compress_pdf_advanced(pdf_path, compression_level='medium',
     except Exception as e:
         # Fallback to basic compression
         try:
+            import PyPDF2
+            import io
+
             pdf_reader = PyPDF2.PdfReader(pdf_path)
             pdf_writer = PyPDF2.PdfWriter()
             
@@ -651,95 +476,52 @@ def compress_pdf_advanced(pdf_path, compression_level='medium',
         except Exception as fallback_error:
             raise Exception(f"PDF compression failed: {str(fallback_error)}")
 
-def convert_excel_to_pdf(excel_path, include_gridlines=True, fit_to_page=True, include_headers=True):
-    """Convert Excel to PDF with options."""
+def convert_excel_to_pdf(excel_path, include_gridlines=True, fit_to_page=True, include_headers=True,
+                         worksheet_option='first', worksheet_names=None, progress=None):
+    """
+    Convert Excel to PDF with options.
+
+    Rows are streamed and paginated by converter.excel_render, or rendered
+    by LibreOffice when enabled for excel_to_pdf (converter.office_pool);
+    the sheets are chosen with worksheet_option ('first', 'active', 'all' or
+    'selection' of worksheet_names). Returns a temp file.
+    """
     try:
-        # Import reportlab components at the top of the function
-        from reportlab.lib.pagesizes import letter, landscape
-        from reportlab.lib.units import inch
-        
-        # Read Excel file
-        df = pd.read_excel(excel_path)
-        
-        # Create PDF buffer
-        pdf_buffer = io.BytesIO()
-        
-        # Configure page size based on fit_to_page option
-        if fit_to_page:
-            # Calculate required width and height
-            num_cols = len(df.columns)
-            num_rows = len(df) + 1  # +1 for header row
-            
-            # Approximate cell sizes
-            col_width = 1.5 * inch
-            row_height = 0.4 * inch
-            
-            required_width = num_cols * col_width
-            required_height = num_rows * row_height
-            
-            # Use letter size or adjust if content is too large
-            if required_width > 10*inch or required_height > 10*inch:
-                pagesize = (required_width + 2*inch, required_height + 2*inch)
-            else:
-                pagesize = letter
-        else:
-            pagesize = letter
-        
-        # Create SimpleDocTemplate with the pagesize
-        doc = SimpleDocTemplate(pdf_buffer, pagesize=pagesize)
-        
-        # Convert DataFrame to list of lists for ReportLab
-        data = [df.columns.tolist()] + df.values.tolist()
-        
-        # Create table with appropriate column widths
-        col_widths = [doc.width/len(df.columns)] * len(df.columns)
-        table = Table(data, colWidths=col_widths)
-        
-        # Add style based on options
-        style_commands = [
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4CAF50')),  # Green header
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#F9F9F9')),
-        ]
-        
-        if include_gridlines:
-            style_commands.append(('GRID', (0, 0), (-1, -1), 0.5, colors.grey))
-        else:
-            style_commands.append(('BOX', (0, 0), (-1, -1), 1, colors.black))
-        
-        style = TableStyle(style_commands)
-        table.setStyle(style)
-        
-        # Build PDF with optional headers
-        elements = []
-        
-        if include_headers:
-            # Add title
-            from reportlab.platypus import Paragraph, Spacer
-            from reportlab.lib.styles import getSampleStyleSheet
-            
-            styles = getSampleStyleSheet()
-            title = Paragraph("Excel to PDF Conversion", styles['Title'])
-            elements.append(title)
-            elements.append(Spacer(1, 20))
-        
-        elements.append(table)
-        doc.build(elements)
-        pdf_buffer.seek(0)
-        
-        return pdf_buffer
-        
+        from .excel_render import render_workbook
+        from .office_pool import convert_with_office
+
+        result = convert_with_office(
+            'excel_to_pdf', excel_path,
+            sheets=worksheet_option,
+            sheet_names=worksheet_names,
+            include_gridlines=include_gridlines,
+            fit_to_page=fit_to_page,
+            include_headers=include_headers,
+        )
+        if result is not None:
+            return result
+
+        return render_workbook(
+            excel_path,
+            sheets=worksheet_option,
+            sheet_names=worksheet_names,
+            include_gridlines=include_gridlines,
+            fit_to_page=fit_to_page,
+            include_headers=include_headers,
+            progress=progress,
+        )
+
     except Exception as e:
         raise Exception(f"Excel to PDF conversion failed: {str(e)}")
 
 def convert_images_to_pdf(image_paths, page_size='A4', orientation='portrait', 
-                         placement='fit', add_page_numbers=False):
+                         placement='fit', add_page_numbers=False, progress=None):
     """Convert images to PDF with various layout options."""
     try:
+        from reportlab.lib.pagesizes import letter, A4, A5, legal
+        from reportlab.pdfgen import canvas
+        from .image_ingest import ingest_images
+
         # Map page sizes
         size_map = {
             'A4': A4,
@@ -763,50 +545,29 @@ def convert_images_to_pdf(image_paths, page_size='A4', orientation='portrait',
         page_number = 1
         total_pages = len(image_paths)
         
-        for idx, img_path in enumerate(image_paths):
+        page_width, page_height = page_size_obj
+        # Decoded, rotated upright and scaled to the page DPI on a thread pool
+        ingest_options = {
+            'dpi': getattr(settings, 'IMAGE_TO_PDF_DPI', 150),
+            'jpeg_quality': getattr(settings, 'IMAGE_TO_PDF_JPEG_QUALITY', 85),
+            'workers': getattr(settings, 'IMAGE_TO_PDF_WORKERS', 1),
+        }
+        if placement == 'multiple':
+            _draw_images_multi_up(c, image_paths, page_size_obj, add_page_numbers, ingest_options, progress)
+            c.save()
+            pdf_buffer.seek(0)
+            return pdf_buffer
+
+        images = ingest_images(image_paths, page_size_obj, placement, **ingest_options)
+
+        for idx, (img_path, prepared) in enumerate(images):
             try:
-                # Open image
-                img = Image.open(img_path)
-                img_width, img_height = img.size
-                page_width, page_height = page_size_obj
-                
-                # Calculate scaling based on placement option
-                if placement == 'fit':
-                    # Fit to page with margins
-                    width_ratio = (page_width * 0.9) / img_width
-                    height_ratio = (page_height * 0.9) / img_height
-                    scale = min(width_ratio, height_ratio)
-                    scaled_width = img_width * scale
-                    scaled_height = img_height * scale
-                    x = (page_width - scaled_width) / 2
-                    y = (page_height - scaled_height) / 2
-                    
-                elif placement == 'full':
-                    # Full page (stretch to fill)
-                    scaled_width = page_width
-                    scaled_height = page_height
-                    x = 0
-                    y = 0
-                    
-                elif placement == 'center':
-                    # Center original size
-                    scaled_width = img_width
-                    scaled_height = img_height
-                    x = (page_width - scaled_width) / 2
-                    y = (page_height - scaled_height) / 2
-                    
-                else:  # 'multiple' or default to fit
-                    # For multiple images per page (simplified - one per page for now)
-                    width_ratio = page_width / img_width
-                    height_ratio = page_height / img_height
-                    scale = min(width_ratio, height_ratio) * 0.8
-                    scaled_width = img_width * scale
-                    scaled_height = img_height * scale
-                    x = (page_width - scaled_width) / 2
-                    y = (page_height - scaled_height) / 2
-                
+                if isinstance(prepared, Exception):
+                    raise prepared
+                x, y, scaled_width, scaled_height = prepared['box']
+
                 # Draw image on PDF
-                c.drawImage(img_path, x, y, width=scaled_width, height=scaled_height)
+                c.drawImage(prepared['image'], x, y, width=scaled_width, height=scaled_height, mask='auto')
                 
                 # Add page numbers if requested
                 if add_page_numbers:
@@ -822,9 +583,11 @@ def convert_images_to_pdf(image_paths, page_size='A4', orientation='portrait',
                 c.drawString(50, 30, f"Image: {img_name}")
                 
                 c.showPage()  # New page for next image
+                if progress:
+                    progress(idx + 1, total_pages, 'adding images')
                 
             except Exception as img_error:
-                print(f"Error processing image {img_path}: {img_error}")
+                logger.warning(f"Error processing image {img_path}: {img_error}", exc_info=True)
                 # Still create a page with error message
                 c.setFont("Helvetica", 12)
                 c.drawString(100, page_height/2, f"Error loading image: {os.path.basename(img_path)}")
@@ -839,71 +602,70 @@ def convert_images_to_pdf(image_paths, page_size='A4', orientation='portrait',
     except Exception as e:
         raise Exception(f"Image to PDF conversion failed: {str(e)}")
 
-def handle_file_upload(file, request):
+def _draw_images_multi_up(c, image_paths, page_size, add_page_numbers, ingest_options, progress=None):
+    """Draw several images per page, packed in order by converter.layout."""
+    from .image_ingest import ingest_images, oriented_size
+    from .layout import pack_pages
+
+    sizes = []
+    for img_path in image_paths:
+        try:
+            sizes.append(oriented_size(img_path))
+        except Exception:
+            # Unreadable: keep a square slot for the error message
+            sizes.append((1, 1))
+    pages = pack_pages(sizes, page_size)
+    boxes = [None] * len(image_paths)
+    page_of = [0] * len(image_paths)
+    for number, page in enumerate(pages):
+        for index, box in page:
+            boxes[index] = box
+            page_of[index] = number
+
+    current = 0
+    images = ingest_images(image_paths, page_size, 'multiple', boxes=boxes, **ingest_options)
+    for idx, (img_path, prepared) in enumerate(images):
+        while page_of[idx] > current:
+            _finish_multi_up_page(c, page_size, current, len(pages), add_page_numbers)
+            current += 1
+        x, y, width, height = boxes[idx]
+        try:
+            if isinstance(prepared, Exception):
+                raise prepared
+            c.drawImage(prepared['image'], x, y, width=width, height=height, mask='auto')
+        except Exception as img_error:
+            logger.warning(f"Error processing image {img_path}: {img_error}", exc_info=True)
+            c.setFont("Helvetica", 8)
+            c.setFillColorRGB(0.6, 0, 0)
+            c.drawString(x, y + height / 2, f"Error loading image: {os.path.basename(img_path)}"[:60])
+        if progress:
+            progress(idx + 1, len(image_paths), 'adding images')
+    if pages:
+        _finish_multi_up_page(c, page_size, current, len(pages), add_page_numbers)
+
+def _finish_multi_up_page(c, page_size, number, total_pages, add_page_numbers):
+    if add_page_numbers:
+        c.setFont("Helvetica", 10)
+        c.setFillColorRGB(0.5, 0.5, 0.5)  # Gray color
+        c.drawRightString(page_size[0] - 50, 20, f"Page {number + 1} of {total_pages}")
+    c.showPage()
+
+def handle_file_upload(file, request, file_hash=''):
     """Handle file upload and create record."""
     from .models import UploadedFile
     
     uploaded = UploadedFile.objects.create(
         original_filename=file.name,
         file_type=os.path.splitext(file.name)[1].lower(),
-        session_key=request.session.session_key or 'anonymous'
+        session_key=request.session.session_key or 'anonymous',
+        file_hash=file_hash
     )
-    uploaded.file.save(file.name, file)
+    storage_name = getattr(file, 'storage_name', None)
+    if storage_name:
+        # Already written to its final path by SecureUploadHandler
+        uploaded.file.name = storage_name
+        uploaded.save(update_fields=['file'])
+        file.claim()
+    else:
+        uploaded.file.save(file.name, file)
     return uploaded
-
-
-# In your utils.py or context_processors.py, update the get_all_tools function:
-def get_all_tools():
-    """Return a list of all available conversion tools."""
-    tools = [
-        {
-            'name': 'PDF to Word',
-            'description': 'Convert PDF files to editable Word documents',
-            'url': 'pdf_to_word',  # Changed from 'pdf-to-word' to 'pdf_to_word'
-            'icon': 'fa-file-word',
-            'color': 'blue'
-        },
-        {
-            'name': 'Word to PDF',
-            'description': 'Convert Word documents to PDF format',
-            'url': 'word_to_pdf',  # Changed from 'word-to-pdf' to 'word_to_pdf'
-            'icon': 'fa-file-pdf',
-            'color': 'red'
-        },
-        {
-            'name': 'Merge PDF',
-            'description': 'Combine multiple PDF files into one',
-            'url': 'merge_pdf',  # Changed from 'merge-pdf' to 'merge_pdf'
-            'icon': 'fa-copy',
-            'color': 'purple'
-        },
-        {
-            'name': 'Split PDF',
-            'description': 'Split PDF into multiple files or extract pages',
-            'url': 'split_pdf',  # Changed from 'split-pdf' to 'split_pdf'
-            'icon': 'fa-cut',
-            'color': 'green'
-        },
-        {
-            'name': 'Compress PDF',
-            'description': 'Reduce PDF file size without losing quality',
-            'url': 'compress_pdf',  # Changed from 'compress-pdf' to 'compress_pdf'
-            'icon': 'fa-compress',
-            'color': 'yellow'
-        },
-        {
-            'name': 'Excel to PDF',
-            'description': 'Convert Excel spreadsheets to PDF',
-            'url': 'excel_to_pdf',  # Changed from 'excel-to-pdf' to 'excel_to_pdf'
-            'icon': 'fa-file-excel',
-            'color': 'green'
-        },
-        {
-            'name': 'Image to PDF',
-            'description': 'Convert images to PDF documents',
-            'url': 'image_to_pdf',  # Changed from 'image-to-pdf' to 'image_to_pdf'
-            'icon': 'fa-image',
-            'color': 'pink'
-        },
-    ]
-    return tools
\ No newline at end of file
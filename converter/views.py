@@ -3,13 +3,14 @@ Secure views for converter app.
 """
 import os
 import uuid
+import base64
 import logging
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from django.conf import settings
 from django.shortcuts import render, redirect
-from django.core.files.base import ContentFile
-from django.http import FileResponse, HttpResponse, HttpResponseForbidden
-from django.utils import timezone
+from django.urls import reverse
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
 from django.contrib import messages
-from django.core.cache import cache
 from django.core.exceptions import ValidationError, SuspiciousOperation
 from ipware import get_client_ip
 
@@ -17,44 +18,24 @@ from .models import UploadedFile, ConversionTask
 from .forms import (
     PDFToWordForm, WordToPDFForm, MergePDFForm, 
     SplitPDFForm, CompressPDFForm, ExcelToPDFForm, 
-    ImageToPDFForm
+    ImageToPDFForm, PDFToImageForm
 )
-from .utils import (
-    handle_file_upload, convert_pdf_to_word, convert_word_to_pdf, merge_pdfs,
-    split_pdf, compress_pdf as compress_pdf_util,
-    convert_excel_to_pdf, convert_images_to_pdf,
-    split_pdf_by_range, split_pdf_custom, split_pdf_every_page, split_pdf_by_count
-)
-from .security import SecureFileValidator, AntiAbuseSystem, FilePathSecurity, create_secure_temp_file, cleanup_secure_temp
+from .utils import handle_file_upload
+from .ratelimit import rate_limit_check
+from .downloads import file_download_response
+from .events import format_event
+from .progress import snapshot
+from .tasks import enqueue_task
+from .security import SecureFileValidator, AntiAbuseSystem, FilePathSecurity
+from . import thumbnails, resumable
 
 logger = logging.getLogger(__name__)
 
-def rate_limit_check(request, operation_type: str):
-    """
-    Check rate limiting for operations
-    """
-    client_ip, _ = get_client_ip(request)
-    
-    if not client_ip:
-        return True  # Can't track, but proceed
-    
-    # Different limits for different operations
-    limits = {
-        'upload': 10,  # 10 uploads per minute
-        'conversion': 5,  # 5 conversions per minute
-        'download': 20,  # 20 downloads per minute
-    }
-    
-    limit = limits.get(operation_type, 5)
-    cache_key = f"rate_limit:{client_ip}:{operation_type}"
-    requests = cache.get(cache_key, 0)
-    
-    if requests >= limit:
-        logger.warning(f"Rate limit exceeded for IP {client_ip}, operation: {operation_type}")
-        return False
-    
-    cache.set(cache_key, requests + 1, 60)  # 1 minute window
-    return True
+# Columns read by download_file and conversion_result (and result.html)
+DOWNLOAD_FIELDS = ('id', 'status', 'output_file', 'output_hash', 'client_ip')
+RESULT_FIELDS = ('id', 'status', 'conversion_type', 'completed_at', 'client_ip', 'extra_data', 'output_file')
+# Columns read by the thumbnail views
+PREVIEW_FIELDS = ('id', 'file', 'file_type', 'session_key', 'file_hash')
 
 
 def validate_and_secure_file(file, request):
@@ -95,8 +76,8 @@ def secure_file_upload(file, request):
     if not validation_result:
         return None
     
-    # Use the existing handle_file_upload
-    uploaded = handle_file_upload(file, request)
+    # Use the existing handle_file_upload; the hash keys the result cache
+    uploaded = handle_file_upload(file, request, file_hash=validation_result['file_hash'])
     
     # Log successful upload
     logger.info(f"Secure file upload: {file.name}, size: {file.size}, "
@@ -105,6 +86,22 @@ def secure_file_upload(file, request):
     return uploaded
 
 
+def _owned_pdf(request, file_id):
+    """
+    An uploaded PDF readable by this session, or None
+
+    Uploads made without a session are reachable by their (random) id alone,
+    like task results.
+    """
+    upload = UploadedFile.objects.only(*PREVIEW_FIELDS).filter(id=file_id).first()
+    if upload is None or upload.file_type != '.pdf' or not upload.file:
+        return None
+    if upload.session_key not in ('', 'anonymous') and upload.session_key != request.session.session_key:
+        logger.warning(f"Preview of upload {file_id} from another session refused")
+        return None
+    return upload
+
+
 def pdf_to_word(request):
     """
     Secure PDF to Word conversion
@@ -123,53 +120,31 @@ def pdf_to_word(request):
                 return render(request, 'converter/pdf_to_word.html', {'form': form})
             
             try:
-                # Create task
+                output_format = request.POST.get('output_format', 'docx')
+                ext = {'docx': '.docx', 'rtf': '.rtf', 'txt': '.txt'}.get(output_format, '.doc')
+                output_filename = f"{os.path.splitext(uploaded.original_filename)[0]}_converted{ext}"
+
+                # Create task - a worker picks it up from the queue
                 task = ConversionTask.objects.create(
                     input_file=uploaded,
                     conversion_type='pdf_to_word',
-                    status='processing',
+                    status='pending',
+                    client_ip=get_client_ip(request)[0],
                     extra_data={
-                        'output_format': request.POST.get('output_format', 'docx'),
+                        'output_format': output_format,
                         'preserve_layout': request.POST.get('preserve_layout') == 'on',
                         'enhanced_ocr': request.POST.get('enhanced_ocr') == 'on',
                         'extract_text_only': request.POST.get('extract_text_only') == 'on',
-                        'client_ip': get_client_ip(request)[0],
+                        'output_filename': output_filename,
                         'user_agent': request.META.get('HTTP_USER_AGENT', 'Unknown'),
                     }
                 )
-                
-                # Process conversion
-                result = convert_pdf_to_word(
-                    uploaded.file.path,
-                    output_format=task.extra_data['output_format'],
-                    preserve_layout=task.extra_data['preserve_layout'],
-                    use_ocr=task.extra_data['enhanced_ocr'],
-                    extract_text_only=task.extra_data['extract_text_only']
-                )
-                
-                # Save output
-                ext = '.docx' if task.extra_data['output_format'] == 'docx' else '.doc'
-                output_filename = f"{os.path.splitext(uploaded.original_filename)[0]}_converted{ext}"
-                
-                task.output_file.save(output_filename, ContentFile(result.read()))
-                task.status = 'completed'
-                task.completed_at = timezone.now()
-                task.save()
-                
-                logger.info(f"PDF to Word conversion completed: {uploaded.original_filename}")
-                
-                return render(request, 'converter/result.html', {
-                    'task': task,
-                    'filename': output_filename,
-                    'format_options': task.extra_data
-                })
-                
+                enqueue_task(task)
+
+                return redirect('conversion_result', task_id=task.id)
+
             except Exception as e:
-                logger.error(f"PDF to Word conversion failed: {str(e)}", exc_info=True)
-                if 'task' in locals():
-                    task.status = 'failed'
-                    task.completed_at = timezone.now()
-                    task.save()
+                logger.error(f"Queueing PDF to Word conversion failed: {str(e)}", exc_info=True)
                 messages.error(request, 'Conversion failed. Please try again or contact support.')
     
     else:
@@ -196,37 +171,24 @@ def word_to_pdf(request):
                 return render(request, 'converter/word_to_pdf.html', {'form': form})
             
             try:
+                output_filename = f"{os.path.splitext(uploaded.original_filename)[0]}_converted.pdf"
+
                 task = ConversionTask.objects.create(
                     input_file=uploaded,
                     conversion_type='word_to_pdf',
-                    status='processing',
+                    status='pending',
+                    client_ip=get_client_ip(request)[0],
                     extra_data={
-                        'client_ip': get_client_ip(request)[0],
+                        'output_filename': output_filename,
                         'user_agent': request.META.get('HTTP_USER_AGENT', 'Unknown'),
                     }
                 )
-                
-                result = convert_word_to_pdf(uploaded.file.path)
-                output_filename = f"{os.path.splitext(uploaded.original_filename)[0]}_converted.pdf"
-                
-                task.output_file.save(output_filename, ContentFile(result.read()))
-                task.status = 'completed'
-                task.completed_at = timezone.now()
-                task.save()
-                
-                logger.info(f"Word to PDF conversion completed: {uploaded.original_filename}")
-                
-                return render(request, 'converter/result.html', {
-                    'task': task,
-                    'filename': output_filename
-                })
-                
+                enqueue_task(task)
+
+                return redirect('conversion_result', task_id=task.id)
+
             except Exception as e:
-                logger.error(f"Word to PDF conversion failed: {str(e)}", exc_info=True)
-                if 'task' in locals():
-                    task.status = 'failed'
-                    task.completed_at = timezone.now()
-                    task.save()
+                logger.error(f"Queueing Word to PDF conversion failed: {str(e)}", exc_info=True)
                 messages.error(request, 'Conversion failed. Please try again or contact support.')
     
     else:
@@ -272,58 +234,30 @@ def merge_pdf(request):
                 uploaded_files.append(uploaded)
             
             try:
-                # Get file paths - ensure they exist
-                file_paths = []
-                for uf in uploaded_files:
-                    file_path = uf.file.path
-                    if not os.path.exists(file_path):
-                        raise FileNotFoundError(f"Uploaded file missing: {file_path}")
-                    file_paths.append(file_path)
-                
-                # Debug logging
-                logger.info(f"Merging {len(file_paths)} PDFs: {[os.path.basename(p) for p in file_paths]}")
-                
-                # Merge PDFs
-                result = merge_pdfs(file_paths)
-                
                 output_filename = f"merged_{uuid.uuid4().hex[:8]}.pdf"
-                
+
                 # Create task - FIXED: Convert UUIDs to strings
                 task = ConversionTask.objects.create(
                     input_file=uploaded_files[0],
                     conversion_type='merge_pdf',
-                    status='processing',
+                    status='pending',
+                    client_ip=get_client_ip(request)[0],
                     extra_data={
                         'file_count': len(files),
                         'remove_blank_pages': request.POST.get('remove_blank_pages') == 'on',
                         'optimize_size': request.POST.get('optimize_size') == 'on',
                         'quality': request.POST.get('quality', 'medium'),
-                        'client_ip': get_client_ip(request)[0],
+                        'output_filename': output_filename,
                         # Convert UUIDs to strings for JSON serialization
                         'merged_files': [str(uf.id) for uf in uploaded_files[1:]],
                     }
                 )
-                
-                # Save output
-                task.output_file.save(output_filename, ContentFile(result.read()))
-                task.status = 'completed'
-                task.completed_at = timezone.now()
-                task.save()
-                
-                logger.info(f"PDF merge completed: {len(files)} files merged, size: {task.output_file.size} bytes")
-                
-                return render(request, 'converter/result.html', {
-                    'task': task,
-                    'filename': output_filename,
-                    'format_options': task.extra_data
-                })
-                
+                enqueue_task(task)
+
+                return redirect('conversion_result', task_id=task.id)
+
             except Exception as e:
-                logger.error(f"PDF merge failed: {str(e)}", exc_info=True)
-                if 'task' in locals():
-                    task.status = 'failed'
-                    task.completed_at = timezone.now()
-                    task.save()
+                logger.error(f"Queueing PDF merge failed: {str(e)}", exc_info=True)
                 messages.error(request, 'Merge failed. Please try again or contact support.')
         
         else:
@@ -350,82 +284,70 @@ def split_pdf(request):
         
         form = SplitPDFForm(request.POST, request.FILES)
         if form.is_valid():
-            # Secure file upload
-            uploaded = secure_file_upload(request.FILES['file'], request)
+            if form.cleaned_data.get('upload_id') and not form.cleaned_data.get('file'):
+                # Already uploaded (and validated) for the page previews
+                uploaded = _owned_pdf(request, form.cleaned_data['upload_id'])
+                if not uploaded:
+                    messages.error(request, 'The previewed file has expired. Please select it again.')
+                    return render(request, 'converter/split_pdf.html', {'form': SplitPDFForm()})
+            else:
+                # Secure file upload
+                uploaded = secure_file_upload(request.FILES['file'], request)
             if not uploaded:
                 return render(request, 'converter/split_pdf.html', {'form': form})
             
             split_type = form.cleaned_data['split_type']
             
             try:
-                task = ConversionTask.objects.create(
-                    input_file=uploaded,
-                    conversion_type='split_pdf',
-                    status='processing',
-                    extra_data={
-                        'split_type': split_type,
-                        'client_ip': get_client_ip(request)[0],
-                    }
-                )
-                
-                # Process based on split type
+                extra_data = {
+                    'split_type': split_type,
+                    'output_filename': f"split_{uuid.uuid4().hex[:8]}.zip",
+                }
+
+                # Validate options based on split type
                 if split_type == 'range':
                     pages = form.cleaned_data['pages']
                     # Validate page range
                     if not pages or not all(c.isdigit() or c in ',- ' for c in pages):
                         raise ValidationError("Invalid page range format")
-                    result = split_pdf_by_range(uploaded.file.path, pages)
-                    task.extra_data['pages'] = pages
-                    
+                    extra_data['pages'] = pages
+
                 elif split_type == 'every':
                     split_every = form.cleaned_data['split_every']
                     if split_every < 1:
                         raise ValidationError("Split every must be at least 1")
-                    result = split_pdf_every_page(uploaded.file.path, split_every)
-                    task.extra_data['split_every'] = split_every
-                    
+                    extra_data['split_every'] = split_every
+
                 elif split_type == 'count':
                     page_count = form.cleaned_data['page_count']
                     if page_count < 1:
                         raise ValidationError("Page count must be at least 1")
-                    result = split_pdf_by_count(uploaded.file.path, page_count)
-                    task.extra_data['page_count'] = page_count
-                    
+                    extra_data['page_count'] = page_count
+
                 elif split_type == 'custom':
                     custom_split = form.cleaned_data['custom_split']
                     # Validate custom split format
                     if not all(c.isdigit() or c in ',' for c in custom_split):
                         raise ValidationError("Invalid custom split format")
-                    result = split_pdf_custom(uploaded.file.path, custom_split)
-                    task.extra_data['custom_split'] = custom_split
-                
+                    extra_data['custom_split'] = custom_split
+
                 else:
                     # Default to range splitting
-                    pages = form.cleaned_data.get('pages', '1')
-                    result = split_pdf_by_range(uploaded.file.path, pages)
-                    task.extra_data['pages'] = pages
-                
-                # Save output
-                output_filename = f"split_{uuid.uuid4().hex[:8]}.zip"
-                task.output_file.save(output_filename, ContentFile(result.read()))
-                task.status = 'completed'
-                task.completed_at = timezone.now()
-                task.save()
-                
-                logger.info(f"PDF split completed: {uploaded.original_filename}, type: {split_type}")
-                
-                return render(request, 'converter/result.html', {
-                    'task': task,
-                    'filename': output_filename,
-                    'format_options': task.extra_data
-                })
-                
+                    extra_data['pages'] = form.cleaned_data.get('pages', '1')
+
+                task = ConversionTask.objects.create(
+                    input_file=uploaded,
+                    conversion_type='split_pdf',
+                    status='pending',
+                    client_ip=get_client_ip(request)[0],
+                    extra_data=extra_data
+                )
+                enqueue_task(task)
+
+                return redirect('conversion_result', task_id=task.id)
+
             except Exception as e:
-                logger.error(f"PDF split failed: {str(e)}", exc_info=True)
-                if 'task' in locals():
-                    task.status = 'failed'
-                    task.completed_at = timezone.now()
-                    task.save()
+                logger.error(f"Queueing PDF split failed: {str(e)}", exc_info=True)
                 messages.error(request, f'Split failed: {str(e)}')
         
         else:
@@ -440,6 +362,56 @@ def split_pdf(request):
     return render(request, 'converter/split_pdf.html', {'form': form})
 
 
+def pdf_to_image(request):
+    """
+    Export every page of a PDF as JPG or PNG images in a ZIP
+    """
+    if request.method == 'POST':
+        # Rate limiting check
+        if not rate_limit_check(request, 'conversion'):
+            messages.error(request, 'Conversion rate limit exceeded. Please try again later.')
+            return render(request, 'converter/pdf_to_image.html', {'form': PDFToImageForm()})
+        
+        form = PDFToImageForm(request.POST, request.FILES)
+        if form.is_valid():
+            # Secure file upload
+            uploaded = secure_file_upload(request.FILES['file'], request)
+            if not uploaded:
+                return render(request, 'converter/pdf_to_image.html', {'form': form})
+            
+            try:
+                image_format = form.cleaned_data['image_format']
+                task = ConversionTask.objects.create(
+                    input_file=uploaded,
+                    conversion_type='pdf_to_image',
+                    status='pending',
+                    client_ip=get_client_ip(request)[0],
+                    extra_data={
+                        'image_format': image_format,
+                        'dpi': form.cleaned_data['dpi'],
+                        'quality': form.cleaned_data['quality'],
+                        'output_filename': f"{os.path.splitext(uploaded.original_filename)[0]}_images.zip",
+                    }
+                )
+                enqueue_task(task)
+
+                return redirect('conversion_result', task_id=task.id)
+
+            except Exception as e:
+                logger.error(f"Queueing PDF to image failed: {str(e)}", exc_info=True)
+                messages.error(request, f'Conversion failed: {str(e)}')
+        
+        else:
+            # Form validation errors
+            for field, errors in form.errors.items():
+                for error in errors:
+                    messages.error(request, f"{field}: {error}")
+    
+    else:
+        form = PDFToImageForm()
+    
+    return render(request, 'converter/pdf_to_image.html', {'form': form})
+
 def compress_pdf_view(request):
     """
     Secure PDF compression
@@ -457,15 +429,7 @@ def compress_pdf_view(request):
             if not uploaded:
                 return render(request, 'converter/compress_pdf.html', {'form': form})
             
-            # Create secure temporary directory
-            temp_dir, temp_path = create_secure_temp_file()
-            
             try:
-                # Write to temp file
-                with open(temp_path, 'wb') as f:
-                    for chunk in request.FILES['file'].chunks():
-                        f.write(chunk)
-                
                 # Get form data
                 compression_level = form.cleaned_data['compression_level']
                 optimize_options = form.cleaned_data.get('optimize_options', '')
@@ -477,11 +441,15 @@ def compress_pdf_view(request):
                 optimize_fonts = 'fonts' in optimize_options
                 remove_unused = 'unused' in optimize_options
                 
-                # Create task
+                name, ext = os.path.splitext(uploaded.original_filename)
+                output_filename = f"compressed_{name}.pdf"
+
+                # Create task - the worker computes the size statistics
                 task = ConversionTask.objects.create(
                     input_file=uploaded,
                     conversion_type='compress_pdf',
-                    status='processing',
+                    status='pending',
+                    client_ip=get_client_ip(request)[0],
                     extra_data={
                         'compression_level': compression_level,
                         'optimize_images': optimize_images,
@@ -489,83 +457,15 @@ def compress_pdf_view(request):
                         'optimize_fonts': optimize_fonts,
                         'remove_unused': remove_unused,
                         'quality_preservation': quality_preservation,
-                        'client_ip': get_client_ip(request)[0],
+                        'output_filename': output_filename,
                     }
                 )
-                
-                # Try different compression methods
-                try:
-                    from .utils import compress_pdf_with_pikepdf, compress_pdf_with_pypdf2
-                    compressed_pdf = compress_pdf_with_pikepdf(
-                        temp_path,
-                        compression_level=compression_level,
-                        optimize_images=optimize_images,
-                        optimize_fonts=optimize_fonts,
-                        remove_metadata=remove_metadata
-                    )
-                except ImportError:
-                    try:
-                        compressed_pdf = compress_pdf_with_pypdf2(
-                            temp_path,
-                            compression_level=compression_level,
-                            optimize_images=optimize_images,
-                            optimize_fonts=optimize_fonts,
-                            remove_metadata=remove_metadata
-                        )
-                    except ImportError:
-                        compressed_pdf = compress_pdf_util(
-                            temp_path,
-                            compression_level=compression_level,
-                            optimize_images=optimize_images,
-                            optimize_fonts=optimize_fonts,
-                            remove_metadata=remove_metadata
-                        )
-                
-                # Save output
-                name, ext = os.path.splitext(uploaded.original_filename)
-                output_filename = f"compressed_{name}.pdf"
-                task.output_file.save(output_filename, ContentFile(compressed_pdf.read()))
-                
-                # Calculate stats
-                original_size = uploaded.file.size
-                compressed_size = task.output_file.size
-                reduction_percent = 0
-                if original_size > 0:
-                    reduction_percent = ((original_size - compressed_size) / original_size) * 100
-                
-                # Update task
-                task.status = 'completed'
-                task.completed_at = timezone.now()
-                task.extra_data.update({
-                    'reduction_percent': round(reduction_percent, 1),
-                    'original_size': original_size,
-                    'compressed_size': compressed_size,
-                    'savings': original_size - compressed_size
-                })
-                task.save()
-                
-                logger.info(f"PDF compression completed: {uploaded.original_filename}, "
-                           f"reduction: {reduction_percent:.1f}%")
-                
-                # Clean up temp directory
-                cleanup_secure_temp(temp_dir)
-                
-                return render(request, 'converter/result.html', {
-                    'task': task,
-                    'filename': output_filename,
-                    'format_options': task.extra_data,
-                })
-                
+                enqueue_task(task)
+
+                return redirect('conversion_result', task_id=task.id)
+
             except Exception as e:
-                # Clean up temp directory on error
-                if temp_dir and os.path.exists(temp_dir):
-                    cleanup_secure_temp(temp_dir)
-                
-                logger.error(f"PDF compression failed: {str(e)}", exc_info=True)
-                if 'task' in locals():
-                    task.status = 'failed'
-                    task.completed_at = timezone.now()
-                    task.save()
+                logger.error(f"Queueing PDF compression failed: {str(e)}", exc_info=True)
                 messages.error(request, f"Error compressing PDF: {str(e)}")
                 return render(request, 'converter/compress_pdf.html', {'form': form})
     
@@ -598,49 +498,31 @@ def excel_to_pdf(request):
                 fit_to_page = 'fit' in request.POST.getlist('options[]')
                 include_headers = 'headers' in request.POST.getlist('options[]')
                 worksheet_option = request.POST.get('worksheet', 'first')
+                worksheet_names = [name.strip() for name in request.POST.get('worksheet_names', '').split(',')
+                                   if name.strip()]
                 
+                output_filename = f"{os.path.splitext(uploaded.original_filename)[0]}_converted.pdf"
+
                 task = ConversionTask.objects.create(
                     input_file=uploaded,
                     conversion_type='excel_to_pdf',
-                    status='processing',
+                    status='pending',
+                    client_ip=get_client_ip(request)[0],
                     extra_data={
                         'include_gridlines': include_gridlines,
                         'fit_to_page': fit_to_page,
                         'include_headers': include_headers,
                         'worksheet_option': worksheet_option,
-                        'client_ip': get_client_ip(request)[0],
+                        'worksheet_names': worksheet_names,
+                        'output_filename': output_filename,
                     }
                 )
-                
-                # Convert Excel to PDF
-                result = convert_excel_to_pdf(
-                    uploaded.file.path, 
-                    include_gridlines=include_gridlines,
-                    fit_to_page=fit_to_page,
-                    include_headers=include_headers
-                )
-                
-                output_filename = f"{os.path.splitext(uploaded.original_filename)[0]}_converted.pdf"
-                
-                task.output_file.save(output_filename, ContentFile(result.read()))
-                task.status = 'completed'
-                task.completed_at = timezone.now()
-                task.save()
-                
-                logger.info(f"Excel to PDF conversion completed: {uploaded.original_filename}")
-                
-                return render(request, 'converter/result.html', {
-                    'task': task,
-                    'filename': output_filename,
-                    'format_options': task.extra_data
-                })
-                
+                enqueue_task(task)
+
+                return redirect('conversion_result', task_id=task.id)
+
             except Exception as e:
-                logger.error(f"Excel to PDF conversion failed: {str(e)}", exc_info=True)
-                if 'task' in locals():
-                    task.status = 'failed'
-                    task.completed_at = timezone.now()
-                    task.save()
+                logger.error(f"Queueing Excel to PDF conversion failed: {str(e)}", exc_info=True)
                 messages.error(request, 'Conversion failed. Please try again or contact support.')
     
     else:
@@ -693,55 +575,36 @@ def image_to_pdf(request):
                 uploaded_file_instances.append(uploaded)
             
             image_count = len(uploaded_files)
-            
-            # Convert images to PDF
-            result = convert_images_to_pdf(
-                uploaded_files, 
-                page_size, 
-                orientation,
-                placement,
-                add_page_numbers
-            )
-            
+
             # Generate filename
             if image_count == 1:
                 output_filename = f"{os.path.splitext(files[0].name)[0]}.pdf"
             else:
                 output_filename = f"images_collection_{uuid.uuid4().hex[:8]}.pdf"
-            
+
             # Create task
             task = ConversionTask.objects.create(
                 input_file=uploaded_file_instances[0],
                 conversion_type='image_to_pdf',
-                status='processing',
+                status='pending',
+                client_ip=get_client_ip(request)[0],
                 extra_data={
                     'page_size': page_size,
                     'orientation': orientation,
                     'placement': placement,
                     'add_page_numbers': add_page_numbers,
                     'image_count': image_count,
-                    'client_ip': get_client_ip(request)[0],
+                    'output_filename': output_filename,
                     'file_names': [f.name for f in files],
                     'additional_files': [str(uf.id) for uf in uploaded_file_instances[1:]]
                 }
             )
-            
-            # Save output
-            task.output_file.save(output_filename, ContentFile(result.read()))
-            task.status = 'completed'
-            task.completed_at = timezone.now()
-            task.save()
-            
-            logger.info(f"Image to PDF conversion completed: {image_count} images")
-            
-            return render(request, 'converter/result.html', {
-                'task': task,
-                'filename': output_filename,
-                'format_options': task.extra_data
-            })
-            
+            enqueue_task(task)
+
+            return redirect('conversion_result', task_id=task.id)
+
         except Exception as e:
-            logger.error(f"Image to PDF conversion failed: {str(e)}", exc_info=True)
+            logger.error(f"Queueing Image to PDF conversion failed: {str(e)}", exc_info=True)
             # Clean up uploaded files on error
             for uploaded in uploaded_file_instances:
                 if os.path.exists(uploaded.file.path):
@@ -763,25 +626,27 @@ def download_file(request, task_id):
     """
     # Rate limiting check
     if not rate_limit_check(request, 'download'):
-        messages.error(request, 'Download rate limit exceeded. Please try again in a minute.')
-        return redirect('index')
+        return HttpResponse('Download rate limit exceeded. Please try again in a minute.',
+                            content_type='text/plain', status=429)
     
     try:
-        task = ConversionTask.objects.get(id=task_id)
+        # Only the columns needed to authorize and stream; extra_data stays in the database
+        task = ConversionTask.objects.only(*DOWNLOAD_FIELDS).get(id=task_id)
         
         # Additional security check: verify IP matches (optional)
         client_ip = get_client_ip(request)[0]
-        if task.extra_data and task.extra_data.get('client_ip') != client_ip:
-            logger.warning(f"Download IP mismatch: task IP {task.extra_data.get('client_ip')}, "
+        if task.client_ip and task.client_ip != client_ip:
+            logger.warning(f"Download IP mismatch: task IP {task.client_ip}, "
                          f"request IP {client_ip}")
             # You might still allow download, but log it
         
         if task.output_file:
-            # Set secure headers
-            response = FileResponse(
-                task.output_file.open(), 
-                as_attachment=True, 
-                filename=os.path.basename(task.output_file.name)
+            # Served by the front proxy when DOWNLOAD_OFFLOAD is set
+            response = file_download_response(
+                request,
+                task.output_file.path,
+                os.path.basename(task.output_file.name),
+                task.output_hash,
             )
             
             # Security headers
@@ -810,15 +675,223 @@ def conversion_result(request, task_id):
     View conversion result with security
     """
     try:
-        task = ConversionTask.objects.get(id=task_id)
+        task = ConversionTask.objects.only(*RESULT_FIELDS).get(id=task_id)
         
         # Optional: Verify user/IP matches
         client_ip = get_client_ip(request)[0]
-        if task.extra_data and task.extra_data.get('client_ip') != client_ip:
-            logger.warning(f"Result view IP mismatch: task IP {task.extra_data.get('client_ip')}, "
+        if task.client_ip and task.client_ip != client_ip:
+            logger.warning(f"Result view IP mismatch: task IP {task.client_ip}, "
                          f"request IP {client_ip}")
         
-        return render(request, 'converter/result.html', {'task': task})
+        return render(request, 'converter/result.html', {
+            'task': task,
+            'filename': task.extra_data.get('output_filename'),
+            'format_options': task.extra_data,
+            'show_pages': task.status == 'completed' and task.output_file.name.lower().endswith('.pdf'),
+        })
     except ConversionTask.DoesNotExist:
         messages.error(request, 'Conversion task not found')
-        return redirect('index')
\ No newline at end of file
+        return redirect('index')
+
+
+def task_events(request, task_id):
+    """
+    Single progress event for deployments without the ASGI app
+
+    Under ASGI, core/asgi.py streams these events and this view is never
+    reached; here the browser's EventSource reconnects after `retry`.
+    """
+    fields = ('id', 'status', 'progress_done', 'progress_total', 'progress_stage')
+    task = ConversionTask.objects.filter(id=task_id).only(*fields).first()
+    if task is None:
+        return HttpResponse('Task not found', content_type='text/plain', status=404)
+
+    response = HttpResponse(b'retry: 3000\n\n' + format_event(snapshot(task)),
+                            content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+def _thumbnails_json(request, pdf_path, content_hash, **extra):
+    """Batch of thumbnails as JSON with data URIs, one round trip for many pages."""
+    if not rate_limit_check(request, 'preview'):
+        return JsonResponse({'error': 'Preview rate limit exceeded'}, status=429)
+
+    try:
+        page_count, pages = thumbnails.get_thumbnails(
+            pdf_path, content_hash or thumbnails.file_hash(pdf_path),
+            request.GET.get('pages', ''), request.GET.get('dpi'), request.GET.get('format'),
+        )
+    except ValueError:
+        return JsonResponse({'error': 'Invalid page range'}, status=400)
+    except (thumbnails.ThumbnailBusy, FutureTimeoutError):
+        return JsonResponse({'error': 'Previews are busy, please retry'}, status=503)
+    except Exception as e:
+        logger.error(f"Thumbnail rendering failed: {str(e)}", exc_info=True)
+        return JsonResponse({'error': 'Could not render this PDF'}, status=422)
+
+    items = []
+    for thumbnail in pages:
+        with open(thumbnail.path, 'rb') as f:
+            data = base64.b64encode(f.read()).decode('ascii')
+        mime_type = thumbnails.FORMATS[os.path.splitext(thumbnail.path)[1][1:]]
+        items.append({
+            'page': thumbnail.page,
+            'width': thumbnail.width,
+            'height': thumbnail.height,
+            'src': f'data:{mime_type};base64,{data}',
+        })
+    response = JsonResponse(dict(extra, page_count=page_count, pages=items))
+    response['Cache-Control'] = 'private, max-age=300'
+    return response
+
+
+def pdf_preview(request):
+    """
+    Upload a PDF for previews; the split form can then use it without a second upload
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST a PDF as "file"'}, status=405)
+
+    file = request.FILES.get('file')
+    if file is None or not file.name.lower().endswith('.pdf'):
+        return JsonResponse({'error': 'Please select a PDF file (.pdf)'}, status=400)
+
+    # Previews are tied to the session that uploaded them
+    if not request.session.session_key:
+        request.session.create()
+    uploaded = secure_file_upload(file, request)
+    if not uploaded:
+        # secure_file_upload reports through messages; hand them to the caller instead
+        errors = [str(message) for message in messages.get_messages(request)]
+        return JsonResponse({'error': ' '.join(errors) or 'Upload failed'}, status=400)
+
+    return _thumbnails_json(request, uploaded.file.path, uploaded.file_hash,
+                            file_id=str(uploaded.id), filename=uploaded.original_filename)
+
+
+def file_thumbnails(request, file_id):
+    """Thumbnails of an uploaded PDF: ?pages=1-12&dpi=48&format=webp"""
+    upload = _owned_pdf(request, file_id)
+    if upload is None:
+        return JsonResponse({'error': 'File not found'}, status=404)
+    return _thumbnails_json(request, upload.file.path, upload.file_hash)
+
+
+def file_page_thumbnail(request, file_id, page):
+    """One page of an uploaded PDF as an image, for <img src> lazy loading"""
+    upload = _owned_pdf(request, file_id)
+    if upload is None:
+        return HttpResponse('File not found', content_type='text/plain', status=404)
+    if not rate_limit_check(request, 'preview'):
+        return HttpResponse('Preview rate limit exceeded', content_type='text/plain', status=429)
+
+    try:
+        _, pages = thumbnails.get_thumbnails(
+            upload.file.path, upload.file_hash or thumbnails.file_hash(upload.file.path),
+            str(page), request.GET.get('dpi'), request.GET.get('format'),
+        )
+    except (thumbnails.ThumbnailBusy, FutureTimeoutError):
+        return HttpResponse('Previews are busy, please retry', content_type='text/plain', status=503)
+    except Exception as e:
+        logger.error(f"Thumbnail rendering failed: {str(e)}", exc_info=True)
+        return HttpResponse('Could not render this PDF', content_type='text/plain', status=422)
+    if not pages:
+        return HttpResponse('Page not found', content_type='text/plain', status=404)
+
+    with open(pages[0].path, 'rb') as f:
+        response = HttpResponse(f.read(), content_type=thumbnails.FORMATS[os.path.splitext(pages[0].path)[1][1:]])
+    response['Cache-Control'] = 'private, max-age=3600'
+    response['X-Content-Type-Options'] = 'nosniff'
+    return response
+
+
+def task_thumbnails(request, task_id):
+    """Thumbnails of a task's PDF output, for the result page"""
+    task = ConversionTask.objects.filter(id=task_id).only(*DOWNLOAD_FIELDS).first()
+    if task is None or task.status != 'completed' or not task.output_file.name.lower().endswith('.pdf'):
+        return JsonResponse({'error': 'No PDF output for this task'}, status=404)
+    return _thumbnails_json(request, task.output_file.path, task.output_hash)
+
+
+def _upload_json(upload, status=200):
+    """State of a resumable upload; the offset is repeated as a header for HEAD"""
+    response = JsonResponse({
+        'id': str(upload.id),
+        'filename': upload.filename,
+        'size': upload.size,
+        'offset': upload.offset,
+        'chunk_size': settings.UPLOAD_CHUNK_SIZE,
+        'complete': upload.complete,
+        'file_id': str(upload.file_id) if upload.file_id else None,
+    }, status=status)
+    response['Upload-Offset'] = str(upload.offset)
+    response['Upload-Length'] = str(upload.size)
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+def upload_sessions(request):
+    """
+    Start a resumable upload: POST filename and size (and optionally sha256)
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST filename and size'}, status=405)
+    if not rate_limit_check(request, 'upload'):
+        return JsonResponse({'error': 'Upload rate limit exceeded. Please try again in a minute.'}, status=429)
+    try:
+        size = int(request.POST.get('size', ''))
+    except ValueError:
+        return JsonResponse({'error': 'size must be a number of bytes'}, status=400)
+
+    # Uploads are tied to the session that started them
+    if not request.session.session_key:
+        request.session.create()
+    try:
+        upload = resumable.create(request.POST.get('filename'), size, request.session.session_key,
+                                  request.POST.get('sha256', ''))
+    except resumable.UploadError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+
+    logger.info(f"Resumable upload started: {upload.filename}, size: {upload.size}, "
+                f"IP: {get_client_ip(request)[0]}")
+    response = _upload_json(upload, status=201)
+    response['Location'] = reverse('upload_session', args=[upload.id])
+    return response
+
+
+def upload_session(request, upload_id):
+    """
+    A resumable upload: its offset (GET/HEAD), its next chunk (PUT) or cancel it (DELETE)
+    """
+    upload = resumable.get(upload_id, request.session.session_key)
+    if upload is None:
+        return JsonResponse({'error': 'Upload not found'}, status=404)
+
+    if request.method in ('GET', 'HEAD'):
+        return _upload_json(upload)
+    if request.method == 'DELETE':
+        try:
+            resumable.cancel(upload)
+        except resumable.UploadError as e:
+            return JsonResponse({'error': str(e)}, status=e.status)
+        return HttpResponse(status=204)
+    if request.method != 'PUT':
+        return JsonResponse({'error': 'Use GET, HEAD, PUT or DELETE'}, status=405)
+
+    if not rate_limit_check(request, 'upload_chunk'):
+        return JsonResponse({'error': 'Upload rate limit exceeded. Please retry shortly.'}, status=429)
+    try:
+        offset = int(request.headers['Upload-Offset'])
+        length = int(request.META['CONTENT_LENGTH'])
+    except (KeyError, ValueError):
+        return JsonResponse({'error': 'Send the Upload-Offset and Content-Length headers'}, status=400)
+
+    try:
+        # The body is streamed from the request, never loaded whole
+        upload = resumable.append(upload, offset, request, length)
+    except resumable.UploadError as e:
+        response = JsonResponse({'error': str(e), 'offset': upload.offset}, status=e.status)
+        response['Upload-Offset'] = str(upload.offset)
+        return response
+    return _upload_json(upload)
@@ -0,0 +1,681 @@
+"""
+Streaming Word (.docx) to PDF rendering.
+
+word/document.xml is read with lxml iterparse and every body-level
+paragraph and table is turned into reportlab flowables as soon as its end
+tag is seen, so the PDF follows the document order (paragraphs and tables
+interleaved) and parsed elements are freed as they are laid out.
+
+The flowables are handed to reportlab through _FlowableFeed, a list that
+refills itself from the parser FEED_BATCH flowables (about a page) at a
+time while the document template lays them out, instead of building the
+whole story first. Tables are laid out a page at a time by _TableRows,
+which only ever measures the next TABLE_CHUNK_ROWS rows, so a long table
+is not re-measured every time it is split at a page end.
+
+ParagraphStyle objects are created once per process for each docx style
+kind and alignment (see paragraph_style), not per conversion.
+
+Handled: headings, title, lists (bullets and numbering), bold, italic,
+underline, strike, super/subscript, tabs, line and page breaks, paragraph
+alignment, tables with merged columns and repeated header rows, inline
+PNG/JPEG/GIF/BMP images, and the page size and margins of the last section.
+Headers, footers, footnotes and text boxes are not drawn.
+"""
+import io
+import re
+import zipfile
+import logging
+import tempfile
+import posixpath
+from functools import lru_cache
+from itertools import islice
+from xml.sax.saxutils import escape
+# utils imports this module on the first Word conversion, not at startup
+from reportlab.platypus import Flowable
+
+logger = logging.getLogger(__name__)
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+R = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+A = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+MC = '{http://schemas.openxmlformats.org/markup-compatibility/2006}'
+WP = '{http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing}'
+PACKAGE_RELS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+EP = '{http://schemas.openxmlformats.org/officeDocument/2006/extended-properties}'
+OFFICE_DOCUMENT = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument'
+
+FEED_BATCH = 50
+TABLE_CHUNK_ROWS = 40
+CELL_FONT_SIZE = 9
+CELL_PADDING = 6
+# Used when the document has no section properties: US Letter, 1 inch margins
+DEFAULT_PAGE = (612, 792)
+DEFAULT_MARGINS = (72, 72, 72, 72)
+TWIPS_PER_POINT = 20
+EMU_PER_POINT = 12700
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp')
+# The body's sectPr is the last child of w:body; read this much of the tail
+SECTION_TAIL_BYTES = 64 * 1024
+TAB = '&nbsp;' * 4
+FALSE_VALUES = ('0', 'false', 'off', 'none')
+# Content under these is not part of the flow it sits in: text boxes (not
+# drawn), and the legacy copy Word stores next to each mc:Choice
+OUT_OF_FLOW = (f'{W}txbxContent', f'{MC}Fallback')
+
+HEADING_SIZES = {1: 16, 2: 14, 3: 12, 4: 11, 5: 10, 6: 10}
+NUMBER_FORMATS = {
+    'decimal': lambda n: f'{n}.',
+    'lowerLetter': lambda n: f'{_letters(n)}.',
+    'upperLetter': lambda n: f'{_letters(n).upper()}.',
+    'lowerRoman': lambda n: f'{_roman(n)}.',
+    'upperRoman': lambda n: f'{_roman(n).upper()}.',
+}
+
+
+def _letters(n):
+    text = ''
+    while n > 0:
+        n, remainder = divmod(n - 1, 26)
+        text = chr(ord('a') + remainder) + text
+    return text
+
+
+def _roman(n):
+    numerals = ((1000, 'm'), (900, 'cm'), (500, 'd'), (400, 'cd'), (100, 'c'), (90, 'xc'),
+                (50, 'l'), (40, 'xl'), (10, 'x'), (9, 'ix'), (5, 'v'), (4, 'iv'), (1, 'i'))
+    text = ''
+    for value, numeral in numerals:
+        count, n = divmod(n, value)
+        text += numeral * count
+    return text
+
+
+@lru_cache(maxsize=None)
+def paragraph_style(kind, alignment=None, level=0):
+    """
+    ParagraphStyle for a style kind ('Normal', 'Title', 'Heading1'..'Heading6',
+    'List', 'Quote', 'Caption', 'Cell', 'HeaderCell'), a reportlab alignment
+    (None keeps the kind's own) and a list level; created once per process
+    """
+    from reportlab.lib.enums import TA_CENTER
+    from reportlab.lib.styles import ParagraphStyle
+
+    name = f'{kind}-{alignment}-{level}'
+    if kind == 'Title':
+        style = ParagraphStyle(name, fontName='Helvetica-Bold', fontSize=22, leading=26,
+                               spaceAfter=12, alignment=TA_CENTER)
+    elif kind.startswith('Heading'):
+        size = HEADING_SIZES[int(kind[-1])]
+        style = ParagraphStyle(name, fontName='Helvetica-Bold', fontSize=size, leading=size * 1.2,
+                               spaceBefore=size * 0.75, spaceAfter=size * 0.4, keepWithNext=1)
+    elif kind == 'List':
+        style = ParagraphStyle(name, fontName='Helvetica', fontSize=10, leading=12, spaceAfter=3,
+                               leftIndent=18 * (level + 1), bulletIndent=18 * level + 4)
+    elif kind == 'Quote':
+        style = ParagraphStyle(name, fontName='Helvetica-Oblique', fontSize=10, leading=12,
+                               spaceAfter=6, leftIndent=24, rightIndent=24)
+    elif kind == 'Caption':
+        style = ParagraphStyle(name, fontName='Helvetica-Oblique', fontSize=8, leading=10, spaceAfter=6)
+    elif kind in ('Cell', 'HeaderCell'):
+        style = ParagraphStyle(name, fontName='Helvetica-Bold' if kind == 'HeaderCell' else 'Helvetica',
+                               fontSize=CELL_FONT_SIZE, leading=CELL_FONT_SIZE + 2)
+    else:
+        style = ParagraphStyle(name, fontName='Helvetica', fontSize=10, leading=12, spaceAfter=6)
+    if alignment is not None:
+        style.alignment = alignment
+    return style
+
+
+def _alignment(value):
+    from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_LEFT, TA_RIGHT
+
+    return {'left': TA_LEFT, 'start': TA_LEFT, 'center': TA_CENTER, 'right': TA_RIGHT, 'end': TA_RIGHT,
+            'both': TA_JUSTIFY, 'distribute': TA_JUSTIFY}.get(value)
+
+
+def _is_on(element):
+    """A w:b / w:i style toggle: present and not switched off by w:val."""
+    return element is not None and element.get(f'{W}val', 'true').lower() not in FALSE_VALUES
+
+
+def _style_kind(name):
+    name = name.lower()
+    if name == 'title':
+        return 'Title'
+    match = re.fullmatch(r'heading ?(\d)', name)
+    if match:
+        return f'Heading{min(max(int(match.group(1)), 1), 6)}'
+    if name.startswith('list'):
+        return 'List'
+    if name.endswith('quote'):
+        return 'Quote'
+    if name == 'caption':
+        return 'Caption'
+    return None
+
+
+class _Package:
+    """The parts of a .docx the renderer needs besides the document body."""
+
+    def __init__(self, archive):
+        self.archive = archive
+        self.document = self._document_part()
+        self.relationships = self._relationships(self.document)
+        self.style_kinds, self.default_style = self._styles()
+        self.numbering = self._numbering()
+        self.counters = {}
+
+    def _xml(self, name):
+        from lxml import etree
+
+        try:
+            return etree.fromstring(self.archive.read(name))
+        except KeyError:
+            return None
+
+    def _document_part(self):
+        root = self._xml('_rels/.rels')
+        if root is not None:
+            for rel in root.iter(f'{PACKAGE_RELS}Relationship'):
+                if rel.get('Type') == OFFICE_DOCUMENT:
+                    return rel.get('Target').lstrip('/')
+        return 'word/document.xml'
+
+    def _relationships(self, part):
+        folder, name = posixpath.split(part)
+        root = self._xml(posixpath.join(folder, '_rels', f'{name}.rels'))
+        targets = {}
+        if root is not None:
+            for rel in root.iter(f'{PACKAGE_RELS}Relationship'):
+                if rel.get('TargetMode') != 'External':
+                    targets[rel.get('Id')] = posixpath.normpath(posixpath.join(folder, rel.get('Target')))
+        return targets
+
+    def _styles(self):
+        """Map paragraph styleId to a style kind, following basedOn to a known style."""
+        root = self._xml(posixpath.join(posixpath.dirname(self.document), 'styles.xml'))
+        if root is None:
+            return {}, None
+        names, based_on, default = {}, {}, None
+        for style in root.iter(f'{W}style'):
+            if style.get(f'{W}type') != 'paragraph':
+                continue
+            style_id = style.get(f'{W}styleId')
+            name = style.find(f'{W}name')
+            names[style_id] = name.get(f'{W}val') if name is not None else style_id
+            parent = style.find(f'{W}basedOn')
+            if parent is not None:
+                based_on[style_id] = parent.get(f'{W}val')
+            if style.get(f'{W}default') in ('1', 'true'):
+                default = style_id
+        kinds = {}
+        for style_id in names:
+            current, seen = style_id, set()
+            while current in names and current not in seen:
+                seen.add(current)
+                kind = _style_kind(names[current])
+                if kind:
+                    kinds[style_id] = kind
+                    break
+                current = based_on.get(current)
+        return kinds, default
+
+    def _numbering(self):
+        """Map (numId, ilvl) to its number format: 'bullet', 'decimal', ..."""
+        root = self._xml(posixpath.join(posixpath.dirname(self.document), 'numbering.xml'))
+        if root is None:
+            return {}
+        abstract = {}
+        for definition in root.iter(f'{W}abstractNum'):
+            levels = {}
+            for level in definition.iter(f'{W}lvl'):
+                number_format = level.find(f'{W}numFmt')
+                levels[level.get(f'{W}ilvl')] = (
+                    number_format.get(f'{W}val') if number_format is not None else 'bullet'
+                )
+            abstract[definition.get(f'{W}abstractNumId')] = levels
+        formats = {}
+        for number in root.iter(f'{W}num'):
+            abstract_id = number.find(f'{W}abstractNumId')
+            if abstract_id is None:
+                continue
+            for level, number_format in abstract.get(abstract_id.get(f'{W}val'), {}).items():
+                formats[(number.get(f'{W}numId'), level)] = number_format
+        return formats
+
+    def list_label(self, num_id, level):
+        """Bullet text for the next item of list num_id at level."""
+        number_format = self.numbering.get((num_id, str(level)), 'bullet')
+        if number_format not in NUMBER_FORMATS:
+            return '•'
+        counters = self.counters.setdefault(num_id, {})
+        counters[level] = counters.get(level, 0) + 1
+        for deeper in [key for key in counters if key > level]:
+            del counters[deeper]
+        return NUMBER_FORMATS[number_format](counters[level])
+
+    def expected_pages(self):
+        """Page count Word saved in docProps/app.xml, or 0."""
+        root = self._xml('docProps/app.xml')
+        pages = root.find(f'{EP}Pages') if root is not None else None
+        try:
+            return int(pages.text) if pages is not None else 0
+        except (TypeError, ValueError):
+            return 0
+
+    def page_setup(self):
+        """(pagesize, (left, right, top, bottom)) of the document's last section."""
+        tail = b''
+        with self.archive.open(self.document) as part:
+            for chunk in iter(lambda: part.read(1024 * 1024), b''):
+                tail = (tail + chunk)[-SECTION_TAIL_BYTES:]
+        text = tail.decode('utf-8', 'ignore')
+        sections = text.rsplit('sectPr', 2)
+        section = sections[-2] if len(sections) >= 3 else ''
+
+        def twips(tag, attribute):
+            match = re.search(rf'<w:{tag}\b[^>]*\bw:{attribute}="(-?\d+)"', section)
+            return abs(int(match.group(1))) / TWIPS_PER_POINT if match else None
+
+        width, height = twips('pgSz', 'w'), twips('pgSz', 'h')
+        pagesize = (width, height) if width and height else DEFAULT_PAGE
+        margins = tuple(
+            value if value is not None else default
+            for value, default in zip((twips('pgMar', 'left'), twips('pgMar', 'right'),
+                                       twips('pgMar', 'top'), twips('pgMar', 'bottom')), DEFAULT_MARGINS)
+        )
+        return pagesize, margins
+
+
+class _Converter:
+    """Turn body-level w:p and w:tbl elements into flowables."""
+
+    def __init__(self, package, frame_width, frame_height):
+        self.package = package
+        self.frame_width = frame_width
+        self.frame_height = frame_height
+
+    def _image(self, drawing):
+        from reportlab.lib.utils import ImageReader
+        from reportlab.platypus import Image
+
+        blip = next(drawing.iter(f'{A}blip'), None)
+        target = self.package.relationships.get(blip.get(f'{R}embed')) if blip is not None else None
+        if not target or not target.lower().endswith(IMAGE_EXTENSIONS):
+            return None
+        try:
+            data = self.package.archive.read(target)
+            pixel_width, pixel_height = ImageReader(io.BytesIO(data)).getSize()
+        except Exception as e:
+            logger.debug(f"Skipping image {target}: {str(e)}")
+            return None
+        extent = next(drawing.iter(f'{WP}extent'), None)
+        if extent is not None:
+            width = int(extent.get('cx', 0)) / EMU_PER_POINT
+            height = int(extent.get('cy', 0)) / EMU_PER_POINT
+        else:
+            width, height = pixel_width * 0.75, pixel_height * 0.75
+        if width <= 0 or height <= 0:
+            return None
+        scale = min(1, self.frame_width / width, self.frame_height * 0.9 / height)
+        return Image(io.BytesIO(data), width=width * scale, height=height * scale)
+
+    def _runs(self, paragraph):
+        """
+        Yield ('text', markup), ('page', None) or ('image', flowable)
+        for the runs of a paragraph, in order
+        """
+        for run in paragraph.iter(f'{W}r'):
+            if _inside(run, OUT_OF_FLOW, paragraph):
+                continue
+            properties = run.find(f'{W}rPr')
+            opening, closing = '', ''
+            if properties is not None:
+                vertical = properties.find(f'{W}vertAlign')
+                vertical = vertical.get(f'{W}val') if vertical is not None else None
+                for tag, markup in (('b', 'b'), ('i', 'i'), ('u', 'u'), ('strike', 'strike')):
+                    element = properties.find(f'{W}{tag}')
+                    if tag == 'u':
+                        on = element is not None and element.get(f'{W}val', 'single') != 'none'
+                    else:
+                        on = _is_on(element)
+                    if on:
+                        opening += f'<{markup}>'
+                        closing = f'</{markup}>' + closing
+                if vertical in ('superscript', 'subscript'):
+                    markup = 'super' if vertical == 'superscript' else 'sub'
+                    opening += f'<{markup}>'
+                    closing = f'</{markup}>' + closing
+            text = []
+            for child in run:
+                tag = child.tag
+                if tag == f'{W}t':
+                    text.append(escape(child.text or ''))
+                elif tag == f'{W}tab':
+                    text.append(TAB)
+                elif tag == f'{W}br' and child.get(f'{W}type') == 'page':
+                    if text:
+                        yield 'text', opening + ''.join(text) + closing
+                        text = []
+                    yield 'page', None
+                elif tag in (f'{W}br', f'{W}cr'):
+                    text.append('<br/>')
+                elif tag == f'{W}noBreakHyphen':
+                    text.append('-')
+                elif tag == f'{W}drawing':
+                    image = self._image(child)
+                    if image is not None:
+                        if text:
+                            yield 'text', opening + ''.join(text) + closing
+                            text = []
+                        yield 'image', image
+            if text:
+                yield 'text', opening + ''.join(text) + closing
+
+    def _paragraph_format(self, paragraph, cell_kind=None):
+        """(style, bullet text) for a paragraph."""
+        properties = paragraph.find(f'{W}pPr')
+        kind, alignment, level, bullet = cell_kind, None, 0, None
+        if properties is not None:
+            style_id = properties.find(f'{W}pStyle')
+            style_id = style_id.get(f'{W}val') if style_id is not None else self.package.default_style
+            if cell_kind is None:
+                kind = self.package.style_kinds.get(style_id)
+            justification = properties.find(f'{W}jc')
+            if justification is not None:
+                alignment = _alignment(justification.get(f'{W}val'))
+            numbering = properties.find(f'{W}numPr')
+            if numbering is not None and cell_kind is None:
+                num_id = numbering.find(f'{W}numId')
+                num_id = num_id.get(f'{W}val') if num_id is not None else None
+                if num_id and num_id != '0':
+                    ilvl = numbering.find(f'{W}ilvl')
+                    level = min(int(ilvl.get(f'{W}val', 0)) if ilvl is not None else 0, 8)
+                    bullet = self.package.list_label(num_id, level)
+                    kind = 'List'
+        if kind is None:
+            kind = 'Normal'
+        if kind == 'List' and bullet is None:
+            # List styles that carry their numbering in the style definition
+            bullet = '•'
+        return paragraph_style(kind, alignment, level if kind == 'List' else 0), bullet
+
+    def paragraph(self, paragraph):
+        """Flowables for a w:p: text, images and page breaks in run order."""
+        from reportlab.platypus import PageBreak, Paragraph, Spacer
+
+        style, bullet = self._paragraph_format(paragraph)
+        properties = paragraph.find(f'{W}pPr')
+        if properties is not None and _is_on(properties.find(f'{W}pageBreakBefore')):
+            yield PageBreak()
+        markup, emitted = [], False
+
+        def flush():
+            text = ''.join(markup)
+            markup.clear()
+            return Paragraph(text, style, bulletText=bullet if not emitted else None)
+
+        for kind, value in self._runs(paragraph):
+            if kind == 'text':
+                markup.append(value)
+                continue
+            if markup:
+                yield flush()
+                emitted = True
+            yield PageBreak() if kind == 'page' else value
+        if markup:
+            yield flush()
+        elif not emitted and bullet is None:
+            # An empty paragraph is vertical space in Word
+            yield Spacer(1, style.leading)
+
+    def _cell(self, cell, kind, width):
+        """
+        Cell content: plain text that fits on one line stays a string, which
+        Table draws without parsing or wrapping; anything else is Paragraphs
+        """
+        from reportlab.lib.enums import TA_LEFT
+        from reportlab.pdfbase.pdfmetrics import stringWidth
+        from reportlab.platypus import Paragraph
+
+        contents = []
+        for paragraph in cell.iter(f'{W}p'):
+            if _inside(paragraph, OUT_OF_FLOW, cell):
+                continue
+            style, _ = self._paragraph_format(paragraph, kind)
+            text = ''.join(value for run_kind, value in self._runs(paragraph) if run_kind == 'text')
+            if text:
+                contents.append((text, style))
+        if len(contents) == 1:
+            text, style = contents[0]
+            if (style.alignment == TA_LEFT and '<' not in text and '&' not in text
+                    and stringWidth(text, style.fontName, style.fontSize) <= width - 2 * CELL_PADDING):
+                return text
+        return [Paragraph(text, style) for text, style in contents]
+
+    def table(self, table):
+        """Tables of at most TABLE_CHUNK_ROWS rows for a w:tbl."""
+        from reportlab.lib import colors
+        from reportlab.platypus import Spacer, Table, TableStyle
+
+        grid = [int(column.get(f'{W}w', 0)) / TWIPS_PER_POINT
+                for column in table.findall(f'{W}tblGrid/{W}gridCol')]
+        layout, spans, repeat_header = [], [], False
+        for row_index, row in enumerate(table.findall(f'{W}tr')):
+            properties = row.find(f'{W}trPr')
+            if row_index == 0 and properties is not None:
+                repeat_header = _is_on(properties.find(f'{W}tblHeader'))
+            cells, column = [], 0
+            for cell in row.findall(f'{W}tc'):
+                span = cell.find(f'{W}tcPr/{W}gridSpan')
+                span = max(1, int(span.get(f'{W}val', 1))) if span is not None else 1
+                merged = cell.find(f'{W}tcPr/{W}vMerge')
+                continued = merged is not None and merged.get(f'{W}val', 'continue') == 'continue'
+                cells.append((None if continued else cell, column, span))
+                if span > 1:
+                    spans.append((row_index, column, column + span - 1))
+                column += span
+            layout.append((cells, column))
+        if not layout:
+            return
+        columns = max(len(grid), max(used for _, used in layout))
+        widths = grid + [0] * (columns - len(grid))
+        if not all(widths):
+            widths = [self.frame_width / columns] * columns
+        scale = min(1, self.frame_width / sum(widths))
+        widths = [width * scale for width in widths]
+
+        rows = []
+        for row_index, (cells, used) in enumerate(layout):
+            kind = 'HeaderCell' if row_index == 0 else 'Cell'
+            row = []
+            for cell, column, span in cells:
+                width = sum(widths[column:column + span])
+                row.append(self._cell(cell, kind, width) if cell is not None else '')
+                row.extend([''] * (span - 1))
+            row.extend([''] * (columns - used))
+            rows.append(row)
+
+        base = [
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), CELL_FONT_SIZE),
+            ('LEADING', (0, 0), (-1, -1), CELL_FONT_SIZE + 2),
+            ('TOPPADDING', (0, 0), (-1, -1), 2),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+            ('LEFTPADDING', (0, 0), (-1, -1), CELL_PADDING),
+            ('RIGHTPADDING', (0, 0), (-1, -1), CELL_PADDING),
+        ]
+        first_row = [
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#EEEEEE')),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ]
+        header = 1 if repeat_header else 0
+
+        def make_table(start, stop):
+            # The table's first row is shaded, and so is the repeated header
+            commands = base + first_row if header or start == 0 else list(base)
+            offset = start - header
+            for row_index, begin, end in spans:
+                if row_index < header:
+                    commands.append(('SPAN', (begin, 0), (end, 0)))
+                elif start <= row_index < stop:
+                    commands.append(('SPAN', (begin, row_index - offset), (end, row_index - offset)))
+            return Table(rows[:header] + rows[start:stop], colWidths=widths, repeatRows=header,
+                         style=TableStyle(commands), hAlign='LEFT')
+
+        if len(rows) > header:
+            yield _TableRows(len(rows), header, make_table)
+        else:
+            yield make_table(header, header)
+        yield Spacer(1, 6)
+
+
+class _TableRows(Flowable):
+    """
+    A table laid out a page at a time
+
+    wrap and split only build a reportlab Table of the next TABLE_CHUNK_ROWS
+    rows (plus the repeated header rows), so placing a page of a long table
+    costs the same wherever it is in the table. A page that ends inside the
+    table gets the Table part that fits and the rest continues as another
+    _TableRows from the first row left.
+    """
+
+    def __init__(self, row_count, header, make_table, start=None):
+        super().__init__()
+        self.row_count = row_count
+        self.header = header
+        self.make_table = make_table
+        self.start = header if start is None else start
+        self.stop = min(row_count, self.start + TABLE_CHUNK_ROWS)
+        self.hAlign = 'LEFT'
+        self._table = None
+
+    def _chunk(self):
+        if self._table is None:
+            self._table = self.make_table(self.start, self.stop)
+        return self._table
+
+    def wrap(self, availWidth, availHeight):
+        width, height = self._chunk().wrap(availWidth, availHeight)
+        if self.stop < self.row_count:
+            # More rows follow this chunk: make the frame split it
+            height = max(height, availHeight + 1)
+        return width, height
+
+    def split(self, availWidth, availHeight):
+        parts = self._chunk().split(availWidth, availHeight)
+        if not parts:
+            return []
+        placed = parts[0]
+        start = self.start + len(placed._cellvalues) - self.header
+        if start >= self.row_count:
+            return [placed]
+        return [placed, _TableRows(self.row_count, self.header, self.make_table, start)]
+
+    def draw(self):
+        self._chunk().drawOn(self.canv, 0, 0)
+
+
+def _inside(element, tags, stop):
+    """True when an ancestor of element below stop has one of tags."""
+    parent = element.getparent()
+    while parent is not None and parent is not stop:
+        if parent.tag in tags:
+            return True
+        parent = parent.getparent()
+    return False
+
+
+def _is_nested(element):
+    """True for paragraphs and tables inside a table cell, a text box or an mc:Fallback."""
+    parent = element.getparent()
+    while parent is not None and parent.tag != f'{W}body':
+        if parent.tag == f'{W}tc' or parent.tag in OUT_OF_FLOW:
+            return True
+        parent = parent.getparent()
+    return False
+
+
+def iter_flowables(package, converter):
+    """Yield flowables for the document body in order, freeing parsed elements."""
+    from lxml import etree
+
+    with package.archive.open(package.document) as part:
+        for _, element in etree.iterparse(part, events=('end',), tag=(f'{W}p', f'{W}tbl')):
+            if _is_nested(element):
+                continue
+            if element.tag == f'{W}p':
+                yield from converter.paragraph(element)
+            else:
+                yield from converter.table(element)
+            element.clear()
+            parent = element.getparent()
+            while element.getprevious() is not None:
+                del parent[0]
+
+
+class _FlowableFeed(list):
+    """
+    The list of flowables reportlab lays out, refilled from an iterator
+    FEED_BATCH flowables at a time
+
+    BaseDocTemplate.build takes flowables from the front of the list and
+    checks len() before each one, so the list never holds more than a batch
+    plus the remainders of split flowables.
+    """
+
+    def __init__(self, flowables, batch=FEED_BATCH):
+        super().__init__()
+        self._source = iter(flowables)
+        self._batch = batch
+
+    def __len__(self):
+        if self._source is not None and super().__len__() < self._batch:
+            refill = list(islice(self._source, self._batch))
+            if refill:
+                self.extend(refill)
+            else:
+                self._source = None
+        return super().__len__()
+
+
+def render_document(word_path, output=None, progress=None):
+    """
+    Render a .docx into a PDF in output
+
+    progress(done, total, stage) counts pages; total is the page count
+    Word last saved, or 0 when unknown. Returns output (default: a new
+    temp file) rewound.
+    """
+    from reportlab.platypus import Paragraph, SimpleDocTemplate
+
+    if output is None:
+        output = tempfile.TemporaryFile()
+    try:
+        with zipfile.ZipFile(word_path) as archive:
+            package = _Package(archive)
+            pagesize, (left, right, top, bottom) = package.page_setup()
+            expected = package.expected_pages()
+            document = SimpleDocTemplate(output, pagesize=pagesize, leftMargin=left, rightMargin=right,
+                                         topMargin=top, bottomMargin=bottom, pageCompression=1)
+
+            def on_page(canvas, doc):
+                if progress:
+                    progress(doc.page, max(expected, doc.page), 'rendering')
+
+            converter = _Converter(package, document.width, document.height)
+            feed = _FlowableFeed(iter_flowables(package, converter))
+            if not len(feed):
+                feed.append(Paragraph('', paragraph_style('Normal')))
+            document.build(feed, onFirstPage=on_page, onLaterPages=on_page)
+            logger.debug(f"Rendered {word_path}: {document.page} pages")
+    except Exception:
+        output.close()
+        raise
+
+    output.seek(0)
+    return output
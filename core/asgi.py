@@ -1,9 +1,23 @@
 """
 ASGI config for pdfconverterpro project.
+
+Progress streams (/tools/tasks/<uuid>/events) are long-lived, so they are
+served by converter.events directly instead of going through the Django
+request cycle; everything else is handled by Django.
 """
 
 import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
-application = get_asgi_application()
\ No newline at end of file
+django_application = get_asgi_application()
+
+# Imported after setup: converter.events uses the app registry
+from converter.events import EVENTS_PATH, sse_application  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and EVENTS_PATH.match(scope['path']):
+        await sse_application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -79,6 +79,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'converter.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -89,6 +90,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'axes.middleware.AxesMiddleware',
+    'converter.ratelimit.RateLimitMiddleware',
 ]
 
 ROOT_URLCONF = 'core.urls'
@@ -133,6 +135,39 @@ if DATABASE_URL and DATABASE_URL.startswith('postgresql://'):
         conn_health_checks=True,
     )
 
+# ============ CACHE ============
+# Shared across processes when Redis is available; per-process otherwise
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# ============ RATE LIMITING ============
+# Token buckets shared by all processes: 'redis' (Lua script) or 'database'
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'redis' if REDIS_URL else 'database')
+RATE_LIMIT_REDIS_URL = REDIS_URL or 'redis://localhost:6379/0'
+# Requests per client IP, as 'N/s', 'N/m' or 'N/h'
+RATE_LIMITS = {
+    'upload': os.getenv('RATE_LIMIT_UPLOAD', '10/m'),
+    'conversion': os.getenv('RATE_LIMIT_CONVERSION', '5/m'),
+    'download': os.getenv('RATE_LIMIT_DOWNLOAD', '20/m'),
+    # Page thumbnails: one request per batch or image, so pages scroll into view freely
+    'preview': os.getenv('RATE_LIMIT_PREVIEW', '120/m'),
+    # Chunks of resumable uploads (starting one counts as an 'upload')
+    'upload_chunk': os.getenv('RATE_LIMIT_UPLOAD_CHUNK', '300/m'),
+    'default': os.getenv('RATE_LIMIT_DEFAULT', '5/m'),
+}
+
 # ============ PASSWORD VALIDATION ============
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -177,10 +212,146 @@ os.makedirs(STATIC_ROOT, exist_ok=True)
 # ============ FILE UPLOAD SETTINGS ============
 # FIXED: Add these settings to handle file uploads properly
 DATA_UPLOAD_MAX_MEMORY_SIZE = 50 * 1024 * 1024  # 50MB
-FILE_UPLOAD_MAX_MEMORY_SIZE = 50 * 1024 * 1024  # 50MB
+# Uploads are validated, hashed and written to MEDIA_ROOT in a single streaming
+# pass; nothing is buffered in memory beyond one chunk.
+FILE_UPLOAD_HANDLERS = ['converter.upload_handlers.SecureUploadHandler']
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2621440  # 2.5MB (Django default); only for non-streaming handlers
 FILE_UPLOAD_PERMISSIONS = 0o644
 FILE_UPLOAD_DIRECTORY_PERMISSIONS = 0o755
 
+# ============ RESUMABLE UPLOADS ============
+# Large files can also be sent in chunks that are retried one by one (see
+# converter/resumable.py). Chunks are streamed to disk, so this only bounds
+# how much a failed request has to resend.
+UPLOAD_CHUNK_MAX_BYTES = int(os.getenv('UPLOAD_CHUNK_MAX_MB', '8')) * 1024 * 1024
+# Chunk size suggested to clients
+UPLOAD_CHUNK_SIZE = min(int(os.getenv('UPLOAD_CHUNK_SIZE_KB', '2048')) * 1024, UPLOAD_CHUNK_MAX_BYTES)
+
+# ============ CONVERSION QUEUE ============
+# Views only enqueue tasks; `python manage.py run_conversion_workers` executes them.
+# Backends: 'database' (SQLite/PostgreSQL), 'redis', or 'eager' (run inline, dev only)
+CONVERSION_QUEUE_BACKEND = os.getenv('CONVERSION_QUEUE_BACKEND', 'database')
+CONVERSION_QUEUE_REDIS_URL = REDIS_URL or 'redis://localhost:6379/0'
+CONVERSION_QUEUE_POLL_INTERVAL = float(os.getenv('CONVERSION_QUEUE_POLL_INTERVAL', '1.0'))
+CONVERSION_WORKER_CONCURRENCY = int(os.getenv('CONVERSION_WORKER_CONCURRENCY', '2'))
+# Workers refresh the heartbeat of the task they run every CONVERSION_HEARTBEAT_INTERVAL
+# seconds. run_conversion_workers requeues tasks silent for CONVERSION_TASK_LEASE
+# seconds (worker killed, host restarted) and fails them after CONVERSION_TASK_MAX_ATTEMPTS.
+CONVERSION_HEARTBEAT_INTERVAL = float(os.getenv('CONVERSION_HEARTBEAT_INTERVAL', '30'))
+CONVERSION_TASK_LEASE = int(os.getenv('CONVERSION_TASK_LEASE', '300'))
+CONVERSION_TASK_MAX_ATTEMPTS = int(os.getenv('CONVERSION_TASK_MAX_ATTEMPTS', '3'))
+
+# ============ PROGRESS EVENTS ============
+# Workers report per-page progress; the ASGI app (core/asgi.py) streams it as
+# server-sent events. 'redis' fans out over pub/sub, 'database' polls the rows
+# of watched tasks once per interval per process (not per client).
+PROGRESS_BACKEND = os.getenv('PROGRESS_BACKEND', 'redis' if REDIS_URL else 'database')
+PROGRESS_REDIS_URL = REDIS_URL or 'redis://localhost:6379/0'
+PROGRESS_SAVE_INTERVAL = float(os.getenv('PROGRESS_SAVE_INTERVAL', '1.0'))
+PROGRESS_POLL_INTERVAL = float(os.getenv('PROGRESS_POLL_INTERVAL', '1.0'))
+PROGRESS_HEARTBEAT = float(os.getenv('PROGRESS_HEARTBEAT', '15'))
+
+# ============ METRICS ============
+# Prometheus metrics on /metrics (see converter.metrics). With several processes
+# (gunicorn, run_conversion_workers) set PROMETHEUS_MULTIPROC_DIR in the environment
+# so their values are summed; conversion workers serve theirs on METRICS_WORKER_PORT.
+# Off by default: the endpoint shows traffic and queue sizes. When on, scrapers
+# send 'Authorization: Bearer <METRICS_TOKEN>', or without a token must connect
+# from METRICS_ALLOWED_IPS (REMOTE_ADDR; forwarded headers are not trusted).
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'False').lower() in ['true', '1', 'yes']
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if ip.strip()]
+METRICS_WORKER_PORT = int(os.getenv('METRICS_WORKER_PORT', '0'))  # 0 = off
+
+# ============ PDF TO WORD ============
+# Large PDFs are parsed in page chunks across a process pool (1 = no parallelism)
+PDF_TO_WORD_WORKERS = int(os.getenv('PDF_TO_WORD_WORKERS', str(min(4, os.cpu_count() or 1))))
+PDF_TO_WORD_CHUNK_SIZE = int(os.getenv('PDF_TO_WORD_CHUNK_SIZE', '25'))
+
+# ============ LIBREOFFICE ============
+# Conversion types rendered by a pool of headless LibreOffice instances instead of
+# reportlab, e.g. 'word_to_pdf,excel_to_pdf' (see converter.office_pool). Without the
+# soffice binary and the uno module (python3-uno) they keep using reportlab.
+OFFICE_CONVERSION_TYPES = [t.strip() for t in os.getenv('OFFICE_CONVERSION_TYPES', '').split(',') if t.strip()]
+OFFICE_BINARY = os.getenv('OFFICE_BINARY', 'soffice')
+# Instances per host, shared by all worker processes; lock files and profiles live here
+OFFICE_POOL_SIZE = int(os.getenv('OFFICE_POOL_SIZE', '2'))
+OFFICE_POOL_DIR = os.getenv('OFFICE_POOL_DIR', '')  # '' = <tmp>/office_pool
+# An instance is restarted after this many jobs or above this much memory
+OFFICE_MAX_JOBS = int(os.getenv('OFFICE_MAX_JOBS', '200'))
+OFFICE_MAX_RSS_MB = int(os.getenv('OFFICE_MAX_RSS_MB', '1024'))
+OFFICE_TIMEOUT = int(os.getenv('OFFICE_TIMEOUT', '120'))  # seconds per document
+OFFICE_START_TIMEOUT = int(os.getenv('OFFICE_START_TIMEOUT', '60'))
+# How long a job waits for a free instance before falling back to reportlab
+OFFICE_ACQUIRE_TIMEOUT = int(os.getenv('OFFICE_ACQUIRE_TIMEOUT', '30'))
+
+# ============ CLEANUP ============
+# Uploads and conversion tasks expire this long after creation (expires_at);
+# `manage.py cleanup_expired` deletes expired rows in batches and unlinks their files
+FILE_RETENTION_SECONDS = int(os.getenv('FILE_RETENTION_SECONDS', '3600'))
+CLEANUP_BATCH_SIZE = int(os.getenv('CLEANUP_BATCH_SIZE', '500'))
+CLEANUP_WORKERS = int(os.getenv('CLEANUP_WORKERS', '4'))
+# Seconds between passes with --loop
+CLEANUP_INTERVAL = int(os.getenv('CLEANUP_INTERVAL', '300'))
+# Pending/processing tasks are kept past expiry until this grace runs out (abandoned)
+CLEANUP_IN_FLIGHT_GRACE = int(os.getenv('CLEANUP_IN_FLIGHT_GRACE', '86400'))
+
+# ============ CONVERSION RESULT CACHE ============
+# Identical uploads with identical options reuse the stored output.
+# Keep the TTL within FILE_RETENTION_SECONDS, the retention cleanup_expired enforces.
+CONVERSION_CACHE_ENABLED = os.getenv('CONVERSION_CACHE_ENABLED', 'True').lower() in ['true', '1', 'yes']
+CONVERSION_CACHE_TTL = int(os.getenv('CONVERSION_CACHE_TTL', '3600'))
+CONVERSION_CACHE_MAX_BYTES = int(os.getenv('CONVERSION_CACHE_MAX_MB', '1024')) * 1024 * 1024
+
+# ============ PDF COMPRESSION ============
+# Threads used to decode/downsample/re-encode images (Pillow releases the GIL)
+COMPRESSION_WORKERS = int(os.getenv('COMPRESSION_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+# ============ IMAGE TO PDF ============
+# Images are decoded and scaled to IMAGE_TO_PDF_DPI on the page before embedding;
+# JPEGs that are already small enough are embedded unchanged
+IMAGE_TO_PDF_DPI = int(os.getenv('IMAGE_TO_PDF_DPI', '150'))
+IMAGE_TO_PDF_JPEG_QUALITY = int(os.getenv('IMAGE_TO_PDF_JPEG_QUALITY', '85'))
+IMAGE_TO_PDF_WORKERS = int(os.getenv('IMAGE_TO_PDF_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+# ============ DOWNLOADS ============
+# '' serves files from Python (Range and ETag supported); 'nginx' returns
+# X-Accel-Redirect to DOWNLOAD_OFFLOAD_PREFIX (an internal location aliasing
+# MEDIA_ROOT, see nginx.conf); 'sendfile' returns X-Sendfile for Apache/lighttpd.
+DOWNLOAD_OFFLOAD = os.getenv('DOWNLOAD_OFFLOAD', '').lower()
+DOWNLOAD_OFFLOAD_PREFIX = os.getenv('DOWNLOAD_OFFLOAD_PREFIX', '/protected-media/')
+
+# ============ PDF SPLIT ============
+# "Split every N pages" builds parts across worker processes once there are enough of them
+SPLIT_WORKERS = int(os.getenv('SPLIT_WORKERS', str(min(4, os.cpu_count() or 1))))
+SPLIT_PARALLEL_MIN_PARTS = int(os.getenv('SPLIT_PARALLEL_MIN_PARTS', '50'))
+
+# ============ PDF TO IMAGE ============
+# Pages are rendered by page range across worker processes once there are enough of them
+PDF_TO_IMAGE_WORKERS = int(os.getenv('PDF_TO_IMAGE_WORKERS', str(min(4, os.cpu_count() or 1))))
+PDF_TO_IMAGE_PARALLEL_MIN_PAGES = int(os.getenv('PDF_TO_IMAGE_PARALLEL_MIN_PAGES', '16'))
+PDF_TO_IMAGE_MAX_DPI = int(os.getenv('PDF_TO_IMAGE_MAX_DPI', '300'))
+# Larger pages (posters, drawings) are rendered at a lower DPI to stay within this
+PDF_TO_IMAGE_MAX_PIXELS = int(os.getenv('PDF_TO_IMAGE_MAX_PIXELS', '40000000'))
+
+# ============ PAGE THUMBNAILS ============
+# PDF page previews rendered with PyMuPDF on one thread per web process and
+# cached on disk by (content hash, page, dpi, format); see converter/thumbnails.py
+THUMBNAIL_CACHE_DIR = os.getenv('THUMBNAIL_CACHE_DIR', str(BASE_DIR / 'cache' / 'thumbnails'))
+THUMBNAIL_CACHE_MAX_BYTES = int(os.getenv('THUMBNAIL_CACHE_MAX_MB', '256')) * 1024 * 1024
+# Thumbnails show user content: drop them once unused for the file retention period
+THUMBNAIL_CACHE_TTL = int(os.getenv('THUMBNAIL_CACHE_TTL', '3600'))
+THUMBNAIL_CACHE_SWEEP_INTERVAL = int(os.getenv('THUMBNAIL_CACHE_SWEEP_INTERVAL', '60'))
+THUMBNAIL_FORMAT = os.getenv('THUMBNAIL_FORMAT', 'webp')
+THUMBNAIL_DEFAULT_DPI = int(os.getenv('THUMBNAIL_DEFAULT_DPI', '48'))
+THUMBNAIL_MIN_DPI = int(os.getenv('THUMBNAIL_MIN_DPI', '24'))
+THUMBNAIL_MAX_DPI = int(os.getenv('THUMBNAIL_MAX_DPI', '150'))
+THUMBNAIL_MAX_SIDE = int(os.getenv('THUMBNAIL_MAX_SIDE', '1600'))
+# Pages per batch request, and requests waiting for the render thread before 503
+THUMBNAIL_BATCH_LIMIT = int(os.getenv('THUMBNAIL_BATCH_LIMIT', '24'))
+THUMBNAIL_QUEUE_LIMIT = int(os.getenv('THUMBNAIL_QUEUE_LIMIT', '8'))
+THUMBNAIL_TIMEOUT = int(os.getenv('THUMBNAIL_TIMEOUT', '30'))
+
 # ============ SECURITY ============
 if IS_PRODUCTION:
     SECURE_SSL_REDIRECT = True
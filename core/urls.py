@@ -3,13 +3,14 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from health import health_check 
+from health import health_check, metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('home.urls')),
     path('tools/', include('converter.urls')),
     path('healthz/', health_check),
+    path('metrics', metrics),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,23 @@
+"""
+Gunicorn hooks; gunicorn reads this file from the working directory.
+
+With PROMETHEUS_MULTIPROC_DIR set, every worker writes its metrics there
+(see converter.metrics): the directory is emptied when the arbiter starts
+and files of exited workers are marked dead.
+"""
+import os
+
+
+def on_starting(server):
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        os.makedirs(path, exist_ok=True)
+        for name in os.listdir(path):
+            if name.endswith('.db'):
+                os.remove(os.path.join(path, name))
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,7 +1,27 @@
 # health.py
-from django.http import HttpResponse
+import hmac
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, Http404
 from django.views.decorators.http import require_GET
 
 @require_GET
 def health_check(request):
-    return HttpResponse("OK", status=200)
\ No newline at end of file
+    return HttpResponse("OK", status=200)
+
+def _metrics_allowed(request):
+    """A scraper with the bearer token, or from an allowed address when no token is set."""
+    if settings.METRICS_TOKEN:
+        supplied = request.headers.get('Authorization', '')
+        return hmac.compare_digest(supplied.encode(), f'Bearer {settings.METRICS_TOKEN}'.encode())
+    return request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+
+@require_GET
+def metrics(request):
+    """Prometheus scrape endpoint; also kept off the public proxy (see nginx.conf)."""
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    if not _metrics_allowed(request):
+        return HttpResponseForbidden("Forbidden", content_type='text/plain')
+    from prometheus_client import CONTENT_TYPE_LATEST
+    from converter.metrics import render
+    return HttpResponse(render(), content_type=CONTENT_TYPE_LATEST)
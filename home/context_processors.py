@@ -2,7 +2,7 @@
 
 
 """Context processors for home app."""
-from converter.utils import get_all_tools
+from converter.tools import get_all_tools
 
 def site_info(request):
     """Add site information to all templates."""